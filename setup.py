@@ -68,7 +68,7 @@ setup(
         "python-constraint",
         "negmas>=0.10.0",
         "tqdm",
-        "joblib",
+        "joblib>=1.4",
         "jupyter",
         "gif",
         "mip",
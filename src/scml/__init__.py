@@ -2,8 +2,224 @@ __author__ = """Yasser Mohammad"""
 __email__ = "yasserfarouk@gmail.com"
 __version__ = "0.6.1"
 
-from .scml2019 import *
-from .scml2020 import *
-from .oneshot import *
+import importlib
+from typing import Any
 
-__all__ = scml2020.__all__ + oneshot.__all__
+# Subpackages are imported on first use to keep `import scml` fast. The public names of every subpackage are listed
+# here so that `from scml import X` keeps working without importing everything. If a name is exported by more than
+# one subpackage, the last one wins (the same as the star imports this replaces).
+_EXPORTS: dict[str, tuple[str, ...]] = {
+    "scml2019": (
+        "UNIT_PRICE",
+        "TIME",
+        "QUANTITY",
+        "Product",
+        "Process",
+        "InputOutput",
+        "RunningCommandInfo",
+        "INVALID_STEP",
+        "NO_PRODUCTION",
+        "ManufacturingProfile",
+        "ManufacturingProfileCompiled",
+        "ProductManufacturingInfo",
+        "FactoryStatusUpdate",
+        "Job",
+        "ProductionNeed",
+        "MissingInput",
+        "ProductionReport",
+        "ProductionFailure",
+        "FinancialReport",
+        "SCMLAgreement",
+        "SCMLAction",
+        "CFP",
+        "FrozenCFP",
+        "CFPIndex",
+        "Loan",
+        "InsurancePolicy",
+        "Factory",
+        "FactoryState",
+        "DEFAULT_NEGOTIATOR",
+        "INVALID_UTILITY",
+        "SCMLAWI",
+        "FactoryManager",
+        "DoNothingFactoryManager",
+        "GreedyFactoryManager",
+        "DefaultBank",
+        "Bank",
+        "LoanBook",
+        "DefaultInsuranceCompany",
+        "InsuranceCompany",
+        "SCML2019Agent",
+        "FactorySimulator",
+        "SlowFactorySimulator",
+        "FastFactorySimulator",
+        "SparseFactorySimulator",
+        "select_simulator_type",
+        "compare_simulators",
+        "transaction",
+        "temporary_transaction",
+        "anac2019_world",
+        "anac2019_tournament",
+        "anac2019_collusion",
+        "anac2019_std",
+        "balance_calculator",
+        "anac2019_sabotage",
+        "DefaultGreedyManager",
+        "pos_gauss",
+        "_safe_max",
+        "zero_runs",
+        "ScheduleInfo",
+        "Scheduler",
+        "GreedyScheduler",
+        "SCML2019World",
+        "Consumer",
+        "ConsumptionProfile",
+        "JustInTimeConsumer",
+        "Miner",
+        "MiningProfile",
+        "ReactiveMiner",
+    ),
+    "scml2020": (
+        "SYSTEM_BUYER_ID",
+        "SYSTEM_SELLER_ID",
+        "COMPENSATION_ID",
+        "ANY_STEP",
+        "NO_COMMAND",
+        "ANY_LINE",
+        "INFINITE_COST",
+        "QUANTITY",
+        "TIME",
+        "UNIT_PRICE",
+        "is_system_agent",
+        "FactoryState",
+        "FinancialReport",
+        "FactoryProfile",
+        "Failure",
+        "ExogenousContract",
+        "RandomAgent",
+        "DoNothingAgent",
+        "IndependentNegotiationsAgent",
+        "MarketAwareIndependentNegotiationsAgent",
+        "BuyCheapSellExpensiveAgent",
+        "MarketAwareBuyCheapSellExpensiveAgent",
+        "DecentralizingAgent",
+        "IndDecentralizingAgent",
+        "DecentralizingAgentWithLogging",
+        "MarketAwareDecentralizingAgent",
+        "MarketAwareIndDecentralizingAgent",
+        "ReactiveAgent",
+        "MarketAwareReactiveAgent",
+        "MovingRangeAgent",
+        "MarketAwareMovingRangeAgent",
+        "SatisficerAgent",
+        "SCML2020World",
+        "SCML2021World",
+        "SCML2022World",
+        "SCML2023World",
+        "AWI",
+        "Simulation",
+        "ProductionStrategy",
+        "SupplyDrivenProductionStrategy",
+        "DemandDrivenProductionStrategy",
+        "TradeDrivenProductionStrategy",
+        "TradePredictionStrategy",
+        "FixedTradePredictionStrategy",
+        "ExecutionRatePredictionStrategy",
+        "FixedERPStrategy",
+        "MeanERPStrategy",
+        "MarketERPStrategy",
+        "MarketAwareTradePredictionStrategy",
+        "SignAll",
+        "SignAllPossible",
+        "KeepOnlyGoodPrices",
+        "TradingStrategy",
+        "ReactiveTradingStrategy",
+        "PredictionBasedTradingStrategy",
+        "MarketAwarePredictionBasedTradingStrategy",
+        "NegotiationManager",
+        "StepNegotiationManager",
+        "IndependentNegotiationsManager",
+        "MovingRangeNegotiationManager",
+        "Factory",
+        "SCML2020Agent",
+        "OneShotAdapter",
+    ),
+    "oneshot": (
+        "QUANTITY",
+        "UNIT_PRICE",
+        "TIME",
+        "OneShotState",
+        "OneShotExogenousContract",
+        "OneShotExogenousContracts",
+        "EXOGENOUS_CONTRACT_DTYPE",
+        "OneShotProfile",
+        "FinancialReport",
+        "is_system_agent",
+        "best_subset",
+        "INFINITE_COST",
+        "SYSTEM_BUYER_ID",
+        "SYSTEM_SELLER_ID",
+        "SCML2020OneShotWorld",
+        "SCML2021OneShotWorld",
+        "SCML2022OneShotWorld",
+        "SCML2023OneShotWorld",
+        "OneShotUFun",
+        "UFunLimit",
+        "LimitCacheInfo",
+        "LIMIT_CACHE_SIZE",
+        "limit_cache_info",
+        "clear_limit_cache",
+        "enable_limit_cache",
+        "OneShotAgent",
+        "OneShotSyncAgent",
+        "OneShotSingleAgreementAgent",
+        "OneShotIndNegotiatorsAgent",
+        "EndingNegotiator",
+        "OneShotPolicy",
+        "OneShotBatchPolicy",
+        "RandomOneShotAgent",
+        "SyncRandomOneShotAgent",
+        "SingleAgreementRandomAgent",
+        "SingleAgreementAspirationAgent",
+        "GreedyOneShotAgent",
+        "GreedySyncAgent",
+        "GreedySingleAgreementAgent",
+        "OneshotDoNothingAgent",
+        "OneShotDummyAgent",
+        "OneShotAWI",
+        "builtin_agent_types",
+        "ActionManager",
+        "DefaultActionManager",
+        "ObservationManager",
+        "FixedPartnerNumbersObservationManager",
+        "LimitedPartnerNumbersObservationManager",
+        "DefaultObservationManager",
+        "OneShotRLAgent",
+        "OneShotEnv",
+        "OneShotWorldFactory",
+        "FixedPartnerNumbersOneShotFactory",
+        "LimitedPartnerNumbersOneShotFactory",
+        "ANACOneShotFactory",
+    ),
+}
+
+_SUBPACKAGES = tuple(_EXPORTS.keys())
+
+_LAZY_NAMES = {name: pkg for pkg, names in _EXPORTS.items() for name in names}
+
+__all__ = list(dict.fromkeys(_EXPORTS["scml2020"] + _EXPORTS["oneshot"]))
+
+
+def __getattr__(name: str) -> Any:
+    if name in _SUBPACKAGES:
+        return importlib.import_module(f".{name}", __name__)
+    pkg = _LAZY_NAMES.get(name, None)
+    if pkg is None:
+        raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
+    value = getattr(importlib.import_module(f".{pkg}", __name__), name)
+    globals()[name] = value
+    return value
+
+
+def __dir__() -> list[str]:
+    return sorted(set(globals().keys()) | set(_LAZY_NAMES.keys()) | set(_SUBPACKAGES))
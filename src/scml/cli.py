@@ -1,5 +1,11 @@
 #!/usr/bin/env python
-"""The SCML universal command line tool"""
+"""The SCML universal command line tool
+
+Heavy dependencies (negmas, pandas, the simulators, ...) are imported inside the commands that use them so that
+starting the tool (e.g. `scml version`) stays fast.
+"""
+from __future__ import annotations
+
 import math
 import os
 import sys
@@ -9,43 +15,17 @@ from functools import partial
 from pathlib import Path
 from pprint import pformat, pprint
 from time import perf_counter
-from typing import List
+from typing import TYPE_CHECKING, List
 
 import click
 import click_config_file
-import negmas
-import numpy as np
-import pandas as pd
 import tqdm
 import yaml
-from negmas import save_stats
-from negmas.helpers import humanize_time, unique_name
-from negmas.helpers.inout import load
-from tabulate import tabulate
 
 import scml
-from scml.oneshot import SCML2020OneShotWorld, SCML2023OneShotWorld
-from scml.oneshot.world import SCML2021OneShotWorld, SCML2022OneShotWorld
-from scml.scml2019 import FactoryManager, SCML2019World
-from scml.scml2019.utils import (
-    DefaultGreedyManager,
-    anac2019_collusion,
-    anac2019_sabotage,
-    anac2019_std,
-)
-from scml.scml2020.agent import SCML2020Agent
-from scml.scml2020.common import is_system_agent
-from scml.scml2020.world import SCML2020World, SCML2021World, SCML2023World
-from scml.utils import (
-    anac2020_collusion,
-    anac2020_std,
-    anac2021_collusion,
-    anac2021_oneshot,
-    anac2021_std,
-    anac2023_collusion,
-    anac2023_oneshot,
-    anac2023_std,
-)
+
+if TYPE_CHECKING:
+    from scml.sinks import ContractSink
 
 try:
     from scml.vendor.quick.quick import gui_option
@@ -316,6 +296,16 @@ def tournament2019(
     path,
     cw,
 ):
+    from negmas.helpers import humanize_time, unique_name
+    from negmas.helpers.inout import load
+
+    from scml.scml2019.utils import (
+        DefaultGreedyManager,
+        anac2019_collusion,
+        anac2019_sabotage,
+        anac2019_std,
+    )
+
     if len(output) == 0 or output == "none":
         output = None
     if output:
@@ -605,6 +595,11 @@ def tournament2020(
     parallel,
     output,
 ):
+    from negmas.helpers import humanize_time, unique_name
+    from negmas.helpers.inout import load
+
+    from scml.utils import anac2020_collusion, anac2020_std
+
     if len(output) == 0 or output == "none":
         output = None
     if output:
@@ -739,6 +734,8 @@ def tournament2020(
 
 
 def display_results(results, metric, file_name=None):
+    from tabulate import tabulate
+
     file = None
     if file_name:
         file = open(file_name, "w")
@@ -787,6 +784,55 @@ def display_results(results, metric, file_name=None):
         file.close()
 
 
+def _print_contracts(
+    world, sink: ContractSink, print_and_log, show_contracts, executed_as_signed
+):
+    """Prints signed contracts one chunk at a time and a per-product summary of the trades of a world"""
+    from tabulate import tabulate
+
+    columns = [
+        "seller_name",
+        "buyer_name",
+        "delivery_time",
+        "unit_price",
+        "quantity",
+        "product_name",
+        "n_neg_steps",
+        "signed_at",
+        "executed_at",
+    ]
+    if show_contracts:
+        for data in sink.iter_records("contracts", columns):
+            data = data.loc[data.signed_at >= 0, columns]
+            data.columns = [
+                "seller",
+                "buyer",
+                "t",
+                "price",
+                "q",
+                "product",
+                "steps",
+                "signed",
+                "executed",
+            ]
+            if executed_as_signed:
+                data["executed"] = data["signed"] = data["t"]
+            print_and_log(tabulate(data, headers="keys", tablefmt="psql"))
+
+    d2 = sink.product_summary(executed_only=not executed_as_signed)
+    d2["Catalog"] = world.catalog_prices[
+        d2["product"].str.slice(start=-1).astype(int).values
+    ]
+    d2["Trading"] = world.trading_prices[
+        d2["product"].str.slice(start=-1).astype(int).values
+    ]
+    d2["Product"] = d2["product"]
+    d2 = d2.loc[:, ["Product", "quantity", "uprice", "Catalog", "Trading"]]
+
+    d2.columns = ["Product", "Quantity", "Avg. Price", "Catalog", "Trading"]
+    print_and_log(tabulate(d2, headers="keys", tablefmt="psql"))
+
+
 def _path(path) -> Path:
     """Creates an absolute path from given path which can be a string"""
     if isinstance(path, Path):
@@ -865,6 +911,15 @@ def run2019(
     path,
     world_config,
 ):
+    import numpy as np
+    import pandas as pd
+    from negmas import save_stats
+    from negmas.helpers import humanize_time, unique_name
+    from negmas.helpers.inout import load
+    from tabulate import tabulate
+
+    from scml.scml2019 import FactoryManager, SCML2019World
+
     kwargs = dict(
         no_bank=True,
         no_insurance=False,
@@ -1142,6 +1197,13 @@ def run2019(
     multiple=False,
     help="A file to load extra configuration parameters for world simulations from.",
 )
+@click.option(
+    "--stream/--no-stream",
+    default=True,
+    help="Stream contracts, breaches and negotiations to chunked files in the log folder while the world runs "
+    "instead of keeping them all in memory (the default). The standard contracts.csv, breaches.csv and "
+    "negotiations.csv files are still written at the end. Pass --no-stream to keep all records in memory",
+)
 @click_config_file.configuration_option()
 def run2020(
     steps,
@@ -1155,7 +1217,19 @@ def run2020(
     path,
     world_config,
     show_contracts,
+    stream,
 ):
+    import numpy as np
+    import pandas as pd
+    from negmas import save_stats
+    from negmas.helpers import humanize_time, unique_name
+    from negmas.helpers.inout import load
+    from tabulate import tabulate
+
+    from scml.scml2020.agent import SCML2020Agent
+    from scml.scml2020.world import SCML2020World
+    from scml.sinks import ContractSink
+
     if time <= 0:
         time = None
     kwargs = {"n_steps": steps}
@@ -1203,6 +1277,7 @@ def run2020(
             **kwargs,
         )
     )
+    sink = ContractSink(world, log_dir, stream=stream)
     failed = False
     strt = perf_counter()
     try:
@@ -1212,6 +1287,7 @@ def run2020(
                 break
             if not world.step():
                 break
+            sink.flush()
     except Exception:
         exception = traceback.format_exc()
         failed = True
@@ -1229,68 +1305,17 @@ def run2020(
     )
 
     save_stats(world=world, log_dir=log_dir, params=params)
+    # rewrites the contracts, breaches and negotiations files of save_stats when records were streamed
+    sink.close()
 
-    if len(world.saved_contracts) > 0:
-        data = pd.DataFrame(world.saved_contracts)
-        data = data.sort_values(["delivery_time"])
-        data = data.loc[
-            data.signed_at >= 0,
-            [
-                "seller_name",
-                "buyer_name",
-                "delivery_time",
-                "unit_price",
-                "quantity",
-                "product_name",
-                "n_neg_steps",
-                "signed_at",
-                "executed_at",
-            ],
-        ]
-        data.columns = [
-            "seller",
-            "buyer",
-            "t",
-            "price",
-            "q",
-            "product",
-            "steps",
-            "signed",
-            "executed",
-        ]
-        if show_contracts:
-            print_and_log(tabulate(data, headers="keys", tablefmt="psql"))
-
-        d2 = (
-            data.loc[(~(data["executed"].isnull())) & (data["executed"] > -1), :]
-            .groupby(["product"])
-            .apply(
-                lambda x: pd.DataFrame(
-                    [
-                        {
-                            "uprice": np.sum(x["price"] * x["q"]) / np.sum(x["q"]),
-                            "quantity": np.sum(x["q"]),
-                        }
-                    ]
-                )
-            )
+    if sink.n_contracts > 0:
+        _print_contracts(
+            world, sink, print_and_log, show_contracts, executed_as_signed=False
         )
-        d2 = d2.reset_index().sort_values(["product"])
-        d2["Catalog"] = world.catalog_prices[
-            d2["product"].str.slice(start=-1).astype(int).values
-        ]
-        d2["Trading"] = world.trading_prices[
-            d2["product"].str.slice(start=-1).astype(int).values
-        ]
-        d2["Product"] = d2["product"]
-        d2 = d2.loc[:, ["Product", "quantity", "uprice", "Catalog", "Trading"]]
-
-        d2.columns = ["Product", "Quantity", "Avg. Price", "Catalog", "Trading"]
-        print_and_log(tabulate(d2, headers="keys", tablefmt="psql"))
 
         n_executed = sum(world.stats["n_contracts_executed"])
         n_negs = sum(world.stats["n_negotiations"])
-        n_contracts = len(world.saved_contracts)
+        n_contracts = sink.n_contracts
         try:
             agent_scores = sorted(
                 (
@@ -1313,32 +1338,30 @@ def run2020(
         ]
         print_and_log(
             f"{n_contracts} contracts :-) [N. Negotiations: {n_negs}, Agreement Rate: "
-            f"{world.agreement_fraction:0.0%}]"
+            f"{sink.agreement_fraction:0.0%}]"
             f" (rounds/successful negotiation: {world.n_negotiation_rounds_successful:5.2f}, "
-            f"rounds/broken negotiation: {world.n_negotiation_rounds_failed:5.2f})"
+            f"rounds/broken negotiation: {sink.n_negotiation_rounds_failed:5.2f})"
         )
         total = (
-            world.contract_dropping_fraction
-            + world.contract_nullification_fraction
-            + world.contract_err_fraction
-            + world.breach_fraction
-            + world.contract_execution_fraction
+            sink.contract_dropping_fraction
+            + sink.contract_nullification_fraction
+            + sink.contract_err_fraction
+            + sink.breach_fraction
+            + sink.contract_execution_fraction
         )
         n_cancelled = (
-            int(round(n_contracts * world.cancellation_rate)) if n_negs > 0 else 0
+            int(round(n_contracts * sink.cancellation_rate)) if n_negs > 0 else 0
         )
         n_signed = n_contracts - n_cancelled
-        n_dropped = int(round(n_signed * world.contract_dropping_fraction))
-        n_nullified = int(round(n_signed * world.contract_nullification_fraction))
-        n_erred = int(round(n_signed * world.contract_err_fraction))
-        n_breached = int(round(n_signed * world.breach_fraction))
-        n_executed = int(round(n_signed * world.contract_execution_fraction))
-        exogenous = [_ for _ in world.saved_contracts if not _["issues"]]
-        negotiated = [_ for _ in world.saved_contracts if _["issues"]]
-        n_exogenous = len(exogenous)
-        n_negotiated = len(negotiated)
-        n_exogenous_signed = len([_ for _ in exogenous if _["signed_at"] >= 0])
-        n_negotiated_signed = len([_ for _ in negotiated if _["signed_at"] >= 0])
+        n_dropped = int(round(n_signed * sink.contract_dropping_fraction))
+        n_nullified = int(round(n_signed * sink.contract_nullification_fraction))
+        n_erred = int(round(n_signed * sink.contract_err_fraction))
+        n_breached = int(round(n_signed * sink.breach_fraction))
+        n_executed = int(round(n_signed * sink.contract_execution_fraction))
+        n_exogenous = sink.count("n_exogenous")
+        n_negotiated = sink.count("n_negotiated")
+        n_exogenous_signed = sink.count("n_exogenous_signed")
+        n_negotiated_signed = sink.count("n_negotiated_signed")
         print_and_log(
             f"Exogenous Contracts : {n_exogenous} of which {n_exogenous_signed} "
             f" were signed ({n_exogenous_signed/n_exogenous if n_exogenous!=0 else 0: 0.1%})"
@@ -1349,14 +1372,14 @@ def run2020(
         )
         print_and_log(
             f"All Contracts       : {n_exogenous + n_negotiated} of which {n_exogenous_signed + n_negotiated_signed} "
-            f" were signed ({1-world.cancellation_rate:0.1%})"
+            f" were signed ({1-sink.cancellation_rate:0.1%})"
         )
         print_and_log(
-            f"Executed: {world.contract_execution_fraction:0.1%}"
-            f", Breached: {world.breach_fraction:0.1%}"
-            f", Erred: {world.contract_err_fraction:0.1%}"
-            f", Nullified: {world.contract_nullification_fraction:0.1%}"
-            f", Dropped: {world.contract_dropping_fraction:0.1%}"
+            f"Executed: {sink.contract_execution_fraction:0.1%}"
+            f", Breached: {sink.breach_fraction:0.1%}"
+            f", Erred: {sink.contract_err_fraction:0.1%}"
+            f", Nullified: {sink.contract_nullification_fraction:0.1%}"
+            f", Dropped: {sink.contract_dropping_fraction:0.1%}"
             f" (Sum:{total: 0.0%})\n"
             f"Negotiated: {n_negs} Concluded: {n_contracts} Signed: {n_signed} Dropped: {n_dropped}  "
             f"Nullified: {n_nullified} "
@@ -1472,6 +1495,13 @@ DEFAULT_ONESHOT_NONCOMPETITORS = [
     default="profitable",
     help="The method used for world generation",
 )
+@click.option(
+    "--stream/--no-stream",
+    default=True,
+    help="Stream contracts, breaches and negotiations to chunked files in the log folder while the world runs "
+    "instead of keeping them all in memory (the default). The standard contracts.csv, breaches.csv and "
+    "negotiations.csv files are still written at the end. Pass --no-stream to keep all records in memory",
+)
 @click_config_file.configuration_option()
 def run2023(
     steps,
@@ -1488,7 +1518,20 @@ def run2023(
     oneshot,
     name,
     method,
+    stream,
 ):
+    import numpy as np
+    import pandas as pd
+    from negmas import save_stats
+    from negmas.helpers import humanize_time, unique_name
+    from negmas.helpers.inout import load
+    from tabulate import tabulate
+
+    from scml.oneshot import SCML2023OneShotWorld
+    from scml.scml2020.common import is_system_agent
+    from scml.scml2020.world import SCML2023World
+    from scml.sinks import ContractSink
+
     if not competitors:
         competitors = (
             (DEFAULT_ONESHOT + ";" + ";".join(DEFAULT_ONESHOT_NONCOMPETITORS))
@@ -1555,6 +1598,7 @@ def run2023(
             **kwargs,
         )
     )
+    sink = ContractSink(world, log_dir, stream=stream)
     failed = False
     strt = perf_counter()
     try:
@@ -1564,6 +1608,7 @@ def run2023(
                 break
             if not world.step():
                 break
+            sink.flush()
     except Exception:
         exception = traceback.format_exc()
         failed = True
@@ -1581,73 +1626,22 @@ def run2023(
     )
 
     save_stats(world=world, log_dir=log_dir, params=params)
+    # rewrites the contracts, breaches and negotiations files of save_stats when records were streamed
+    sink.close()
 
-    if len(world.saved_contracts) > 0:
-        data = pd.DataFrame(world.saved_contracts)
-        data = data.sort_values(["delivery_time"])
-        data = data.loc[
-            data.signed_at >= 0,
-            [
-                "seller_name",
-                "buyer_name",
-                "delivery_time",
-                "unit_price",
-                "quantity",
-                "product_name",
-                "n_neg_steps",
-                "signed_at",
-                "executed_at",
-            ],
-        ]
-        data.columns = [
-            "seller",
-            "buyer",
-            "t",
-            "price",
-            "q",
-            "product",
-            "steps",
-            "signed",
-            "executed",
-        ]
-        data["executed"] = data["signed"] = data["t"]
-        if show_contracts:
-            print_and_log(tabulate(data, headers="keys", tablefmt="psql"))
-
-        d2 = (
-            data.loc[(~(data["executed"].isnull())) & (data["executed"] > -1), :]
-            .groupby(["product"])
-            .apply(
-                lambda x: pd.DataFrame(
-                    [
-                        {
-                            "uprice": np.sum(x["price"] * x["q"]) / np.sum(x["q"]),
-                            "quantity": np.sum(x["q"]),
-                        }
-                    ]
-                )
-            )
+    if sink.n_contracts > 0:
+        _print_contracts(
+            world, sink, print_and_log, show_contracts, executed_as_signed=True
         )
-        d2 = d2.reset_index().sort_values(["product"])
-        d2["Catalog"] = world.catalog_prices[
-            d2["product"].str.slice(start=-1).astype(int).values
-        ]
-        d2["Trading"] = world.trading_prices[
-            d2["product"].str.slice(start=-1).astype(int).values
-        ]
-        d2["Product"] = d2["product"]
-        d2 = d2.loc[:, ["Product", "quantity", "uprice", "Catalog", "Trading"]]
-
-        d2.columns = ["Product", "Quantity", "Avg. Price", "Catalog", "Trading"]
-        print_and_log(tabulate(d2, headers="keys", tablefmt="psql"))
 
         n_executed = sum(world.stats["n_contracts_executed"])
         n_negs = sum(world.stats["n_negotiations"])
-        n_contracts = len(world.saved_contracts)
+        n_contracts = sink.n_contracts
+        scores = world.scores()
         try:
             agent_scores = sorted(
                 (
-                    [_.name, world.scores()[_.id]]
+                    [_.name, scores[_.id]]
                     for _ in world.agents.values()
                     if not is_system_agent(_)
                 ),
@@ -1660,35 +1654,33 @@ def run2023(
             print_and_log(tabulate(agent_scores, headers="keys", tablefmt="psql"))
         except:
             pass
-        winners = [f"{_.name} gaining {world.scores()[_.id]}" for _ in world.winners]
+        winners = [f"{_.name} gaining {scores[_.id]}" for _ in world.winners]
         print_and_log(
             f"{n_contracts} contracts :-) [N. Negotiations: {n_negs}, Agreement Rate: "
-            f"{world.agreement_fraction:0.0%}]"
+            f"{sink.agreement_fraction:0.0%}]"
             f" (rounds/successful negotiation: {world.n_negotiation_rounds_successful:5.2f}, "
-            f"rounds/broken negotiation: {world.n_negotiation_rounds_failed:5.2f})"
+            f"rounds/broken negotiation: {sink.n_negotiation_rounds_failed:5.2f})"
         )
         total = (
-            world.contract_dropping_fraction
-            + world.contract_nullification_fraction
-            + world.contract_err_fraction
-            + world.breach_fraction
-            + world.contract_execution_fraction
+            sink.contract_dropping_fraction
+            + sink.contract_nullification_fraction
+            + sink.contract_err_fraction
+            + sink.breach_fraction
+            + sink.contract_execution_fraction
         )
         n_cancelled = (
-            int(round(n_contracts * world.cancellation_rate)) if n_negs > 0 else 0
+            int(round(n_contracts * sink.cancellation_rate)) if n_negs > 0 else 0
         )
         n_signed = n_contracts - n_cancelled
-        n_dropped = int(round(n_signed * world.contract_dropping_fraction))
-        n_nullified = int(round(n_signed * world.contract_nullification_fraction))
-        n_erred = int(round(n_signed * world.contract_err_fraction))
-        n_breached = int(round(n_signed * world.breach_fraction))
-        n_executed = int(round(n_signed * world.contract_execution_fraction))
-        exogenous = [_ for _ in world.saved_contracts if not _["issues"]]
-        negotiated = [_ for _ in world.saved_contracts if _["issues"]]
-        n_exogenous = len(exogenous)
-        n_negotiated = len(negotiated)
-        n_exogenous_signed = len([_ for _ in exogenous if _["signed_at"] >= 0])
-        n_negotiated_signed = len([_ for _ in negotiated if _["signed_at"] >= 0])
+        n_dropped = int(round(n_signed * sink.contract_dropping_fraction))
+        n_nullified = int(round(n_signed * sink.contract_nullification_fraction))
+        n_erred = int(round(n_signed * sink.contract_err_fraction))
+        n_breached = int(round(n_signed * sink.breach_fraction))
+        n_executed = int(round(n_signed * sink.contract_execution_fraction))
+        n_exogenous = sink.count("n_exogenous")
+        n_negotiated = sink.count("n_negotiated")
+        n_exogenous_signed = sink.count("n_exogenous_signed")
+        n_negotiated_signed = sink.count("n_negotiated_signed")
         print_and_log(
             f"Exogenous Contracts : {n_exogenous} of which {n_exogenous_signed} "
             f" were signed ({n_exogenous_signed/n_exogenous if n_exogenous!=0 else 0: 0.1%})"
@@ -1699,14 +1691,14 @@ def run2023(
         )
         print_and_log(
             f"All Contracts       : {n_exogenous + n_negotiated} of which {n_exogenous_signed + n_negotiated_signed} "
-            f" were signed ({1-world.cancellation_rate:0.1%})"
+            f" were signed ({1-sink.cancellation_rate:0.1%})"
         )
         print_and_log(
-            f"Executed: {world.contract_execution_fraction:0.1%}"
-            f", Breached: {world.breach_fraction:0.1%}"
-            f", Erred: {world.contract_err_fraction:0.1%}"
-            f", Nullified: {world.contract_nullification_fraction:0.1%}"
-            f", Dropped: {world.contract_dropping_fraction:0.1%}"
+            f"Executed: {sink.contract_execution_fraction:0.1%}"
+            f", Breached: {sink.breach_fraction:0.1%}"
+            f", Erred: {sink.contract_err_fraction:0.1%}"
+            f", Nullified: {sink.contract_nullification_fraction:0.1%}"
+            f", Dropped: {sink.contract_dropping_fraction:0.1%}"
             f" (Sum:{total: 0.0%})\n"
             f"Negotiated: {n_negs} Concluded: {n_contracts} Signed: {n_signed} Dropped: {n_dropped}  "
             f"Nullified: {n_nullified} "
@@ -1800,6 +1792,13 @@ def run2023(
     default="profitable",
     help="The method used for world generation",
 )
+@click.option(
+    "--stream/--no-stream",
+    default=True,
+    help="Stream contracts, breaches and negotiations to chunked files in the log folder while the world runs "
+    "instead of keeping them all in memory (the default). The standard contracts.csv, breaches.csv and "
+    "negotiations.csv files are still written at the end. Pass --no-stream to keep all records in memory",
+)
 @click_config_file.configuration_option()
 def run2022(
     steps,
@@ -1816,7 +1815,20 @@ def run2022(
     oneshot,
     name,
     method,
+    stream,
 ):
+    import numpy as np
+    import pandas as pd
+    from negmas import save_stats
+    from negmas.helpers import humanize_time, unique_name
+    from negmas.helpers.inout import load
+    from tabulate import tabulate
+
+    from scml.oneshot.world import SCML2022OneShotWorld
+    from scml.scml2020.common import is_system_agent
+    from scml.scml2020.world import SCML2022World
+    from scml.sinks import ContractSink
+
     if not competitors:
         competitors = (
             (DEFAULT_ONESHOT + ";" + ";".join(DEFAULT_ONESHOT_NONCOMPETITORS))
@@ -1883,6 +1895,7 @@ def run2022(
             **kwargs,
         )
     )
+    sink = ContractSink(world, log_dir, stream=stream)
     failed = False
     strt = perf_counter()
     try:
@@ -1892,6 +1905,7 @@ def run2022(
                 break
             if not world.step():
                 break
+            sink.flush()
     except Exception:
         exception = traceback.format_exc()
         failed = True
@@ -1909,73 +1923,22 @@ def run2022(
     )
 
     save_stats(world=world, log_dir=log_dir, params=params)
+    # rewrites the contracts, breaches and negotiations files of save_stats when records were streamed
+    sink.close()
 
-    if len(world.saved_contracts) > 0:
-        data = pd.DataFrame(world.saved_contracts)
-        data = data.sort_values(["delivery_time"])
-        data = data.loc[
-            data.signed_at >= 0,
-            [
-                "seller_name",
-                "buyer_name",
-                "delivery_time",
-                "unit_price",
-                "quantity",
-                "product_name",
-                "n_neg_steps",
-                "signed_at",
-                "executed_at",
-            ],
-        ]
-        data.columns = [
-            "seller",
-            "buyer",
-            "t",
-            "price",
-            "q",
-            "product",
-            "steps",
-            "signed",
-            "executed",
-        ]
-        data["executed"] = data["signed"] = data["t"]
-        if show_contracts:
-            print_and_log(tabulate(data, headers="keys", tablefmt="psql"))
-
-        d2 = (
-            data.loc[(~(data["executed"].isnull())) & (data["executed"] > -1), :]
-            .groupby(["product"])
-            .apply(
-                lambda x: pd.DataFrame(
-                    [
-                        {
-                            "uprice": np.sum(x["price"] * x["q"]) / np.sum(x["q"]),
-                            "quantity": np.sum(x["q"]),
-                        }
-                    ]
-                )
-            )
+    if sink.n_contracts > 0:
+        _print_contracts(
+            world, sink, print_and_log, show_contracts, executed_as_signed=True
         )
-        d2 = d2.reset_index().sort_values(["product"])
-        d2["Catalog"] = world.catalog_prices[
-            d2["product"].str.slice(start=-1).astype(int).values
-        ]
-        d2["Trading"] = world.trading_prices[
-            d2["product"].str.slice(start=-1).astype(int).values
-        ]
-        d2["Product"] = d2["product"]
-        d2 = d2.loc[:, ["Product", "quantity", "uprice", "Catalog", "Trading"]]
-
-        d2.columns = ["Product", "Quantity", "Avg. Price", "Catalog", "Trading"]
-        print_and_log(tabulate(d2, headers="keys", tablefmt="psql"))
 
         n_executed = sum(world.stats["n_contracts_executed"])
         n_negs = sum(world.stats["n_negotiations"])
-        n_contracts = len(world.saved_contracts)
+        n_contracts = sink.n_contracts
+        scores = world.scores()
         try:
             agent_scores = sorted(
                 (
-                    [_.name, world.scores()[_.id]]
+                    [_.name, scores[_.id]]
                     for _ in world.agents.values()
                     if not is_system_agent(_)
                 ),
@@ -1988,35 +1951,33 @@ def run2022(
             print_and_log(tabulate(agent_scores, headers="keys", tablefmt="psql"))
         except:
             pass
-        winners = [f"{_.name} gaining {world.scores()[_.id]}" for _ in world.winners]
+        winners = [f"{_.name} gaining {scores[_.id]}" for _ in world.winners]
         print_and_log(
             f"{n_contracts} contracts :-) [N. Negotiations: {n_negs}, Agreement Rate: "
-            f"{world.agreement_fraction:0.0%}]"
+            f"{sink.agreement_fraction:0.0%}]"
             f" (rounds/successful negotiation: {world.n_negotiation_rounds_successful:5.2f}, "
-            f"rounds/broken negotiation: {world.n_negotiation_rounds_failed:5.2f})"
+            f"rounds/broken negotiation: {sink.n_negotiation_rounds_failed:5.2f})"
         )
         total = (
-            world.contract_dropping_fraction
-            + world.contract_nullification_fraction
-            + world.contract_err_fraction
-            + world.breach_fraction
-            + world.contract_execution_fraction
+            sink.contract_dropping_fraction
+            + sink.contract_nullification_fraction
+            + sink.contract_err_fraction
+            + sink.breach_fraction
+            + sink.contract_execution_fraction
         )
         n_cancelled = (
-            int(round(n_contracts * world.cancellation_rate)) if n_negs > 0 else 0
+            int(round(n_contracts * sink.cancellation_rate)) if n_negs > 0 else 0
         )
         n_signed = n_contracts - n_cancelled
-        n_dropped = int(round(n_signed * world.contract_dropping_fraction))
-        n_nullified = int(round(n_signed * world.contract_nullification_fraction))
-        n_erred = int(round(n_signed * world.contract_err_fraction))
-        n_breached = int(round(n_signed * world.breach_fraction))
-        n_executed = int(round(n_signed * world.contract_execution_fraction))
-        exogenous = [_ for _ in world.saved_contracts if not _["issues"]]
-        negotiated = [_ for _ in world.saved_contracts if _["issues"]]
-        n_exogenous = len(exogenous)
-        n_negotiated = len(negotiated)
-        n_exogenous_signed = len([_ for _ in exogenous if _["signed_at"] >= 0])
-        n_negotiated_signed = len([_ for _ in negotiated if _["signed_at"] >= 0])
+        n_dropped = int(round(n_signed * sink.contract_dropping_fraction))
+        n_nullified = int(round(n_signed * sink.contract_nullification_fraction))
+        n_erred = int(round(n_signed * sink.contract_err_fraction))
+        n_breached = int(round(n_signed * sink.breach_fraction))
+        n_executed = int(round(n_signed * sink.contract_execution_fraction))
+        n_exogenous = sink.count("n_exogenous")
+        n_negotiated = sink.count("n_negotiated")
+        n_exogenous_signed = sink.count("n_exogenous_signed")
+        n_negotiated_signed = sink.count("n_negotiated_signed")
         print_and_log(
             f"Exogenous Contracts : {n_exogenous} of which {n_exogenous_signed} "
             f" were signed ({n_exogenous_signed/n_exogenous if n_exogenous!=0 else 0: 0.1%})"
@@ -2027,14 +1988,14 @@ def run2022(
         )
         print_and_log(
             f"All Contracts       : {n_exogenous + n_negotiated} of which {n_exogenous_signed + n_negotiated_signed} "
-            f" were signed ({1-world.cancellation_rate:0.1%})"
+            f" were signed ({1-sink.cancellation_rate:0.1%})"
         )
         print_and_log(
-            f"Executed: {world.contract_execution_fraction:0.1%}"
-            f", Breached: {world.breach_fraction:0.1%}"
-            f", Erred: {world.contract_err_fraction:0.1%}"
-            f", Nullified: {world.contract_nullification_fraction:0.1%}"
-            f", Dropped: {world.contract_dropping_fraction:0.1%}"
+            f"Executed: {sink.contract_execution_fraction:0.1%}"
+            f", Breached: {sink.breach_fraction:0.1%}"
+            f", Erred: {sink.contract_err_fraction:0.1%}"
+            f", Nullified: {sink.contract_nullification_fraction:0.1%}"
+            f", Dropped: {sink.contract_dropping_fraction:0.1%}"
             f" (Sum:{total: 0.0%})\n"
             f"Negotiated: {n_negs} Concluded: {n_contracts} Signed: {n_signed} Dropped: {n_dropped}  "
             f"Nullified: {n_nullified} "
@@ -2128,6 +2089,13 @@ def run2022(
     default="profitable",
     help="The method used for world generation",
 )
+@click.option(
+    "--stream/--no-stream",
+    default=True,
+    help="Stream contracts, breaches and negotiations to chunked files in the log folder while the world runs "
+    "instead of keeping them all in memory (the default). The standard contracts.csv, breaches.csv and "
+    "negotiations.csv files are still written at the end. Pass --no-stream to keep all records in memory",
+)
 @click_config_file.configuration_option()
 def run2021(
     steps,
@@ -2144,7 +2112,20 @@ def run2021(
     oneshot,
     name,
     method,
+    stream,
 ):
+    import numpy as np
+    import pandas as pd
+    from negmas import save_stats
+    from negmas.helpers import humanize_time, unique_name
+    from negmas.helpers.inout import load
+    from tabulate import tabulate
+
+    from scml.oneshot.world import SCML2021OneShotWorld
+    from scml.scml2020.common import is_system_agent
+    from scml.scml2020.world import SCML2021World
+    from scml.sinks import ContractSink
+
     if not competitors:
         competitors = (
             (DEFAULT_ONESHOT + ";" + ";".join(DEFAULT_ONESHOT_NONCOMPETITORS))
@@ -2211,6 +2192,7 @@ def run2021(
             **kwargs,
         )
     )
+    sink = ContractSink(world, log_dir, stream=stream)
     failed = False
     strt = perf_counter()
     try:
@@ -2220,6 +2202,7 @@ def run2021(
                 break
             if not world.step():
                 break
+            sink.flush()
     except Exception:
         exception = traceback.format_exc()
         failed = True
@@ -2237,73 +2220,22 @@ def run2021(
     )
 
     save_stats(world=world, log_dir=log_dir, params=params)
+    # rewrites the contracts, breaches and negotiations files of save_stats when records were streamed
+    sink.close()
 
-    if len(world.saved_contracts) > 0:
-        data = pd.DataFrame(world.saved_contracts)
-        data = data.sort_values(["delivery_time"])
-        data = data.loc[
-            data.signed_at >= 0,
-            [
-                "seller_name",
-                "buyer_name",
-                "delivery_time",
-                "unit_price",
-                "quantity",
-                "product_name",
-                "n_neg_steps",
-                "signed_at",
-                "executed_at",
-            ],
-        ]
-        data.columns = [
-            "seller",
-            "buyer",
-            "t",
-            "price",
-            "q",
-            "product",
-            "steps",
-            "signed",
-            "executed",
-        ]
-        data["executed"] = data["signed"] = data["t"]
-        if show_contracts:
-            print_and_log(tabulate(data, headers="keys", tablefmt="psql"))
-
-        d2 = (
-            data.loc[(~(data["executed"].isnull())) & (data["executed"] > -1), :]
-            .groupby(["product"])
-            .apply(
-                lambda x: pd.DataFrame(
-                    [
-                        {
-                            "uprice": np.sum(x["price"] * x["q"]) / np.sum(x["q"]),
-                            "quantity": np.sum(x["q"]),
-                        }
-                    ]
-                )
-            )
+    if sink.n_contracts > 0:
+        _print_contracts(
+            world, sink, print_and_log, show_contracts, executed_as_signed=True
         )
-        d2 = d2.reset_index().sort_values(["product"])
-        d2["Catalog"] = world.catalog_prices[
-            d2["product"].str.slice(start=-1).astype(int).values
-        ]
-        d2["Trading"] = world.trading_prices[
-            d2["product"].str.slice(start=-1).astype(int).values
-        ]
-        d2["Product"] = d2["product"]
-        d2 = d2.loc[:, ["Product", "quantity", "uprice", "Catalog", "Trading"]]
-
-        d2.columns = ["Product", "Quantity", "Avg. Price", "Catalog", "Trading"]
-        print_and_log(tabulate(d2, headers="keys", tablefmt="psql"))
 
         n_executed = sum(world.stats["n_contracts_executed"])
         n_negs = sum(world.stats["n_negotiations"])
-        n_contracts = len(world.saved_contracts)
+        n_contracts = sink.n_contracts
+        scores = world.scores()
         try:
             agent_scores = sorted(
                 (
-                    [_.name, world.scores()[_.id]]
+                    [_.name, scores[_.id]]
                     for _ in world.agents.values()
                     if not is_system_agent(_)
                 ),
@@ -2316,35 +2248,33 @@ def run2021(
             print_and_log(tabulate(agent_scores, headers="keys", tablefmt="psql"))
         except:
             pass
-        winners = [f"{_.name} gaining {world.scores()[_.id]}" for _ in world.winners]
+        winners = [f"{_.name} gaining {scores[_.id]}" for _ in world.winners]
         print_and_log(
             f"{n_contracts} contracts :-) [N. Negotiations: {n_negs}, Agreement Rate: "
-            f"{world.agreement_fraction:0.0%}]"
+            f"{sink.agreement_fraction:0.0%}]"
             f" (rounds/successful negotiation: {world.n_negotiation_rounds_successful:5.2f}, "
-            f"rounds/broken negotiation: {world.n_negotiation_rounds_failed:5.2f})"
+            f"rounds/broken negotiation: {sink.n_negotiation_rounds_failed:5.2f})"
         )
         total = (
-            world.contract_dropping_fraction
-            + world.contract_nullification_fraction
-            + world.contract_err_fraction
-            + world.breach_fraction
-            + world.contract_execution_fraction
+            sink.contract_dropping_fraction
+            + sink.contract_nullification_fraction
+            + sink.contract_err_fraction
+            + sink.breach_fraction
+            + sink.contract_execution_fraction
         )
         n_cancelled = (
-            int(round(n_contracts * world.cancellation_rate)) if n_negs > 0 else 0
+            int(round(n_contracts * sink.cancellation_rate)) if n_negs > 0 else 0
         )
         n_signed = n_contracts - n_cancelled
-        n_dropped = int(round(n_signed * world.contract_dropping_fraction))
-        n_nullified = int(round(n_signed * world.contract_nullification_fraction))
-        n_erred = int(round(n_signed * world.contract_err_fraction))
-        n_breached = int(round(n_signed * world.breach_fraction))
-        n_executed = int(round(n_signed * world.contract_execution_fraction))
-        exogenous = [_ for _ in world.saved_contracts if not _["issues"]]
-        negotiated = [_ for _ in world.saved_contracts if _["issues"]]
-        n_exogenous = len(exogenous)
-        n_negotiated = len(negotiated)
-        n_exogenous_signed = len([_ for _ in exogenous if _["signed_at"] >= 0])
-        n_negotiated_signed = len([_ for _ in negotiated if _["signed_at"] >= 0])
+        n_dropped = int(round(n_signed * sink.contract_dropping_fraction))
+        n_nullified = int(round(n_signed * sink.contract_nullification_fraction))
+        n_erred = int(round(n_signed * sink.contract_err_fraction))
+        n_breached = int(round(n_signed * sink.breach_fraction))
+        n_executed = int(round(n_signed * sink.contract_execution_fraction))
+        n_exogenous = sink.count("n_exogenous")
+        n_negotiated = sink.count("n_negotiated")
+        n_exogenous_signed = sink.count("n_exogenous_signed")
+        n_negotiated_signed = sink.count("n_negotiated_signed")
         print_and_log(
             f"Exogenous Contracts : {n_exogenous} of which {n_exogenous_signed} "
             f" were signed ({n_exogenous_signed/n_exogenous if n_exogenous!=0 else 0: 0.1%})"
@@ -2355,14 +2285,14 @@ def run2021(
         )
         print_and_log(
             f"All Contracts       : {n_exogenous + n_negotiated} of which {n_exogenous_signed + n_negotiated_signed} "
-            f" were signed ({1-world.cancellation_rate:0.1%})"
+            f" were signed ({1-sink.cancellation_rate:0.1%})"
         )
         print_and_log(
-            f"Executed: {world.contract_execution_fraction:0.1%}"
-            f", Breached: {world.breach_fraction:0.1%}"
-            f", Erred: {world.contract_err_fraction:0.1%}"
-            f", Nullified: {world.contract_nullification_fraction:0.1%}"
-            f", Dropped: {world.contract_dropping_fraction:0.1%}"
+            f"Executed: {sink.contract_execution_fraction:0.1%}"
+            f", Breached: {sink.breach_fraction:0.1%}"
+            f", Erred: {sink.contract_err_fraction:0.1%}"
+            f", Nullified: {sink.contract_nullification_fraction:0.1%}"
+            f", Dropped: {sink.contract_dropping_fraction:0.1%}"
             f" (Sum:{total: 0.0%})\n"
             f"Negotiated: {n_negs} Concluded: {n_contracts} Signed: {n_signed} Dropped: {n_dropped}  "
             f"Nullified: {n_nullified} "
@@ -2529,6 +2459,11 @@ def tournament2020(
     parallel,
     output,
 ):
+    from negmas.helpers import humanize_time, unique_name
+    from negmas.helpers.inout import load
+
+    from scml.utils import anac2020_collusion, anac2020_std
+
     if len(output) == 0 or output == "none":
         output = None
     if output:
@@ -2805,6 +2740,13 @@ def tournament2021(
     parallel,
     output,
 ):
+    from negmas.helpers import humanize_time, unique_name
+    from negmas.helpers.inout import load
+
+    from scml.oneshot import SCML2020OneShotWorld
+    from scml.scml2020.world import SCML2021World
+    from scml.utils import anac2021_collusion, anac2021_oneshot, anac2021_std
+
     oneshot = ttype == "oneshot"
     if not competitors:
         competitors = DEFAULT_ONESHOT if oneshot else DEFAULT_STD_2021
@@ -3102,6 +3044,13 @@ def tournament2023(
     parallel,
     output,
 ):
+    from negmas.helpers import humanize_time, unique_name
+    from negmas.helpers.inout import load
+
+    from scml.oneshot import SCML2020OneShotWorld
+    from scml.scml2020.world import SCML2021World
+    from scml.utils import anac2023_collusion, anac2023_oneshot, anac2023_std
+
     oneshot = ttype == "oneshot"
     if not competitors:
         competitors = DEFAULT_ONESHOT if oneshot else DEFAULT_STD_2021
@@ -3257,7 +3206,9 @@ def tournament2023(
 
 @main.command(help="Prints SCML version and NegMAS version")
 def version():
-    print(f"SCML: {scml.__version__} (NegMAS: {negmas.__version__})")
+    from importlib.metadata import version as package_version
+
+    print(f"SCML: {scml.__version__} (NegMAS: {package_version('negmas')})")
 
 
 if __name__ == "__main__":
@@ -1,5 +1,9 @@
 #!/usr/bin/env python
-"""The SCML universal command line tool"""
+"""The SCML universal command line tool
+
+Heavy dependencies (negmas, pandas, the simulators, ...) are imported inside the commands that use them so that
+starting the tool stays fast.
+"""
 import os
 import pathlib
 import sys
@@ -12,31 +16,10 @@ from time import perf_counter
 
 import click
 import click_config_file
-import negmas
-import numpy as np
-import pandas as pd
 import progressbar
 import yaml
-from negmas import save_stats
-from negmas.helpers import humanize_time, load, unique_name
-from negmas.tournaments import create_tournament, evaluate_tournament, run_tournament
-from tabulate import tabulate
 
 import scml
-from scml.scml2019.common import DEFAULT_NEGOTIATOR
-from scml.scml2019.utils import (
-    anac2019_assigner,
-    anac2019_config_generator,
-    anac2019_sabotage_assigner,
-    anac2019_sabotage_config_generator,
-    anac2019_world_generator,
-    sabotage_effectiveness,
-)
-from scml.utils import (
-    anac2020_world_generator,
-    anac_assigner_std,
-    anac_config_generator_std,
-)
 
 try:
     from .vendor.quick.quick import gui_option
@@ -56,6 +39,13 @@ n_completed = 0
 n_total = 0
 
 
+def _default_negotiator() -> str:
+    """The default negotiator of SCML2019 agents (imported only when needed)"""
+    from scml.scml2019.common import DEFAULT_NEGOTIATOR
+
+    return DEFAULT_NEGOTIATOR
+
+
 def get_range(x, x_min, x_max):
     """Gets a range with possibly overriding it with a single value"""
     if x is not None:
@@ -538,6 +528,24 @@ def create(
     factories_max,
     horizon,
 ):
+    from negmas.helpers import unique_name
+    from negmas.helpers.inout import load
+    from negmas.tournaments import create_tournament
+
+    from scml.scml2019.utils import (
+        anac2019_assigner,
+        anac2019_config_generator,
+        anac2019_sabotage_assigner,
+        anac2019_sabotage_config_generator,
+        anac2019_world_generator,
+        sabotage_effectiveness,
+    )
+    from scml.utils import (
+        anac2020_world_generator,
+        anac_assigner_std,
+        anac_config_generator_std,
+    )
+
     if balance < 0:
         balance = None
     productivity = get_range(productivity, productivity_min, productivity_max)
@@ -952,6 +960,9 @@ def create(
 def run(
     ctx, name, verbosity, parallel, distributed, ip, port, compact, path, log, metric
 ):
+    from negmas.helpers import humanize_time
+    from negmas.tournaments import evaluate_tournament, run_tournament
+
     if len(name) == 0:
         name = ctx.obj.get("tournament_name", "")
     if len(name) == 0:
@@ -988,6 +999,8 @@ def run(
 
 
 def display_results(results, metric):
+    from tabulate import tabulate
+
     viewmetric = ["50%" if metric == "median" else metric]
     print(
         tabulate(
@@ -1038,7 +1051,7 @@ def _path(path) -> Path:
 @click.option("--neg-speedup", default=21, help="Negotiation Speedup.")
 @click.option(
     "--negotiator",
-    default=DEFAULT_NEGOTIATOR,
+    default=_default_negotiator,
     help="Negotiator type to use for builtin agents.",
 )
 @click.option(
@@ -1196,6 +1209,13 @@ def run2019(
     path,
     world_config,
 ):
+    import numpy as np
+    import pandas as pd
+    from negmas import save_stats
+    from negmas.helpers import humanize_time, unique_name
+    from negmas.helpers.inout import load
+    from tabulate import tabulate
+
     kwargs = dict(
         no_bank=True,
         no_insurance=False,
@@ -1799,6 +1819,13 @@ def run2020(
     borrow_to_produce,
     show_contracts,
 ):
+    import numpy as np
+    import pandas as pd
+    from negmas import save_stats
+    from negmas.helpers import humanize_time, unique_name
+    from negmas.helpers.inout import load
+    from tabulate import tabulate
+
     if balance < 0:
         balance = None
     productivity = get_range(productivity, productivity_min, productivity_max)
@@ -2071,7 +2098,9 @@ def run2020(
 
 @cli.command(help="Prints SCML version and NegMAS version")
 def version():
-    print(f"SCML: {scml.__version__} (NegMAS: {negmas.__version__})")
+    from importlib.metadata import version as package_version
+
+    print(f"SCML: {scml.__version__} (NegMAS: {package_version('negmas')})")
 
 
 if __name__ == "__main__":
@@ -2,21 +2,40 @@
 from __future__ import annotations
 
 import random
-from typing import Iterable
+from functools import lru_cache
+from typing import Any, Iterable, Sequence
 
 import numpy as np
+from negmas.outcomes import (
+    ContiguousIssue,
+    DiscreteCartesianOutcomeSpace,
+    Issue,
+    Outcome,
+    make_issue,
+    make_os,
+)
 from numpy.typing import NDArray
 
 __all__ = [
     "fraction_cut",
     "integer_cut",
+    "vectorized_fraction_cut",
+    "vectorized_integer_cut",
     "intin",
     "realin",
     "strin",
     "make_array",
     "distribute_quantities",
+    "OUTCOME_SPACE_CACHE_SIZE",
+    "shared_outcome_space",
+    "shared_outcomes",
+    "shared_outcome_array",
+    "clear_outcome_space_cache",
 ]
 
+OUTCOME_SPACE_CACHE_SIZE = 4096
+"""Maximum number of distinct outcome-spaces kept by `shared_outcome_space` and friends"""
+
 
 def fraction_cut(n: int, p: np.ndarray) -> np.ndarray:
     """Distributes n items on boxes with probabilities relative to p"""
@@ -88,6 +107,75 @@ def integer_cut(
     return sizes.tolist()
 
 
+def vectorized_fraction_cut(n: int, p: np.ndarray) -> np.ndarray:
+    """
+    Distributes n items on boxes with probabilities relative to p.
+
+    Remarks:
+        - Produces the same distribution of results as `fraction_cut` but fixes
+          rounding errors with a few multinomial draws instead of moving one
+          item at a time.
+        - Uses `np.random` instead of `random` as its source of randomness.
+    """
+    x = (np.round(100 * n * p).astype(np.int64) // 100).astype(int)
+    total = x.sum()
+    if total < n:
+        x += np.random.multinomial(n - total, np.ones(len(x)) / len(x))
+        return x
+    while total > n:
+        available = np.flatnonzero(x > 0)
+        removed = np.minimum(
+            np.random.multinomial(total - n, np.ones(len(available)) / len(available)),
+            x[available],
+        )
+        x[available] -= removed
+        total -= removed.sum()
+    return x
+
+
+def vectorized_integer_cut(
+    n: int,
+    l: int,
+    l_m: int | list[int],
+    l_x: int | list[int] | None = None,
+) -> list[int]:
+    """
+    Generates l random integers that sum to n where each of them is at least l_m
+
+    Args:
+        n: total
+        l: number of levels
+        l_m: minimum per level
+        l_x: maximum per level
+
+    Remarks:
+        - Produces the same distribution of results as `integer_cut` (with
+          `randomize` set) but distributes all items with a few multinomial draws
+          instead of adding them one by one.
+        - Uses `np.random` instead of `random` as its source of randomness.
+    """
+    sizes = (np.zeros(l, dtype=np.int64) + np.asarray(l_m)).astype(np.int64)
+    upper = np.zeros(l, dtype=float) + (
+        np.asarray(l_x, dtype=float) if l_x is not None else float("inf")
+    )
+    if n < sizes.sum():
+        raise ValueError(
+            f"Cannot generate {l} numbers summing to {n}  with a minimum summing to {sizes.sum()}"
+        )
+    if n > upper.sum():
+        raise ValueError(
+            f"Cannot generate {l} numbers summing to {n}  with a maximum summing to {upper.sum()}"
+        )
+    remaining = n - sizes.sum()
+    while remaining > 0:
+        valid = np.flatnonzero(upper > sizes)
+        added = np.random.multinomial(remaining, np.ones(len(valid)) / len(valid))
+        added = np.minimum(added, upper[valid] - sizes[valid]).astype(np.int64)
+        sizes[valid] += added
+        remaining -= added.sum()
+    return sizes.tolist()
+
+
 def realin(rng: tuple[float, float] | float) -> float:
     """
     Selects a random number within a range if given or the input if it was a float
@@ -159,6 +247,40 @@ def make_array(
     return np.array(list(random.choices(xlst, k=n)))
 
 
+def _scatter_units(n: NDArray, a: int, upper: NDArray | None = None) -> NDArray:
+    """
+    Distributes n[s] items uniformly at random over `a` boxes for every row s.
+
+    Args:
+        n: Number of items to distribute per row
+        a: Number of boxes per row
+        upper: An optional (len(n), a) array of maximum contents of every box. Items
+               that cannot fit in a row are dropped.
+
+    Returns:
+        A (len(n), a) array with row sums equal to n (when feasible).
+    """
+    x = np.zeros((len(n), a), dtype=np.int64)
+    remaining = np.asarray(n, dtype=np.int64)
+    while remaining.sum() > 0:
+        if upper is None:
+            rows = np.repeat(np.arange(len(n)), remaining)
+            np.add.at(x, (rows, np.random.randint(0, a, len(rows))), 1)
+            break
+        free = upper > x
+        n_free = free.sum(axis=1)
+        remaining = np.where(n_free > 0, remaining, 0)
+        rows = np.repeat(np.arange(len(n)), remaining)
+        # pick uniformly among the boxes of each row that still have space
+        k = (np.random.random(len(rows)) * n_free[rows]).astype(int)
+        cols = np.argsort(~free, axis=1, kind="stable")[rows, k]
+        np.add.at(x, (rows, cols), 1)
+        over = np.maximum(x - upper, 0)
+        x -= over
+        remaining = over.sum(axis=1)
+    return x
+
+
 def distribute_quantities(
     equal: bool,
     predictability: float,
@@ -166,6 +288,7 @@ def distribute_quantities(
     a: int,
     n_steps: int,
     limit: list[int] | None = None,
+    vectorized: bool = False,
 ):
     """Used internally by generate() methods to distribute exogenous contracts
 
@@ -176,6 +299,8 @@ def distribute_quantities(
         q: The quantity per step to be distributed
         a: The number of agents to distribute over.
         limit: The maximum quantity per step for each agent (len(limit) == a). Only used if `equal==False`
+        vectorized: If given, `vectorized_integer_cut` is used instead of `integer_cut` and
+                    quantities of all steps are perturbed at once using array operations
 
     Returns:
         an n_steps * a list of lists giving the distributed quantities where
@@ -183,6 +308,7 @@ def distribute_quantities(
 
     """
     q = np.asarray(q)
+    cut = integer_cut if not vectorized else vectorized_integer_cut
     if limit is not None and not isinstance(limit, Iterable):
         limit = [limit] * a  # type: ignore
     # if we do not distribute anything just return all zeros
@@ -199,13 +325,13 @@ def distribute_quantities(
     if predictability < 0.01:
         values = []
         for s in range(n_steps):
-            values.append(integer_cut(q[s], a, 0, limit))
+            values.append(cut(q[s], a, 0, limit))
             assert sum(values[-1]) == q[s]
         return values
     values = []
     assert all(_ >= 0 for _ in q), f"We have some negative quantities! {q}"
     qz = int(0.5 + sum(q) / len(q))
-    base_cut = integer_cut(qz, a, 0, limit)
+    base_cut = cut(qz, a, 0, limit)
     limit_sum = sum(limit) if limit is not None else float("inf")
     if limit is not None:
         assert all(
@@ -221,7 +347,7 @@ def distribute_quantities(
             errs = -v[i]
             v[i] = 0
             while errs > 0:
-                diffs = integer_cut(errs, a - 1, 0)
+                diffs = cut(errs, a - 1, 0)
                 diffs = diffs[:i] + [0] + diffs[i:]
                 for j in range(len(v)):
                     if j == i:
@@ -243,7 +369,7 @@ def distribute_quantities(
             if sum(available) < errs:
                 errs = sum(available)
             while errs > 0:
-                diffs = integer_cut(errs, a - 1, 0, available)
+                diffs = cut(errs, a - 1, 0, available)
                 diffs = diffs[:i] + [0] + diffs[i:]
                 for j in range(len(v)):
                     if j == i:
@@ -253,32 +379,58 @@ def distribute_quantities(
                         errs -= diffs[j]
         return v
 
-    for s in range(0, n_steps):
-        assert (
-            limit is None or sum(limit) >= q[s]
-        ), f"Sum of limits is {limit_sum} but we need to distribute {q[s]} at step {s}"
-        if qz == 0 or q[s] == 0:
-            values.append([0] * a)
-            continue
+    if vectorized:
+        assert limit is None or sum(limit) >= q.max(), (
+            f"Sum of limits is {limit_sum} but we need to distribute {q.max()} "
+            f"at step {q.argmax()}"
+        )
+        lim = np.asarray(limit, dtype=np.int64) if limit is not None else None
+        v = np.zeros((n_steps, a), dtype=np.int64)
+        n_changes = np.zeros(n_steps, dtype=np.int64)
+        if qz != 0:
+            v = (0.5 + np.asarray(base_cut)[None, :] * q[:, None] / qz).astype(np.int64)
+            n_changes = np.minimum(q, (0.5 + (1.0 - predictability) * q).astype(int))
+            if lim is not None:
+                n_changes = np.minimum(n_changes, (lim[None, :] - v).sum(axis=1))
+            n_changes = np.maximum(n_changes, 0)
+        subtracted = _scatter_units(n_changes, a)
+        added = _scatter_units(
+            n_changes, a, lim[None, :] + subtracted - v if lim is not None else None
+        )
+        v += added - subtracted
+        invalid = (v < 0).any(axis=1)
+        if lim is not None:
+            invalid |= (v > lim[None, :]).any(axis=1)
+        values = v.tolist()
+        for s in np.flatnonzero(invalid):
+            values[s] = adjust_values(values[s], limit)
+    else:
+        for s in range(0, n_steps):
+            assert (
+                limit is None or sum(limit) >= q[s]
+            ), f"Sum of limits is {limit_sum} but we need to distribute {q[s]} at step {s}"
+            if qz == 0 or q[s] == 0:
+                values.append([0] * a)
+                continue
 
-        v = [int(0.5 + _ * q[s] / qz) for _ in base_cut]
-        n_changes = max(0, min(q[s], int(0.5 + (1.0 - predictability) * q[s])))
-        if limit is not None:
-            n_changes = min(n_changes, sum(l - x for l, x in zip(limit, v)))
-        if n_changes <= 0:
+            v = [int(0.5 + _ * q[s] / qz) for _ in base_cut]
+            n_changes = max(0, min(q[s], int(0.5 + (1.0 - predictability) * q[s])))
+            if limit is not None:
+                n_changes = min(n_changes, sum(l - x for l, x in zip(limit, v)))
+            if n_changes <= 0:
+                values.append(adjust_values(v, limit))
+                continue
+            subtracted = cut(n_changes, a, 0)
+            upper = (
+                [l + s - c for l, c, s in zip(limit, v, subtracted)]
+                if limit is not None
+                else None
+            )
+            added = cut(n_changes, a, 0, upper)
+            # assert isinstance(added[0], int) and isinstance(subtracted[0], int)
+            for i in range(len(v)):
+                v[i] += added[i] - subtracted[i]
             values.append(adjust_values(v, limit))
-            continue
-        subtracted = integer_cut(n_changes, a, 0)
-        upper = (
-            [l + s - c for l, c, s in zip(limit, v, subtracted)]
-            if limit is not None
-            else None
-        )
-        added = integer_cut(n_changes, a, 0, upper)
-        # assert isinstance(added[0], int) and isinstance(subtracted[0], int)
-        for i in range(len(v)):
-            v[i] += added[i] - subtracted[i]
-        values.append(adjust_values(v, limit))
 
     for s, v in enumerate(values):
         if limit is not None:
@@ -290,3 +442,117 @@ def distribute_quantities(
         ), f"Failed to distribute: expected {q[s]} but got {sum(v)}: {values[-1]}"
         assert min(v) >= 0, f"Negative  value {min(v)} in quantities!\n{v}"
     return values
+
+
+def _generate_seeded(
+    world_type: Any, seed: int, args: tuple, kwargs: dict[str, Any]
+) -> dict[str, Any]:
+    """Generates a world configuration after seeding all random number generators"""
+    random.seed(seed)
+    np.random.seed(seed)
+    return world_type.generate(*args, **kwargs)
+
+
+def _generate_many(
+    world_type: Any,
+    n_configs: int,
+    args: tuple,
+    kwargs: dict[str, Any],
+    n_jobs: int = 1,
+    seed: int | None = None,
+) -> list[dict[str, Any]]:
+    """Generates `n_configs` seeded world configurations (used by `generate_many` of worlds)"""
+    rng = random.Random(seed) if seed is not None else random
+    seeds = [rng.randint(0, 2**31 - 1) for _ in range(n_configs)]
+    if n_jobs == 1:
+        return [_generate_seeded(world_type, _, args, kwargs) for _ in seeds]
+    from joblib import Parallel, delayed
+
+    return Parallel(n_jobs=n_jobs)(
+        delayed(_generate_seeded)(world_type, _, args, kwargs) for _ in seeds
+    )
+
+
+_OSKey = tuple[tuple[str, int, int], ...]
+
+
+def _outcome_space_key(
+    issues: Sequence[Issue] | None = None,
+    ranges: Sequence[tuple[str, tuple[int, int]]] | None = None,
+) -> _OSKey | None:
+    """Returns a hashable key for the issues (or ranges) or None if they are not all integer ranges"""
+    if ranges is not None:
+        return tuple((name, int(lo), int(hi)) for name, (lo, hi) in ranges)
+    if issues is None or not all(isinstance(_, ContiguousIssue) for _ in issues):
+        return None
+    return tuple((_.name, int(_.min_value), int(_.max_value)) for _ in issues)
+
+
+@lru_cache(maxsize=OUTCOME_SPACE_CACHE_SIZE)
+def _interned_outcome_space(key: _OSKey) -> DiscreteCartesianOutcomeSpace:
+    return make_os([make_issue((lo, hi), name=name) for name, lo, hi in key])  # type: ignore
+
+
+@lru_cache(maxsize=OUTCOME_SPACE_CACHE_SIZE)
+def _interned_outcomes(key: _OSKey) -> tuple[Outcome, ...]:
+    return tuple(_interned_outcome_space(key).enumerate())
+
+
+@lru_cache(maxsize=OUTCOME_SPACE_CACHE_SIZE)
+def _interned_outcome_array(key: _OSKey) -> NDArray:
+    outcomes = np.array(_interned_outcomes(key), dtype=int).reshape((-1, len(key)))
+    outcomes.setflags(write=False)
+    return outcomes
+
+
+def shared_outcome_space(
+    issues: Sequence[Issue] | None = None,
+    ranges: Sequence[tuple[str, tuple[int, int]]] | None = None,
+) -> DiscreteCartesianOutcomeSpace:
+    """
+    Returns an outcome-space for the given issues shared with every other caller using the same issue ranges
+
+    Args:
+        issues: The issues of the outcome-space
+        ranges: Alternatively, the name and (min, max) range of every integer issue
+
+    Remarks:
+        - Outcome-spaces are immutable so the same object can be used by all negotiations and utility functions
+          with identical issues (e.g. all negotiations about the same product in a day).
+        - Only outcome-spaces in which every issue is an integer range are shared. A new outcome-space is created for
+          any other issues.
+    """
+    key = _outcome_space_key(issues, ranges)
+    if key is None:
+        return make_os(issues)  # type: ignore
+    return _interned_outcome_space(key)
+
+
+def shared_outcomes(issues: Sequence[Issue]) -> Sequence[Outcome]:
+    """
+    Returns all outcomes of the given issues in the same order as `enumerate_issues` as a shared immutable tuple
+
+    Remarks:
+        - Falls back to enumerating the outcomes if the issues are not all integer ranges.
+    """
+    key = _outcome_space_key(issues)
+    if key is None:
+        return tuple(make_os(issues).enumerate())  # type: ignore
+    return _interned_outcomes(key)
+
+
+def shared_outcome_array(issues: Sequence[Issue]) -> NDArray:
+    """
+    Returns all outcomes of the given issues as a read-only n_outcomes * n_issues integer array shared by all callers
+    """
+    key = _outcome_space_key(issues)
+    if key is None:
+        return np.array(shared_outcomes(issues), dtype=int).reshape((-1, len(issues)))
+    return _interned_outcome_array(key)
+
+
+def clear_outcome_space_cache() -> None:
+    """Clears all shared outcome-spaces and outcome lists"""
+    _interned_outcome_space.cache_clear()
+    _interned_outcomes.cache_clear()
+    _interned_outcome_array.cache_clear()
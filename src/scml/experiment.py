@@ -1,25 +1,41 @@
+import hashlib
 import itertools
+import json
 import random
 import sys
 import time
 import traceback
-from collections import namedtuple
+from collections import defaultdict, namedtuple
 from multiprocessing import cpu_count
 from pathlib import Path
-from typing import Any, Callable, Dict, Iterable, List, Tuple, Union
+from typing import Any, Callable, Dict, Iterable, List, Optional, Tuple, Type, Union
 
 import click
+import numpy as np
 import pandas as pd
 from joblib import Parallel, delayed
-from negmas.helpers import unique_name
+from negmas.helpers import get_full_type_name, unique_name
 from tqdm import tqdm
 
-from scml import DecentralizingAgent, SCML2020World
+from scml import (
+    DecentralizingAgent,
+    GreedyOneShotAgent,
+    SCML2020OneShotWorld,
+    SCML2020World,
+)
 
 N_STEPS = 10
 N_WORLDS = 2
 COMPACT = True
 NOLOGS = True
+RESULTS_FILE_NAME = "results.jsonl"
+"""Name of the file in which the row of every finished config is appended"""
+UNTESTED_FILE_NAME = "untested_vars.json"
+"""Name of the file keeping the values chosen for variables not tested by an experiment run from the command line"""
+SMALL_WORLD_STEPS = 20
+"""Worlds with at most this number of steps are run in batches by each worker"""
+MAX_BATCH_SIZE = 8
+"""Maximum number of worlds run by a worker in a single batch"""
 
 Constraint = namedtuple(
     "Constraint",
@@ -71,6 +87,19 @@ def breach_rate(world: SCML2020World):
     return world.breach_rate
 
 
+dep_var_attributes = {
+    "relative_welfare_all": "relative_welfare",
+    "relative_welfare_non_bankrupt": "relative_welfare",
+    "welfare_all": "welfare",
+    "welfare_non_bankrupt": "welfare",
+    "productivity": "relative_productivity",
+    "relative_productivity": "relative_productivity",
+    "bankruptcy_rate": "bankruptcy_rate",
+    "contract_execution": "contract_execution_fraction",
+    "breach_rate": "breach_rate",
+}
+"""The attribute of the world each dependent variable reads (used to skip variables a world type does not define)"""
+
 dep_vars = {
     "relative_welfare_all": relative_welfare_all,
     "relative_welfare_non_bankrupt": relative_welfare_non_bankrupt,
@@ -98,6 +127,21 @@ fixed_vars = {
 }
 
 
+oneshot_fixed_vars = {
+    "n_steps": N_STEPS,
+    "compact": COMPACT,
+    "no_logs": NOLOGS,
+    "agent_types": [GreedyOneShotAgent],
+}
+
+oneshot_ind_vars = {
+    "cost_increases_with_level": [True, False],
+    "equal_exogenous_supply": [True, False],
+    "equal_exogenous_sales": [True, False],
+    "penalties_scale": ["trading", "catalog"],
+}
+
+
 def jobs(n_jobs: Union[float, int]) -> int:
     if n_jobs <= 0:
         return cpu_count()
@@ -113,16 +157,69 @@ def get_var_vals(var: str, val: Any) -> Dict[str, Any]:
     return dict(zip(var.split(";"), val))
 
 
-def run_config(world_config: Dict[str, Any], funcs: List[str]):
+def _canonical(x: Any) -> Any:
+    """
+    Returns a representation of a config value that does not change between runs
+
+    Raises:
+        ValueError: If the value has no such representation (e.g. an arbitrary object whose repr includes its address)
+    """
+    if isinstance(x, dict):
+        return tuple(sorted((str(k), _canonical(v)) for k, v in x.items()))
+    if isinstance(x, (list, tuple)):
+        return type(x).__name__, tuple(_canonical(_) for _ in x)
+    if isinstance(x, (set, frozenset)):
+        return type(x).__name__, tuple(sorted(repr(_canonical(_)) for _ in x))
+    if x is None or isinstance(x, (bool, int, float, str)):
+        return x
+    if isinstance(x, np.generic):
+        return x.item()
+    if isinstance(x, type) or (callable(x) and hasattr(x, "__qualname__")):
+        return get_full_type_name(x)
+    raise ValueError(
+        f"Cannot compute a stable config id for {x} of type {type(x).__name__}"
+    )
+
+
+def config_ids(configs: Iterable[Dict[str, Any]]) -> List[str]:
+    """
+    Returns an id for every config that is stable across runs.
+
+    Remarks:
+        - Repeated configs (i.e. multiple worlds of the same condition) get ids that differ only in a repetition
+          number (e.g. `1f2e3d4c5b6a7980-0`, `1f2e3d4c5b6a7980-1`, ...).
+    """
+    counts = defaultdict(int)
+    ids = []
+    for config in configs:
+        key = hashlib.sha1(repr(_canonical(config)).encode()).hexdigest()[:16]
+        ids.append(f"{key}-{counts[key]}")
+        counts[key] += 1
+    return ids
+
+
+def _dep_value(func: str, world) -> float:
+    """Evaluates a dependent variable returning nan if the world type does not define it"""
+    attribute = dep_var_attributes.get(func, None)
+    if attribute is not None and not hasattr(type(world), attribute):
+        return float("nan")
+    return dep_vars[func](world)
+
+
+def run_config(
+    world_config: Dict[str, Any],
+    funcs: List[str],
+    world_type: Type[SCML2020World] = SCML2020World,
+):
     """Runs a single configuration and returns values of all functions for that configuration"""
-    world = SCML2020World(**SCML2020World.generate(**world_config))
+    world = world_type(**world_type.generate(**world_config))
     results = {}
     results["log_folder"] = world.log_folder
     try:
         _start = time.perf_counter()
         world.run()
         _end = time.perf_counter()
-        results.update({func: dep_vars[func](world) for func in funcs})
+        results.update({func: _dep_value(func, world) for func in funcs})
         results["time"] = _end - _start
         results["time_per_step"] = (_end - _start) / world.n_steps
         results["failed_run"] = False
@@ -141,6 +238,65 @@ def run_config(world_config: Dict[str, Any], funcs: List[str]):
     return results
 
 
+def run_batch(
+    batch: List[Tuple[str, Dict[str, Any]]],
+    funcs: List[str],
+    world_type: Type[SCML2020World] = SCML2020World,
+) -> List[Dict[str, Any]]:
+    """Runs a batch of (config id, config) pairs in the current process returning a row for each of them"""
+    rows = []
+    for config_id, world_config in batch:
+        results = run_config(world_config, funcs, world_type)
+        results["config_id"] = config_id
+        rows.append(results)
+    return rows
+
+
+def _drop_partial_row(file_name: Path) -> None:
+    """Removes a row that was only partially written at the end of the results file (if any)"""
+    if not file_name.exists():
+        return
+    with open(file_name, "rb+") as f:
+        f.seek(0, 2)
+        size = f.tell()
+        if size == 0:
+            return
+        f.seek(size - 1)
+        if f.read(1) == b"\n":
+            return
+        # find the end of the last complete row reading backwards in blocks
+        end, block = size, 1 << 16
+        while end > 0:
+            start = max(0, end - block)
+            f.seek(start)
+            found = f.read(end - start).rfind(b"\n")
+            if found >= 0:
+                f.truncate(start + found + 1)
+                return
+            end = start
+        f.truncate(0)
+
+
+def read_results(path: Union[str, Path]) -> List[Dict[str, Any]]:
+    """
+    Reads the rows saved by `run_configs` in the given folder.
+
+    Remarks:
+        - A row that was only partially written (e.g. the experiment was interrupted while saving it) is ignored.
+    """
+    file_name = Path(path) / RESULTS_FILE_NAME
+    if not file_name.exists():
+        return []
+    rows = []
+    with open(file_name) as f:
+        for line in f:
+            try:
+                rows.append(json.loads(line))
+            except json.JSONDecodeError:
+                continue
+    return rows
+
+
 def satisfied(config: Dict[str, Any], constraints: Iterable[Constraint]) -> bool:
     """
     Tests whether the constraints are all satisfied in the config or not
@@ -229,19 +385,72 @@ def generate_configs_single(
     return configs
 
 
-def run_configs(configs: Iterable[Dict[str, Any]], n_jobs: int) -> pd.DataFrame:
+def run_configs(
+    configs: Iterable[Dict[str, Any]],
+    n_jobs: int,
+    path: Optional[Union[str, Path]] = None,
+    world_type: Type[SCML2020World] = SCML2020World,
+    batch_size: Optional[int] = None,
+    funcs: Optional[List[str]] = None,
+) -> pd.DataFrame:
+    """
+    Runs the given configs returning a row with the values of the dependent variables for each of them
+
+    Args:
+        configs: The configs to pass to the world generator
+        n_jobs: Number of parallel jobs (1 means serial processing)
+        path: If given, the row of every config is appended to a file in this folder as soon as it finishes and
+              configs with rows in that file are not run again (i.e. the experiment is resumed).
+        world_type: The world type to use (e.g. `SCML2020World` or `SCML2020OneShotWorld`)
+        batch_size: Number of configs run by a worker in one batch. If None, small worlds (see
+                    `SMALL_WORLD_STEPS`) are batched to reduce process overhead and larger worlds are run one by one.
+        funcs: The dependent variables to calculate. If None, all of `dep_vars` are used.
+
+    Returns:
+        A dataframe with the results of all configs (including ones run before if resuming)
+    """
     configs = list(configs)
+    if funcs is None:
+        funcs = list(dep_vars.keys())
+    results_file, rows = None, []
+    if path is not None:
+        path = Path(path)
+        path.mkdir(parents=True, exist_ok=True)
+        results_file = path / RESULTS_FILE_NAME
+        rows = read_results(path)
+        # new rows must not be appended to a row left incomplete by an interrupted run
+        _drop_partial_row(results_file)
+    done = set(_["config_id"] for _ in rows)
+    pending = [(i, c) for i, c in zip(config_ids(configs), configs) if i not in done]
+    if done:
+        print(f"Skipping {len(configs) - len(pending)} configs completed before")
+    if batch_size is None:
+        batch_size = 1
+        if all(_.get("n_steps", N_STEPS) <= SMALL_WORLD_STEPS for _ in configs):
+            batch_size = max(1, min(MAX_BATCH_SIZE, len(pending) // (4 * n_jobs)))
+    batches = [pending[i : i + batch_size] for i in range(0, len(pending), batch_size)]
+
+    def save(new_rows: List[Dict[str, Any]]):
+        if results_file is not None:
+            with open(results_file, "a") as f:
+                for row in new_rows:
+                    f.write(json.dumps(row, default=str) + "\n")
+                f.flush()
+        rows.extend(new_rows)
+
     if n_jobs == 1:
-        results = []
-        for world_config, funcs in configs:
-            results.append(run_config(world_config, funcs))
-        return pd.DataFrame(results)
-
-    results = Parallel(n_jobs=n_jobs)(
-        delayed(run_config)(configs[i], list(dep_vars.keys()))
-        for i in tqdm(range(len(configs)))
-    )
-    return pd.DataFrame(results)
+        for batch in tqdm(batches):
+            save(run_batch(batch, funcs, world_type))
+    else:
+        finished = Parallel(n_jobs=n_jobs, return_as="generator_unordered")(
+            delayed(run_batch)(batch, funcs, world_type) for batch in batches
+        )
+        for new_rows in tqdm(finished, total=len(batches)):
+            save(new_rows)
+    if results_file is not None:
+        # use the saved rows so that all rows are represented the same way when resuming
+        rows = read_results(path)  # type: ignore
+    return pd.DataFrame(rows)
 
 
 def run(
@@ -251,6 +460,9 @@ def run(
     factorial: bool = True,
     constraints: Tuple[Constraint] = tuple(),
     n_jobs: Union[float, int] = 0,
+    world_type: Type[SCML2020World] = SCML2020World,
+    path: Optional[Union[str, Path]] = None,
+    batch_size: Optional[int] = None,
 ) -> pd.DataFrame:
     """
     Runs an experiment
@@ -263,6 +475,10 @@ def run(
                      variable given that a condition is met
         n_jobs: Number of jobs to use. If 1, processing will be serial. If zero all processes will be used. If a
                 a fraction between zero and one, this fraction of CPU count will be used
+        world_type: The world type to use (e.g. `SCML2020World` or `SCML2020OneShotWorld`)
+        path: If given, results are saved to this folder as they become available and running the same experiment
+              with the same path again will skip all configs already completed.
+        batch_size: Number of configs run by a worker in one batch. See `run_configs`
     Returns:
         A dataframe with the results
     """
@@ -278,7 +494,9 @@ def run(
     print(
         f"Will run a total of {len(configs)} configs using {n_jobs} core{'s' if n_jobs > 1 else ''}"
     )
-    return run_configs(configs, n_jobs)
+    return run_configs(
+        configs, n_jobs, path=path, world_type=world_type, batch_size=batch_size
+    )
 
 
 @click.command("Runs an experiment")
@@ -332,10 +550,32 @@ def run(
     default=0,
     help="Number of parallel jobs to use. 0 means use all cores.",
 )
-def main(worlds, factorial, variables, name, steps, compact, log, jobs):
-    fixed_vars["n_steps"] = steps
-    fixed_vars["compact"] = compact
-    fixed_vars["no_logs"] = not log
+@click.option(
+    "--oneshot/--std",
+    default=False,
+    help="Run one-shot worlds instead of standard worlds",
+)
+@click.option(
+    "-p",
+    "--path",
+    type=click.Path(file_okay=False, dir_okay=True),
+    default=None,
+    help="The folder to save results in. Passing the folder of an interrupted experiment resumes it.",
+)
+@click.option(
+    "-b",
+    "--batch",
+    type=int,
+    default=None,
+    help="Number of worlds each worker runs in one batch. Small worlds are batched by default.",
+)
+def main(
+    worlds, factorial, variables, name, steps, compact, log, jobs, oneshot, path, batch
+):
+    world_vars = dict(oneshot_fixed_vars if oneshot else fixed_vars)
+    world_vars["n_steps"] = steps
+    world_vars["compact"] = compact
+    world_vars["no_logs"] = not log
     ind_vars = {
         "borrow_on_breach": [True, False],
         "buy_missing_products": [True, False],
@@ -352,61 +592,86 @@ def main(worlds, factorial, variables, name, steps, compact, log, jobs):
         "signing_delay": [0, 1],
     }
 
+    if oneshot:
+        ind_vars = dict(oneshot_ind_vars)
+
+    if path is None:
+        path = (
+            Path.home()
+            / "negmas"
+            / "experiments"
+            / unique_name("E" if name is None else name, add_time=True, sep="")
+        )
+    path = Path(path)
+    path.mkdir(parents=True, exist_ok=True)
+
+    all_ind_vars, untested = ind_vars, []
     if variables is not None and variables != "all":
-        variables = ";".split(variables)
+        variables = variables.split(";")
+        untested = [k for k in ind_vars.keys() if k not in variables]
         ind_vars = {k: v for k, v in ind_vars.items() if k in variables}
-
-    untested = list(set(ind_vars.keys()) - set(variables))
+    # values of untested variables are chosen once and saved so that resuming runs the same configs
+    untested_file = path / UNTESTED_FILE_NAME
+    chosen = dict()
+    if untested_file.exists():
+        with open(untested_file) as f:
+            chosen = json.load(f)
     for v in untested:
+        if v not in chosen:
+            chosen[v] = random.sample(all_ind_vars[v], 1)[0]
         if ";" in v:
-            vs = v.split(";")
-            vals = random.sample(ind_vars[v], 1)[0]
-            fixed_vars.update(dict(zip(vs, vals)))
+            world_vars.update(dict(zip(v.split(";"), chosen[v])))
             continue
-        fixed_vars[v] = random.sample(ind_vars[v], 1)[0]
-
-    constraints = (
-        Constraint(
-            condition_vars=["borrow_on_breach"],
-            condition_values=[[False]],
-            conditioned_var="production_no_borrow",
-            feasible_values=[True],
-        ),
-        Constraint(
-            condition_vars=["borrow_on_breach"],
-            condition_values=[[False]],
-            conditioned_var="exogenous_no_borrow",
-            feasible_values=[True],
-        ),
-        Constraint(
-            condition_vars=["exogenous_force_max"],
-            condition_values=[[False]],
-            conditioned_var="production_no_borrow",
-            feasible_values=[False],
-        ),
-        Constraint(
-            condition_vars=["exogenous_force_max"],
-            condition_values=[[True]],
-            conditioned_var="exogenous_buy_missing",
-            feasible_values=[True],
-        ),
-    )
+        world_vars[v] = chosen[v]
+    if untested:
+        with open(untested_file, "w") as f:
+            json.dump(chosen, f)
+
+    constraints = tuple()
+    if not oneshot:
+        constraints = (
+            Constraint(
+                condition_vars=["borrow_on_breach"],
+                condition_values=[[False]],
+                conditioned_var="production_no_borrow",
+                feasible_values=[True],
+            ),
+            Constraint(
+                condition_vars=["borrow_on_breach"],
+                condition_values=[[False]],
+                conditioned_var="exogenous_no_borrow",
+                feasible_values=[True],
+            ),
+            Constraint(
+                condition_vars=["exogenous_force_max"],
+                condition_values=[[False]],
+                conditioned_var="production_no_borrow",
+                feasible_values=[False],
+            ),
+            Constraint(
+                condition_vars=["exogenous_force_max"],
+                condition_values=[[True]],
+                conditioned_var="exogenous_buy_missing",
+                feasible_values=[True],
+            ),
+        )
     print(
         f"Running experiment:\n"
         f"Independent Variables {list(ind_vars.keys())}\nDependent Variables: {list(dep_vars.keys())}\n"
-        f"Untested Variables: {list(fixed_vars.keys())}\n"
+        f"Untested Variables: {list(world_vars.keys())}\n"
         f"n. runs per world: {worlds} ({'factorial' if factorial else 'non-factorial'})"
     )
-    path = (
-        Path.home()
-        / "negmas"
-        / "experiments"
-        / unique_name("E" if name is None else name, add_time=True, sep="")
-    )
-    path.mkdir(parents=True, exist_ok=True)
-    run(ind_vars, fixed_vars, worlds, factorial, constraints, n_jobs=jobs).to_csv(
-        path / "results.csv"
-    )
+    run(
+        ind_vars,
+        world_vars,
+        worlds,
+        factorial,
+        constraints,
+        n_jobs=jobs,
+        world_type=SCML2020OneShotWorld if oneshot else SCML2020World,
+        path=path,
+        batch_size=batch,
+    ).to_csv(path / "results.csv")
 
 
 if __name__ == "__main__":
@@ -1,13 +1,41 @@
+import importlib
+
 from .agent import *
 from .agents import *
 from .awi import *
 from .common import *
 from .policy import *
-from .rl import *
 from .sysagents import *
 from .ufun import *
 from .world import *
 
+# The RL subpackage (which needs gymnasium) is only imported when one of its names is used
+_RL_EXPORTS = (
+    "ActionManager",
+    "DefaultActionManager",
+    "ObservationManager",
+    "FixedPartnerNumbersObservationManager",
+    "LimitedPartnerNumbersObservationManager",
+    "DefaultObservationManager",
+    "OneShotRLAgent",
+    "OneShotEnv",
+    "OneShotWorldFactory",
+    "FixedPartnerNumbersOneShotFactory",
+    "LimitedPartnerNumbersOneShotFactory",
+    "ANACOneShotFactory",
+)
+
+
+def __getattr__(name: str):
+    if name == "rl" or name in _RL_EXPORTS:
+        rl = importlib.import_module(".rl", __name__)
+        if name == "rl":
+            return rl
+        value = getattr(rl, name)
+        globals()[name] = value
+        return value
+    raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
+
 
 def builtin_agent_types(as_str=False):
     """
@@ -37,6 +65,6 @@ __all__ = (
     + policy.__all__
     + agents.__all__
     + awi.__all__
-    + rl.__all__
+    + list(_RL_EXPORTS)
     + ["builtin_agent_types"]
 )
@@ -3,9 +3,9 @@ import random
 from typing import Dict
 
 from negmas import Outcome, PolyAspiration, ResponseType
-from negmas.outcomes.issue_ops import enumerate_issues
 from negmas.sao import SAOResponse
 
+from ...common import shared_outcomes
 from ..agent import OneShotSyncAgent
 
 __all__ = ["SingleAgreementAspirationAgent"]
@@ -54,7 +54,7 @@ class SingleAgreementAspirationAgent(OneShotSyncAgent):
             if self.awi.is_first_level
             else self.awi.current_output_issues
         )
-        outcomes = list(enumerate_issues(issues))
+        outcomes = shared_outcomes(issues)
         self._outcomes = sorted(
             zip(
                 (
@@ -72,7 +72,6 @@ class SingleAgreementAspirationAgent(OneShotSyncAgent):
         self._last_index = 0
 
     def counter_all(self, offers, states):
-
         if self.__endall:
             return dict(
                 zip(
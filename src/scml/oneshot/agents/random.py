@@ -12,7 +12,7 @@ from scml.oneshot.agent import (
     OneShotSingleAgreementAgent,
     OneShotSyncAgent,
 )
-from scml.oneshot.common import QUANTITY, UNIT_PRICE
+from scml.oneshot.common import QUANTITY, UNIT_PRICE, best_subset
 
 __all__ = [
     "RandomOneShotAgent",
@@ -108,26 +108,20 @@ class SyncRandomOneShotAgent(OneShotSyncAgent):
         # get current step, some valid price, the quantity I need, and my partners
         s, p = self._step_and_price()
         needs = self._needs()
-        partners = set(offers.keys())
+        partners = list(offers.keys())
 
         # find the set of partners that gave me the best offer set
         # (i.e. total quantity nearest to my needs)
-        plist = list(powerset(partners))
-        best_diff, best_indx = float("inf"), -1
-        for i, partner_ids in enumerate(plist):
-            others = partners.difference(partner_ids)
-            offered = sum(offers[p][QUANTITY] for p in partner_ids)
-            diff = abs(offered - needs)
-            if diff < best_diff:
-                best_diff, best_indx = diff, i
-            if diff == 0:
-                break
+        indices, offered = best_subset(
+            [offers[p][QUANTITY] for p in partners], needs, allow_excess=True
+        )
+        best_diff = abs(offered - needs)
 
         # If the best combination of offers is good enough, accept them and end all
         # other negotiations
         if best_diff <= self._threshold:
-            partner_ids = plist[best_indx]
-            others = list(partners.difference(partner_ids))
+            partner_ids = [partners[_] for _ in indices]
+            others = [_ for _ in partners if _ not in partner_ids]
             return {
                 k: SAOResponse(ResponseType.ACCEPT_OFFER, None) for k in partner_ids
             } | {k: SAOResponse(ResponseType.END_NEGOTIATION, None) for k in others}
@@ -10,10 +10,11 @@ from typing import TYPE_CHECKING, Literal
 
 import numpy as np
 from negmas import ContiguousIssue
-from negmas.outcomes import DiscreteCartesianOutcomeSpace, Outcome, make_os
+from negmas.outcomes import DiscreteCartesianOutcomeSpace, Outcome
 from negmas.sao import SAONMI, SAOState
 from negmas.situated import AgentWorldInterface
 
+from ..common import shared_outcome_space
 from .common import (
     FinancialReport,
     NegotiationDetails,
@@ -578,11 +579,11 @@ class OneShotAWI(AgentWorldInterface):
 
     @property
     def current_input_outcome_space(self) -> DiscreteCartesianOutcomeSpace:
-        return make_os(self._world._current_issues[self.my_input_product])  # type: ignore
+        return shared_outcome_space(self._world._current_issues[self.my_input_product])
 
     @property
     def current_output_outcome_space(self) -> DiscreteCartesianOutcomeSpace:
-        return make_os(self._world._current_issues[self.my_output_product])  # type: ignore
+        return shared_outcome_space(self._world._current_issues[self.my_output_product])
 
     @property
     def current_negotiation_details(self) -> dict[str, dict[str, NegotiationDetails]]:
@@ -1,6 +1,8 @@
 import sys
 from dataclasses import dataclass
-from typing import Literal
+from typing import Iterable, Iterator, Literal, Sequence
+
+import numpy as np
 
 from attr import define
 from negmas.common import define
@@ -14,6 +16,8 @@ __all__ = [
     "TIME",
     "OneShotState",
     "OneShotExogenousContract",
+    "OneShotExogenousContracts",
+    "EXOGENOUS_CONTRACT_DTYPE",
     "OneShotProfile",
     "FinancialReport",
     "is_system_agent",
@@ -21,6 +25,7 @@ __all__ = [
     "SYSTEM_BUYER_ID",
     "SYSTEM_SELLER_ID",
     "is_system_agent",
+    "best_subset",
 ]
 
 
@@ -67,6 +72,81 @@ def is_system_agent(aid: str) -> bool:
     )
 
 
+def _min_counts(quantities: Sequence[int], limit: int) -> np.ndarray:
+    """
+    Subset-sum table: the value at [j, s] is the minimum number of items from quantities[j:] that sum exactly to s
+    (len(quantities) + 1 if impossible).
+    """
+    n = len(quantities)
+    counts = np.full((n + 1, limit + 1), n + 1, dtype=np.int64)
+    counts[n, 0] = 0
+    for j in range(n - 1, -1, -1):
+        q, after = quantities[j], counts[j + 1]
+        counts[j] = after
+        if 0 < q <= limit:
+            counts[j, q:] = np.minimum(after[q:], after[:-q] + 1)
+    return counts
+
+
+def _first_subset(
+    quantities: Sequence[int], counts: np.ndarray, total: int
+) -> tuple[int, ...]:
+    """The lexicographically first of the smallest subsets of quantities summing to total"""
+    k, chosen, start = int(counts[0, total]), [], 0
+    while k > 0:
+        for i in range(start, len(quantities)):
+            q = quantities[i]
+            if 0 < q <= total and counts[i + 1, total - q] == k - 1:
+                chosen.append(i)
+                total, k, start = total - q, k - 1, i + 1
+                break
+    return tuple(chosen)
+
+
+def best_subset(
+    quantities: Sequence[int], target: int, allow_excess: bool = False
+) -> tuple[tuple[int, ...], int] | None:
+    """
+    Finds the subset of items (e.g. offers) with a total quantity closest to a target (e.g. the agent's needs).
+
+    Args:
+        quantities: The quantity of every item. Items with quantities that are not positive are never selected.
+        target: The total quantity needed.
+        allow_excess: If True, totals above the target are allowed and the subset with the total nearest to the target
+                      is found. Otherwise, the subset with the largest total not exceeding the target is found.
+
+    Returns:
+        The (sorted) indices of the selected items and their total quantity or None if no subset is possible (i.e. the
+        target is negative and excess is not allowed).
+
+    Remarks:
+        - Among equally good subsets, the one with the fewest items is returned with ties broken in favor of the
+          lexicographically first indices. This is the first best subset found when enumerating the powerset of items
+          in order of increasing size.
+        - Runs a subset-sum dynamic program taking O(n * target) time instead of enumerating all 2^n subsets.
+    """
+    quantities = [int(_) for _ in quantities]
+    if target < 0 and not allow_excess:
+        return None
+    target = max(target, 0)
+    limit = target + (max(quantities, default=0) if allow_excess else 0)
+    counts = _min_counts(quantities, limit)
+    reachable = counts[0] <= len(quantities)
+    candidates: list[int] = []
+    for d in range(limit + 1):
+        candidates = [
+            _ for _ in (target - d, target + d) if 0 <= _ <= limit and reachable[_]
+        ]
+        if candidates:
+            break
+    fewest = min(counts[0, _] for _ in candidates)
+    return min(
+        (_first_subset(quantities, counts, _), _)
+        for _ in candidates
+        if counts[0, _] == fewest
+    )
+
+
 @dataclass
 class FinancialReport:
     """A report published periodically by the system showing the financial standing of an agent"""
@@ -137,6 +217,100 @@ class OneShotExogenousContract:
     """Simulation step at which the contract is revealed to its owner. Should not exceed `time` and the default `generate()` method sets it to time"""
 
 
+EXOGENOUS_CONTRACT_DTYPE = np.dtype(
+    [
+        ("quantity", np.int64),
+        ("unit_price", np.int64),
+        ("product", np.int64),
+        ("seller", np.int64),
+        ("buyer", np.int64),
+        ("time", np.int64),
+        ("revelation_time", np.int64),
+    ]
+)
+"""The dtype of the structured array used by `OneShotExogenousContracts`. Seller and buyer
+are agent indices with -1 standing for the system agents"""
+
+
+class OneShotExogenousContracts(Sequence[OneShotExogenousContract]):
+    """
+    A collection of exogenous contracts stored as a structured numpy array.
+
+    Args:
+        data: A structured array with dtype `EXOGENOUS_CONTRACT_DTYPE`
+
+    Remarks:
+        - Behaves as a read-only sequence of `OneShotExogenousContract` objects which are
+          only created when items are accessed so it can be passed anywhere a list of
+          exogenous contracts is expected.
+        - Columns can be accessed directly (e.g. `contracts["quantity"]`) as numpy arrays.
+    """
+
+    __slots__ = ["data"]
+
+    def __init__(self, data: np.ndarray | None = None):
+        if data is None:
+            data = np.zeros(0, dtype=EXOGENOUS_CONTRACT_DTYPE)
+        if data.dtype != EXOGENOUS_CONTRACT_DTYPE:
+            data = data.astype(EXOGENOUS_CONTRACT_DTYPE)
+        self.data = data
+
+    @classmethod
+    def from_contracts(
+        cls, contracts: Iterable[OneShotExogenousContract]
+    ) -> "OneShotExogenousContracts":
+        """Creates the collection from `OneShotExogenousContract` objects with integer partners"""
+        if isinstance(contracts, OneShotExogenousContracts):
+            return contracts
+        return cls(
+            np.array(
+                [
+                    tuple(getattr(c, _) for _ in EXOGENOUS_CONTRACT_DTYPE.names)
+                    for c in contracts
+                ],
+                dtype=EXOGENOUS_CONTRACT_DTYPE,
+            )
+        )
+
+    @classmethod
+    def concatenate(
+        cls, parts: Iterable["OneShotExogenousContracts"]
+    ) -> "OneShotExogenousContracts":
+        """Concatenates several collections (in order)"""
+        arrays = [_.data for _ in parts]
+        if not arrays:
+            return cls()
+        return cls(np.concatenate(arrays))
+
+    def rows(self) -> Iterator[tuple[int, ...]]:
+        """Iterates over contracts as tuples of python ints ordered as the fields of `EXOGENOUS_CONTRACT_DTYPE`"""
+        return iter(self.data.tolist())
+
+    def __len__(self) -> int:
+        return len(self.data)
+
+    def __getitem__(self, item):
+        if isinstance(item, str):
+            return self.data[item]
+        if isinstance(item, slice):
+            return OneShotExogenousContracts(self.data[item])
+        return OneShotExogenousContract(*self.data[item].tolist())
+
+    def __iter__(self) -> Iterator[OneShotExogenousContract]:
+        for row in self.data.tolist():
+            yield OneShotExogenousContract(*row)
+
+    def __eq__(self, other) -> bool:
+        if isinstance(other, OneShotExogenousContracts):
+            return np.array_equal(self.data, other.data)
+        if isinstance(other, Sequence):
+            return len(self) == len(other) and all(a == b for a, b in zip(self, other))
+        return NotImplemented
+
+    def __repr__(self) -> str:
+        return f"OneShotExogenousContracts({len(self)} contracts)"
+
+
 @define
 class OneShotProfile:
     """Defines all private information of a factory"""
@@ -2,6 +2,8 @@ from __future__ import annotations
 
 from typing import TYPE_CHECKING
 
+from negmas import Rational
+
 from .common import QUANTITY, UNIT_PRICE
 from .ufun import OneShotUFun
 
@@ -21,19 +23,17 @@ class OneShotUFunCreatorMixin:
         op = (
             awi.current_output_issues[UNIT_PRICE] if awi.current_output_issues else None
         )
-        self.ufun = OneShotUFun(
+        input_agent = awi.my_input_product == 0
+        output_agent = awi.my_output_product == awi.n_products - 1
+        daily = dict(
             ex_qin=awi.current_exogenous_input_quantity if add_exogenous else 0,
             ex_pin=awi.current_exogenous_input_price if add_exogenous else 0,
             ex_qout=awi.current_exogenous_output_quantity if add_exogenous else 0,
             ex_pout=awi.current_exogenous_output_price if add_exogenous else 0,
-            production_cost=awi.profile.cost,
             disposal_cost=awi.current_disposal_cost,
             shortfall_penalty=awi.current_shortfall_penalty,
             input_penalty_scale=awi.penalty_multiplier(True, None),
             output_penalty_scale=awi.penalty_multiplier(False, None),
-            input_agent=awi.my_input_product == 0,
-            output_agent=awi.my_output_product == awi.n_products - 1,
-            input_product=awi.my_input_product,
             n_input_negs=awi.n_input_negotiations,
             n_output_negs=awi.n_output_negotiations,
             current_step=awi.current_step,
@@ -41,12 +41,38 @@ class OneShotUFunCreatorMixin:
             input_prange=(ip.min_value, ip.max_value) if ip else (0, 0),
             output_qrange=(oq.min_value, oq.max_value) if oq else (0, 0),
             output_prange=(op.min_value, op.max_value) if op else (0, 0),
-            force_exogenous=awi.is_exogenous_forced,
-            n_lines=awi.n_lines,
             current_balance=awi.current_balance,
             suppliers=set(awi.my_suppliers),
             consumers=set(awi.my_consumers),
         )
+        ufun = getattr(self, "ufun", None)
+        refresh = (
+            type(ufun) is OneShotUFun
+            and not ufun.normalized
+            and ufun.input_product == awi.my_input_product
+            and ufun.input_agent == input_agent
+            and ufun.output_agent == output_agent
+            and ufun.production_cost == awi.profile.cost
+            and ufun.n_lines == awi.n_lines
+            and ufun.force_exogenous == awi.is_exogenous_forced
+        )
+        if refresh:
+            # the agent's position in the market did not change. Just update what changes every day
+            ufun.refresh(**daily)
+        else:
+            self.ufun = OneShotUFun(
+                production_cost=awi.profile.cost,
+                input_agent=input_agent,
+                output_agent=output_agent,
+                input_product=awi.my_input_product,
+                force_exogenous=awi.is_exogenous_forced,
+                n_lines=awi.n_lines,
+                **daily,
+            )
         if hasattr(self, "_obj") and not in_adapter:
-            self._obj.ufun = self.ufun  # type: ignore
+            if refresh and isinstance(self._obj, Rational):  # type: ignore
+                # the ufun object did not change so we must force notifying the agent
+                self._obj.set_preferences(self.ufun, force=True)  # type: ignore
+            else:
+                self._obj.ufun = self.ufun  # type: ignore
         return self.ufun
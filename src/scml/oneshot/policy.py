@@ -3,16 +3,17 @@ import warnings
 from abc import ABC, abstractmethod
 from typing import Any
 
+import numpy as np
 from negmas.gb.common import ResponseType
 from negmas.helpers.strings import itertools
 from negmas.outcomes import Outcome
 from negmas.sao.common import SAOResponse, SAOState
 
-from scml.scml2019.common import QUANTITY, UNIT_PRICE
+from scml.scml2019.common import QUANTITY, TIME, UNIT_PRICE
 
 from .agent import OneShotSyncAgent
 
-__all__ = ["OneShotPolicy"]
+__all__ = ["OneShotPolicy", "OneShotBatchPolicy"]
 
 
 class OneShotPolicy(OneShotSyncAgent, ABC):
@@ -137,3 +138,165 @@ class OneShotPolicy(OneShotSyncAgent, ABC):
                 ],
             )
         )
+
+
+class OneShotBatchPolicy(OneShotPolicy, ABC):
+    """
+    A oneshot policy that can act for many agents of the same type at once.
+
+    Agents of this type implement `act_batch` which receives the offers and encoded states of any number of agents
+    stacked in arrays and returns their responses stacked the same way.
+
+    Remarks:
+        - When the world is created with `batch_policies=True`, agents of the same type inheriting from this class
+          are grouped and the world calls `batch_respond` (and hence `act_batch`) once for every group at every
+          negotiation step passing all offers these agents must respond to. See `SCML2020OneShotWorld`.
+        - In any other world, `counter_all` calls `act_batch` with the offers and state of this agent alone.
+        - Offers are stacked in an (n_agents, n_partners, 3) array. For every agent, partners are ordered as in
+          `batch_partners` (suppliers then consumers) and the three values are the quantity, the unit price and
+          whether the agent is selling to this partner (1) or buying from it (0). Quantity and price are NaN if
+          there is no offer to respond to (e.g. when the agent is to start the negotiation or when it is not its
+          turn to respond). Agents with fewer partners are padded with NaN rows.
+        - Responses are stacked in an (n_agents, n_partners, 3) array with the response type (the value of a
+          `ResponseType`), the quantity and the unit price of the counter offer in this order. Responses are only
+          used for partners with pending negotiations. When there is no offer, the counter offer is proposed
+          unless the response is to end the negotiation.
+        - States are stacked in an (n_agents, n_features) array with one row returned by `encode_batch_state` for
+          every agent.
+    """
+
+    @classmethod
+    @abstractmethod
+    def act_batch(cls, offers: np.ndarray, states: np.ndarray) -> np.ndarray:
+        """
+        The main policy. Generates responses to the offers of many agents at once.
+
+        Args:
+            offers: An (n_agents, n_partners, 3) array of offers (See the class documentation).
+            states: An (n_agents, n_features) array of states (one row from `encode_batch_state` for every agent).
+
+        Returns:
+            An (n_agents, n_partners, 3) array of responses (See the class documentation).
+        """
+
+    @classmethod
+    def batch_respond(
+        cls,
+        agents: list["OneShotBatchPolicy"],
+        offers: list[dict[str, Outcome | None]],
+    ) -> list[dict[str, SAOResponse]]:
+        """
+        Responds to offers received by many agents of this type at once using a single call to `act_batch`.
+
+        Args:
+            agents: The agents to respond for.
+            offers: For every agent, maps each partner it must respond to now to its current offer (None if the
+                    agent is to make the first offer).
+
+        Returns:
+            For every agent, the responses to the partners in the corresponding `offers`.
+
+        Remarks:
+            - This is the hook used by `SCML2020OneShotWorld` when created with `batch_policies=True`. Any agent
+              type defining a `batch_respond` class method with this signature is batched the same way.
+        """
+        partners = [_.batch_partners() for _ in agents]
+        n_partners = max(len(_) for _ in partners)
+        encoded = np.stack(
+            [
+                agent.encode_batch_offers(p, o, n_partners)
+                for agent, p, o in zip(agents, partners, offers)
+            ]
+        )
+        states = np.stack([_.encode_batch_state() for _ in agents])
+        responses = cls.act_batch(encoded, states)
+        results = []
+        for k, (agent, p, o) in enumerate(zip(agents, partners, offers)):
+            index = dict(zip(p, range(len(p))))
+            results.append(
+                {
+                    partner: agent.decode_batch_response(
+                        responses[k, index[partner]], offer is not None
+                    )
+                    for partner, offer in o.items()
+                }
+            )
+        return results
+
+    def batch_partners(self) -> list[str]:
+        """The partners of the agent in the order used for offers and responses (suppliers then consumers)"""
+        return self.awi.my_partners
+
+    def encode_batch_state(self) -> np.ndarray:
+        """
+        Encodes the state of the agent as a row of the states passed to `act_batch`.
+
+        Remarks:
+            - The default encoding gives the needed supplies, the needed sales, the trading prices of the input and
+              output products, the disposal cost and the shortfall penalty in this order.
+            - All agents of the same type must encode their states with the same number of features.
+        """
+        awi = self.awi
+        return np.asarray(
+            [
+                awi.needed_supplies,
+                awi.needed_sales,
+                awi.trading_prices[awi.my_input_product],
+                awi.trading_prices[awi.my_output_product],
+                awi.current_disposal_cost,
+                awi.current_shortfall_penalty,
+            ],
+            dtype=float,
+        )
+
+    def encode_batch_offers(
+        self, partners: list[str], offers: dict[str, Outcome | None], n_partners: int
+    ) -> np.ndarray:
+        """Encodes offers from the given partners as one row of the offers passed to `act_batch`"""
+        encoded = np.full((n_partners, 3), np.nan)
+        consumers = set(self.awi.my_consumers)
+        for i, partner in enumerate(partners):
+            encoded[i, 2] = partner in consumers
+            offer = offers.get(partner, None)
+            if offer is not None:
+                encoded[i, 0], encoded[i, 1] = offer[QUANTITY], offer[UNIT_PRICE]
+        return encoded
+
+    def decode_batch_response(
+        self, response: np.ndarray, has_offer: bool
+    ) -> SAOResponse:
+        """Decodes the response to a single partner from a row of the responses returned by `act_batch`"""
+        response_type = ResponseType(int(response[0]))
+        if response_type == ResponseType.END_NEGOTIATION:
+            return SAOResponse(response_type, None)
+        if response_type == ResponseType.ACCEPT_OFFER and has_offer:
+            return SAOResponse(response_type, None)
+        outcome = [0] * 3
+        outcome[QUANTITY] = int(response[1])
+        outcome[TIME] = self.awi.current_step
+        outcome[UNIT_PRICE] = int(response[2])
+        return SAOResponse(ResponseType.REJECT_OFFER, tuple(outcome))
+
+    def act(self, state: tuple[np.ndarray, np.ndarray]) -> np.ndarray:
+        """Calls `act_batch` with the offers and state of this agent alone"""
+        offers, encoded = state
+        return type(self).act_batch(offers[np.newaxis], encoded[np.newaxis])[0]
+
+    def counter_all(
+        self, offers: dict[str, Outcome | None], states: dict[str, SAOState]
+    ) -> dict[str, SAOResponse]:
+        """Responds to all offers by calling `act_batch` with the offers and state of this agent alone"""
+        partners = self.batch_partners()
+        responses = self.act(
+            (
+                self.encode_batch_offers(partners, offers, len(partners)),
+                self.encode_batch_state(),
+            )
+        )
+        return {
+            partner: self.decode_batch_response(
+                responses[i], offers.get(partner, None) is not None
+            )
+            for i, partner in enumerate(partners)
+            if partner in offers
+        }
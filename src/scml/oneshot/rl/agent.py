@@ -1,5 +1,7 @@
+from collections import defaultdict
 from typing import Any
 
+import numpy as np
 from negmas.gb.common import ResponseType
 from negmas.helpers import instantiate
 from negmas.outcomes import Outcome
@@ -19,7 +21,25 @@ __all__ = ["OneShotRLAgent"]
 
 
 class OneShotRLAgent(OneShotPolicy):
-    """A oneshot agent that can execute a trained RL policy in appropriate worlds. It falls back to the given agent type otherwise"""
+    """
+    A oneshot agent that can execute a trained RL policy in appropriate worlds. It falls back to the given agent type otherwise
+
+    Args:
+        models: The trained models (one for every observation manager).
+        observation_managers: Observation managers used to encode the state of the agent for the models.
+        action_managers: Action managers used to decode the actions of the models. If None, an
+                         `UnconstrainedActionManager` is used for every observation manager.
+        fallback_type: The type of the agent to use if no observation/action managers match the world.
+        fallback_params: Parameters of the fallback agent.
+        batched_models: If True, models accept observations stacked in a 2D array (one row per observation) and
+                        return actions stacked the same way (as the models returned from `model_wrapper` do).
+
+    Remarks:
+        - Observations are encoded into an array preallocated by the agent using the `encode_into` method of the
+          observation manager (if it has one) which avoids constructing the full state of the agent.
+        - In worlds created with `batch_policies=True`, all RL agents sharing the same model and managers respond
+          together through `batch_respond` which calls the model once for all of them if `batched_models` is True.
+    """
 
     def __init__(
         self,
@@ -29,6 +49,7 @@ class OneShotRLAgent(OneShotPolicy):
         action_managers: list[ActionManager] | None = None,
         fallback_type: type[OneShotAgent] = GreedyOneShotAgent,
         fallback_params: dict[str, Any] | None = None,
+        batched_models: bool = False,
         **kwargs,
     ):
         super().__init__(*args, **kwargs)
@@ -49,6 +70,8 @@ class OneShotRLAgent(OneShotPolicy):
         self._valid_obs_manager: ObservationManager = None  # type: ignore
         self._valid_index: int = -1
         self._fallback_agent: OneShotAget = None  # type: ignore
+        self._batched_models = batched_models
+        self._obs: np.ndarray | None = None
 
     def init(self):
         super().init()
@@ -62,6 +85,8 @@ class OneShotRLAgent(OneShotPolicy):
             if self.awi in a.factory and self.awi in o.factory:
                 self._valid_index = i
                 break
+        if self._valid_index >= 0:
+            self._obs = self._make_obs_buffer(self._obs_managers[self._valid_index])
         if self._valid_index < 0:
             self._fallback_agent = instantiate(
                 self._fallback_type, **self._fallback_params
@@ -74,10 +99,33 @@ class OneShotRLAgent(OneShotPolicy):
             self._owner._obj = self._fallback_agent  # type: ignore
             self._fallback_agent.init()
 
+    @staticmethod
+    def _make_obs_buffer(manager: ObservationManager, n: int | None = None):
+        """Allocates an array for one observation (or n stacked observations) if the manager can encode into it"""
+        if not hasattr(manager, "encode_into"):
+            return None
+        shape = manager.make_space().shape
+        if not shape:
+            return None
+        return np.zeros(shape if n is None else (n, *shape), dtype=np.int64)
+
+    def _encode(self, out: np.ndarray | None) -> RLState:
+        manager = self._obs_managers[self._valid_index]
+        if out is None:
+            return manager.encode(self.awi.state)
+        return manager.encode_into(self.awi, out)  # type: ignore
+
     def encode_state(self, mechanism_states: dict[str, SAOState]) -> RLState:
+        """
+        Encodes the current state of the agent for the model.
+
+        Remarks:
+            - When the observation manager supports it, the returned array is owned by the agent and is overwritten
+              the next time this method is called.
+        """
         _ = mechanism_states
         if self._valid_index >= 0:
-            return self._obs_managers[self._valid_index].encode(self.awi.state)
+            return self._encode(self._obs)
         raise RuntimeError(
             f"This is an RL agent running in fallback mode and its encode_state should never be called"
         )
@@ -96,6 +144,80 @@ class OneShotRLAgent(OneShotPolicy):
             f"This is an RL agent running in fallback mode and its decode_action should never be called"
         )
 
+    @classmethod
+    def batch_respond(
+        cls,
+        agents: list["OneShotRLAgent"],
+        offers: list[dict[str, Outcome | None]],
+    ) -> list[dict[str, SAOResponse]]:
+        """
+        Responds to offers received by many RL agents at once.
+
+        Args:
+            agents: The agents to respond for.
+            offers: For every agent, maps each partner it must respond to now to its current offer.
+
+        Returns:
+            For every agent, the responses to the partners in the corresponding `offers`.
+
+        Remarks:
+            - Agents sharing the same model and `batched_models` value are encoded (each using its own observation
+              manager) into a single stacked array and (if `batched_models` is True) their model is called once for
+              all of them. Actions are decoded by the action manager of every agent.
+            - Agents running in fallback mode respond to each partner through their fallback agent.
+            - Used by `SCML2020OneShotWorld` when created with `batch_policies=True`.
+        """
+        results: list[dict[str, SAOResponse]] = [dict() for _ in agents]
+        groups: dict[tuple, list[int]] = defaultdict(list)
+        for k, agent in enumerate(agents):
+            i = agent._valid_index
+            if i < 0:
+                results[k] = agent._fallback_responses(offers[k])
+                continue
+            groups[(id(agent._models[i]), agent._batched_models)].append(k)
+        for indices in groups.values():
+            first = agents[indices[0]]
+            i = first._valid_index
+            model, batched = first._models[i], first._batched_models
+            obs = cls._make_obs_buffer(first._obs_managers[i], len(indices))
+            if obs is None or any(agents[k]._obs is None for k in indices):
+                obs = np.stack([agents[k]._encode(None) for k in indices])
+            else:
+                for row, k in enumerate(indices):
+                    agents[k]._encode(obs[row])
+            if batched:
+                actions = model(obs)
+            else:
+                actions = [model(_) for _ in obs]
+            for row, k in enumerate(indices):
+                agent = agents[k]
+                responses = agent.decode_action(actions[row])
+                results[k] = {
+                    partner: responses.get(
+                        partner, SAOResponse(ResponseType.END_NEGOTIATION, None)
+                    )
+                    for partner in offers[k].keys()
+                }
+        return results
+
+    def _fallback_responses(
+        self, offers: dict[str, Outcome | None]
+    ) -> dict[str, SAOResponse]:
+        """Responds to the given offers one partner at a time using the fallback agent"""
+        states = self.awi.current_states
+        responses = dict()
+        for partner, offer in offers.items():
+            state = states[partner]
+            response = self._fallback_agent.respond(partner, state)
+            if response == ResponseType.REJECT_OFFER:
+                outcome = self._fallback_agent.propose(partner, state)
+            elif response == ResponseType.ACCEPT_OFFER:
+                outcome = offer
+            else:
+                outcome = None
+            responses[partner] = SAOResponse(response, outcome)
+        return responses
+
     # =====================
     # Negotiation Callbacks
     # =====================
@@ -79,6 +79,17 @@ class BaseObservationManager(ABC):
         """Creates the initial observation (returned from gym's reset())"""
         return self.encode(awi.state)
 
+    def encode_into(self, awi: OneShotAWI, out: np.ndarray) -> np.ndarray:
+        """
+        Encodes the current state of the agent into a preallocated array and returns it.
+
+        Remarks:
+            - The default calls `encode` with the state of the agent. Override it to read only what is needed from
+              the AWI.
+        """
+        out[:] = self.encode(awi.state)
+        return out
+
 
 @define(frozen=True)
 class FixedPartnerNumbersObservationManager(BaseObservationManager):
@@ -123,6 +134,40 @@ class FixedPartnerNumbersObservationManager(BaseObservationManager):
 
     def encode(self, state: OneShotState) -> np.ndarray:
         """Encodes the state as an array"""
+        return self._encode_into(
+            np.empty(2 * self.n_partners + 9, dtype=np.int64),
+            state,
+            state.relative_simulation_time,
+            state.disposal_cost,
+            state.shortfall_penalty,
+        )
+
+    def encode_into(self, awi: OneShotAWI, out: np.ndarray) -> np.ndarray:
+        """
+        Encodes the current state of the agent into a preallocated array and returns it.
+
+        Remarks:
+            - Gives the same observation as `encode(awi.state)` but reads everything directly from the AWI and the
+              running negotiations without constructing a `OneShotState`.
+            - `out` must have the shape of the observation space.
+        """
+        return self._encode_into(
+            out,
+            awi,
+            awi.relative_time,
+            awi.current_disposal_cost,
+            awi.current_shortfall_penalty,
+        )
+
+    def _encode_into(
+        self,
+        out: np.ndarray,
+        state: OneShotState | OneShotAWI,
+        relative_simulation_time: float,
+        disposal_cost: float,
+        shortfall_penalty: float,
+    ) -> np.ndarray:
+        """Encodes a state or the AWI (which share the names of the values used) into out"""
         partners = state.my_partners
         assert (
             len(partners) >= self.n_partners
@@ -130,43 +175,32 @@ class FixedPartnerNumbersObservationManager(BaseObservationManager):
         if len(partners) > self.n_partners:
             partners = partners[: self.n_partners]
         partner_index = dict(zip(partners, range(self.n_partners)))
-        partnerset = set(partners)
         infos: list[NegotiationDetails | None] = [None] * self.n_partners  # type: ignore
         neg_relative_time = 0.0
-        actual_partners = list(
-            itertools.chain(
-                state.current_negotiation_details["buy"].items(),
-                state.current_negotiation_details["sell"].items(),
-            )
-        )
-        for partner, info in actual_partners:
-            if partner not in partnerset:
+        details = state.current_negotiation_details
+        for partner, info in itertools.chain(
+            details["buy"].items(), details["sell"].items()
+        ):
+            i = partner_index.get(partner, None)
+            if i is None:
                 continue
-            infos[partner_index[partner]] = info
+            infos[i] = info
             if not info.nmi.state.ended:
                 neg_relative_time = max(neg_relative_time, info.nmi.state.relative_time)
-        offers = [
-            (0, 0)
-            if info is None or info.nmi.state.current_offer is None  # type: ignore
-            else (
-                int(info.nmi.state.current_offer[QUANTITY]),  # type: ignore
-                int(info.nmi.state.current_offer[UNIT_PRICE] - info.nmi.outcome_space.issues[UNIT_PRICE].min_value),  # type: ignore
-            )
-            for info in infos
-        ]
+        for i, info in enumerate(infos):
+            offer = None if info is None else info.nmi.state.current_offer  # type: ignore
+            if offer is None:
+                out[2 * i] = out[2 * i + 1] = 0
+                continue
+            out[2 * i] = int(offer[QUANTITY])
+            out[2 * i + 1] = int(offer[UNIT_PRICE] - info.nmi.outcome_space.issues[UNIT_PRICE].min_value)  # type: ignore
         if self.extra_checks:
             assert (
                 len(partners) == self.n_partners
             ), f"{len(partners)=} while {self.n_partners=}: {partners=}"
-            assert (
-                len(infos) == self.n_partners
-            ), f"{len(infos)=} while {self.n_partners=}: {infos=}"
-            assert (
-                len(offers) == self.n_partners
-            ), f"{len(infos)=} while {self.n_partners=}: {offers=}"
             assert (
                 state.total_sales == 0 or state.total_supplies == 0
-            ), f"{state.total_sales=}, {state.total_supplies=}, {state.exogenous_input_quantity=}, {state.exogenous_output_quantity=}"
+            ), f"{state.total_sales=}, {state.total_supplies=}"
 
         # TODO add more state values here and remember to add corresponding limits in the make_space function
         def _normalize(x, mu, sigma, n_sigmas=self.n_sigmas):
@@ -180,7 +214,10 @@ class FixedPartnerNumbersObservationManager(BaseObservationManager):
                 return 1
             return max(0, min(1, (x - mn) / (mx - mn)))
 
-        extra = [
+        profile = state.profile
+        trading_prices = state.trading_prices
+        output_price = trading_prices[state.my_output_product]
+        out[2 * self.n_partners :] = [
             state.needed_sales,
             state.needed_supplies,
             # state.n_input_negotiations,
@@ -188,21 +225,21 @@ class FixedPartnerNumbersObservationManager(BaseObservationManager):
             state.n_lines - 1,
             int(self.n_bins * (state.level / state.n_processes) + 0.5),
             int(neg_relative_time * self.n_bins + 0.5),
-            int(state.relative_simulation_time * self.n_bins * 10 + 0.5),
+            int(relative_simulation_time * self.n_bins * 10 + 0.5),
             int(
                 _normalize(
-                    state.disposal_cost,
-                    state.profile.disposal_cost_mean,
-                    state.profile.disposal_cost_dev,
+                    disposal_cost,
+                    profile.disposal_cost_mean,
+                    profile.disposal_cost_dev,
                 )
                 * self.n_bins
                 + 0.5
             ),
             int(
                 _normalize(
-                    state.shortfall_penalty,
-                    state.profile.shortfall_penalty_mean,
-                    state.profile.shortfall_penalty_dev,
+                    shortfall_penalty,
+                    profile.shortfall_penalty_mean,
+                    profile.shortfall_penalty_dev,
                 )
                 * self.n_bins
                 + 0.5
@@ -211,29 +248,22 @@ class FixedPartnerNumbersObservationManager(BaseObservationManager):
                 self.n_bins
                 * min(
                     1,
-                    (
-                        state.trading_prices[state.my_output_product]
-                        - state.trading_prices[state.my_input_product]
-                    )
-                    / state.trading_prices[state.my_output_product],
+                    (output_price - trading_prices[state.my_input_product])
+                    / output_price,
                 )
                 + 0.5
             ),
         ]
-
-        v = np.asarray(np.asarray(offers).flatten().tolist() + extra)
         if self.extra_checks:
             space = self.make_space()
             assert space is not None and space.shape is not None
             exp = space.shape[0]
-            assert (
-                len(v) == exp
-            ), f"{len(v)=}, {len(extra)=}, {len(offers)=}, {exp=}, {self.n_partners=}\n{state.current_negotiation_details=}"
+            assert len(out) == exp, f"{len(out)=}, {exp=}, {self.n_partners=}"
             assert all(
-                -1 < a < b for a, b in zip(v, space.nvec)  # type: ignore
-            ), f"{v=}\n{space.nvec=}\n{space.nvec - v =}\n{ (state.exogenous_input_quantity , state.total_supplies , state.total_sales , state.exogenous_output_quantity) }"  # type: ignore
+                -1 < a < b for a, b in zip(out, space.nvec)  # type: ignore
+            ), f"{out=}\n{space.nvec=}\n{space.nvec - out =}"  # type: ignore
 
-        return v
+        return out
 
     def is_valid(self, env) -> bool:
         """Checks that it is OK to use this observation manager with a given `OneShotEnv`"""
@@ -374,6 +404,10 @@ class LimitedPartnerNumbersObservationManager(BaseObservationManager):
         """Encodes the state as an array"""
         return self.sub_manager.encode(state)
 
+    def encode_into(self, awi: OneShotAWI, out: np.ndarray) -> np.ndarray:
+        """Encodes the current state of the agent into a preallocated array and returns it"""
+        return self.sub_manager.encode_into(awi, out)
+
     def is_valid(self, env) -> bool:
         """Checks that it is OK to use this observation manager with a given `OneShotEnv`"""
         if isin(env._n_lines, self.n_lines):
@@ -1,15 +1,15 @@
 import itertools
 import random
+import sys
 from typing import Callable
 
 import numpy as np
 from negmas import SAONMI, ResponseType, SAOState
 from negmas.outcomes import Outcome
 from negmas.sao import SAOResponse
-from papermill.iorw import sys
 
 from scml.oneshot.awi import OneShotAWI
-from scml.oneshot.common import QUANTITY, TIME, UNIT_PRICE
+from scml.oneshot.common import QUANTITY, TIME, UNIT_PRICE, best_subset
 from scml.oneshot.rl.action import (
     ActionManager,
     DefaultActionManager,
@@ -89,7 +89,7 @@ def greedy_policy(
         return_decoded: If True, the returned action is already decoded (no need to decode it by the action manager).
 
     Remarks:
-        - Accepts the subset of offers with maximum total quantity under current needs.
+        - Accepts the subset of offers with maximum total quantity under current needs (found by `best_subset`).
         - The remaining quantity is distributed over the remaining partners using the distributor function
         - Prices are set to the worst for the agent if the price range is small else they are set randomly
 
@@ -116,20 +116,14 @@ def greedy_policy(
     all_offers = list(offers.values())
     all_partners = list(offers.keys())
     n_partners = len(all_partners)
-    all_indices = list(range(len(offers)))
-    best, diff = None, sys.maxsize
-    for indices in powerset(all_indices):
-        q = sum(
+    found = best_subset(
+        [
             _.outcome[QUANTITY] if _.response == ResponseType.REJECT_OFFER else 0
-            for _ in [all_offers[_] for _ in indices]
-        )
-        d = needed - q
-        if d < 0:
-            continue
-        if d < diff:
-            best, diff = indices, d
-        if d == 0:
-            break
+            for _ in all_offers
+        ],
+        needed,
+    )
+    best, diff = (None, sys.maxsize) if found is None else (found[0], needed - found[1])
     os = (
         awi.current_input_outcome_space
         if not awi.is_first_level
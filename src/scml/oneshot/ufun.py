@@ -1,18 +1,28 @@
 from __future__ import annotations
 
-from collections import namedtuple
+from collections import OrderedDict, namedtuple
 from functools import cache
 from typing import Iterable, Literal, overload
 
+import numpy as np
 from negmas import Contract
-from negmas.outcomes import Issue, Outcome, OutcomeSpace, make_issue, make_os
+from negmas.outcomes import Issue, Outcome, OutcomeSpace
 from negmas.preferences import StationaryMixin, UtilityFunction
 
+from scml.common import shared_outcome_space
 from scml.scml2020.common import is_system_agent
 
 from .common import QUANTITY, TIME, UNIT_PRICE
 
-__all__ = ["OneShotUFun", "UFunLimit"]
+__all__ = [
+    "OneShotUFun",
+    "UFunLimit",
+    "LimitCacheInfo",
+    "LIMIT_CACHE_SIZE",
+    "limit_cache_info",
+    "clear_limit_cache",
+    "enable_limit_cache",
+]
 
 UFunLimit = namedtuple(
     "UFunLimit",
@@ -31,6 +41,134 @@ UFunLimit = namedtuple(
 )
 """Information about one utility limit (either highest or lowest). See `OnShotUFun.find_limit` for details."""
 
+LimitCacheInfo = namedtuple(
+    "LimitCacheInfo", ["hits", "misses", "maxsize", "currsize", "enabled"]
+)
+"""Statistics of the limit cache shared by all `OneShotUFun` objects. See `limit_cache_info`"""
+
+LIMIT_CACHE_SIZE = 8192
+"""Maximum number of utility limits kept in the limit cache shared by all `OneShotUFun` objects"""
+
+_limit_cache: OrderedDict[tuple, UFunLimit] = OrderedDict()
+_limit_cache_stats = dict(hits=0, misses=0, enabled=True)
+
+
+def limit_cache_info() -> LimitCacheInfo:
+    """Returns the number of hits and misses and the current size of the limit cache shared by all ufuns"""
+    return LimitCacheInfo(
+        hits=_limit_cache_stats["hits"],
+        misses=_limit_cache_stats["misses"],
+        maxsize=LIMIT_CACHE_SIZE,
+        currsize=len(_limit_cache),
+        enabled=_limit_cache_stats["enabled"],
+    )
+
+
+def clear_limit_cache() -> None:
+    """Removes all utility limits from the shared limit cache and resets its statistics"""
+    _limit_cache.clear()
+    _limit_cache_stats["hits"] = _limit_cache_stats["misses"] = 0
+
+
+def enable_limit_cache(enable: bool = True) -> None:
+    """
+    Enables or disables the limit cache shared by all `OneShotUFun` objects.
+
+    Remarks:
+        - When disabled, every `OneShotUFun.find_limit_brute_force` call with new arguments runs the full search.
+        - Disabling the cache also clears it.
+    """
+    _limit_cache_stats["enabled"] = enable
+    if not enable:
+        clear_limit_cache()
+
+
+def _cheapest_subsets(
+    quantities: list[int], prices: list[float]
+) -> tuple[np.ndarray, np.ndarray]:
+    """
+    Finds the cheapest subset of items for every total quantity (0/1 knapsack).
+
+    Returns:
+        The total price of the cheapest subset for every total quantity (inf if no subset has it) and a boolean
+        matrix marking for every item and total quantity whether the item is in that subset (See `_taken_items`).
+    """
+    total = sum(quantities)
+    costs = np.full(total + 1, np.inf)
+    costs[0] = 0.0
+    taken = np.zeros((len(quantities), total + 1), dtype=bool)
+    for i, (q, p) in enumerate(zip(quantities, prices)):
+        shifted = costs[: total + 1 - q] + q * p
+        better = shifted < costs[q:]
+        costs[q:] = np.where(better, shifted, costs[q:])
+        taken[i, q:] = better
+    return costs, taken
+
+
+def _taken_items(taken: np.ndarray, quantities: list[int], total: int) -> list[int]:
+    """Returns the indices of the items making the given total quantity in a matrix found by `_cheapest_subsets`"""
+    items = []
+    for i in range(len(quantities) - 1, -1, -1):
+        if taken[i, total]:
+            items.append(i)
+            total -= quantities[i]
+    return items[::-1]
+
+
+def _best_sales(
+    items: list[tuple[int, float, bool]], sellable: int
+) -> tuple[np.ndarray, np.ndarray, list[np.ndarray | None]]:
+    """
+    Finds the subset of output items with the highest revenue for every total output quantity.
+
+    Args:
+        items: (quantity, unit price, optional) of every output sorted from the most expensive. Items that are not
+               optional are in every subset.
+        sellable: The number of units that can be produced. Only the first `sellable` units are paid for.
+
+    Returns:
+        The revenue (-inf if no subset has this quantity) and total price of the best subset for every total
+        quantity and, for every item, whether it is in that subset (None for items that are not optional).
+    """
+    total = sum(_[0] for _ in items)
+    revenue = np.full(total + 1, -np.inf)
+    revenue[0] = 0.0
+    value = np.zeros(total + 1)
+    states = np.arange(total + 1)
+    taken: list[np.ndarray | None] = []
+    for q, p, optional in items:
+        n = total + 1 - q
+        shifted = revenue[:n] + p * np.clip(sellable - states[:n], 0, q)
+        shifted_value = value[:n] + p * q
+        if not optional:
+            revenue[q:], value[q:] = shifted, shifted_value
+            revenue[:q], value[:q] = -np.inf, 0.0
+            taken.append(None)
+            continue
+        better = (shifted > revenue[q:]) | (
+            (shifted == revenue[q:]) & (shifted_value < value[q:])
+        )
+        revenue[q:] = np.where(better, shifted, revenue[q:])
+        value[q:] = np.where(better, shifted_value, value[q:])
+        row = np.zeros(total + 1, dtype=bool)
+        row[q:] = better
+        taken.append(row)
+    return revenue, value, taken
+
+
+def _sold_items(
+    items: list[tuple[int, float, bool]], taken: list[np.ndarray | None], total: int
+) -> list[int]:
+    """Returns the indices of the optional items making the given total quantity in the subsets of `_best_sales`"""
+    found = []
+    for i in range(len(items) - 1, -1, -1):
+        row = taken[i]
+        if row is None or row[total]:
+            if row is not None:
+                found.append(i)
+            total -= items[i][0]
+    return found[::-1]
+
 
 class OneShotUFun(StationaryMixin, UtilityFunction):
     """
@@ -110,10 +248,74 @@ class OneShotUFun(StationaryMixin, UtilityFunction):
         **kwargs,
     ):
         super().__init__(**kwargs)
+        self.normalized = normalized
+        self.production_cost = production_cost
+        self.input_agent, self.output_agent = input_agent, output_agent
+        self.force_exogenous = force_exogenous
+        self.n_lines = n_lines
+        if input_product is None and input_agent:
+            input_product = 0
+        self.input_product = input_product
+        if self.input_product is not None:
+            self.output_product = self.input_product + 1
+        else:
+            self.output_product = None
+        self.refresh(
+            ex_pin=ex_pin,
+            ex_qin=ex_qin,
+            ex_pout=ex_pout,
+            ex_qout=ex_qout,
+            disposal_cost=disposal_cost,
+            shortfall_penalty=shortfall_penalty,
+            input_penalty_scale=input_penalty_scale,
+            output_penalty_scale=output_penalty_scale,
+            n_input_negs=n_input_negs,
+            n_output_negs=n_output_negs,
+            current_step=current_step,
+            input_qrange=input_qrange,
+            input_prange=input_prange,
+            output_qrange=output_qrange,
+            output_prange=output_prange,
+            current_balance=current_balance,
+            suppliers=suppliers,
+            consumers=consumers,
+        )
+
+    def refresh(
+        self,
+        ex_pin: int,
+        ex_qin: int,
+        ex_pout: int,
+        ex_qout: int,
+        disposal_cost: float,
+        shortfall_penalty: float,
+        input_penalty_scale: float | None,
+        output_penalty_scale: float | None,
+        n_input_negs: int,
+        n_output_negs: int,
+        current_step: int,
+        input_qrange: tuple[int, int] = (0, 0),
+        input_prange: tuple[int, int] = (0, 0),
+        output_qrange: tuple[int, int] = (0, 0),
+        output_prange: tuple[int, int] = (0, 0),
+        current_balance: int | float = float("inf"),
+        suppliers: set[str] = set(),
+        consumers: set[str] = set(),
+    ) -> None:
+        """
+        Updates the ufun in place with the information of a new simulation step.
+
+        Args:
+            See the constructor for the meaning of all arguments.
+
+        Remarks:
+            - Only information that can change from one step to the next is passed. The agent's position in the
+              production graph, its production cost, number of lines and `force_exogenous` are kept.
+            - All registered contracts and failures, utility limits and cached values are discarded.
+        """
         self.suppliers = suppliers
         self.consumers = consumers
         self.current_balance = current_balance
-        self.normalized = normalized
         self.input_penalty_scale = input_penalty_scale
         self.output_penalty_scale = output_penalty_scale
         self.current_step = current_step
@@ -123,23 +325,15 @@ class OneShotUFun(StationaryMixin, UtilityFunction):
         self.n_output_negs = n_output_negs
         self.input_qrange, self.input_prange = input_qrange, input_prange
         self.output_qrange, self.output_prange = output_qrange, output_prange
-        self.production_cost, self.disposal_cost, self.shortfall_penalty = (
-            production_cost,
-            disposal_cost,
-            shortfall_penalty,
-        )
-        self.input_agent, self.output_agent = input_agent, output_agent
-        self.force_exogenous = force_exogenous
-        if not force_exogenous:
+        self.disposal_cost, self.shortfall_penalty = disposal_cost, shortfall_penalty
+        if not self.force_exogenous:
             self.ex_pin = self.ex_qin = self.ex_pout = self.ex_qout = 0
-        self.n_lines = n_lines
-        if input_product is None and input_agent:
-            input_product = 0
-        self.input_product = input_product
-        if self.input_product is not None:
-            self.output_product = self.input_product + 1
-        else:
-            self.output_product = None
+        self._signed_agreements: list[tuple[int, int, int]] = []
+        self._signed_is_output: list[bool] = []
+        self._registered_sale_failures: set[str] = set()
+        self._registered_supply_failures: set[str] = set()
+        self.find_limit_brute_force.cache_clear()
+        self.from_aggregates.cache_clear()
         if self.normalized:
             self.best = self.find_limit(True, None, None)
             self.worst = self.find_limit(False, None, None)
@@ -150,34 +344,30 @@ class OneShotUFun(StationaryMixin, UtilityFunction):
             # if this is an edge agent, all negotiations will be on the same product so we can define its outcome-space
             qrange = self.input_qrange if self.output_agent else self.output_qrange
             prange = self.input_prange if self.output_agent else self.output_prange
-            self.outcome_space = make_os(
-                [
-                    make_issue(qrange, name="quantity"),
-                    make_issue((self.current_step, self.current_step), name="time"),
-                    make_issue(prange, name="unit_price"),
-                ]
+            self.outcome_space = shared_outcome_space(
+                ranges=(
+                    ("quantity", qrange),
+                    ("time", (self.current_step, self.current_step)),
+                    ("unit_price", prange),
+                )
             )
         else:
             # if this is not an edge agent, we have a different outcome space for each side
             self.outcome_spaces = [
-                make_os(
-                    [
-                        make_issue(qrange, name="quantity"),
-                        make_issue((self.current_step, self.current_step), name="time"),
-                        make_issue(prange, name="unit_price"),
-                    ]
+                shared_outcome_space(
+                    ranges=(
+                        ("quantity", qrange),
+                        ("time", (self.current_step, self.current_step)),
+                        ("unit_price", prange),
+                    )
                 )
                 for qrange, prange in (
                     (self.input_qrange, self.input_prange),
-                    (self.output_qrange, self.output_qrange),
+                    (self.output_qrange, self.output_prange),
                 )
             ]
         # slightly bias toward agreements
         self.reserved_value = self.from_contracts([], ignore_exogenous=False) - 1e-3
-        self._signed_agreements: list[tuple[int, int, int]] = []
-        self._signed_is_output: list[bool] = []
-        self._registered_sale_failures: set[str] = set()
-        self._registered_supply_failures: set[str] = set()
 
     def register_supply_failure(self, supplier_id: str):
         self.find_limit_brute_force.cache_clear()
@@ -525,6 +715,171 @@ class OneShotUFun(StationaryMixin, UtilityFunction):
             return 1.0
         return (u - self.min_utility) / rng
 
+    def _affordable_quantity(self, inputs: list[tuple[int, float]]) -> int:
+        """The input quantity the agent can pay for (and produce) buying inputs from the cheapest (as in `from_offers`)"""
+        if self.current_balance < 0:
+            return 0
+        qin, pin = 0, 0.0
+        for q, p in sorted(inputs, key=lambda x: x[1]):
+            if pin + p * q + q * self.production_cost > self.current_balance:
+                return qin + int(
+                    (self.current_balance - pin) // (p + self.production_cost)
+                )
+            pin += p * q
+            qin += q
+        return qin
+
+    @overload
+    def best_acceptance_set(
+        self,
+        offers: dict[str, tuple[int, int, int] | None],
+        outputs: None = None,
+        ignore_signed_contracts: bool = False,
+    ) -> tuple[tuple[str, ...], float]:
+        ...
+
+    @overload
+    def best_acceptance_set(
+        self,
+        offers: tuple[tuple[int, int, int] | None, ...],
+        outputs: tuple[bool, ...] | None = None,
+        ignore_signed_contracts: bool = False,
+    ) -> tuple[tuple[int, ...], float]:
+        ...
+
+    def best_acceptance_set(
+        self,
+        offers: tuple[tuple[int, int, int] | None, ...]
+        | dict[str, tuple[int, int, int] | None],
+        outputs: tuple[bool, ...] | None = None,
+        ignore_signed_contracts: bool = False,
+    ) -> tuple[tuple, float]:
+        """
+        Finds the subset of the given offers that maximizes the utility if accepted.
+
+        Args:
+            offers: The offers to choose from (with the same format as in `from_offers`). None offers are never chosen.
+            outputs: Whether each offer is for selling the agent's output product (as in `from_offers`).
+            ignore_signed_contracts: If true, ignores the registered signed contracts. By default, they are taken into
+                                     account because the agent is already committed to them.
+
+        Returns:
+            The keys (if offers is a dict) or indices (otherwise) of the offers to accept and the utility of
+            accepting them (i.e. the value of `from_offers` for the chosen offers).
+
+        Remarks:
+            - Inputs are bought from the cheapest and outputs are sold from the most expensive (as in `from_offers`).
+              The utility thus depends on the chosen inputs only through their total quantity and price and, for a
+              given quantity, cheaper inputs are always better. The cheapest set of input offers for every total
+              quantity is found using dynamic programming and so is the set of output offers with the highest
+              revenue for every total quantity and every producible quantity (which is limited by the number of
+              lines). The best combination of the two is then returned.
+            - The time needed grows with the number of offers times the total quantity offered (times the number of
+              lines for output offers) instead of exponentially with the number of offers.
+            - The result is optimal if the balance of the agent is enough to pay for all inputs offered and an
+              output penalty scale is given (both hold in SCML worlds unless penalties are scaled by unit prices).
+              Otherwise, it is the best of the subsets that are cheapest (for inputs) and have the highest revenue
+              (for outputs) for their quantities.
+            - Offers with zero quantity are never chosen as accepting them does not change the utility.
+        """
+        if isinstance(offers, dict):
+            partners = list(offers.keys())
+            chosen, u = self.best_acceptance_set(
+                tuple(offers.values()),
+                tuple(p in self.consumers for p in partners),
+                ignore_signed_contracts=ignore_signed_contracts,
+            )
+            return tuple(partners[_] for _ in chosen), u
+        offers = tuple(offers)
+        if outputs is None:
+            if self.input_agent:
+                outputs = tuple([True] * len(offers))
+            elif self.output_agent:
+                outputs = tuple([False] * len(offers))
+            else:
+                raise RuntimeError(
+                    f"You cannot pass outputs=None if the agent is neither a first or last level agent"
+                )
+        # the offers that can be chosen (indices) and the contracts executed anyway ((quantity, unit price) pairs)
+        # in the same order used by `from_offers`: offers, signed contracts then exogenous contracts
+        candidates: tuple[list[int], list[int]] = ([], [])
+        fixed: tuple[list[tuple[int, float]], list[tuple[int, float]]] = ([], [])
+        for i, (offer, is_output) in enumerate(zip(offers, outputs, strict=True)):
+            if offer and offer[QUANTITY] > 0:
+                candidates[is_output].append(i)
+        if not ignore_signed_contracts:
+            for offer, is_output in zip(
+                self._signed_agreements, self._signed_is_output
+            ):
+                fixed[is_output].append((offer[QUANTITY], offer[UNIT_PRICE]))
+        fixed[0].append((self.ex_qin, self.ex_pin / self.ex_qin if self.ex_qin else 0))
+        fixed[1].append(
+            (self.ex_qout, self.ex_pout / self.ex_qout if self.ex_qout else 0)
+        )
+
+        # the cheapest set of input offers for every total quantity
+        in_quantities = [offers[_][QUANTITY] for _ in candidates[0]]  # type: ignore
+        in_prices = [offers[_][UNIT_PRICE] for _ in candidates[0]]  # type: ignore
+        in_costs, in_taken = _cheapest_subsets(in_quantities, in_prices)
+        fixed_qin = sum(_[0] for _ in fixed[0])
+        fixed_pin = sum(q * p for q, p in fixed[0])
+
+        # output items sorted from the most expensive (stable to match `from_offers`)
+        outs = sorted(
+            [
+                (offers[_][QUANTITY], offers[_][UNIT_PRICE], _)  # type: ignore
+                for _ in candidates[1]
+            ]
+            + [(q, p, -1) for q, p in fixed[1]],
+            key=lambda x: -x[1],
+        )
+        out_items = [(q, p, i >= 0) for q, p, i in outs]
+        sales = dict()
+        best, best_u = None, float("-inf")
+        for a in np.flatnonzero(np.isfinite(in_costs)):
+            a = int(a)
+            chosen_inputs = _taken_items(in_taken, in_quantities, a)
+            qin, pin = fixed_qin + a, fixed_pin + float(in_costs[a])
+            sellable = min(
+                self._affordable_quantity(
+                    [(in_quantities[_], in_prices[_]) for _ in chosen_inputs] + fixed[0]
+                ),
+                self.n_lines,
+            )
+            if sellable not in sales:
+                sales[sellable] = _best_sales(out_items, sellable)
+            revenue, value, _ = sales[sellable]
+            qout = np.arange(len(revenue))
+            producible = np.minimum(np.minimum(qout, sellable), qin)
+            input_scale = self.input_penalty_scale
+            if input_scale is None:
+                input_scale = pin / qin if qin else 0
+            output_scale = self.output_penalty_scale
+            if output_scale is None:
+                output_scale = np.divide(
+                    value, qout, out=np.zeros_like(value), where=qout > 0
+                )
+            u = (
+                revenue
+                - pin
+                - self.production_cost * producible
+                - input_scale * self.disposal_cost * (qin - producible)
+                - output_scale * self.shortfall_penalty * (qout - producible)
+            )
+            b = int(np.argmax(u))
+            if u[b] > best_u:
+                best, best_u = (chosen_inputs, sellable, b), u[b]
+        chosen_inputs, sellable, b = best  # type: ignore
+        chosen = [candidates[0][_] for _ in chosen_inputs]
+        for i in _sold_items(out_items, sales[sellable][2], b):
+            chosen.append(outs[i][2])
+        chosen = tuple(sorted(chosen))
+        return chosen, self.from_offers(
+            tuple(offers[_] for _ in chosen),  # type: ignore
+            tuple(outputs[_] for _ in chosen),
+            ignore_signed_contracts=ignore_signed_contracts,
+        )
+
     def breach_level(self, qin: int = 0, qout: int = 0):
         """Calculates the breach level that would result from a given quantities"""
         qin += self.ex_qin
@@ -785,6 +1140,87 @@ class OneShotUFun(StationaryMixin, UtilityFunction):
             secured_output_unit_price = sum(_[-1] * _[0] for _ in sales) / (
                 secured_output_quantity if secured_output_quantity else 1
             )
+        if self.normalized or not _limit_cache_stats["enabled"]:
+            return self._find_limit(
+                best,
+                n_input_negs,
+                n_output_negs,
+                secured_input_quantity,
+                secured_input_unit_price,
+                secured_output_quantity,
+                secured_output_unit_price,
+            )
+        # a balance that can pay for every possible input and its production is equivalent to an infinite one
+        balance = self.current_balance
+        max_input = (
+            n_input_negs * self.input_qrange[1] + secured_input_quantity + self.ex_qin
+        )
+        max_unit_cost = self.production_cost + max(
+            self.input_prange[1],
+            secured_input_unit_price,
+            self.ex_pin / self.ex_qin if self.ex_qin else 0,
+        )
+        if balance >= max_input * max_unit_cost:
+            balance = float("inf")
+        # the limit depends only on these values so all ufuns sharing them can share the result. The type is part of
+        # the key because subclasses may override `from_offers` or `from_aggregates`
+        key = (
+            type(self),
+            best,
+            n_input_negs,
+            n_output_negs,
+            secured_input_quantity,
+            secured_input_unit_price,
+            secured_output_quantity,
+            secured_output_unit_price,
+            self.input_qrange,
+            self.input_prange,
+            self.output_qrange,
+            self.output_prange,
+            self.ex_qin,
+            self.ex_pin,
+            self.ex_qout,
+            self.ex_pout,
+            self.force_exogenous,
+            self.n_lines,
+            self.production_cost,
+            self.disposal_cost,
+            self.shortfall_penalty,
+            self.input_penalty_scale,
+            self.output_penalty_scale,
+            balance,
+        )
+        result = _limit_cache.get(key, None)
+        if result is not None:
+            _limit_cache_stats["hits"] += 1
+            _limit_cache.move_to_end(key)
+            return result
+        _limit_cache_stats["misses"] += 1
+        result = self._find_limit(
+            best,
+            n_input_negs,
+            n_output_negs,
+            secured_input_quantity,
+            secured_input_unit_price,
+            secured_output_quantity,
+            secured_output_unit_price,
+        )
+        _limit_cache[key] = result
+        if len(_limit_cache) > LIMIT_CACHE_SIZE:
+            _limit_cache.popitem(last=False)
+        return result
+
+    def _find_limit(
+        self,
+        best,
+        n_input_negs,
+        n_output_negs,
+        secured_input_quantity,
+        secured_input_unit_price,
+        secured_output_quantity,
+        secured_output_unit_price,
+    ) -> UFunLimit:
+        """Searches all input and output quantities for the limit. See `find_limit_brute_force`"""
         imax = n_input_negs * self.input_qrange[1] + 1
         omax = n_output_negs * self.output_qrange[1] + 1
 
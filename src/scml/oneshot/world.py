@@ -26,6 +26,8 @@ from negmas import (
     BreachProcessing,
     ContiguousIssue,
     Contract,
+    Mechanism,
+    MechanismAction,
     Operations,
     SAOResponse,
     TimeInAgreementMixin,
@@ -37,6 +39,7 @@ from negmas.sao import ControlledSAONegotiator, SAOController, SAONegotiator
 from negmas.situated import NegotiationInfo
 
 from ..common import (
+    _generate_many,
     distribute_quantities,
     integer_cut,
     intin,
@@ -44,15 +47,18 @@ from ..common import (
     realin,
     strin,
 )
+from ..sinks import ContractSink, ContractSinkStatsMixin
 from .adapter import OneShotSCML2020Adapter
 from .agent import OneShotAgent
 from .common import (
+    EXOGENOUS_CONTRACT_DTYPE,
     INFINITE_COST,
     SYSTEM_BUYER_ID,
     SYSTEM_SELLER_ID,
     FinancialReport,
     NegotiationDetails,
     OneShotExogenousContract,
+    OneShotExogenousContracts,
     OneShotProfile,
     is_system_agent,
 )
@@ -66,7 +72,53 @@ __all__ = [
 ]
 
 
-class SCML2020OneShotWorld(TimeInAgreementMixin, World):
+def _exogenous_contract_array(
+    quantities: np.ndarray,
+    prices: np.ndarray,
+    agents: np.ndarray,
+    product: int,
+    is_sale: bool,
+    price_dev: float,
+    control: float,
+) -> OneShotExogenousContracts:
+    """
+    Creates exogenous contracts for a set of agents at once.
+
+    Args:
+        quantities: An (n_agents, n_steps) array of exogenous quantities
+        prices: An (n_agents, n_steps) array of mean unit prices
+        agents: The indices of the agents (one per row of `quantities`)
+        product: The product traded
+        is_sale: If True, agents are sellers to the system buyer otherwise buyers from the system seller
+        price_dev: Std. dev. of unit prices relative to the mean price
+        control: If positive, every quantity q is split randomly over `int(1 + control * (q - 1))`
+                 contracts (contracts with zero quantity are dropped)
+    """
+    rows, steps = np.nonzero(quantities)
+    q = quantities[rows, steps]
+    if control > 0.0 and len(q):
+        n_contracts = (1 + control * (q - 1)).astype(int)
+        # assign every unit to one of the contracts of its (agent, step) pair uniformly
+        owner = np.repeat(np.arange(len(q)), q)
+        piece = (np.random.random(len(owner)) * n_contracts[owner]).astype(int)
+        keys, q = np.unique(owner * n_contracts.max() + piece, return_counts=True)
+        owner = keys // n_contracts.max()
+        rows, steps = rows[owner], steps[owner]
+    mean_prices = prices[rows, steps]
+    data = np.empty(len(q), dtype=EXOGENOUS_CONTRACT_DTYPE)
+    data["quantity"] = q
+    data["unit_price"] = (
+        0.5 + mean_prices + np.random.randn(len(q)) * price_dev * mean_prices
+    ).astype(int)
+    data["product"] = product
+    data["seller"] = agents[rows] if is_sale else -1
+    data["buyer"] = -1 if is_sale else agents[rows]
+    data["time"] = steps
+    data["revelation_time"] = steps
+    return OneShotExogenousContracts(data)
+
+
+class SCML2020OneShotWorld(ContractSinkStatsMixin, TimeInAgreementMixin, World):
     """Implements the SCML-OneShot variant of the SCM world.
 
     Args:
@@ -82,6 +134,8 @@ class SCML2020OneShotWorld(TimeInAgreementMixin, World):
                             catalog price). If set to a large value (e.g. 10000), the price at which a product is sold
                             will not affect the trading price
         financial_report_period: The number of steps between financial reports. If < 1, it is a fraction of n_steps
+        exogenous_contracts: The exogenous contracts of the world either as a list of `OneShotExogenousContract` objects
+                             or a `OneShotExogenousContracts` structured array
         exogenous_force_max: If true, exogenous contracts are forced to be signed independent of the setting of
                              `force_signing`
         compact: If True, no logs will be kept and the whole simulation will use a smaller memory footprint
@@ -93,6 +147,11 @@ class SCML2020OneShotWorld(TimeInAgreementMixin, World):
         negotiation_speed: The number of negotiation steps that pass in every simulation step. If 0, negotiations
                            will be guaranteed to finish within a single simulation step
         signing_delay: The number of simulation steps to pass between a contract is concluded and signed
+        one_offer_per_step: If True, every step of a negotiation mechanism runs a single offer or response.
+        batch_policies: If True, agents of the same type defining a `batch_respond` class method (e.g.
+                        `OneShotBatchPolicy` and `OneShotRLAgent`) are grouped and the responses of each group are
+                        generated by a single call to `batch_respond` at every negotiation step. This implies
+                        `one_offer_per_step`.
         name: The name of the simulations
         **kwargs: Other parameters that are passed directly to `SCML2020World` constructor.
 
@@ -112,7 +171,8 @@ class SCML2020OneShotWorld(TimeInAgreementMixin, World):
         penalize_bankrupt_for_future_contracts=True,
         penalties_scale: Literal["trading", "catalog", "unit", "none"] = "trading",
         # external contracts parameters
-        exogenous_contracts: Collection[OneShotExogenousContract] = tuple(),
+        exogenous_contracts: Collection[OneShotExogenousContract]
+        | OneShotExogenousContracts = tuple(),
         exogenous_dynamic: bool = False,
         exogenous_force_max: bool = False,
         # factory parameters
@@ -131,6 +191,7 @@ class SCML2020OneShotWorld(TimeInAgreementMixin, World):
         negotiation_speed=None,
         shuffle_negotiations=False,
         one_offer_per_step=False,
+        batch_policies=False,
         # public information
         publish_exogenous_summary=True,
         publish_trading_prices=True,
@@ -154,6 +215,11 @@ class SCML2020OneShotWorld(TimeInAgreementMixin, World):
         **kwargs,
     ):
         self._debug = False
+        # batched policies respond to the offers they have at every step which needs one offer per step
+        self.batch_policies = batch_policies
+        self._batch_policies: list[tuple[str, Agent]] | None = None
+        if batch_policies:
+            one_offer_per_step = True
         # neg_n_steps is ALWAYS the number of rounds. We multiply it by 2 if mechanisms are stepped one offer at a time
         if one_offer_per_step and neg_n_steps is not None:
             neg_n_steps *= 2
@@ -322,6 +388,7 @@ class SCML2020OneShotWorld(TimeInAgreementMixin, World):
             publish_trading_prices=publish_trading_prices,
             selected_price_multiplier=price_multiplier,
             wide_price_range=wide_price_range,
+            batch_policies=batch_policies,
         )
 
         if not isinstance(agent_types, Iterable):
@@ -531,20 +598,28 @@ class SCML2020OneShotWorld(TimeInAgreementMixin, World):
             zip(self.agents.keys(), itertools.repeat(False))
         )
         self.exogenous_contracts: dict[int : list[Contract]] = defaultdict(list)
-        for c in exogenous_contracts:
-            seller_id = agents[c.seller].id if c.seller >= 0 else SYSTEM_SELLER_ID
-            buyer_id = agents[c.buyer].id if c.buyer >= 0 else SYSTEM_BUYER_ID
+        if isinstance(exogenous_contracts, OneShotExogenousContracts):
+            # read the structured array directly without creating intermediate objects
+            exogenous_rows = exogenous_contracts.rows()
+        else:
+            exogenous_rows = (
+                (c.quantity, c.unit_price, c.product, c.seller, c.buyer, c.time)
+                for c in exogenous_contracts
+            )
+        for quantity, unit_price, product, seller, buyer, time, *_ in exogenous_rows:
+            seller_id = agents[seller].id if seller >= 0 else SYSTEM_SELLER_ID
+            buyer_id = agents[buyer].id if buyer >= 0 else SYSTEM_BUYER_ID
             contract = Contract(
                 agreement={
-                    "time": c.time,
-                    "quantity": c.quantity,
-                    "unit_price": c.unit_price,
+                    "time": time,
+                    "quantity": quantity,
+                    "unit_price": unit_price,
                 },
                 partners=[buyer_id, seller_id],
                 issues=[],
                 signatures=dict(),
                 signed_at=-1,
-                to_be_signed_at=c.time,
+                to_be_signed_at=time,
                 annotation={
                     "seller": seller_id,
                     "buyer": buyer_id,
@@ -552,10 +627,10 @@ class SCML2020OneShotWorld(TimeInAgreementMixin, World):
                     if seller_id == SYSTEM_SELLER_ID
                     else SYSTEM_BUYER_ID,
                     "is_buy": True,
-                    "product": c.product,
+                    "product": product,
                 },
             )
-            self.exogenous_contracts[c.time].append(contract)
+            self.exogenous_contracts[time].append(contract)
         self._traded_quantity = np.ones(n_products) * self.catalog_quantities
         self._real_price = np.nan * np.ones((n_products, n_steps + 1))
         self._sold_quantity = np.zeros((n_products, n_steps + 1), dtype=int)
@@ -579,6 +654,8 @@ class SCML2020OneShotWorld(TimeInAgreementMixin, World):
         self.exogenous_pout = defaultdict(int)
         self.exogenous_pin = defaultdict(int)
         self.exogenous_contracts_summary = None
+        # set by `scml.sinks.ContractSink` when contract records are streamed out of the world
+        self.contract_sink: ContractSink | None = None
 
         self.initial_balances = dict(zip(self.agents.keys(), initial_balance))
         self._max_n_lines = max(_.n_lines for _ in self.profiles)
@@ -675,6 +752,7 @@ class SCML2020OneShotWorld(TimeInAgreementMixin, World):
         penalties_scale: str | list[str] = "trading",
         cap_exogenous_quantities: bool = True,
         method="profitable",
+        vectorized: bool = False,
         **kwargs,
     ) -> dict[str, Any]:
         """
@@ -736,6 +814,10 @@ class SCML2020OneShotWorld(TimeInAgreementMixin, World):
                             and `shortfall_penalty` are absolute values (in money unit).
                             If not given will be read through the AWI
             method: the generation method. This is only for compatibility with SCML2020World and is not used.
+            vectorized: If True, exogenous quantities are distributed and exogenous contracts are created using
+                        array operations and returned as a `OneShotExogenousContracts` structured array instead of a
+                        list of `OneShotExogenousContract` objects. The generated worlds follow the same distribution
+                        but are not identical to the ones generated with `vectorized=False` for the same seed.
             **kwargs:
 
         Returns:
@@ -789,6 +871,7 @@ class SCML2020OneShotWorld(TimeInAgreementMixin, World):
             price_multiplier=price_multiplier,
             exogenous_price_dev=exogenous_price_dev,
             penalties_scale=penalties_scale,
+            vectorized=vectorized,
             profit_basis="min"
             if profit_basis == np.min
             else "mean"
@@ -934,6 +1017,7 @@ class SCML2020OneShotWorld(TimeInAgreementMixin, World):
             n_agents_per_process[0],
             n_steps,
             n_lines if cap_exogenous_quantities else None,
+            vectorized=vectorized,
         )
         quantities[0] = [sum(_) for _ in exogenous_supplies]
         exogenous_sales = distribute_quantities(
@@ -943,6 +1027,7 @@ class SCML2020OneShotWorld(TimeInAgreementMixin, World):
             n_agents_per_process[-1],
             n_steps,
             n_lines if cap_exogenous_quantities else None,
+            vectorized=vectorized,
         )
         quantities[-1] = [sum(_) for _ in exogenous_sales]
 
@@ -1115,6 +1200,101 @@ class SCML2020OneShotWorld(TimeInAgreementMixin, World):
             )
         )
 
+        split_exogenous = not force_signing and exogenous_control > 0.0
+        if vectorized:
+            exogenous = OneShotExogenousContracts.concatenate(
+                [
+                    _exogenous_contract_array(
+                        np.asarray(exogenous_supplies, dtype=int).T,
+                        supply_prices,
+                        np.arange(first_agent[0], last_agent[0]),
+                        product=0,
+                        is_sale=False,
+                        price_dev=exogenous_price_dev,
+                        control=exogenous_control if split_exogenous else 0.0,
+                    ),
+                    _exogenous_contract_array(
+                        np.asarray(exogenous_sales, dtype=int).T,
+                        sale_prices,
+                        np.arange(first_agent[-1], last_agent[-1]),
+                        product=n_processes,
+                        is_sale=True,
+                        price_dev=exogenous_price_dev,
+                        control=exogenous_control if split_exogenous else 0.0,
+                    ),
+                ]
+            )
+        else:
+            exogenous = cls._generate_exogenous_contracts(
+                profile_info,
+                process_of_agent,
+                exogenous_price_dev,
+                exogenous_control,
+                split_exogenous,
+            )
+        return dict(
+            # process_inputs=process_inputs,
+            # process_outputs=process_outputs,
+            catalog_prices=catalog_prices,
+            profiles=[_[0] for _ in profile_info],
+            exogenous_contracts=exogenous,
+            agent_types=agent_types,
+            agent_params=agent_params,
+            initial_balance=initial_balance,
+            n_steps=n_steps,
+            info=info,
+            force_signing=force_signing,
+            price_multiplier=price_multiplier,
+            inventory_valuation_trading=0,
+            inventory_valuation_catalog=0,
+            penalties_scale=penalties_scale,
+            **kwargs,
+        )
+
+    @classmethod
+    def generate_many(
+        cls,
+        n_configs: int,
+        *args,
+        n_jobs: int = 1,
+        seed: int | None = None,
+        **kwargs,
+    ) -> list[dict[str, Any]]:
+        """
+        Generates the configurations of several worlds in one call
+
+        Args:
+            n_configs: Number of world configurations to generate
+            *args: Positional arguments passed to `generate`
+            n_jobs: Number of processes to use. If 1, all configurations are generated in
+                    the current process. Negative values follow the convention of `joblib`
+            seed: Used to derive the seed of every configuration. If not given, seeds are
+                  drawn from the `random` module
+            **kwargs: Keyword arguments passed to `generate`. `vectorized` is True unless
+                      explicitly passed as False
+
+        Returns:
+            A list of `n_configs` world configurations. A world can be generated from each of
+            them by calling `cls(**config)`
+
+        Remarks:
+            - This is useful for creating pools of worlds for tournaments and RL training.
+            - The same seed leads to the same configurations independent of `n_jobs`.
+        """
+        kwargs["vectorized"] = kwargs.get("vectorized", True)
+        return _generate_many(cls, n_configs, args, kwargs, n_jobs=n_jobs, seed=seed)
+
+    @staticmethod
+    def _generate_exogenous_contracts(
+        profile_info: list[
+            tuple[OneShotProfile, np.ndarray, np.ndarray, np.ndarray, np.ndarray]
+        ],
+        process_of_agent: np.ndarray,
+        exogenous_price_dev: float,
+        exogenous_control: float,
+        split_exogenous: bool,
+    ) -> list[OneShotExogenousContract]:
+        """Creates exogenous contracts one by one (used by `generate` when not vectorized)"""
         exogenous = []
         for (
             indx,
@@ -1129,7 +1309,7 @@ class SCML2020OneShotWorld(TimeInAgreementMixin, World):
                 thisprice = int(
                     0.5 + price + np.random.randn() * exogenous_price_dev * price
                 )
-                if force_signing or exogenous_control <= 0.0:
+                if not split_exogenous:
                     exogenous.append(
                         OneShotExogenousContract(
                             product=input_product + 1,
@@ -1171,7 +1351,7 @@ class SCML2020OneShotWorld(TimeInAgreementMixin, World):
                 thisprice = int(
                     0.5 + price + np.random.randn() * exogenous_price_dev * price
                 )
-                if force_signing or exogenous_control <= 0.0:
+                if not split_exogenous:
                     exogenous.append(
                         OneShotExogenousContract(
                             product=input_product,
@@ -1205,24 +1385,7 @@ class SCML2020OneShotWorld(TimeInAgreementMixin, World):
                                 buyer=indx,
                             )
                         )
-        return dict(
-            # process_inputs=process_inputs,
-            # process_outputs=process_outputs,
-            catalog_prices=catalog_prices,
-            profiles=[_[0] for _ in profile_info],
-            exogenous_contracts=exogenous,
-            agent_types=agent_types,
-            agent_params=agent_params,
-            initial_balance=initial_balance,
-            n_steps=n_steps,
-            info=info,
-            force_signing=force_signing,
-            price_multiplier=price_multiplier,
-            inventory_valuation_trading=0,
-            inventory_valuation_catalog=0,
-            penalties_scale=penalties_scale,
-            **kwargs,
-        )
+        return exogenous
 
     def current_balance(self, agent_id: str):
         return sum(self._profits[agent_id]) + self.initial_balances[agent_id]
@@ -1301,6 +1464,105 @@ class SCML2020OneShotWorld(TimeInAgreementMixin, World):
         if self.exogenous_dynamic:
             raise NotImplementedError("Exogenous-dynamic is not yet implemented")
 
+    def _batched_agents(self) -> list[tuple[str, Agent]]:
+        """Agents (ID and the agent object) whose responses are generated in batches"""
+        if self._batch_policies is None:
+            self._batch_policies = [
+                (aid, agent._obj)
+                for aid, agent in self.agents.items()
+                if callable(
+                    getattr(getattr(agent, "_obj", None), "batch_respond", None)
+                )
+            ]
+        return self._batch_policies
+
+    def _batch_actions(
+        self, mechanisms: list[Mechanism]
+    ) -> dict[str, dict[str, SAOResponse]]:
+        """
+        Generates the responses of all batched agents whose turn comes in the next step of the given mechanisms.
+
+        Returns:
+            A mapping from mechanism ID to a mapping from negotiator ID to its response (to be passed as actions).
+        """
+        stepped = {_.id for _ in mechanisms}
+        groups: dict[type, list] = defaultdict(list)
+        for aid, policy in self._batched_agents():
+            details = self._agent_negotiations.get(aid, None)
+            if not details:
+                continue
+            pending = dict()
+            for partner, info in itertools.chain(
+                details["buy"].items(), details["sell"].items()
+            ):
+                mechanism = info.nmi._mechanism
+                if mechanism.id not in stepped or mechanism.state.ended:
+                    continue
+                nid = mechanism.next_negotitor_ids()[0]
+                negotiator = mechanism._negotiator_map[nid]
+                if negotiator.owner is None or negotiator.owner.id != aid:
+                    continue
+                pending[partner] = (mechanism, nid)
+            if pending:
+                groups[type(policy)].append((policy, pending))
+        actions: dict[str, dict[str, SAOResponse]] = defaultdict(dict)
+        for cls, members in groups.items():
+            responses = cls.batch_respond(
+                [policy for policy, _ in members],
+                [
+                    {p: m.state.current_offer for p, (m, _) in pending.items()}
+                    for _, pending in members
+                ],
+            )
+            for (_, pending), response in zip(members, responses):
+                for partner, r in response.items():
+                    mechanism, nid = pending[partner]
+                    actions[mechanism.id][nid] = r
+        return actions
+
+    def _step_negotiations(
+        self,
+        mechanisms: list[Mechanism],
+        n_steps: int | float | None,
+        force_immediate_signing: bool,
+        partners: list[list[Agent]],
+        action: dict[str, dict[str, MechanismAction | None]] | None = None,
+    ) -> tuple[list[Contract | None], list[bool], int, int, int, int]:
+        """Runs negotiations one step at a time generating the responses of batched agents before every step"""
+        if not self.batch_policies or not self._batched_agents():
+            return super()._step_negotiations(
+                mechanisms, n_steps, force_immediate_signing, partners, action
+            )
+        if n_steps is None:
+            n_steps = float("inf")
+        if self.negotiation_speed is not None:
+            n_steps = min(n_steps, self.negotiation_speed)
+        contracts: list[Contract | None] = [None] * len(mechanisms)
+        running = [_ is not None for _ in mechanisms]
+        counts = [0, 0, 0, 0]
+        current_step = 0
+        while any(running) and current_step < n_steps:
+            if self.time >= self.time_limit:
+                break
+            indices = [i for i, _ in enumerate(running) if _]
+            stepped = [mechanisms[i] for i in indices]
+            actions = self._batch_actions(stepped)
+            # actions passed explicitly take precedence
+            for mid, given in (action if action else dict()).items():
+                actions[mid] = {**actions.get(mid, dict()), **given}
+            found, still_running, *step_counts = super()._step_negotiations(
+                stepped,
+                1,
+                force_immediate_signing,
+                [partners[i] for i in indices],
+                action=actions,
+            )
+            for i, contract, r in zip(indices, found, still_running):
+                contracts[i], running[i] = contract, r
+            counts = [a + b for a, b in zip(counts, step_counts)]
+            current_step += 1
+        return contracts, running, *counts  # type: ignore
+
     def step_with(self, actions: dict[str, dict[str, SAOResponse]], init=False) -> bool:
         """
         Runs a simulation step for the agents given in keys passing the corresponding values as counter offers.
@@ -1378,8 +1640,8 @@ class SCML2020OneShotWorld(TimeInAgreementMixin, World):
                     key=self.current_step,
                 )
 
-            # make agent ufuns
-            # ================
+            # make agent ufuns (created on the first step and refreshed in place afterwards)
+            # ==============================================================================
             for aid, a in self.agents.items():
                 if is_system_agent(aid):
                     continue
@@ -1722,7 +1984,10 @@ class SCML2020OneShotWorld(TimeInAgreementMixin, World):
     @property
     def contracts_df(self) -> pd.DataFrame:
         """Returns a pandas data frame with the contracts"""
-        contracts = pd.DataFrame(self.saved_contracts)
+        if self.contract_sink is not None:
+            contracts = self.contract_sink.contracts_df()
+        else:
+            contracts = pd.DataFrame(self.saved_contracts)
         contracts["product_index"] = contracts.product_name.str.replace("p", "").astype(
             int
         )
@@ -2052,7 +2317,6 @@ class SCML2020OneShotWorld(TimeInAgreementMixin, World):
             if is_system_agent(aid) or isinstance(a, OneShotSCML2020Adapter):
                 continue
             controllers[aid] = a.adapted_object
-            a.adapted_object.make_ufun(add_exogenous=True)
 
         # initialize negotiation details
         # self._current_negotiations = []
@@ -150,6 +150,54 @@ class SCMLAWI(AgentWorldInterface):
 
     """
 
+    def bb_query(
+        self, section: Optional[str], query: Any, query_keys=False
+    ) -> Optional[Dict[str, Any]]:
+        """Queries the bulletin-board (see `AgentWorldInterface.bb_query`).
+
+        Remarks:
+            - Value queries on the "cfps" section are answered using the CFP index of the world
+              which only tests CFPs with matching products/publishers.
+        """
+        if (
+            section == "cfps"
+            and isinstance(query, dict)
+            and not query_keys
+            and self._world.bulletin_board
+        ):
+            return self._world.query_cfps(query)
+        return super().bb_query(section=section, query=query, query_keys=query_keys)
+
+    def bb_remove(
+        self,
+        section: Optional[str],
+        *,
+        query: Optional[Any] = None,
+        key: Optional[str] = None,
+        query_keys: bool = False,
+        value: Any = None,
+    ) -> bool:
+        """Removes records from the bulletin-board (see `AgentWorldInterface.bb_remove`).
+
+        Remarks:
+            - Value queries on the "cfps" section are answered using the CFP index of the world.
+        """
+        if (
+            section == "cfps"
+            and isinstance(query, dict)
+            and key is None
+            and value is None
+            and not query_keys
+            and self._world.bulletin_board
+        ):
+            keys = list(self._world.query_cfps(query).keys())
+            for k in keys:
+                self._world.bulletin_board.remove(section=section, key=k)
+            return len(keys) > 0
+        return super().bb_remove(
+            section=section, query=query, key=key, query_keys=query_keys, value=value
+        )
+
     def register_cfp(self, cfp: CFP) -> None:
         """Registers a CFP"""
         self._world.n_new_cfps += 1
@@ -184,6 +232,20 @@ class SCMLAWI(AgentWorldInterface):
         """
         return self._world.evaluate_insurance(contract=contract, agent=self.agent, t=t)
 
+    def evaluate_insurance_many(
+        self, contracts: List[Contract], t: int = None
+    ) -> List[Optional[float]]:
+        """Evaluates the premiums for insuring several contracts against breaches committed by others in one call
+
+        Args:
+
+            contracts: hypothetical contracts
+            t: time at which the policies are to be bought. If None, it means current step
+        """
+        return self._world.evaluate_insurance_many(
+            contracts=contracts, agent=self.agent, t=t
+        )
+
     def buy_insurance(self, contract: Contract) -> bool:
         """Buys insurance for the contract by the premium calculated by the insurance company.
 
@@ -3,6 +3,7 @@ from abc import ABC
 from collections import defaultdict
 from typing import TYPE_CHECKING, Any, Dict, List, Optional
 
+import numpy as np
 from negmas import (
     Issue,
     Mechanism,
@@ -17,7 +18,97 @@ from .common import Factory, Loan
 if TYPE_CHECKING:
     from .agent import SCML2019Agent
 
-__all__ = ["DefaultBank", "Bank"]
+__all__ = ["DefaultBank", "Bank", "LoanBook"]
+
+
+class LoanBook:
+    """
+    The loans of all agents stored as a structure of arrays (one entry per loan).
+
+    Remarks:
+        - `amount`, `installment`, `n_installments`, `starts_at` and `borrower` (index in `agents`) are numpy arrays
+          that are the source of truth for the loans in the book.
+        - The `Loan` objects given to agents are kept in `loans` (in the same order) and their `amount` and
+          `n_installments` are updated by `sync` so that agents can still inspect them.
+        - Loans added by `add` are buffered and appended to the arrays by `flush`.
+    """
+
+    def __init__(self):
+        self.amount = np.zeros(0, dtype=float)
+        self.installment = np.zeros(0, dtype=float)
+        self.n_installments = np.zeros(0, dtype=np.int64)
+        self.starts_at = np.zeros(0, dtype=np.int64)
+        self.borrower = np.zeros(0, dtype=np.int64)
+        self.loans: List[Loan] = []
+        self.agents: List["SCML2019Agent"] = []
+        self._agent_index: Dict[str, int] = dict()
+        self._pending: List[Loan] = []
+        self._pending_borrowers: List[int] = []
+
+    def __len__(self) -> int:
+        return len(self.loans) + len(self._pending)
+
+    def add(self, agent: "SCML2019Agent", loan: Loan) -> None:
+        """Adds a loan borrowed by the given agent"""
+        indx = self._agent_index.get(agent.id, None)
+        if indx is None:
+            indx = self._agent_index[agent.id] = len(self.agents)
+            self.agents.append(agent)
+        self._pending.append(loan)
+        self._pending_borrowers.append(indx)
+
+    def flush(self) -> None:
+        """Appends all loans added since the last flush to the arrays"""
+        if not self._pending:
+            return
+        pending = self._pending
+        self.amount = np.concatenate((self.amount, [_.amount for _ in pending]))
+        self.installment = np.concatenate(
+            (self.installment, [_.installment for _ in pending])
+        )
+        self.n_installments = np.concatenate(
+            (self.n_installments, [_.n_installments for _ in pending])
+        ).astype(np.int64)
+        self.starts_at = np.concatenate(
+            (self.starts_at, [_.starts_at for _ in pending])
+        ).astype(np.int64)
+        self.borrower = np.concatenate((self.borrower, self._pending_borrowers)).astype(
+            np.int64
+        )
+        self.loans += pending
+        self._pending, self._pending_borrowers = [], []
+
+    def sync(self, indices: np.ndarray) -> None:
+        """Updates the `Loan` objects at the given indices from the arrays"""
+        for i, amount, n in zip(
+            indices.tolist(),
+            self.amount[indices].tolist(),
+            self.n_installments[indices].tolist(),
+        ):
+            loan = self.loans[i]
+            loan.amount, loan.n_installments = amount, n
+
+    def compact(self) -> None:
+        """Removes all completely paid loans"""
+        keep = self.n_installments > 0
+        if keep.all():
+            return
+        self.amount, self.installment = self.amount[keep], self.installment[keep]
+        self.n_installments, self.starts_at = (
+            self.n_installments[keep],
+            self.starts_at[keep],
+        )
+        self.borrower = self.borrower[keep]
+        self.loans = [l for l, k in zip(self.loans, keep.tolist()) if k]
+
+    def of(self) -> Dict["SCML2019Agent", List[Loan]]:
+        """The loans of every agent with loans (paid loans are removed on `compact`)"""
+        loans = defaultdict(list)
+        for indx, loan in zip(self.borrower.tolist(), self.loans):
+            loans[self.agents[indx]].append(loan)
+        for indx, loan in zip(self._pending_borrowers, self._pending):
+            loans[self.agents[indx]].append(loan)
+        return loans
 
 
 class Bank(Agent, ABC):
@@ -125,7 +216,7 @@ class DefaultBank(Bank):
         self.storage: Dict[int, int] = defaultdict(int)
         self.wallet: float = 0.0
         self.disabled = disabled
-        self.loans: Dict[SCML2019Agent, List[Loan]] = defaultdict(list)
+        self.loan_book = LoanBook()
         self.minimum_balance = minimum_balance
         self.interest_rate = interest_rate
         self.interest_max = interest_max
@@ -135,6 +226,11 @@ class DefaultBank(Bank):
         self._credit_rating: Dict[str, float] = defaultdict(float)
         self.a2f = a2f
 
+    @property
+    def loans(self) -> Dict["SCML2019Agent", List[Loan]]:
+        """The loans of every agent with loans (see `LoanBook`)"""
+        return self.loan_book.of()
+
     def set_renegotiation_agenda(
         self, contract: Contract, breaches: List[Breach]
     ) -> Optional[RenegotiationRequest]:
@@ -210,7 +306,7 @@ class DefaultBank(Bank):
             return loan
         factory = self.a2f[agent.id]
         if agent.confirm_loan(loan=loan, bankrupt_if_rejected=bankrupt_if_rejected):
-            self.loans[agent].append(loan)
+            self.loan_book.add(agent, loan)
             self.awi.logdebug(f"Bank: {agent.name} borrowed {str(loan)}")
             factory.receive(loan.amount)
             factory.add_loan(loan.total)
@@ -257,82 +353,80 @@ class DefaultBank(Bank):
         if self.disabled:
             return
         t = self.awi.current_step
-        delayed_payments = 0.0
-        # for every agent with loans
-        for agent, loans in self.loans.items():
+        book = self.loan_book
+        book.flush()
+        # loans with remaining installments that are not in their grace period
+        indices = np.nonzero((book.n_installments > 0) & (book.starts_at <= t))[0]
+        if len(indices) == 0:
+            book.compact()
+            return
+        # group loans by borrower keeping the order of loans of each borrower
+        indices = indices[np.argsort(book.borrower[indices], kind="stable")]
+        borrowers = book.borrower[indices]
+        installments = book.installment[indices]
+        agents = np.unique(borrowers)
+        wallets = np.zeros(len(book.agents))
+        wallets[agents] = [self.a2f[book.agents[_].id].wallet for _ in agents]
+
+        # every agent pays as much as possible from its wallet (which may be zero) for its loans in order
+        firsts = np.nonzero(np.r_[True, borrowers[1:] != borrowers[:-1]])[0]
+        previous = np.cumsum(installments) - installments
+        previous -= np.repeat(previous[firsts], np.diff(np.r_[firsts, len(borrowers)]))
+        payments = np.clip(wallets[borrowers] - previous, 0.0, installments)
+        paid = payments >= installments
+        book.amount[indices] -= payments
+        # reduce the number of remaining installments if needed
+        book.n_installments[indices[paid]] -= 1
+        totals = np.bincount(borrowers, weights=payments, minlength=len(book.agents))
+        due = np.bincount(borrowers, weights=installments, minlength=len(book.agents))
+        # if the payment is not enough for an installment, try to get a new loan
+        unavailables = due - totals
+
+        for indx in agents.tolist():
+            agent, total = book.agents[indx], float(totals[indx])
             factory = self.a2f[agent.id]
-            keep = [True] * len(
-                loans
-            )  # a flag to tell whether a loan is to be kept for future processing
-            unpaid = []  # any new loans that may arise from failure to pay installments
-            unavailable = 0.0
-            for i, loan in enumerate(loans):
-                # if there are no remaining installments or I am in the grace period do not do anything
-                if loan.n_installments <= 0 or loan.starts_at > t:
-                    continue
-
-                # pay as much as possible from the agent's wallet (which may be zero)
-                wallet = factory.wallet
-                payment = max(0.0, min(loan.installment, wallet))
-                loan.amount -= payment
-                factory.pay(payment)
-                factory.add_loan(-payment)
-                self.wallet += payment
-
-                if payment >= loan.installment:
-                    # reduce the number of remaining installments if needed
-                    loan.n_installments -= 1
-                else:
-                    # if the payment is not enough for the installment, try to get a new loan
-                    unavailable += loan.installment - payment
-                    unpaid.append((i, loan))
-                # if the loan is completely paid, mark it for removal
-                if loan.n_installments <= 0:
-                    keep[i] = False
+            factory.pay(total)
+            factory.add_loan(-total)
+            self.wallet += total
+            self.awi.logdebug(f"Bank: {agent.name} payed {total} (of {due[indx]})")
+            unavailable = float(unavailables[indx])
+            if unavailable <= 0.0:
+                continue
+            new_loan = self._evaluate_loan(
+                agent=agent,
+                amount=unavailable,
+                n_installments=1,
+                installment_loan=True,
+                starts_at=t + 1,
+            )
+            if new_loan is None:
+                self._reduce_credit_rating(agent=agent, unavailable=unavailable)
                 self.awi.logdebug(
-                    f"Bank: {agent.name} payed {payment} (of {loan.installment}) "
-                    f"[{loan.n_installments} remain]"
+                    f"Bank: CR of {agent.name} was reduced for failure to pay {unavailable}"
                 )
-            if unavailable > 0.0:
-                new_loan = self._evaluate_loan(
+            elif (
+                self._buy_loan(
                     agent=agent,
-                    amount=unavailable,
-                    n_installments=1,
-                    installment_loan=True,
-                    starts_at=t + 1,
+                    loan=new_loan,
+                    bankrupt_if_rejected=True,
+                    beneficiary=self,
+                    contract=None,
+                )
+                is not None
+            ):
+                self.awi.logdebug(
+                    f"Bank: {agent.name} payed an installment by a new loan {str(new_loan)}"
                 )
-                if new_loan is None:
-                    self._reduce_credit_rating(agent=agent, unavailable=unavailable)
-                    self.awi.logdebug(
-                        f"Bank: CR of {agent.name} was reduced for failure to pay {unavailable}"
-                    )
-                elif (
-                    self._buy_loan(
-                        agent=agent,
-                        loan=new_loan,
-                        bankrupt_if_rejected=True,
-                        beneficiary=self,
-                        contract=None,
-                    )
-                    is not None
-                ):
-                    self.awi.logdebug(
-                        f"Bank: {agent.name} payed an installment by a new loan {str(new_loan)}"
-                    )
-                    factory.add_loan(-new_loan.amount)
-                    factory.pay(new_loan.amount)
-                    self.wallet += new_loan.amount
-                    for indx, loan in unpaid:
-                        loan.amount -= loan.installment
-                        loan.n_installments -= 1
-                        if loan.n_installments <= 0:
-                            keep[indx] = False
-
-            # remove marked loans (that were completely paid)
-            self.loans[agent] = [l for i, l in enumerate(loans) if keep[i]]
-
-        # remove records of agents that paid all their loans
-        self.loans = {k: v for k, v in self.loans.items() if len(v) > 0}
+                factory.add_loan(-new_loan.amount)
+                factory.pay(new_loan.amount)
+                self.wallet += new_loan.amount
+                unpaid = indices[(borrowers == indx) & ~paid]
+                book.amount[unpaid] -= book.installment[unpaid]
+                book.n_installments[unpaid] -= 1
+
+        # update the loans seen by agents and remove loans that were completely paid
+        book.sync(indices)
+        book.compact()
 
     def _reduce_credit_rating(self, agent: Agent, unavailable: float):
         """Updates the credit rating when the agent fails to pay an installment"""
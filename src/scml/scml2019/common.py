@@ -1,10 +1,12 @@
 """Common data-structures and objects used throughout the SCM world implementation"""
+import copy
+import heapq
 import itertools
 import math
 import sys
 import uuid
 from collections import defaultdict, namedtuple
-from dataclasses import InitVar, dataclass, field
+from dataclasses import FrozenInstanceError, InitVar, dataclass, field, fields
 from typing import Any, Dict, Iterable, List, Optional, Tuple, Union
 
 import numpy as np
@@ -36,6 +38,8 @@ __all__ = [
     "SCMLAgreement",
     "SCMLAction",
     "CFP",
+    "FrozenCFP",
+    "CFPIndex",
     "Loan",
     "InsurancePolicy",
     "Factory",
@@ -930,6 +934,183 @@ class CFP:
         )
 
 
+class FrozenCFP(CFP):
+    """
+    A read-only `CFP` shared among all the agents notified about it.
+
+    Remarks:
+        - Use `FrozenCFP.of` to create one. Assigning to any field raises `FrozenInstanceError`.
+        - Copying it (using `copy.copy`, `copy.deepcopy` or `thaw`) returns a normal (mutable) `CFP`.
+        - It compares equal to any `CFP` with the same fields.
+    """
+
+    @classmethod
+    def of(cls, cfp: CFP) -> "FrozenCFP":
+        """Creates a read-only copy of the given CFP (returning it unchanged if it is already read-only)"""
+        if isinstance(cfp, FrozenCFP):
+            return cfp
+        frozen = object.__new__(cls)
+        d = frozen.__dict__
+        for k, v in cfp.__dict__.items():
+            # lists are the only mutable values a CFP may hold
+            d[k] = list(v) if isinstance(v, list) else v
+        return frozen
+
+    def thaw(self) -> CFP:
+        """Returns a mutable copy of this CFP"""
+        return CFP(
+            **{f.name: copy.deepcopy(getattr(self, f.name)) for f in fields(CFP)}
+        )
+
+    def __setattr__(self, key, value):
+        raise FrozenInstanceError(f"cannot assign to field {key!r} of a FrozenCFP")
+
+    def __delattr__(self, key):
+        raise FrozenInstanceError(f"cannot delete field {key!r} of a FrozenCFP")
+
+    def __eq__(self, other):
+        if not isinstance(other, CFP):
+            return NotImplemented
+        return all(getattr(self, f.name) == getattr(other, f.name) for f in fields(CFP))
+
+    def __copy__(self):
+        return self.thaw()
+
+    def __deepcopy__(self, memo):
+        return self.thaw()
+
+
+class CFPIndex:
+    """
+    An index of the CFPs on the bulletin-board used by `SCML2019World`.
+
+    CFPs are indexed by product and publisher and an expiry heap keyed by
+    `CFP.max_time` is used to find expired CFPs.
+
+    Remarks:
+        - `query` accepts the same queries as `CFP.satisfies` and returns the same
+          records the bulletin-board would return (in the same order). Only CFPs
+          with the queried publisher/products are tested when the query
+          specifies any of them.
+        - The heap is cleaned lazily so removing a CFP is O(1).
+    """
+
+    _PRODUCT_KEYS = ("product", "product_id", "product_index")
+    _PRODUCTS_KEYS = ("products", "product_ids", "product_indices")
+
+    def __init__(self):
+        self._cfps: Dict[str, CFP] = dict()
+        self._order: Dict[str, int] = dict()
+        self._by_product: Dict[int, Dict[str, CFP]] = defaultdict(dict)
+        self._by_publisher: Dict[str, Dict[str, CFP]] = defaultdict(dict)
+        self._expiry: List[Tuple[int, int, str]] = []
+        self._n_added = 0
+
+    def __len__(self) -> int:
+        return len(self._cfps)
+
+    def __contains__(self, key: str) -> bool:
+        return key in self._cfps
+
+    def get(self, key: str) -> Optional[CFP]:
+        """Returns the CFP with the given key (or None)"""
+        return self._cfps.get(key, None)
+
+    def add(self, key: str, cfp: CFP) -> None:
+        """Adds (or replaces) the CFP stored under the given key"""
+        old = self._cfps.get(key, None)
+        if old is not None:
+            self._unindex(key, old)
+        else:
+            self._order[key] = self._n_added
+            self._n_added += 1
+        self._cfps[key] = cfp
+        self._by_product[cfp.product][key] = cfp
+        self._by_publisher[cfp.publisher][key] = cfp
+        heapq.heappush(self._expiry, (cfp.max_time, self._order[key], key))
+
+    def remove(self, key: str) -> Optional[CFP]:
+        """Removes the CFP stored under the given key returning it (or None if not found)"""
+        cfp = self._cfps.pop(key, None)
+        if cfp is None:
+            return None
+        self._unindex(key, cfp)
+        del self._order[key]
+        return cfp
+
+    def _unindex(self, key: str, cfp: CFP) -> None:
+        for index, k in (
+            (self._by_product, cfp.product),
+            (self._by_publisher, cfp.publisher),
+        ):
+            records = index.get(k, None)
+            if records is None:
+                continue
+            records.pop(key, None)
+            if not records:
+                del index[k]
+
+    def expired(self, step: int) -> List[str]:
+        """Keys of all CFPs with a `max_time` less than or equal to the given step (in insertion order)"""
+        keys = set()
+        while self._expiry and self._expiry[0][0] <= step:
+            _, order, key = heapq.heappop(self._expiry)
+            cfp = self._cfps.get(key, None)
+            if cfp is None or self._order[key] != order:
+                # removed after being pushed
+                continue
+            if cfp.max_time > step:
+                # replaced (or changed) after being pushed
+                heapq.heappush(self._expiry, (cfp.max_time, order, key))
+                continue
+            keys.add(key)
+        return sorted(keys, key=self._order.get)
+
+    def _candidates(self, query: Dict[str, Any]) -> Optional[Dict[str, CFP]]:
+        """Finds the smallest subset of CFPs that may satisfy the query (None means all)"""
+        options = []
+        publisher = query.get("publisher", None)
+        if isinstance(publisher, str):
+            options.append(self._by_publisher.get(publisher, dict()))
+        publishers = query.get("publishers", None)
+        if publishers is not None:
+            options.append(
+                self._merge([self._by_publisher.get(_, dict()) for _ in publishers])
+            )
+        for k in self._PRODUCT_KEYS:
+            if k in query:
+                options.append(self._by_product.get(query[k], dict()))
+        for k in self._PRODUCTS_KEYS:
+            if k in query:
+                options.append(
+                    self._merge([self._by_product.get(_, dict()) for _ in query[k]])
+                )
+        if not options:
+            return None
+        return min(options, key=len)
+
+    def _merge(self, parts: List[Dict[str, CFP]]) -> Dict[str, CFP]:
+        parts = [_ for _ in parts if _]
+        if len(parts) == 1:
+            return parts[0]
+        merged = dict()
+        for part in parts:
+            merged.update(part)
+        return {k: merged[k] for k in sorted(merged.keys(), key=self._order.get)}
+
+    def query(self, query: Dict[str, Any]) -> Dict[str, CFP]:
+        """Returns all CFPs satisfying the query (see `CFP.satisfies`) as a mapping from key to CFP"""
+        candidates = self._candidates(query)
+        if candidates is None:
+            candidates = self._cfps
+        results = {k: v for k, v in candidates.items() if v.satisfies(query)}
+        if len(results) > 1 and candidates is not self._cfps:
+            results = {
+                k: results[k] for k in sorted(results.keys(), key=self._order.get)
+            }
+        return results
+
+
 @dataclass
 class SCMLAction:
     line: str
@@ -21,7 +21,7 @@ from .common import CFP, DEFAULT_NEGOTIATOR, UNIT_PRICE, FinancialReport
 from .helpers import pos_gauss
 
 if True:  #
-    from typing import Any, Dict, List, Optional, Tuple, Union
+    from typing import Any, Dict, List, Optional, Set, Tuple, Union
 
     from .common import Loan
 
@@ -166,9 +166,25 @@ class JustInTimeConsumer(Consumer):
         negotiator_type=DEFAULT_NEGOTIATOR,
         consumption_horizon: Optional[int] = 20,
         immediate_cfp_update: bool = True,
+        incremental_cfp_update: bool = False,
         name=None,
     ):
+        """
+        Args:
+            profiles: Consumption profiles for each product index
+            negotiator_type: The negotiator type used in all negotiations
+            consumption_horizon: Number of steps ahead for which CFPs are published (None means the whole simulation)
+            immediate_cfp_update: Update the CFP for a product/time as soon as a contract about it is signed
+            incremental_cfp_update: Keep a table of the CFPs published for each (product, time) and only update the
+                                    bulletin-board for entries with a changed schedule (see `step`).
+            name: Agent name
+        """
         super().__init__(name=name)
+        self.incremental_cfp_update = incremental_cfp_update
+        self._published_cfps: Dict[Tuple[int, int], Tuple[str, int]] = dict()
+        self._changed_cfps: Set[Tuple[int, int]] = set()
+        self._cfps_visited_before = 0
+        self._cfps_expired_before = 0
         self.negotiator_type = get_class(negotiator_type, scope=globals())
         self.profiles: Dict[int, ConsumptionProfile] = defaultdict(ConsumptionProfile)
         self.secured_quantities: Dict[int, int] = defaultdict(int)
@@ -186,6 +202,8 @@ class JustInTimeConsumer(Consumer):
         self.awi.register_interest(list(self.profiles.keys()))
 
     def set_profiles(self, profiles: Dict[int, ConsumptionProfile]):
+        # every schedule may have changed
+        self._cfps_visited_before = 0
         self.profiles = defaultdict(ConsumptionProfile)
         if profiles is not None:
             for k, v in profiles.items():
@@ -195,51 +213,67 @@ class JustInTimeConsumer(Consumer):
             for k, v in profiles.items():
                 self.secured_quantities[k] = 0
 
+    def _make_cfp(self, p: int, t: int, quantity: int) -> CFP:
+        product = self.products[p]
+        max_price = (
+            JustInTimeConsumer.RELATIVE_MAX_PRICE * product.catalog_price
+            if product.catalog_price is not None
+            else JustInTimeConsumer.MAX_UNIT_PRICE
+        )
+        return CFP(
+            is_buy=True,
+            publisher=self.id,
+            product=p,
+            time=t,
+            unit_price=(0, max_price),
+            quantity=(1, quantity),
+        )
+
     def register_product_cfps(self, p: int, t: int, profile: ConsumptionProfile):
+        """
+        Makes the CFP published for product `p` at time `t` match the current schedule
+
+        Remarks:
+            - If `incremental_cfp_update` is set, the CFP last published for (p, t) is looked up in a local table and
+              the bulletin-board is only updated if the schedule differs from its quantity. This assumes that the
+              CFPs of the consumer are only removed by itself or by the world when they expire.
+        """
         current_schedule = profile.schedule_at(t)
-        product = self.products[p]
         awi: SCMLAWI = self.awi
+        if self.incremental_cfp_update:
+            current_schedule = max(current_schedule, 0)
+            cfp_id, published = self._published_cfps.get((p, t), (None, 0))
+            if current_schedule == published:
+                return
+            if published > 0:
+                awi.bb_remove(section="cfps", key=cfp_id)
+            if current_schedule <= 0:
+                self._published_cfps.pop((p, t), None)
+                return
+            cfp = self._make_cfp(p, t, current_schedule)
+            awi.register_cfp(cfp)
+            self._published_cfps[(p, t)] = (cfp.id, current_schedule)
+            return
         if current_schedule <= 0:
             awi.bb_remove(
                 section="cfps",
                 query={"publisher": self.id, "time": t, "product_index": p},
             )
             return
-        max_price = (
-            JustInTimeConsumer.RELATIVE_MAX_PRICE * product.catalog_price
-            if product.catalog_price is not None
-            else JustInTimeConsumer.MAX_UNIT_PRICE
-        )
         cfps = awi.bb_query(
             section="cfps", query={"publisher": self.id, "time": t, "product": p}
         )
         if cfps is not None and len(cfps) > 0:
             for _, cfp in cfps.items():
                 if cfp.max_quantity != current_schedule:
-                    cfp = CFP(
-                        is_buy=True,
-                        publisher=self.id,
-                        product=p,
-                        time=t,
-                        unit_price=(0, max_price),
-                        quantity=(1, current_schedule),
-                    )
                     awi.bb_remove(
                         section="cfps",
                         query={"publisher": self.id, "time": t, "product": p},
                     )
-                    awi.register_cfp(cfp)
+                    awi.register_cfp(self._make_cfp(p, t, current_schedule))
                     break
         else:
-            cfp = CFP(
-                is_buy=True,
-                publisher=self.id,
-                product=p,
-                time=t,
-                unit_price=(0, max_price),
-                quantity=(1, current_schedule),
-            )
-            awi.register_cfp(cfp)
+            awi.register_cfp(self._make_cfp(p, t, current_schedule))
 
     def step(self):
         if self.consumption_horizon is None:
@@ -248,12 +282,39 @@ class JustInTimeConsumer(Consumer):
             horizon = min(
                 self.awi.current_step + self.consumption_horizon + 1, self.awi.n_steps
             )
+        if self.incremental_cfp_update:
+            self._update_changed_cfps(horizon)
+            return
         for p, profile in self.profiles.items():
             for t in range(
                 self.awi.current_step, horizon
             ):  # + self.transportation_delay
                 self.register_product_cfps(p=p, t=t, profile=profile)
 
+    def _update_changed_cfps(self, horizon: int) -> None:
+        """
+        Updates the CFPs of entries that entered the horizon or had their schedule changed since the last step
+
+        Remarks:
+            - CFPs of past steps are removed from the board by the world when they expire so their entries are just
+              dropped from the table.
+            - Schedule changes are collected by `on_contract_signed`. Other changes to the schedules must be followed
+              by a call to `register_product_cfps` (or `set_profiles`).
+        """
+        current = self.awi.current_step
+        for t in range(self._cfps_expired_before, current):
+            for p in self.profiles.keys():
+                self._published_cfps.pop((p, t), None)
+        self._cfps_expired_before = max(self._cfps_expired_before, current)
+        first_new = max(current, self._cfps_visited_before)
+        changed, self._changed_cfps = self._changed_cfps, set()
+        for p, profile in self.profiles.items():
+            times = {t for q, t in changed if q == p and current <= t < first_new}
+            times.update(range(first_new, horizon))
+            for t in sorted(times):
+                self.register_product_cfps(p=p, t=t, profile=profile)
+        self._cfps_visited_before = max(self._cfps_visited_before, horizon)
+
     def confirm_contract_execution(self, contract: Contract) -> bool:
         return True
 
@@ -388,6 +449,8 @@ class JustInTimeConsumer(Consumer):
             self.register_product_cfps(
                 p=cfp.product, t=t, profile=self.profiles[cfp.product]
             )
+        elif self.incremental_cfp_update and new_quantity != old_quantity:
+            self._changed_cfps.add((cfp.product, t))
         for negotiation in self._running_negotiations.values():
             self.notify(
                 negotiation.negotiator, Notification(type="ufun_modified", data=None)
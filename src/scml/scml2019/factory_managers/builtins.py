@@ -1,8 +1,11 @@
 import itertools
+import math
 import warnings
 from abc import ABC, abstractmethod
 from collections import defaultdict
 
+import numpy as np
+
 from negmas import (
     Breach,
     Contract,
@@ -34,6 +37,8 @@ from scml.scml2019.schedulers import GreedyScheduler, ScheduleInfo, Scheduler
 from scml.scml2019.simulators import (
     FactorySimulator,
     FastFactorySimulator,
+    SparseFactorySimulator,
+    select_simulator_type,
     storage_as_array,
     temporary_transaction,
 )
@@ -47,6 +52,7 @@ if True:
         Iterable,
         List,
         Optional,
+        Tuple,
         Type,
         Union,
     )
@@ -218,10 +224,12 @@ class FactoryManager(SCML2019Agent, ABC):
         """Transportation delay in the world"""
         self.simulator: Optional[FactorySimulator] = None
         """The simulator used by this agent"""
-        self.simulator_type: Type[FactorySimulator] = get_class(
-            simulator_type, scope=globals()
+        self.simulator_type: Optional[Type[FactorySimulator]] = (
+            None
+            if simulator_type == "auto"
+            else get_class(simulator_type, scope=globals())
         )
-        """Simulator type (as a class)"""
+        """Simulator type (as a class). If "auto" was passed, it is selected using `select_simulator_type` in `init_`"""
         self.current_step = 0
         """Current simulation step"""
         self.max_storage: int = 0
@@ -231,6 +239,10 @@ class FactoryManager(SCML2019Agent, ABC):
         state: Factory = self.awi.state
         self.current_step = state.next_step
         self.max_storage = state.max_storage
+        if self.simulator_type is None:
+            self.simulator_type = select_simulator_type(
+                n_steps=self.awi.n_steps, n_products=len(self.awi.products)
+            )
         self.simulator = self.simulator_type(
             initial_wallet=state.wallet,
             initial_storage=state.storage,
@@ -409,8 +421,16 @@ class GreedyFactoryManager(DoNothingFactoryManager):
         riskiness=0.0,
         max_insurance_premium: float = 0.1,
         reserved_value: float = -float("inf"),
+        memoize_utilities: bool = True,
     ):
         super().__init__(name=name, simulator_type=simulator_type)
+        self.memoize_utilities = memoize_utilities
+        self._utility_cache: Dict[Tuple, float] = dict()
+        self._utility_cache_state: Optional[Tuple[int, int]] = None
+        self._base_balance: Optional[float] = None
+        self._base_wallet_minima: Optional[np.ndarray] = None
+        self._marginal_cache: Dict[Tuple, Tuple[bool, float]] = dict()
+        self._n_schedule_updates = 0
         self.negotiator_type = get_class(negotiator_type, scope=globals())
         self.negotiator_params = (
             negotiator_params if negotiator_params is not None else {}
@@ -454,22 +474,174 @@ class GreedyFactoryManager(DoNothingFactoryManager):
             scheduler_params if scheduler_params is not None else {}
         )
 
+    def invalidate_utility_cache(self) -> None:
+        """Drops all memoized utilities.
+
+        Remarks:
+            - The cache is invalidated automatically whenever the simulator is updated by this class (at the beginning
+              of every step and when a signed contract is scheduled). Subclasses that change the simulator directly
+              outside a transaction should call this method afterwards.
+        """
+        self._n_schedule_updates += 1
+
+    @staticmethod
+    def _contract_key(contract: Contract) -> Tuple:
+        annotation, agreement = contract.annotation, contract.agreement
+        return (
+            annotation["seller"],
+            annotation["buyer"],
+            annotation["cfp"].product,
+            agreement["quantity"],
+            agreement["time"],
+            agreement["unit_price"],
+        )
+
     def total_utility(self, contracts: Collection[Contract] = ()) -> float:
-        """Calculates the total utility for the agent of a collection of contracts"""
+        """Calculates the total utility for the agent of a collection of contracts
+
+        Remarks:
+            - If `memoize_utilities` is set, results are memoized until the simulator of the agent changes (the
+              simulator state is updated at the beginning of a step or a signed contract is scheduled). Contracts
+              are identified by their partners, product and agreement.
+            - If `memoize_utilities` is set, a single contract is evaluated incrementally against the current
+              schedule (see `_marginal_utility`) instead of being scheduled for every unit price.
+        """
         if self.scheduler is None:
             raise ValueError("Cannot calculate total utility without a scheduler")
+        if not self.memoize_utilities:
+            return self._total_utility(contracts)
+        state = (self.awi.current_step, self._n_schedule_updates)
+        if state != self._utility_cache_state:
+            self._utility_cache = dict()
+            self._marginal_cache = dict()
+            self._base_balance = self._base_wallet_minima = None
+            self._utility_cache_state = state
+        key = tuple(self._contract_key(_) for _ in contracts)
+        utility = self._utility_cache.get(key, None)
+        if utility is None:
+            if len(contracts) == 1:
+                utility = self._marginal_utility(next(iter(contracts)))
+            if utility is None:
+                utility = self._total_utility(contracts)
+            self._utility_cache[key] = utility
+        return utility
+
+    def _marginal_utility(self, contract: Contract) -> Optional[float]:
+        """Evaluates a single contract incrementally against the current schedule
+
+        Returns:
+            The same value as `_total_utility` for this contract or None if it cannot be evaluated incrementally.
+
+        Remarks:
+            - The base final balance and the minimum future wallet of every step are read once from the simulator for
+              the current schedule.
+            - The contract is scheduled once per product, quantity and delivery time with a zero unit price. The
+              utility of any unit price is then found by adding its effect on the wallet to this price-free result.
+              Sales only add their price so that is exact if all the costs of the price-free schedule were paid.
+              Purchases are exact if the wallet never drops below the price (and the insurance premium if insurance
+              is bought), the same condition the simulator checks.
+            - Only supported for the `GreedyScheduler` with a `FastFactorySimulator` or a `SparseFactorySimulator`.
+        """
+        if not isinstance(self.scheduler, GreedyScheduler) or not isinstance(
+            self.simulator, (FastFactorySimulator, SparseFactorySimulator)
+        ):
+            return None
+        annotation, agreement = contract.annotation, contract.agreement
+        is_seller = annotation["seller"] == self.id
+        if not is_seller and annotation["buyer"] != self.id:
+            return None
+        q, t = int(agreement["quantity"]), agreement["time"]
+        p = agreement["unit_price"] * q
+        if p < 0:
+            return None
+        if self._base_balance is None:
+            simulator = self.simulator
+            wallet = np.asarray(simulator.wallet_to(simulator.n_steps - 1))
+            self._base_balance = simulator.final_balance
+            self._base_wallet_minima = np.minimum.accumulate(wallet[::-1])[::-1]
+        key = (is_seller, annotation["cfp"].product, q, t)
+        marginal = self._marginal_cache.get(key, None)
+        if marginal is None:
+            marginal = self._marginal_cache[key] = self._price_free_marginal(contract)
+        valid, delta = marginal
+        if not valid:
+            return float("-inf")
+        if delta is None:
+            return None
+        if is_seller:
+            return self._base_balance + delta + p
+        # I am a buyer. The purchase fails if it makes the wallet negative at any step from delivery on
+        if not 0 <= t < len(self._base_wallet_minima):
+            return None
+        slack = self._base_wallet_minima[t] - p
+        if slack < 0:
+            return float("-inf")
+        if p <= 0:
+            return self._base_balance - p
+        insurance = self.awi.evaluate_insurance(
+            contract=contract, t=self.awi.current_step
+        )
+        if (
+            insurance is not None
+            and insurance / p < self.scheduler.max_insurance_premium
+            and slack - insurance >= 0
+        ):
+            p += insurance
+        return self._base_balance - p
+
+    def _price_free_marginal(self, contract: Contract) -> Tuple[bool, Optional[float]]:
+        """Schedules the contract with a zero unit price and returns its validity and its effect on the final balance
+
+        Remarks:
+            - The effect is None if the result cannot be used for other prices. That happens for sales if some cost of
+              the schedule was not paid because of a money shortage.
+        """
+        agreement = contract.agreement
+        free = Contract(
+            partners=contract.partners,
+            agreement=SCMLAgreement(
+                time=agreement["time"], quantity=agreement["quantity"], unit_price=0
+            ),
+            annotation=contract.annotation,
+            issues=contract.issues,
+            signed_at=contract.signed_at,
+            concluded_at=contract.concluded_at,
+        )
+        schedule = self._schedule([free])
+        if not schedule.valid:
+            return False, 0.0
+        if contract.annotation["buyer"] == self.id:
+            return True, 0.0
+        # the schedule is found before selling and does not depend on the price. The costs found here are paid for
+        # any price if they were all paid without the income of the sale
+        delta = schedule.final_balance - self._base_balance
+        expected = -sum(self.scheduler.profiles[_.profile].cost for _ in schedule.jobs)
+        for need in schedule.needs:
+            catalog_price = self.products[need.product].catalog_price
+            if catalog_price == 0 or need.quantity_to_buy <= 0:
+                continue
+            expected -= need.quantity_to_buy * catalog_price
+        if not math.isclose(delta, expected, rel_tol=1e-9, abs_tol=1e-6):
+            return True, None
+        return True, delta
+
+    def _total_utility(self, contracts: Collection[Contract]) -> float:
+        schedule = self._schedule(contracts)
+        if not schedule.valid:
+            return float("-inf")
+        return schedule.final_balance
+
+    def _schedule(self, contracts: Collection[Contract]) -> ScheduleInfo:
+        """Schedules the contracts (as if signed now) and returns the schedule leaving the simulator unchanged"""
         min_concluded_at = self.awi.current_step
         min_sign_at = min_concluded_at + self.awi.default_signing_delay
         with temporary_transaction(self.scheduler):
-            schedule = self.scheduler.schedule(
+            return self.scheduler.schedule(
                 contracts=contracts,
                 assume_no_further_negotiations=False,
                 ensure_storage_for=self.transportation_delay,
                 start_at=min_sign_at,
             )
-        if not schedule.valid:
-            return float("-inf")
-        return schedule.final_balance
 
     def init(self):
         self.negotiation_margin = max(
@@ -559,6 +731,7 @@ class GreedyFactoryManager(DoNothingFactoryManager):
     def _execute_schedule(self, schedule: ScheduleInfo, contract: Contract) -> None:
         if self.simulator is None:
             raise ValueError("No factory simulator is defined")
+        self.invalidate_utility_cache()
         awi: SCMLAWI = self.awi
         total = contract.agreement["unit_price"] * contract.agreement["quantity"]
         product = contract.annotation["cfp"].product
@@ -692,17 +865,20 @@ class GreedyFactoryManager(DoNothingFactoryManager):
                     Notification(type="ufun_modified", data=None),
                 )
 
-    def _process_buy_cfp(self, cfp: "CFP") -> None:
+    def _may_respond_to_buy_cfp(self, cfp: "CFP") -> bool:
         if cfp.publisher == self.id:
-            return
+            return False
         if self.awi.is_bankrupt(cfp.publisher):
-            return
-        if self.simulator is None or not self.can_expect_agreement(
+            return False
+        return self.simulator is not None and self.can_expect_agreement(
             cfp=cfp, margin=self.negotiation_margin
+        )
+
+    def _process_buy_cfp(self, cfp: "CFP", check_production: bool = True) -> None:
+        if check_production and (
+            not self._may_respond_to_buy_cfp(cfp) or not self.can_produce(cfp=cfp)
         ):
             return
-        if not self.can_produce(cfp=cfp):
-            return
         neg = self.negotiator_type(
             name=self.name + ">" + cfp.publisher[:4], **self.negotiator_params
         )
@@ -729,6 +905,11 @@ class GreedyFactoryManager(DoNothingFactoryManager):
         ):
             self._process_sell_cfp(cfp)
 
+    def step_(self):
+        # the simulator state is reset from the factory at every step
+        self.invalidate_utility_cache()
+        super().step_()
+
     def step(self):
         if self.use_consumer:
             self.consumer.step()
@@ -744,39 +925,49 @@ class GreedyFactoryManager(DoNothingFactoryManager):
         )
         if cfps is None:
             return
-        for cfp in cfps.values():
-            self._process_buy_cfp(cfp)
+        cfps = [_ for _ in cfps.values() if self._may_respond_to_buy_cfp(_)]
+        for cfp, feasible in zip(cfps, self.can_produce_many(cfps)):
+            if feasible:
+                self._process_buy_cfp(cfp, check_production=False)
 
     def can_produce(self, cfp: CFP, assume_no_further_negotiations=False) -> bool:
         """Whether or not we can produce the required item in time"""
-        if cfp.product not in self.producing.keys():
-            return False
-        agreement = SCMLAgreement(
-            time=cfp.max_time, unit_price=cfp.max_unit_price, quantity=cfp.min_quantity
-        )
+        return self.can_produce_many(
+            [cfp], assume_no_further_negotiations=assume_no_further_negotiations
+        )[0]
+
+    def can_produce_many(
+        self, cfps: List[CFP], assume_no_further_negotiations=False
+    ) -> List[bool]:
+        """Whether or not we can produce the required item in time for each of the given buy CFPs.
+
+        Remarks:
+            - All CFPs are checked against the current schedule using `GreedyScheduler.schedule_cfps` (i.e. the
+              result for each CFP does not assume that any of the others is agreed upon).
+        """
         min_concluded_at = self.awi.current_step + 1 - int(self.immediate_negotiations)
         min_sign_at = min_concluded_at + self.awi.default_signing_delay
-        if cfp.max_time < min_sign_at + 1:  # 1 is minimum time to produce the product
-            return False
-        with temporary_transaction(self.scheduler):
-            schedule = self.scheduler.schedule(
-                contracts=[
-                    Contract(
-                        partners=[self.id, cfp.publisher],
-                        agreement=agreement,
-                        annotation=self._create_annotation(cfp=cfp),
-                        issues=cfp.issues,
-                        signed_at=min_sign_at,
-                        concluded_at=min_concluded_at,
-                    )
-                ],
-                ensure_storage_for=self.transportation_delay,
-                assume_no_further_negotiations=assume_no_further_negotiations,
-                start_at=min_sign_at,
-            )
-        return schedule.valid and self.can_secure_needs(
-            schedule=schedule, step=self.awi.current_step
+        # 1 is minimum time to produce the product
+        results = [
+            cfp.product in self.producing.keys() and cfp.max_time >= min_sign_at + 1
+            for cfp in cfps
+        ]
+        candidates = [i for i, possible in enumerate(results) if possible]
+        if not candidates:
+            return results
+        schedules = self.scheduler.schedule_cfps(
+            [cfps[i] for i in candidates],
+            ensure_storage_for=self.transportation_delay,
+            assume_no_further_negotiations=assume_no_further_negotiations,
+            start_at=min_sign_at,
+            signed_at=min_sign_at,
+            concluded_at=min_concluded_at,
         )
+        for i, schedule in zip(candidates, schedules):
+            results[i] = schedule.valid and self.can_secure_needs(
+                schedule=schedule, step=self.awi.current_step
+            )
+        return results
 
     def can_secure_needs(self, schedule: ScheduleInfo, step: int):
         """
@@ -833,6 +1024,7 @@ class NegotiatorUtility(UtilityFunction):
         self.annotation = annotation
         self.avoid_free_sales = avoid_free_sales
         self.expected_breach_level = expected_breach_level
+        self._issues: Optional[List[Issue]] = None
 
     def _contracts(self, agreements: Iterable[SCMLAgreement]) -> Collection[Contract]:
         """Converts agreements/outcomes into contracts"""
@@ -852,11 +1044,14 @@ class NegotiatorUtility(UtilityFunction):
     def _contract(self, agreement: SCMLAgreement) -> Contract:
         """Converts an agreement/outcome into a contract"""
         annotation = self.annotation
+        if self._issues is None:
+            # CFP.issues creates new issues every time it is accessed
+            self._issues = annotation["cfp"].issues
         return Contract(
             partners=annotation["partners"],
             agreement=agreement,
             annotation=annotation,
-            issues=annotation["cfp"].issues,
+            issues=self._issues,
         )
 
     def _free_sale(self, agreement: SCMLAgreement) -> bool:
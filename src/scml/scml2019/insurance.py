@@ -1,6 +1,9 @@
 from abc import ABC
 from collections import defaultdict
-from typing import TYPE_CHECKING, Any, Dict, List, Optional, Tuple
+from itertools import islice
+from typing import TYPE_CHECKING, Any, Dict, List, Optional, Tuple, Union
+
+import numpy as np
 
 from negmas import Mechanism, MechanismState, NegotiatorMechanismInterface
 from negmas.negotiators import Negotiator
@@ -88,7 +91,17 @@ class InsuranceCompany(Agent, ABC):
 
 
 class DefaultInsuranceCompany(InsuranceCompany):
-    """Represents an insurance company in the world"""
+    """Represents an insurance company in the world
+
+    Remarks:
+
+        - Policies are indexed by `(contract.id, perpetrator id)` in `insured_contracts`.
+        - The total breach level of every perpetrator is accumulated incrementally from the `breaches` section of the
+          bulletin board so that premiums can be evaluated for many contracts at once (see
+          `evaluate_insurance_many`) without rescanning the breach history.
+        - Premiums only grow with the breach level of the perpetrator if `breach_sensitive_premiums` is set. By
+          default, `premium_breach_increment` is ignored and premiums depend only on the delay from signing.
+    """
 
     def __init__(
         self,
@@ -98,13 +111,17 @@ class DefaultInsuranceCompany(InsuranceCompany):
         a2f: Dict[str, Factory],
         disabled=False,
         name: str = None,
+        breach_sensitive_premiums: bool = False,
     ):
         super().__init__(name=name)
         self.premium_breach_increment = premium_breach_increment
+        self.breach_sensitive_premiums = breach_sensitive_premiums
         self.premium = premium
         self.disabled = disabled
         self.premium_time_increment = premium_time_increment
-        self.insured_contracts: Dict[Tuple[Contract, str], InsurancePolicy] = dict()
+        self.insured_contracts: Dict[Tuple[str, str], InsurancePolicy] = dict()
+        self._breach_levels: Dict[str, float] = defaultdict(float)
+        self._n_breaches_seen = 0
         self.storage: Dict[int, int] = defaultdict(int)
         self.wallet: float = 0.0
         self.a2f = a2f
@@ -122,6 +139,27 @@ class DefaultInsuranceCompany(InsuranceCompany):
     ) -> Optional[Negotiator]:
         raise ValueError("The insurance company does not receive callbacks")
 
+    def _update_breach_levels(self) -> Dict[str, float]:
+        """Accumulates the breach levels of all breaches published since the last call and returns them per agent"""
+        breaches = self._world.bulletin_board.data.get("breaches", None)
+        if not breaches:
+            return self._breach_levels
+        if len(breaches) < self._n_breaches_seen:
+            # breach records were removed. Start over
+            self._breach_levels = defaultdict(float)
+            self._n_breaches_seen = 0
+        for record in islice(breaches.values(), self._n_breaches_seen, None):
+            perpetrator = record["perpetrator"]
+            self._breach_levels[getattr(perpetrator, "id", perpetrator)] += record[
+                "level"
+            ]
+        self._n_breaches_seen = len(breaches)
+        return self._breach_levels
+
+    def breach_level(self, agent: Union[SCML2019Agent, str]) -> float:
+        """Returns the total breach level of all breaches committed by the given agent (or agent ID) so far"""
+        return self._update_breach_levels().get(getattr(agent, "id", agent), 0.0)
+
     def evaluate_insurance(
         self,
         contract: Contract,
@@ -144,35 +182,77 @@ class DefaultInsuranceCompany(InsuranceCompany):
               insurance, you need to multiply this by the contract value (quantity * unit_price).
 
         """
-        if self.disabled:
-            return None
-        # fail if no premium
-        if self.premium is None:
-            return None
+        return self.evaluate_insurance_many(
+            contracts=[contract], insured=insured, against=against, t=t
+        )[0]
+
+    def evaluate_insurance_many(
+        self,
+        contracts: List[Contract],
+        insured: SCML2019Agent,
+        against: Union[SCML2019Agent, List[SCML2019Agent]],
+        t: int = None,
+    ) -> List[Optional[float]]:
+        """Evaluates the premiums for insuring several contracts in one call
+
+        Args:
+
+            contracts: hypothetical contracts
+            insured: The `SCML2019Agent` to buy the insurance
+            against: The `SCML2019Agent` to insure against or a list of them (one per contract)
+            t: time at which the policies are to be bought. If None, it means current step
+
+        Returns:
+
+            A list with the premium (relative to the contract price) of every contract or None if it cannot be insured
+
+        Remarks:
+
+            - Breach levels are looked up per perpetrator from statistics accumulated incrementally from the bulletin
+              board so the cost of a call is linear in the number of contracts only.
+
+        """
+        n = len(contracts)
+        if self.disabled or self.premium is None:
+            return [None] * n
+        if n == 0:
+            return []
 
         # assume the insurance is to be bought now if needed
         if t is None:
             t = self.awi.current_step
 
-        # find the delay from contract signing. The more this is the more expensive the insurance will be
-        if contract.signed_at is None:
-            dt = 0
-        else:
-            dt = max(0, t - contract.signed_at)
-
-        # fail if the insurance is to be bought at or after the agreed upon delivery time
-        if t >= contract.agreement.get("time", -1):
-            return None
+        if not isinstance(against, (list, tuple)):
+            against = [against] * n
 
-        # find the total breach of the agent I am insuring against. The more this is, the more expensive the insurance
-        breaches = self.awi.bb_query(section="breaches", query={"perpetrator": against})
-        b = 0
-        if breaches is not None:
-            for _, breach in breaches.items():
-                b += breach.level
-        return (self.premium + b * self.premium_breach_increment) * (
-            1 + self.premium_time_increment * dt
+        # find the delay from contract signing. The more this is the more expensive the insurance will be
+        signed = np.fromiter(
+            (t if _.signed_at is None else _.signed_at for _ in contracts),
+            dtype=float,
+            count=n,
+        )
+        delivery = np.fromiter(
+            (_.agreement.get("time", -1) for _ in contracts), dtype=float, count=n
         )
+        dt = np.maximum(0, t - signed)
+        premiums = self.premium * (1 + self.premium_time_increment * dt)
+        if self.breach_sensitive_premiums:
+            # find the total breach of the agent I am insuring against. The more this is, the more expensive the
+            # insurance
+            levels = self._update_breach_levels()
+            b = np.fromiter(
+                (levels.get(getattr(_, "id", _), 0.0) for _ in against),
+                dtype=float,
+                count=n,
+            )
+            premiums = premiums + b * self.premium_breach_increment * (
+                1 + self.premium_time_increment * dt
+            )
+        # fail if the insurance is to be bought at or after the agreed upon delivery time
+        return [
+            None if t >= d else float(p)
+            for d, p in zip(delivery.tolist(), premiums.tolist())
+        ]
 
     def buy_insurance(
         self, contract: Contract, insured: SCML2019Agent, against: SCML2019Agent
@@ -208,25 +288,24 @@ class DefaultInsuranceCompany(InsuranceCompany):
             against=against,
             premium=premium,
         )
-        self.insured_contracts[(contract, against.id)] = policy
+        self.insured_contracts[(contract.id, against.id)] = policy
         return policy
 
     def is_insured(self, contract: Contract, perpetrator: SCML2019Agent) -> bool:
-        """
+        """Checks whether the contract is insured against breaches by the perpetrator consuming the policy if so
 
         Args:
-            contract:
-            perpetrator:
+            contract: The contract breached
+            perpetrator: The agent that committed the breach
 
         Returns:
-
+            True if a policy was found (and consumed)
         """
         if self.disabled:
             return False
-        if (contract, perpetrator.id) in self.insured_contracts.keys():
-            del self.insured_contracts[(contract, perpetrator.id)]
-            return True
-        return False
+        return (
+            self.insured_contracts.pop((contract.id, perpetrator.id), None) is not None
+        )
 
     def step(self):
         """does nothing"""
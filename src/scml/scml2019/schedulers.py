@@ -1,7 +1,7 @@
 import math
 from abc import ABC, abstractmethod
 from dataclasses import dataclass, field
-from typing import Any, Callable, Collection, Dict, List, Optional
+from typing import Any, Callable, Collection, Dict, Iterable, List, Optional
 
 import numpy as np
 from negmas.situated import Contract
@@ -9,6 +9,7 @@ from negmas.situated import Contract
 from scml.scml2019.helpers import zero_runs
 
 from .common import (
+    CFP,
     NO_PRODUCTION,
     Job,
     ManufacturingProfileCompiled,
@@ -215,6 +216,122 @@ class Scheduler(ABC):
             start_at=start_at,
         )
 
+    def schedule_each(
+        self,
+        contracts: Iterable[Contract],
+        assume_no_further_negotiations=False,
+        ensure_storage_for: int = 0,
+        start_at: int = 0,
+    ) -> List[ScheduleInfo]:
+        """
+        Schedules each contract on its own starting from the current state which is left unchanged
+
+        Args:
+
+            contracts: The contracts to be scheduled (each independently of the others)
+            assume_no_further_negotiations: whether to assume that more negotiations can take place (to secure
+            production needs)
+            ensure_storage_for: A minimum time to ensure that products are available in storage before contract delivery
+            times (sell contracts).
+            start_at: The time at which to start scheduling. No jobs will be scheduled before this time.
+
+        Returns:
+
+            A `ScheduleInfo` for each contract (in the same order). The same as calling `schedule` for each of them
+            inside a `temporary_transaction` but using a single bookmark that is rewound between contracts.
+
+        """
+        simulator = self.simulator
+        results = []
+        # rewinding may replace the bookmark (See `FactorySimulator.rewind`)
+        bookmark = simulator.bookmark()
+        try:
+            for contract in contracts:
+                if results:
+                    bookmark = simulator.rewind(bookmark)
+                results.append(
+                    self.schedule(
+                        contracts=[contract],
+                        assume_no_further_negotiations=assume_no_further_negotiations,
+                        ensure_storage_for=ensure_storage_for,
+                        start_at=start_at,
+                    )
+                )
+        finally:
+            simulator.rollback(bookmark)
+            simulator.delete_bookmark(bookmark)
+        return results
+
+    def schedule_cfps(
+        self,
+        cfps: Iterable[CFP],
+        assume_no_further_negotiations=False,
+        ensure_storage_for: int = 0,
+        start_at: int = 0,
+        signed_at: Optional[int] = None,
+        concluded_at: Optional[int] = None,
+    ) -> List[ScheduleInfo]:
+        """
+        Checks the feasibility of many CFPs at once against the current state (which is left unchanged)
+
+        Args:
+
+            cfps: The CFPs to check. They must be published by partners of the factory manager.
+            assume_no_further_negotiations: whether to assume that more negotiations can take place (to secure
+            production needs)
+            ensure_storage_for: A minimum time to ensure that products are available in storage before contract delivery
+            times (sell contracts).
+            start_at: The time at which to start scheduling. No jobs will be scheduled before this time.
+            signed_at: Signing time of the hypothetical contracts
+            concluded_at: Conclusion time of the hypothetical contracts
+
+        Returns:
+
+            A `ScheduleInfo` for each CFP (use `valid` and `needs` to check feasibility).
+
+        Remarks:
+
+            - Each CFP is evaluated using the agreement easiest for the factory manager to satisfy: its maximum time,
+              minimum quantity and best unit price for the manager.
+            - All CFPs are scheduled from the same state using a single bookmark (see `schedule_each`).
+        """
+        contracts = []
+        for cfp in cfps:
+            if cfp.is_buy:
+                seller, buyer, price = (
+                    self.manager_id,
+                    cfp.publisher,
+                    cfp.max_unit_price,
+                )
+            else:
+                seller, buyer, price = (
+                    cfp.publisher,
+                    self.manager_id,
+                    cfp.min_unit_price,
+                )
+            contracts.append(
+                Contract(
+                    partners=[self.manager_id, cfp.publisher],
+                    agreement=SCMLAgreement(
+                        time=cfp.max_time, unit_price=price, quantity=cfp.min_quantity
+                    ),
+                    annotation={
+                        "cfp": cfp,
+                        "partners": [self.manager_id, cfp.publisher],
+                        "seller": seller,
+                        "buyer": buyer,
+                    },
+                    signed_at=signed_at,
+                    concluded_at=concluded_at,
+                )
+            )
+        return self.schedule_each(
+            contracts,
+            assume_no_further_negotiations=assume_no_further_negotiations,
+            ensure_storage_for=ensure_storage_for,
+            start_at=start_at,
+        )
+
     @abstractmethod
     def find_schedule(
         self,
@@ -721,7 +838,6 @@ class GreedyScheduler(Scheduler):
         ensure_storage_for: int = 0,
         start_at: int = 0,
     ):
-
         # Now, schedule the contracts
         schedule = self.schedule_contracts(
             contracts=contracts,
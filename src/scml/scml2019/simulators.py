@@ -1,12 +1,15 @@
 """Simulators module implementing factory simulation"""
 
 import math
+import random
 import sys
+import time
 from abc import ABC, abstractmethod
+from bisect import bisect_left, bisect_right
 from collections import defaultdict
 from contextlib import contextmanager
 from dataclasses import dataclass, field
-from typing import Dict, List, Optional
+from typing import Any, Dict, List, Optional, Sequence, Tuple, Type
 
 import numpy as np
 
@@ -16,6 +19,9 @@ __all__ = [
     "FactorySimulator",
     "SlowFactorySimulator",
     "FastFactorySimulator",
+    "SparseFactorySimulator",
+    "select_simulator_type",
+    "compare_simulators",
     "transaction",
     "temporary_transaction",
 ]
@@ -58,7 +64,6 @@ class FactorySimulator(ABC):
         profiles: List[ManufacturingProfile],
         max_storage: Optional[int] = None,
     ):
-
         self._n_steps = n_steps
         self._max_storage = max_storage if max_storage is not None else sys.maxsize
         self._initial_wallet = initial_wallet
@@ -711,6 +716,31 @@ class FactorySimulator(ABC):
             `delete_bookmark` `rollback` `transaction` `temporary_transaction`
         """
 
+    def rewind(self, bookmark_id: int) -> int:
+        """Rolls back to the given bookmark ID keeping a bookmark active at the same location
+
+        Args:
+            bookmark_id The bookmark ID returned from bookmark (or from an earlier rewind)
+
+        Returns:
+
+            The ID of the bookmark to use from now on (to rewind again, rollback or delete it)
+
+        Remarks:
+
+            - This allows trying several alternatives starting from the same state using a single bookmark. The
+              bookmark must still be deleted (or rolled back) at the end.
+            - The default implementation rolls back, deletes the bookmark and sets a new one returning its ID.
+              Simulators that can roll back to the same bookmark several times return `bookmark_id` itself.
+
+        See Also:
+
+            `bookmark` `rollback` `delete_bookmark`
+        """
+        self.rollback(bookmark_id)
+        self.delete_bookmark(bookmark_id)
+        return self.bookmark()
+
     @abstractmethod
     def delete_bookmark(self, bookmark_id: int) -> bool:
         """Commits everything since the bookmark so it cannot be rolled back
@@ -850,12 +880,12 @@ class SlowFactorySimulator(FactorySimulator):
         if self._active_bookmark is None or self._active_bookmark.id != bookmark_id:
             raise ValueError(f"there is no active bookmark to rollback")
         for t, payment in self._active_bookmark.payment_updates.items():
-            self._payment_updates[t] += payment
+            self._payment_updates[t] -= payment
         for t, payment in self._active_bookmark.loans_updates.items():
-            self._loans_updates[t] += payment
+            self._loans_updates[t] -= payment
         for t, storage in self._active_bookmark.storage_updates.items():
             s = self._storage_updates[t]
-            for k, v in storage:
+            for k, v in storage.items():
                 s[k] -= v
         for t, rolled_indices in self._active_bookmark.jobs.items():
             self._jobs[t] = [
@@ -1458,6 +1488,19 @@ class FastFactorySimulator(FactorySimulator):
         self._total_storage = self._storage.sum(axis=0)
         return True
 
+    def rewind(self, bookmark_id: int) -> int:
+        if self._active_bookmark is None or self._active_bookmark.id != bookmark_id:
+            raise ValueError(f"there is no active bookmark to rewind")
+        # copy in-place so that the bookmark can be reused
+        b = self._active_bookmark
+        self._wallet[:] = b.wallet
+        self._loans[:] = b.loans
+        self._storage[:] = b.storage
+        self._line_schedules[:] = b.line_schedules
+        self._has_jobs[:] = b.has_jobs
+        self._total_storage = self._storage.sum(axis=0)
+        return bookmark_id
+
     def set_state(
         self,
         t: int,
@@ -1469,6 +1512,7 @@ class FastFactorySimulator(FactorySimulator):
         self._storage[:, t:] += storage.reshape(self._n_products, 1) - self._storage[
             :, t
         ].reshape(self._n_products, 1)
+        self._total_storage = self._storage.sum(axis=0)
         self._wallet[t:] += wallet - self._wallet[t]
         self._loans[t:] += loans - self._loans[t]
 
@@ -1491,6 +1535,654 @@ class FastFactorySimulator(FactorySimulator):
         self.fix_before(t)
 
 
+class _StepSeries:
+    """A piecewise-constant series over `n_steps` time-steps stored as a base value and a sorted log of changes.
+
+    Adding `delta` at time `t` changes the value at `t` and all later steps which is what all simulator operations do.
+    """
+
+    __slots__ = ["n_steps", "base", "times", "deltas"]
+
+    def __init__(self, n_steps: int, base: float = 0.0):
+        self.n_steps = n_steps
+        self.base = base
+        self.times: List[int] = []
+        self.deltas: List[float] = []
+
+    def add(self, t: int, delta: float) -> None:
+        if t >= self.n_steps or delta == 0:
+            return
+        i = bisect_left(self.times, t)
+        if i < len(self.times) and self.times[i] == t:
+            d = self.deltas[i] + delta
+            if d == 0:
+                del self.times[i]
+                del self.deltas[i]
+            else:
+                self.deltas[i] = d
+            return
+        self.times.insert(i, t)
+        self.deltas.insert(i, delta)
+
+    def at(self, t: int) -> float:
+        return self.base + sum(self.deltas[: bisect_right(self.times, t)])
+
+    def to(self, t: int) -> np.array:
+        n = min(t + 1, self.n_steps)
+        a = np.zeros(n)
+        for _, d in zip(self.times, self.deltas):
+            if _ >= n:
+                break
+            a[_] += d
+        return np.cumsum(a) + self.base
+
+    def min_from(self, t: int) -> float:
+        """Minimum value at or after `t` (infinity if `t` is beyond the last step)"""
+        if t >= self.n_steps:
+            return float("inf")
+        i = bisect_right(self.times, t)
+        v = m = self.base + sum(self.deltas[:i])
+        for d in self.deltas[i:]:
+            v += d
+            if v < m:
+                m = v
+        return m
+
+    def max_from(self, t: int) -> float:
+        """Maximum value at or after `t` (-infinity if `t` is beyond the last step)"""
+        if t >= self.n_steps:
+            return float("-inf")
+        i = bisect_right(self.times, t)
+        v = m = self.base + sum(self.deltas[:i])
+        for d in self.deltas[i:]:
+            v += d
+            if v > m:
+                m = v
+        return m
+
+
+class SparseFactorySimulator(FactorySimulator):
+    """
+    An event-log implementation of the `FactorySimulator` interface with the same semantics as
+    `FastFactorySimulator`.
+
+    Remarks:
+
+        - Wallet, loans and storage are kept as logs of changes instead of dense `n_steps` arrays and line schedules
+          are kept as sparse mappings. Bookmarks only record a position in an undo journal so creating and rolling
+          back bookmarks does not depend on the horizon.
+        - This backend is faster than `FastFactorySimulator` for long horizons (and many products) with few events.
+          Use `select_simulator_type` to choose a backend automatically.
+
+    """
+
+    def __init__(
+        self,
+        initial_wallet: float,
+        initial_storage: Dict[int, int],
+        n_steps: int,
+        n_products: int,
+        profiles: List[ManufacturingProfile],
+        max_storage: Optional[int],
+    ):
+        super().__init__(
+            initial_wallet=initial_wallet,
+            initial_storage=initial_storage,
+            n_steps=n_steps,
+            n_products=n_products,
+            profiles=profiles,
+            max_storage=max_storage,
+        )
+        self._wallet = _StepSeries(n_steps, initial_wallet)
+        self._loans = _StepSeries(n_steps)
+        self._storage: Dict[int, _StepSeries] = dict()
+        self._total_storage = _StepSeries(n_steps, self._initial_storage.sum())
+        factory = Factory(
+            initial_storage=initial_storage,
+            initial_wallet=initial_wallet,
+            profiles=profiles,
+            max_storage=max_storage,
+        )
+        self._profiles = factory.profiles
+        self._n_lines = factory.n_lines
+        self._line_schedules: List[Dict[int, int]] = [
+            dict() for _ in range(self._n_lines)
+        ]
+        self._fixed_before = 0
+        self._bookmarks: List[int] = []
+        self._journal: List[Tuple] = []
+
+    def _product_storage(self, product: int) -> _StepSeries:
+        s = self._storage.get(product, None)
+        if s is None:
+            s = self._storage[product] = _StepSeries(
+                self._n_steps, self._initial_storage[product]
+            )
+        return s
+
+    def _add(self, series: _StepSeries, t: int, delta: float) -> None:
+        series.add(t, delta)
+        if self._bookmarks:
+            self._journal.append((series, t, delta))
+
+    def _set_line(self, line: int, t: int, process: int) -> None:
+        schedule = self._line_schedules[line]
+        if self._bookmarks:
+            self._journal.append((schedule, t, schedule.get(t, None)))
+        if process == NO_PRODUCTION:
+            schedule.pop(t, None)
+        else:
+            schedule[t] = process
+
+    def _undo_to(self, position: int) -> None:
+        while len(self._journal) > position:
+            target, t, change = self._journal.pop()
+            if isinstance(target, _StepSeries):
+                target.add(t, -change)
+            elif change is None:
+                target.pop(t, None)
+            else:
+                target[t] = change
+
+    def _check_time(self, t: int) -> None:
+        if t < self._fixed_before:
+            raise ValueError(
+                f"Cannot run operations in the past (t={t}, fixed before {self._fixed_before})"
+            )
+
+    @property
+    def fixed_before(self):
+        return self._fixed_before
+
+    @property
+    def n_lines(self):
+        return self._n_lines
+
+    @property
+    def final_balance(self) -> float:
+        return self.balance_at(self._n_steps - 1)
+
+    def wallet_to(self, t: int) -> np.array:
+        return self._wallet.to(t)
+
+    def wallet_at(self, t: int) -> float:
+        return self._wallet.at(t)
+
+    def loans_to(self, t: int) -> np.array:
+        return self._loans.to(t)
+
+    def loans_at(self, t: int) -> float:
+        return self._loans.at(t)
+
+    def balance_at(self, t: int) -> float:
+        return self._wallet.at(t) - self._loans.at(t)
+
+    def storage_to(self, t: int) -> np.array:
+        n = min(t + 1, self._n_steps)
+        a = np.repeat(self._initial_storage.reshape((self._n_products, 1)), n, axis=1)
+        for p, s in self._storage.items():
+            a[p, :] = s.to(t)
+        return a
+
+    def storage_at(self, t: int) -> np.array:
+        a = self._initial_storage.copy()
+        for p, s in self._storage.items():
+            a[p] = s.at(t)
+        return a
+
+    def total_storage_at(self, t: int) -> int:
+        return self.storage_at(t).sum()
+
+    def line_schedules_to(self, t: int) -> np.array:
+        n = min(t + 1, self._n_steps)
+        a = np.ones(shape=(self._n_lines, n)) * NO_PRODUCTION
+        for line, schedule in enumerate(self._line_schedules):
+            for step, process in schedule.items():
+                if step < n:
+                    a[line, step] = process
+        return a
+
+    def line_schedules_at(self, t: int) -> np.array:
+        return np.array(
+            [_.get(t, NO_PRODUCTION) for _ in self._line_schedules], dtype=float
+        )
+
+    def add_loan(self, total: float, t: int) -> bool:
+        self._check_time(t)
+        self._add(self._loans, t, total)
+        return True
+
+    def pay(self, payment: float, t: int, ignore_money_shortage: bool = True) -> bool:
+        self._check_time(t)
+        if t >= self._n_steps:
+            return False
+        if self._wallet.min_from(t) - payment < 0:
+            return False
+        self._add(self._wallet, t, -payment)
+        return True
+
+    def transport_to(
+        self,
+        product: int,
+        quantity: int,
+        t: int,
+        ignore_inventory_shortage: bool = True,
+        ignore_space_shortage: bool = True,
+    ) -> bool:
+        self._check_time(t)
+        if t >= self._n_steps:
+            return False
+        s = self._product_storage(product)
+        if (
+            s.min_from(t) + quantity < 0
+            or self._total_storage.max_from(t) + quantity > self.max_storage
+        ):
+            return False
+        self._add(s, t, quantity)
+        self._add(self._total_storage, t, quantity)
+        return True
+
+    def buy(
+        self,
+        product: int,
+        quantity: int,
+        price: int,
+        t: int,
+        ignore_money_shortage: bool = True,
+        ignore_space_shortage: bool = True,
+    ) -> bool:
+        self._check_time(t)
+        if t >= self._n_steps:
+            return False
+        if (
+            self._total_storage.max_from(t) + quantity > self.max_storage
+            or self._wallet.min_from(t) - price < 0
+        ):
+            return False
+        self._add(self._product_storage(product), t, quantity)
+        self._add(self._total_storage, t, quantity)
+        self._add(self._wallet, t, -price)
+        return True
+
+    def sell(
+        self,
+        product: int,
+        quantity: int,
+        price: int,
+        t: int,
+        ignore_money_shortage: bool = True,
+        ignore_inventory_shortage: bool = True,
+    ) -> bool:
+        self._check_time(t)
+        if t >= self._n_steps:
+            return False
+        s = self._product_storage(product)
+        if s.min_from(t) - quantity < 0:
+            return False
+        self._add(s, t, -quantity)
+        self._add(self._total_storage, t, -quantity)
+        self._add(self._wallet, t, price)
+        return True
+
+    def schedule(
+        self,
+        job: Job,
+        ignore_inventory_shortage=True,
+        ignore_money_shortage=True,
+        ignore_space_shortage=True,
+        override=True,
+    ) -> bool:
+        t, job_override = job.time, job.override
+        self._check_time(t)
+        if job_override:
+            raise NotImplementedError(
+                f"{self.__class__.__name__} does not support scheduling jobs with overriding"
+            )
+        profile = self._profiles[job.profile]
+        inputs, outputs, length, cost = (
+            profile.process.inputs,
+            profile.process.outputs,
+            profile.n_steps,
+            profile.cost,
+        )
+        line = profile.line
+
+        # confirm that the line is not busy
+        schedule = self._line_schedules[line]
+        end = min(t + length, self._n_steps)
+        if any(_ in schedule for _ in range(t, end)):
+            return False
+
+        # confirm that there is enough money to start production
+        if (not ignore_money_shortage) and self._wallet.min_from(t) < cost:
+            return False
+        if job.action == "run":
+            with transaction(self) as bookmark:
+                if not self.pay(cost, t):
+                    self.rollback(bookmark)
+                    return False
+                for step in range(t, end):
+                    self._set_line(line, step, profile.process.id)
+                for i in inputs:
+                    it = int(math.floor(i.step * length) + t)
+                    p, q = i.product, i.quantity
+                    s = self._product_storage(p)
+                    if (not ignore_inventory_shortage) and s.min_from(it) < q:
+                        self.rollback(bookmark)
+                        return False
+                    self._add(s, it, -q)
+                    self._add(self._total_storage, it, -q)
+                for o in outputs:
+                    ot = int(math.ceil(o.step * length) + t)
+                    p, q = o.product, o.quantity
+                    if (not ignore_space_shortage) and self._total_storage.max_from(
+                        ot
+                    ) + q > self.max_storage:
+                        self.rollback(bookmark)
+                        return False
+                    self._add(self._product_storage(p), ot, q)
+                    self._add(self._total_storage, ot, q)
+            return True
+        raise NotImplementedError(
+            f"{self.__class__.__name__} does not support scheduling {job.action} jobs"
+        )
+
+    def fix_before(self, t: int) -> bool:
+        self._fixed_before = t
+        return True
+
+    def bookmark(self) -> int:
+        self._bookmarks.append(len(self._journal))
+        return len(self._bookmarks) - 1
+
+    def rollback(self, bookmark_id: int) -> bool:
+        if len(self._bookmarks) - 1 != bookmark_id or bookmark_id < 0:
+            raise ValueError(f"there is no active bookmark to rollback")
+        self._undo_to(self._bookmarks[-1])
+        return True
+
+    def rewind(self, bookmark_id: int) -> int:
+        if len(self._bookmarks) - 1 != bookmark_id or bookmark_id < 0:
+            raise ValueError(f"there is no active bookmark to rewind")
+        self._undo_to(self._bookmarks[-1])
+        return bookmark_id
+
+    def delete_bookmark(self, bookmark_id: int) -> bool:
+        if len(self._bookmarks) - 1 != bookmark_id or bookmark_id < 0:
+            raise ValueError(f"there is no active bookmark to delete")
+        self._bookmarks.pop()
+        if not self._bookmarks:
+            self._journal = []
+        return True
+
+    def set_state(
+        self,
+        t: int,
+        storage: np.array,
+        wallet: float,
+        loans: float,
+        line_schedules: np.array,
+    ) -> None:
+        for p, q in enumerate(storage):
+            s = self._product_storage(p)
+            d = q - s.at(t)
+            self._add(s, t, d)
+            self._add(self._total_storage, t, d)
+        self._add(self._wallet, t, wallet - self._wallet.at(t))
+        self._add(self._loans, t, loans - self._loans.at(t))
+        for line, process in enumerate(line_schedules):
+            self._set_line(line, t, process)
+        self.fix_before(t)
+
+
+SPARSE_SIMULATOR_MIN_SIZE = 10_000
+"""Minimum n_steps * n_products for which `select_simulator_type` selects `SparseFactorySimulator`"""
+
+
+def select_simulator_type(
+    n_steps: int, n_products: int, min_sparse_size: int = SPARSE_SIMULATOR_MIN_SIZE
+) -> Type[FactorySimulator]:
+    """
+    Selects the simulator backend expected to be fastest for the given horizon and number of products
+
+    Args:
+        n_steps: number of simulation steps
+        n_products: number of products in the world
+        min_sparse_size: minimum value of `n_steps` * `n_products` for which the sparse backend is used
+
+    Returns:
+
+        `SparseFactorySimulator` for large horizons/many products and `FastFactorySimulator` otherwise.
+
+    Remarks:
+
+        - The default threshold was found using `compare_simulators` with scheduler-like workloads (mostly bookmarked
+          trials with a few operations each). Bookmarks of `FastFactorySimulator` copy all of its dense arrays.
+
+    """
+    if n_steps * n_products >= min_sparse_size:
+        return SparseFactorySimulator
+    return FastFactorySimulator
+
+
+def _random_operations(
+    profiles: List[ManufacturingProfile],
+    n_steps: int,
+    n_products: int,
+    n_lines: int,
+    n_operations: int,
+    rng: random.Random,
+) -> List[Tuple[str, Dict[str, Any]]]:
+    """Generates a random sequence of simulator operations keeping bookmarks balanced"""
+    processes = [NO_PRODUCTION] + sorted({_.process.id for _ in profiles})
+    operations, depth, fixed = [], 0, 0
+
+    def step():
+        return rng.randint(fixed, n_steps - 1)
+
+    for _ in range(n_operations):
+        r = rng.random()
+        if r < 0.15:
+            operations.append(("bookmark", dict()))
+            depth += 1
+        elif r < 0.25 and depth > 0:
+            operations.append((rng.choice(("rollback", "commit", "rewind")), dict()))
+            if operations[-1][0] != "rewind":
+                depth -= 1
+        elif r < 0.4:
+            k = rng.randrange(len(profiles))
+            operations.append(
+                (
+                    "schedule",
+                    dict(
+                        job=Job(
+                            profile=k,
+                            time=step(),
+                            line=profiles[k].line,
+                            action="run",
+                            contract=None,
+                            override=False,
+                        ),
+                        ignore_inventory_shortage=rng.random() < 0.5,
+                        ignore_money_shortage=rng.random() < 0.5,
+                        ignore_space_shortage=rng.random() < 0.5,
+                        override=False,
+                    ),
+                )
+            )
+        elif r < 0.5:
+            operations.append(
+                (
+                    rng.choice(("pay", "receive", "add_loan")),
+                    dict(payment=rng.randint(1, 50), t=step()),
+                )
+            )
+        elif r < 0.7:
+            kind = rng.choice(("buy", "sell", "transport_to"))
+            kwargs = dict(
+                product=rng.randrange(n_products),
+                quantity=rng.randint(1, 10),
+                t=step(),
+            )
+            if kind != "transport_to":
+                kwargs["price"] = rng.randint(1, 50)
+            else:
+                kwargs["quantity"] *= rng.choice((-1, 1))
+            operations.append((kind, kwargs))
+        elif r < 0.71:
+            fixed = min(fixed + rng.randint(0, 2), n_steps - 1)
+            operations.append(
+                (
+                    "set_state",
+                    dict(
+                        t=fixed,
+                        storage=np.array(
+                            [rng.randint(0, 20) for _ in range(n_products)], dtype=float
+                        ),
+                        wallet=float(rng.randint(0, 1000)),
+                        loans=float(rng.randint(0, 100)),
+                        line_schedules=np.array(
+                            [rng.choice(processes) for _ in range(n_lines)], dtype=float
+                        ),
+                    ),
+                )
+            )
+        else:
+            operations.append(
+                (
+                    rng.choice(
+                        (
+                            "wallet_at",
+                            "balance_at",
+                            "available_storage_at",
+                            "line_schedules_at",
+                        )
+                    ),
+                    dict(t=step()),
+                )
+            )
+    operations += [("commit", dict())] * depth
+    return operations
+
+
+def _run_operations(
+    simulator: FactorySimulator, operations: List[Tuple[str, Dict[str, Any]]]
+) -> List[Any]:
+    results, bookmarks = [], []
+    for name, kwargs in operations:
+        try:
+            if name == "bookmark":
+                bookmarks.append(simulator.bookmark())
+                result = bookmarks[-1]
+            elif name == "rollback":
+                result = simulator.rollback(bookmarks[-1])
+                simulator.delete_bookmark(bookmarks.pop())
+            elif name == "commit":
+                result = simulator.delete_bookmark(bookmarks.pop())
+            elif name == "rewind":
+                bookmarks[-1] = result = simulator.rewind(bookmarks[-1])
+            elif name in ("pay", "receive"):
+                result = getattr(simulator, name)(kwargs["payment"], kwargs["t"])
+            elif name == "add_loan":
+                result = simulator.add_loan(kwargs["payment"], kwargs["t"])
+            else:
+                result = getattr(simulator, name)(**kwargs)
+        except (ValueError, NotImplementedError) as error:
+            result = error.__class__.__name__
+        # reads may return views on the internal state of the simulator
+        results.append(result.copy() if isinstance(result, np.ndarray) else result)
+    return results
+
+
+def _same(a: Any, b: Any) -> bool:
+    if isinstance(a, (np.ndarray, float)) or isinstance(b, (np.ndarray, float)):
+        return np.shape(a) == np.shape(b) and np.allclose(a, b)
+    return a == b
+
+
+def compare_simulators(
+    profiles: List[ManufacturingProfile],
+    n_steps: int,
+    n_products: int,
+    simulator_types: Sequence[Type[FactorySimulator]] = (
+        FastFactorySimulator,
+        SparseFactorySimulator,
+    ),
+    n_operations: int = 1000,
+    initial_wallet: float = 1000.0,
+    initial_storage: Optional[Dict[int, int]] = None,
+    max_storage: Optional[int] = None,
+    seed: Optional[int] = None,
+    check: bool = True,
+) -> Dict[str, float]:
+    """
+    Runs the same random sequence of operations through several simulator backends comparing their results and
+    timing them.
+
+    Args:
+        profiles: manufacturing profiles of the simulated factory
+        n_steps: number of simulation steps
+        n_products: number of products
+        simulator_types: The backends to compare. The first one is used as a reference
+        n_operations: number of random operations (scheduling, trading, payments, bookmarks, state reads ...)
+        initial_wallet: initial cash in wallet
+        initial_storage: initial inventory
+        max_storage: maximum storage
+        seed: random seed used to generate the operations
+        check: If true, the result of every operation and the final state of every backend are compared with the
+               reference and a `ValueError` is raised on the first mismatch.
+
+    Returns:
+
+        A mapping from the backend class name to the time (in seconds) it took to run all operations
+
+    Remarks:
+
+        - `SlowFactorySimulator` replays a real `Factory` and does not share the semantics of the array based
+          backends. Only use it with `check=False` to compare timings.
+
+    """
+    rng = random.Random(seed)
+    if initial_storage is None:
+        initial_storage = {_: rng.randint(0, 10) for _ in range(n_products)}
+    simulators = [
+        _(
+            initial_wallet=initial_wallet,
+            initial_storage=initial_storage,
+            n_steps=n_steps,
+            n_products=n_products,
+            profiles=profiles,
+            max_storage=max_storage,
+        )
+        for _ in simulator_types
+    ]
+    operations = _random_operations(
+        profiles, n_steps, n_products, simulators[0].n_lines, n_operations, rng
+    )
+    times, results = dict(), []
+    for simulator in simulators:
+        _start = time.perf_counter()
+        results.append(_run_operations(simulator, operations))
+        times[simulator.__class__.__name__] = time.perf_counter() - _start
+    if not check:
+        return times
+    reference, last = simulators[0], n_steps - 1
+    for simulator, result in zip(simulators[1:], results[1:]):
+        for i, (a, b) in enumerate(zip(results[0], result)):
+            if not _same(a, b):
+                raise ValueError(
+                    f"{simulator.__class__.__name__} differs from {reference.__class__.__name__} at operation "
+                    f"{i} ({operations[i][0]}): {b} != {a}"
+                )
+        for method in ("wallet_to", "loans_to", "storage_to", "line_schedules_to"):
+            a, b = getattr(reference, method)(last), getattr(simulator, method)(last)
+            if not _same(a, b):
+                raise ValueError(
+                    f"{simulator.__class__.__name__} differs from {reference.__class__.__name__} in {method}"
+                )
+    return times
+
+
 @contextmanager
 def transaction(simulator):
     """Runs the simulated actions then confirms them if they are not rolled back"""
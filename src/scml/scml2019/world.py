@@ -41,10 +41,13 @@ from negmas.situated import (
 from .agent import SCML2019Agent
 from .bank import DefaultBank
 from .common import (
+    CFP,
     DEFAULT_NEGOTIATOR,
+    CFPIndex,
     Factory,
     FactoryState,
     FinancialReport,
+    FrozenCFP,
     InputOutput,
     Job,
     ManufacturingProfile,
@@ -139,6 +142,7 @@ class SCML2019World(TimeInAgreementMixin, World):
         premium=0.03,
         premium_time_increment=0.03,
         premium_breach_increment=0.001,
+        breach_sensitive_premiums=False,
         # breach processing
         max_allowed_breach_level=None,
         breach_processing=BreachProcessing.VICTIM_THEN_PERPETRATOR,
@@ -216,6 +220,8 @@ class SCML2019World(TimeInAgreementMixin, World):
             money_resolution:
             premium_time_increment:
             premium_breach_increment:
+            breach_sensitive_premiums: If true, insurance premiums grow with the breach level of the perpetrator (by
+                                       `premium_breach_increment` per unit of breach level)
             default_signing_delay:
             transportation_delay:
             loan_installments:
@@ -299,6 +305,7 @@ class SCML2019World(TimeInAgreementMixin, World):
             event_type="will_remove_record", listener=self
         )
         self.bulletin_board.add_section("cfps")
+        self._cfp_index = CFPIndex()
         self.bulletin_board.add_section("products")
         self.bulletin_board.add_section("processes")
         self.bulletin_board.add_section("bankruptcy")
@@ -415,7 +422,10 @@ class SCML2019World(TimeInAgreementMixin, World):
             self.f2a[factory.id] = agent
             self.a2f[agent.id] = factory
 
-        self.__interested_agents: List[List[SCML2019Agent]] = [[]] * len(self.products)
+        # agents interested in each product keyed by ID (a dict keeps notification order deterministic)
+        self.__interested_agents: List[Dict[str, SCML2019Agent]] = [
+            dict() for _ in self.products
+        ]
         self.n_new_cfps = 0
         self.__n_nullified = 0
         self.__n_bankrupt = 0
@@ -446,6 +456,7 @@ class SCML2019World(TimeInAgreementMixin, World):
             premium_time_increment=premium_time_increment,
             a2f=self.a2f,
             name="insurance_company",
+            breach_sensitive_premiums=breach_sensitive_premiums,
         )
         self.join(self.insurance_company)
 
@@ -1519,17 +1530,10 @@ class SCML2019World(TimeInAgreementMixin, World):
 
         # remove expired CFPs
         # -------------------
-        cfps = self.bulletin_board.query(section="cfps", query=None)
-        if cfps is not None:
-            # new_cfps = dict()
-            toremove = []
-            for key, cfp in cfps.items():
-                # we remove CFP with a max_time less than *or equal* to current step as all processing for current step
-                # should already be complete by now
-                if cfp.max_time <= self.current_step:
-                    toremove.append(key)
-            for key in toremove:
-                self.bulletin_board.remove(section="cfps", query=key, query_keys=True)
+        # we remove CFP with a max_time less than *or equal* to current step as all processing for current step
+        # should already be complete by now
+        for key in self._cfp_index.expired(self.current_step):
+            self.bulletin_board.remove(section="cfps", key=key)
 
     def pre_step_stats(self):
         # noinspection PyProtectedMember
@@ -1571,7 +1575,6 @@ class SCML2019World(TimeInAgreementMixin, World):
         self._stats["_market_size_total"].append(market_size + internal_market_size)
 
     def start_contract_execution(self, contract: Contract) -> Set[Breach]:
-
         partners, agreement = (
             {self.agents[_] for _ in contract.partners},
             contract.agreement,
@@ -2204,16 +2207,11 @@ class SCML2019World(TimeInAgreementMixin, World):
 
     def register_interest(self, agent: SCML2019Agent, products: List[int]) -> None:
         for product in products:
-            self.__interested_agents[product] = list(
-                set(self.__interested_agents[product] + [agent])
-            )
+            self.__interested_agents[product][agent.id] = agent
 
     def unregister_interest(self, agent: SCML2019Agent, products: List[int]) -> None:
         for product in products:
-            try:
-                self.__interested_agents[product].remove(agent)
-            except ValueError:
-                pass
+            self.__interested_agents[product].pop(agent.id, None)
 
     def make_bankrupt(
         self,
@@ -2328,6 +2326,25 @@ class SCML2019World(TimeInAgreementMixin, World):
             contract=contract, insured=agent, against=against[0], t=t
         )
 
+    def evaluate_insurance_many(
+        self, contracts: List[Contract], agent: SCML2019Agent, t: int = None
+    ) -> List[Optional[float]]:
+        """Evaluates the premiums for insuring several contracts against breaches committed by others in one call
+
+        Args:
+
+            contracts: hypothetical contracts
+            agent: The agent buying the contracts
+            t: time at which the policies are to be bought. If None, it means current step
+        """
+        against = []
+        for contract in contracts:
+            partners = [self.agents[_] for _ in contract.partners if _ != agent.id]
+            against.append(partners[0] if len(partners) > 0 else agent.id)
+        return self.insurance_company.evaluate_insurance_many(
+            contracts=contracts, insured=agent, against=against, t=t
+        )
+
     def buy_insurance(self, contract: Contract, agent: SCML2019Agent) -> bool:
         """Buys insurance for the contract by the premium calculated by the insurance company.
 
@@ -2503,16 +2520,40 @@ class SCML2019World(TimeInAgreementMixin, World):
         """
         if event.type == "new_record" and event.data["section"] == "cfps":
             cfp = event.data["value"]
-            product = cfp.product
-            for m in self.__interested_agents[product]:
-                if m.id != cfp.publisher:
-                    m.on_new_cfp(copy.deepcopy(cfp))
-        elif event.type == "will_remove_record" and event.data["section"] == "cfps":
+            self._cfp_index.add(event.data["key"], cfp)
+            shared = None
+            for aid, m in list(self.__interested_agents[cfp.product].items()):
+                if aid != cfp.publisher:
+                    if shared is None:
+                        shared = FrozenCFP.of(cfp)
+                    m.on_new_cfp(shared)
+        elif event.type == "will_remove_record" and self._is_cfps_section(
+            event.data["section"]
+        ):
             cfp = event.data["value"]
-            product = cfp.product
-            for m in self.__interested_agents[product]:
-                if m.id != cfp.publisher:
-                    m.on_remove_cfp(copy.deepcopy(cfp))
+            self._cfp_index.remove(event.data["key"])
+            shared = None
+            for aid, m in list(self.__interested_agents[cfp.product].items()):
+                if aid != cfp.publisher:
+                    if shared is None:
+                        shared = FrozenCFP.of(cfp)
+                    m.on_remove_cfp(shared)
+
+    def _is_cfps_section(self, section) -> bool:
+        # the bulletin-board passes the section itself (not its name) when removing records
+        return section == "cfps" or section is self.bulletin_board.data.get(
+            "cfps", None
+        )
+
+    def query_cfps(self, query: Dict[str, Any]) -> Dict[str, CFP]:
+        """
+        Returns all CFPs on the bulletin-board satisfying the query (see `CFP.satisfies`)
+
+        Remarks:
+            - Uses the CFP index so only CFPs with matching products/publishers are tested.
+            - The returned CFPs are the ones on the bulletin-board (not copies).
+        """
+        return self._cfp_index.query(query)
 
     def contract_record(self, contract: Contract) -> Dict[str, Any]:
         c = {
@@ -13,11 +13,11 @@ from negmas import (
     NegotiatorMechanismInterface,
     RenegotiationRequest,
     make_issue,
-    make_os,
 )
 from negmas.helpers import get_full_type_name, instantiate
 from negmas.situated import Adapter
 
+from ..common import shared_outcome_space
 from ..oneshot.agent import OneShotAgent
 from ..oneshot.common import OneShotProfile, OneShotState
 from ..oneshot.mixins import OneShotUFunCreatorMixin
@@ -477,12 +477,18 @@ class AWIHelper:
 
     @property
     def current_input_outcome_space(self) -> DiscreteCartesianOutcomeSpace:
-        return make_os(self.current_input_issues) if self.current_input_issues else None
+        return (
+            shared_outcome_space(self.current_input_issues)
+            if self.current_input_issues
+            else None
+        )
 
     @property
     def current_output_outcome_space(self) -> DiscreteCartesianOutcomeSpace:
         return (
-            make_os(self.current_output_issues) if self.current_output_issues else None
+            shared_outcome_space(self.current_output_issues)
+            if self.current_output_issues
+            else None
         )
 
     @property
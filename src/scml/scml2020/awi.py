@@ -21,6 +21,7 @@ from .common import (
     FinancialReport,
     is_system_agent,
 )
+from .services.market import MarketStatistics
 
 __all__ = [
     "AWI",
@@ -516,6 +517,16 @@ class AWI(AgentWorldInterface):
             else None
         )
 
+    @property
+    def market_statistics(self) -> MarketStatistics:
+        """
+        Public market statistics (execution rates, exogenous contract shares and price forecasts) shared by all agents
+
+        Remarks:
+            - These statistics are computed once per step for the whole world. Do not modify any of the arrays returned.
+        """
+        return self._world.market_statistics
+
     @property
     def state(self) -> FactoryState:
         """Receives the factory state"""
@@ -524,12 +535,12 @@ class AWI(AgentWorldInterface):
     @property
     def current_balance(self):
         """Current balance of the agent"""
-        return self.state.balance
+        return self._world.a2f[self.agent.id].current_balance
 
     @property
     def current_inventory(self):
         """Current inventory of the agent"""
-        return self.state.inventory
+        return self._world.a2f[self.agent.id].current_inventory.copy()
 
     def reports_of_agent(self, aid: str) -> Dict[int, FinancialReport]:
         """Returns a dictionary mapping time-steps to financial reports of the given agent"""
@@ -543,7 +554,7 @@ class AWI(AgentWorldInterface):
         steps = sorted(
             int(i) for i in self.bb_query("reports_time", None, query_keys=True).keys()
         )
-        for (s, prev) in zip(steps[1:], steps[:-1]):
+        for s, prev in zip(steps[1:], steps[:-1]):
             if s > step:
                 return self.bb_read("reports_time", prev)
         return self.bb_read("reports_time", str(steps[-1]))
@@ -647,17 +658,17 @@ class AWI(AgentWorldInterface):
     @property
     def n_lines(self) -> int:
         """The number of lines in the corresponding factory. You can read `state` to get this among other information"""
-        return self.state.n_lines
+        return self._world.a2f[self.agent.id].profile.n_lines
 
     @property
     def n_products(self) -> int:
         """Number of products in the world"""
-        return self.state.n_products
+        return self._world.n_products
 
     @property
     def n_processes(self) -> int:
         """Number of processes in the world"""
-        return self.state.n_processes
+        return self._world.n_processes
 
     @property
     def is_first_level(self):
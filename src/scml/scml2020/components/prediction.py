@@ -10,6 +10,7 @@ __all__ = [
     "ExecutionRatePredictionStrategy",
     "FixedERPStrategy",
     "MeanERPStrategy",
+    "MarketERPStrategy",
     "MarketAwareTradePredictionStrategy",
 ]
 
@@ -288,21 +289,23 @@ class MarketAwareTradePredictionStrategy(TradePredictionStrategy):
         self.expected_inputs = adjust(self.expected_inputs, False)
 
     def __update(self):
-        if self.awi.settings.get("public_exogenous_summary", False):
-            exogenous = self.awi.exogenous_contract_summary
+        # shares of exogenous contracts and price forecasts are computed once per step for all agents
+        market = self.awi.market_statistics
+        s = self.awi.current_step
+        if market.exogenous_supply is not None:
             horizon = self.awi.settings.get("horizon", 1)
-            a, b = self.awi.current_step, self.awi.current_step + horizon
-            self.expected_inputs[a:b] = (
-                exogenous[self.awi.my_input_product, a:b, 0] / self._n_competitors
-            )
-            self.expected_outputs[a:b] = (
-                exogenous[self.awi.my_output_product, a:b, 0] / self._n_competitors
-            )
-
-        if self.awi.settings.get("public_trading_prices", False):
-            s = self.awi.current_step
-            self.input_cost[s:] = self.awi.trading_prices[self.awi.my_input_product]
-            self.output_price[s:] = self.awi.trading_prices[self.awi.my_output_product]
+            a, b = s, s + horizon
+            self.expected_inputs[a:b] = market.exogenous_supply[
+                self.awi.my_input_product, a:b
+            ]
+            self.expected_outputs[a:b] = market.exogenous_demand[
+                self.awi.my_output_product, a:b
+            ]
+
+        forecast = market.price_forecast
+        if forecast is not None:
+            self.input_cost[s:] = forecast[self.awi.my_input_product, s:]
+            self.output_price[s:] = forecast[self.awi.my_output_product, s:]
 
     def trade_prediction_step(self):
         super().trade_prediction_step()
@@ -436,3 +439,26 @@ class MeanERPStrategy(ExecutionRatePredictionStrategy):
         self._execution_fraction = (
             self._execution_fraction * old_total + q
         ) / self._total_quantity
+
+
+class MarketERPStrategy(ExecutionRatePredictionStrategy):
+    """
+    Predicts that the execution fraction of any contract is the fraction of the quantity of all contracts on its
+    product that was executed in the market so far
+
+    Provides:
+        - `predict_quantity` : A method for predicting the quantity that will actually be executed from a contract
+
+    Requires:
+        - `awi.market_statistics` : The market statistics shared by all agents in the world
+
+    Remarks:
+        - Execution rates are computed once for the whole world by `MarketStatistics` so this component keeps no state
+          and does not hook into any contract callbacks. Use `MeanERPStrategy` for per-agent execution rates.
+    """
+
+    def predict_quantity(self, contract: Contract):
+        return (
+            contract.agreement["quantity"]
+            * self.awi.market_statistics.execution_rates[contract.annotation["product"]]
+        )
@@ -19,6 +19,13 @@ __all__ = [
 ]
 
 
+def _prefix_sums(x: np.ndarray) -> np.ndarray:
+    """Returns prefix sums of x so that `x[a:b].sum() == sums[b] - sums[a]` for `0 <= a <= b <= len(x)`"""
+    sums = np.zeros(len(x) + 1, dtype=x.dtype)
+    np.cumsum(x, out=sums[1:])
+    return sums
+
+
 class TradingStrategy:
     """Base class for all trading strategies.
 
@@ -367,6 +374,17 @@ class PredictionBasedTradingStrategy(
         )
         sold, bought = 0, 0
         s = self.awi.current_step
+        # secured and needed quantities do not change while signing so range sums are read from prefix sums
+        sums = {
+            True: (
+                _prefix_sums(self.outputs_secured),
+                _prefix_sums(self.outputs_needed),
+            ),
+            False: (
+                _prefix_sums(self.inputs_secured),
+                _prefix_sums(self.inputs_needed),
+            ),
+        }
         for contract, indx in contracts:
             is_seller = contract.annotation["seller"] == self.id
             q, u, t = (
@@ -387,12 +405,11 @@ class PredictionBasedTradingStrategy(
             #     continue
             if is_seller:
                 trange = (s, t - 1)
-                secured, needed = (self.outputs_secured, self.outputs_needed)
                 taken = sold
             else:
                 trange = (t + 1, self.awi.n_steps - 1)
-                secured, needed = (self.inputs_secured, self.inputs_needed)
                 taken = bought
+            secured, needed = sums[is_seller]
 
             # check that I can produce the required quantities even in principle
             steps, _ = self.awi.available_for_production(
@@ -401,9 +418,10 @@ class PredictionBasedTradingStrategy(
             if len(steps) - taken < q:
                 continue
 
+            first, last = trange[0], max(trange[0], trange[1] + 1)
             if (
-                secured[trange[0] : trange[1] + 1].sum() + q + taken
-                <= needed[trange[0] : trange[1] + 1].sum()
+                secured[last] - secured[first] + q + taken
+                <= needed[last] - needed[first]
             ):
                 signatures[indx] = self.id
                 if is_seller:
@@ -1,8 +1,10 @@
 """Implements the world class for the SCML2020 world """
 import copy
-from typing import List, Optional, Tuple, Union
+from collections import defaultdict
+from typing import Dict, Iterator, List, Optional, Tuple, Union
 
 import numpy as np
+from negmas import Contract
 
 from .common import (
     ANY_LINE,
@@ -97,6 +99,61 @@ class Factory:
         """SCML2020Agent names used for logging purposes"""
         self.contracts: List[List[ContractInfo]] = [[] for _ in range(world.n_steps)]
         """A list of lists of contracts per time-step (len == n_steps)"""
+        self.open_contracts: Dict[int, Dict[str, ContractInfo]] = defaultdict(dict)
+        """Contracts that are neither executed nor nullified indexed by delivery step then contract ID"""
+        self.open_contracts_with: Dict[str, Dict[str, ContractInfo]] = defaultdict(
+            dict
+        )
+        """Contracts that are neither executed nor nullified indexed by partner ID then contract ID"""
+
+    def add_contract(self, info: ContractInfo) -> None:
+        """Registers a signed contract of this factory"""
+        t = info.contract.agreement["time"]
+        self.contracts[t].append(info)
+        self.open_contracts[t][info.contract.id] = info
+        self.open_contracts_with[info.partner][info.contract.id] = info
+
+    def close_contract(self, contract: Contract) -> None:
+        """Removes a contract from the open contracts (after it is executed or nullified)"""
+        t = contract.agreement["time"]
+        at_step = self.open_contracts.get(t, None)
+        if not at_step:
+            return
+        info = at_step.pop(contract.id, None)
+        if info is None:
+            return
+        if not at_step:
+            del self.open_contracts[t]
+        with_partner = self.open_contracts_with[info.partner]
+        with_partner.pop(contract.id, None)
+        if not with_partner:
+            del self.open_contracts_with[info.partner]
+
+    def close_contracts_at(self, step: int) -> None:
+        """Removes all contracts to be executed at the given step from the open contracts"""
+        for cid, info in self.open_contracts.pop(step, dict()).items():
+            with_partner = self.open_contracts_with[info.partner]
+            with_partner.pop(cid, None)
+            if not with_partner:
+                del self.open_contracts_with[info.partner]
+
+    def close_all_contracts(self) -> None:
+        """Removes all open contracts of this factory from its index and the indices of its partners"""
+        for partner in self.open_contracts_with.keys():
+            partner_factory = self.world.a2f.get(partner, None)
+            if partner_factory is None:
+                continue
+            for info in list(
+                partner_factory.open_contracts_with.get(self.agent_id, dict()).values()
+            ):
+                partner_factory.close_contract(info.contract)
+        self.open_contracts = defaultdict(dict)
+        self.open_contracts_with = defaultdict(dict)
+
+    def future_open_contracts(self, step: int) -> Iterator[ContractInfo]:
+        """Open contracts to be executed at the given step or later in delivery time order"""
+        for t in sorted(_ for _ in self.open_contracts.keys() if _ >= step):
+            yield from list(self.open_contracts[t].values())
 
     @property
     def state(self) -> FactoryState:
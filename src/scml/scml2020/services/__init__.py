@@ -4,5 +4,6 @@ override any methods of the SCML2020Agent class.
 """
 from .simulators import *
 from .controllers import *
+from .market import *
 
-__all__ = simulators.__all__ + controllers.__all__
+__all__ = simulators.__all__ + controllers.__all__ + market.__all__
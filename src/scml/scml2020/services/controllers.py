@@ -28,6 +28,7 @@ from negmas.sao import (
 )
 from negmas.sao.negotiators.controlled import ControlledSAONegotiator
 
+from scml.common import shared_outcomes
 from scml.scml2020.common import QUANTITY, TIME, UNIT_PRICE
 
 __all__ = ["StepController", "SyncController"]
@@ -405,7 +406,7 @@ class SyncController(SAOSyncController):
         negotiator = self.negotiators[nid][0]
         if negotiator.nmi is None:
             return None, -1000
-        outcomes = negotiator.nmi.discrete_outcomes()
+        outcomes = shared_outcomes(negotiator.nmi.issues)
         utils = np.array(
             [
                 self.utility(_, negotiator.nmi.issues[UNIT_PRICE].max_value)
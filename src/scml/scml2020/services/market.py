@@ -0,0 +1,125 @@
+"""Market statistics shared by all agents in a world"""
+from typing import TYPE_CHECKING, Optional, Tuple
+
+import numpy as np
+
+if TYPE_CHECKING:
+    from ..world import SCML2020World
+
+__all__ = ["MarketStatistics"]
+
+
+class MarketStatistics:
+    """
+    Public market statistics computed once per step for the whole world and shared by all agents.
+
+    Args:
+        world: The world to collect statistics for
+        trend_window: Number of past steps used to estimate the trend of trading prices
+        trend_damping: Damping factor (between zero and one) applied to the trend for every step ahead in the price
+                       forecast
+
+    Remarks:
+
+        - Agents access this object through `AWI.market_statistics` . All arrays returned are shared by all agents and
+          must not be modified.
+        - Statistics are recomputed lazily using array operations on data the world already keeps. Execution rates are
+          recomputed whenever the due or executed quantities of the current step change and price forecasts at most
+          once per step. Information that is not public in the world (exogenous contract summaries or trading prices)
+          is returned as None.
+
+    """
+
+    def __init__(
+        self,
+        world: "SCML2020World",
+        trend_window: int = 5,
+        trend_damping: float = 0.9,
+    ):
+        self._world = world
+        self.trend_window = trend_window
+        self.trend_damping = trend_damping
+        self._version: Optional[Tuple[int, int, int]] = None
+        self._forecast_step: Optional[int] = None
+        self._execution_rates = np.ones(world.n_products)
+        self._price_forecast: Optional[np.ndarray] = None
+        self._exogenous_supply: Optional[np.ndarray] = None
+        self._exogenous_demand: Optional[np.ndarray] = None
+        summary = world.exogenous_contracts_summary
+        if world.publish_exogenous_summary and summary is not None:
+            n_consumers = np.array([max(1, len(_)) for _ in world.consumers])
+            n_suppliers = np.array([max(1, len(_)) for _ in world.suppliers])
+            self._exogenous_supply = summary[:, :, 0] / n_consumers.reshape((-1, 1))
+            self._exogenous_demand = summary[:, :, 0] / n_suppliers.reshape((-1, 1))
+
+    def _update(self) -> None:
+        world = self._world
+        s = min(world.current_step, world.n_steps - 1)
+        version = (
+            s,
+            int(world._due_quantity[:, s].sum()),
+            int(world._sold_quantity[:, s + 1].sum()),
+        )
+        if version == self._version:
+            return
+        self._version = version
+        due = world._due_quantity[:, : s + 1].sum(axis=1)
+        executed = world._sold_quantity[:, : s + 2].sum(axis=1)
+        self._execution_rates = np.ones(world.n_products)
+        np.divide(executed, due, out=self._execution_rates, where=due > 0)
+
+    def _update_forecast(self) -> None:
+        world = self._world
+        if world.current_step == self._forecast_step:
+            return
+        self._forecast_step = world.current_step
+        s = min(world.current_step, world.n_steps - 1)
+        if not world.publish_trading_prices:
+            self._price_forecast = None
+            return
+        # column t + 1 of the world's trading prices is the trading price at step t (column 0 is the catalog price)
+        history = world._trading_price[:, : s + 2]
+        w = min(self.trend_window, s + 1)
+        slope = (
+            (history[:, -1] - history[:, -1 - w]) / w
+            if w > 0
+            else np.zeros(world.n_products)
+        )
+        ahead = np.arange(1, world.n_steps - s)
+        damping = np.cumsum(self.trend_damping**ahead)
+        forecast = np.empty((world.n_products, world.n_steps))
+        forecast[:, : s + 1] = history[:, 1:]
+        forecast[:, s + 1 :] = history[:, -1:] + slope.reshape((-1, 1)) * damping
+        self._price_forecast = np.maximum(forecast, 0.0)
+
+    @property
+    def execution_rates(self) -> np.ndarray:
+        """The fraction of the quantity of all contracts due so far that was actually executed for every product"""
+        self._update()
+        return self._execution_rates
+
+    @property
+    def price_forecast(self) -> Optional[np.ndarray]:
+        """An n_products * n_steps array with the unit price of every product at every step (or None if trading prices
+        are not public).
+
+        Past steps and the current step get the trading prices the world published at the time. Future steps
+        extrapolate the trend of the last `trend_window` trading prices, damping it by `trend_damping` for every
+        step ahead and never going below zero.
+        """
+        self._update_forecast()
+        return self._price_forecast
+
+    @property
+    def exogenous_supply(self) -> Optional[np.ndarray]:
+        """An n_products * n_steps array giving the quantity of exogenous contracts of every product at every step
+        divided by the number of its consumers (or None if the exogenous contract summary is not public)
+        """
+        return self._exogenous_supply
+
+    @property
+    def exogenous_demand(self) -> Optional[np.ndarray]:
+        """An n_products * n_steps array giving the quantity of exogenous contracts of every product at every step
+        divided by the number of its suppliers (or None if the exogenous contract summary is not public)
+        """
+        return self._exogenous_demand
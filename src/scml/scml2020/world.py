@@ -42,14 +42,18 @@ from negmas.situated import (
 from scml.scml2019.utils import _realin
 
 from ..common import (
+    _generate_many,
     distribute_quantities,
     fraction_cut,
     integer_cut,
     intin,
     make_array,
     realin,
+    vectorized_fraction_cut,
+    vectorized_integer_cut,
 )
 from ..oneshot.agent import OneShotAgent
+from ..sinks import ContractSink, ContractSinkStatsMixin
 from .agent import OneShotAdapter, SCML2020Agent, _SystemAgent
 from .awi import AWI
 from .common import (
@@ -66,6 +70,7 @@ from .common import (
     is_system_agent,
 )
 from .factory import Factory
+from .services.market import MarketStatistics
 
 __all__ = [
     "SCML2020World",
@@ -110,7 +115,20 @@ ContractRecord = namedtuple(
 """A record of a contract using during world generation"""
 
 
-class SCML2020World(TimeInAgreementMixin, World):
+def _grouped_cumsum(keys: np.ndarray, values: np.ndarray) -> np.ndarray:
+    """Cumulative sum of values restarted for every distinct key (keeping the original order)"""
+    order = np.argsort(keys, kind="stable")
+    sorted_keys, sorted_values = keys[order], np.cumsum(values[order])
+    starts = np.ones(len(keys), dtype=bool)
+    starts[1:] = sorted_keys[1:] != sorted_keys[:-1]
+    offsets = np.maximum.accumulate(np.where(starts, np.arange(len(keys)), 0))
+    before = np.concatenate(([0], sorted_values[:-1]))
+    result = np.empty_like(sorted_values)
+    result[order] = sorted_values - before[offsets]
+    return result
+
+
+class SCML2020World(ContractSinkStatsMixin, TimeInAgreementMixin, World):
     """A Supply Chain SCML2020World simulation as described for the SCML league of ANAC @ IJCAI 2020.
 
     Args:
@@ -181,6 +199,12 @@ class SCML2020World(TimeInAgreementMixin, World):
         negotiation_speed: The number of negotiation steps that pass in every simulation step. If 0, negotiations
                            will be guaranteed to finish within a single simulation step
         signing_delay: The number of simulation steps to pass between a contract is concluded and signed
+        batch_contract_execution: If true, contracts that cannot be breached given the inventory and balance of their
+                                  partners are executed together using array operations and only contracts that may
+                                  be breached are executed one by one. This leads to exactly the same breaches,
+                                  balances and trading prices as executing all contracts one by one. Contracts are
+                                  still executed (and reported to agents) when negmas executes them but agents may
+                                  see the effects of contracts executed in the same batch in their callbacks.
         name: The name of the simulations
         **kwargs: Other parameters that are passed directly to `SCML2020World` constructor.
 
@@ -245,6 +269,7 @@ class SCML2020World(TimeInAgreementMixin, World):
         signing_delay=0,
         force_signing=False,
         batch_signing=True,
+        batch_contract_execution=False,
         name: str = None,
         # public information
         publish_exogenous_summary=True,
@@ -276,6 +301,11 @@ class SCML2020World(TimeInAgreementMixin, World):
         self.inventory_valuation_trading = inventory_valuation_trading
         self.inventory_valuation_catalog = inventory_valuation_catalog
         self.n_concurrent_negs_between_partners = n_concurrent_negs_between_partners
+        self.batch_contract_execution = batch_contract_execution
+        self._batch_execution_results: dict[str, set[Breach] | None] = dict()
+        self._batch_executed: dict[str, Contract] = dict()
+        self._batch_contracts: list[Contract] = []
+        self._batch_index: dict[str, int] = dict()
         kwargs["log_to_file"] = not no_logs
         if compact:
             kwargs["event_file_name"] = None
@@ -431,6 +461,7 @@ class SCML2020World(TimeInAgreementMixin, World):
             neg_step_time_limit=neg_step_time_limit,
             negotiation_speed=negotiation_speed,
             signing_delay=signing_delay,
+            batch_contract_execution=batch_contract_execution,
             agent_name_reveals_position=agent_name_reveals_position,
             agent_name_reveals_type=agent_name_reveals_type,
             publish_exogenous_summary=publish_exogenous_summary,
@@ -608,7 +639,9 @@ class SCML2020World(TimeInAgreementMixin, World):
         ]
         self.a2f = dict(zip((_.id for _ in agents), self.factories))
         self.afp = list(zip(agents, self.factories, profiles))
-        self.f2i = self.a2i = dict(zip((_.id for _ in agents), range(n_agents)))
+        self.a2i = dict(zip((_.id for _ in agents), range(n_agents)))
+        # indices of all factories in i2f (the same as a2i plus the system agents whose factories come last)
+        self.f2i = dict(zip((_.id for _ in agents), range(len(self.factories))))
         self.i2a = agents
         self.i2f = self.factories
 
@@ -742,6 +775,9 @@ class SCML2020World(TimeInAgreementMixin, World):
         self._traded_quantity = np.ones(n_products) * self.catalog_quantities
         self._real_price = np.nan * np.ones((n_products, n_steps + 1))
         self._sold_quantity = np.zeros((n_products, n_steps + 1), dtype=int)
+        # _due_quantity is the quantity of all contracts up for execution per product per step
+        self._due_quantity = np.zeros((n_products, n_steps), dtype=int)
+        self._sold_value = np.zeros((n_products, n_steps + 1), dtype=np.int64)
         # self._real_price[0, :] = self.catalog_prices[0]
         # self._real_price[-1, :] = self.catalog_prices[-1]
         self._real_price[:, 0] = self.catalog_prices
@@ -785,6 +821,9 @@ class SCML2020World(TimeInAgreementMixin, World):
                     value=self.exogenous_contracts_summary,
                     key=s,
                 )
+        self.market_statistics = MarketStatistics(self)
+        # set by `scml.sinks.ContractSink` when contract records are streamed out of the world
+        self.contract_sink: ContractSink | None = None
 
         self.info.update(
             dict(
@@ -847,6 +886,7 @@ class SCML2020World(TimeInAgreementMixin, World):
         exogenous_supply_surplus: tuple[float, float] | float = 0.0,
         exogenous_sales_surplus: tuple[float, float] | float = 0.0,
         run_extra_checks: bool = True,
+        vectorized: bool = False,
         **kwargs,
     ) -> dict[str, Any]:
         """
@@ -904,6 +944,9 @@ class SCML2020World(TimeInAgreementMixin, World):
             run_extra_checks: If given, the world generation method will check
                               whether the genrated world "makes sense" given its
                               internal criteria. May slow down world generation
+            vectorized: If given, quantities, splits and prices are sampled using array operations instead of
+                        distributing items one by one. The generated worlds are statistically equivalent to the
+                        ones generated otherwise but the same random seed will not lead to the same world.
             **kwargs:
 
         Returns:
@@ -971,7 +1014,9 @@ class SCML2020World(TimeInAgreementMixin, World):
             else "unknown",
             exogenous_supply_surplus=exogenous_supply_surplus,
             exogenous_sales_surplus=exogenous_sales_surplus,
+            vectorized=vectorized,
         )
+        cut = vectorized_integer_cut if vectorized else integer_cut
         exogenous_supply_surplus = realin(exogenous_supply_surplus)
         exogenous_sales_surplus = realin(exogenous_sales_surplus)
         inventory_valuation_trading = realin(inventory_valuation_trading)
@@ -1091,6 +1136,7 @@ class SCML2020World(TimeInAgreementMixin, World):
                 first_quantities,
                 n_agents_per_process[0],
                 n_steps,
+                vectorized=vectorized,
             )
             exogenous_supplies = np.asarray(exogenous_supplies)
 
@@ -1144,6 +1190,7 @@ class SCML2020World(TimeInAgreementMixin, World):
             profit_stddevs_agent=profit_stddevs_agent,
             profit_means_agent=profit_means_agent,
             run_extra_checks=run_extra_checks,
+            vectorized=vectorized,
         )
 
         generated, n_trials = False, 0
@@ -1187,7 +1234,7 @@ class SCML2020World(TimeInAgreementMixin, World):
                 unit_price = random.randint(
                     int(unit_price * 0.8), int(unit_price * 1.2)
                 )
-                for step, quantity in enumerate(integer_cut(q, n_steps, 0)):
+                for step, quantity in enumerate(cut(q, n_steps, 0)):
                     exogenous.append(
                         ExogenousContract(
                             product=process + 1 if is_sale else process,
@@ -1242,6 +1289,41 @@ class SCML2020World(TimeInAgreementMixin, World):
             **kwargs,
         )
 
+    @classmethod
+    def generate_many(
+        cls,
+        n_configs: int,
+        *args,
+        n_jobs: int = 1,
+        seed: int | None = None,
+        **kwargs,
+    ) -> list[dict[str, Any]]:
+        """
+        Generates the configurations of several worlds in one call
+
+        Args:
+            n_configs: Number of world configurations to generate
+            *args: Positional arguments passed to `generate`
+            n_jobs: Number of processes to use. If 1, all configurations are generated in
+                    the current process. Negative values follow the convention of `joblib`
+                    (i.e. -1 means using all cores)
+            seed: Used to derive the seed of every configuration. If not given, seeds are
+                  drawn from the `random` module
+            **kwargs: Keyword arguments passed to `generate`. `vectorized` is True unless
+                      explicitly passed as False
+
+        Returns:
+            A list of `n_configs` world configurations. A world can be generated from each of
+            them by calling `cls(**config)`
+
+        Remarks:
+            - Both `random` and `np.random` are seeded with the seed of each configuration
+              before generating it so the same seed leads to the same configurations
+              independent of `n_jobs`.
+        """
+        kwargs["vectorized"] = kwargs.get("vectorized", True)
+        return _generate_many(cls, n_configs, args, kwargs, n_jobs=n_jobs, seed=seed)
+
     @classmethod
     def generate_guaranteed_profit(
         cls,
@@ -1272,6 +1354,7 @@ class SCML2020World(TimeInAgreementMixin, World):
         inventory_valuation_trading: float = 0.5,
         inventory_valuation_catalog: float = 0.0,
         run_extra_checks=True,
+        vectorized: bool = False,
     ) -> tuple[
         list[ExogenousContract],
         list[int],
@@ -1283,6 +1366,7 @@ class SCML2020World(TimeInAgreementMixin, World):
         Generates prices, contracts and profiles ensuring that all agents can
         profit and returning a set of explict contracts that can achieve this profit
         """
+        cut = vectorized_integer_cut if vectorized else integer_cut
         n_processes = len(first_agent)
         n_agents = len(process_of_agent)
         n_products = n_processes + 1
@@ -1358,26 +1442,38 @@ class SCML2020World(TimeInAgreementMixin, World):
             production_start = product
             if run_extra_checks:
                 assert supplies[first_seller:last_seller, :production_start].sum() == 0
-            for s in range(production_start, production_limit):
-                n = production_limit - s
-                not_produced = 0
-                for i in range(first_seller, last_seller):
-                    if supplies[i, s] < 1:
-                        continue
+            if vectorized:
+                # produce everything as early as possible for all sellers together
+                waiting = np.zeros(last_seller - first_seller, dtype=np.int64)
+                for s in range(production_start, production_limit):
+                    waiting += supplies[first_seller:last_seller, s]
+                    produced = np.minimum(
+                        n_lines - active_lines[first_seller:last_seller, s], waiting
+                    )
+                    active_lines[first_seller:last_seller, s] += produced
+                    waiting -= produced
+            else:
+                for s in range(production_start, production_limit):
+                    n = production_limit - s
+                    not_produced = 0
+                    for i in range(first_seller, last_seller):
+                        if supplies[i, s] < 1:
+                            continue
 
-                    to_produce, not_produced = supplies[i, s] + not_produced, 0
-                    for k in range(s, production_limit):
-                        can_use = min(
-                            n_lines - active_lines[i, k],
-                            supplies[i, : k + 1].sum() - active_lines[i, : k + 1].sum(),
-                            to_produce,
-                        )
-                        active_lines[i, k] += can_use
-                        to_produce -= can_use
-                        if to_produce <= 0:
-                            break
-                    else:
-                        not_produced = to_produce
+                        to_produce, not_produced = supplies[i, s] + not_produced, 0
+                        for k in range(s, production_limit):
+                            can_use = min(
+                                n_lines - active_lines[i, k],
+                                supplies[i, : k + 1].sum()
+                                - active_lines[i, : k + 1].sum(),
+                                to_produce,
+                            )
+                            active_lines[i, k] += can_use
+                            to_produce -= can_use
+                            if to_produce <= 0:
+                                break
+                        else:
+                            not_produced = to_produce
 
             # distribute sales
 
@@ -1385,6 +1481,51 @@ class SCML2020World(TimeInAgreementMixin, World):
             distribution_limit = production_limit + production_time
             distribution_start = production_start + production_time
 
+            def distribute_step_sales(
+                s, p1, first_seller, last_seller, first_buyer, last_buyer
+            ):
+                """Distributes the production of all sellers at step s in one go"""
+                beg = min(production_time + s, distribution_limit)
+                if min(beg + 1, distribution_limit) <= beg:
+                    return []
+                lines = active_lines[first_seller:last_seller, s]
+                selling = np.flatnonzero(lines >= 1)
+                if len(selling) < 1:
+                    return []
+                sellers = selling + first_seller
+                d = np.stack([vectorized_fraction_cut(lines[_], p1) for _ in selling])
+                unit_prices = np.maximum(
+                    1,
+                    np.ceil(
+                        (
+                            total_costs[sellers, s] / lines[selling]
+                            + production_costs[sellers]
+                        )
+                        * (1 + agent_profits[sellers])
+                    ).astype(int),
+                )
+                sold = d.sum(axis=1)
+                sales[sellers, beg] += sold
+                revenue[sellers, beg] += unit_prices * sold
+                if not final:
+                    supplies[first_buyer:last_buyer, beg] += d.sum(axis=0)
+                    total_costs[first_buyer:last_buyer, beg] += (
+                        unit_prices.reshape((len(selling), 1)) * d
+                    ).sum(axis=0)
+                return [
+                    ContractRecord(
+                        product + 1,
+                        s if not final else beg - horizon,
+                        beg,
+                        int(sellers[i]),
+                        int(j) + first_buyer if not final else -1,
+                        int(d[i, j]),
+                        int(unit_prices[i]),
+                        final,
+                    )
+                    for i, j in zip(*np.nonzero(d))
+                ]
+
             # this loop is for selling production so it goes on the production
             # rather than distribution limits
             for s in range(production_start, production_limit):
@@ -1410,6 +1551,11 @@ class SCML2020World(TimeInAgreementMixin, World):
                         p1 = np.ones_like(p1) / len(p1)
                     else:
                         p1 = p1 / p1.sum()
+                if vectorized:
+                    simulated += distribute_step_sales(
+                        s, p1, first_seller, last_seller, first_buyer, last_buyer
+                    )
+                    continue
                 for i in range(first_seller, last_seller):
                     beg = min(production_time + s, distribution_limit)
                     end = min(beg + 1, distribution_limit)
@@ -1620,7 +1766,7 @@ class SCML2020World(TimeInAgreementMixin, World):
                 )
             else:
                 n_contracts = int(1 + exogenous_control * (c.quantity - 1))
-                per_contract = integer_cut(c.quantity, n_contracts, 0)
+                per_contract = cut(c.quantity, n_contracts, 0)
                 for q in per_contract:
                     if q == 0:
                         continue
@@ -1649,55 +1795,73 @@ class SCML2020World(TimeInAgreementMixin, World):
                 + inventory_valuation_catalog,
             ):
                 n_agents, n_steps = active_lines.shape
-                balances = initial_balance[:].copy()
-                contracts = defaultdict(list)
-                inventory = np.zeros((n_agents, n_products), dtype=int)
-
-                for c in all_contracts:
-                    contracts[c.time].append(c)
-
-                def _check(s):
+                contracts = [_ for _ in all_contracts if 0 <= _.time < n_steps]
+                times = np.asarray([_.time for _ in contracts], dtype=int)
+                products = np.asarray([_.product for _ in contracts], dtype=int)
+                sellers = np.asarray([_.seller for _ in contracts], dtype=int)
+                buyers = np.asarray([_.buyer for _ in contracts], dtype=int)
+                quantities = np.asarray([_.quantity for _ in contracts], dtype=np.int64)
+                totals = quantities * np.asarray(
+                    [_.unit_price for _ in contracts], dtype=np.int64
+                )
+                # changes in balance and inventory due to contracts at every step
+                money = np.zeros((n_agents, n_steps), dtype=np.int64)
+                stock = np.zeros((n_agents, n_products, n_steps), dtype=np.int64)
+                s_, b_ = sellers >= 0, buyers >= 0
+                np.add.at(money, (sellers[s_], times[s_]), totals[s_])
+                np.add.at(money, (buyers[b_], times[b_]), -totals[b_])
+                np.add.at(
+                    stock, (sellers[s_], products[s_], times[s_]), -quantities[s_]
+                )
+                np.add.at(stock, (buyers[b_], products[b_], times[b_]), quantities[b_])
+                # changes in balance and inventory due to production at every step
+                agents = np.arange(n_agents)
+                production_money = -active_lines * production_costs.reshape(
+                    (n_agents, 1)
+                )
+                production_stock = np.zeros(
+                    (n_agents, n_products, n_steps), dtype=np.int64
+                )
+                production_stock[agents, process_of_agent, :] -= active_lines
+                production_stock[agents, process_of_agent + 1, :] += active_lines
+
+                # state just after contract execution and just after production
+                produced_money = np.cumsum(production_money, axis=-1)
+                produced_stock = np.cumsum(production_stock, axis=-1)
+                balances_after_contracts = initial_balance.reshape(
+                    (n_agents, 1)
+                ) + np.cumsum(money, axis=-1)
+                inventory_after_contracts = np.cumsum(stock, axis=-1)
+                balances_after_contracts[:, 1:] += produced_money[:, :-1]
+                inventory_after_contracts[:, :, 1:] += produced_stock[:, :, :-1]
+                balances = balances_after_contracts + production_money
+                inventory = inventory_after_contracts + production_stock
+
+                for b, i, when in (
+                    (
+                        balances_after_contracts,
+                        inventory_after_contracts,
+                        "contract execution",
+                    ),
+                    (balances, inventory, "production"),
+                ):
                     assert (
-                        balances.min() >= 0
-                    ), f"Contract Simulation Issue: Some agents went bankrupt at step {s}!!\n{balances}\nSupplies:\n{supplies}\nActive:\n{active_lines}\nSales:\n{sales}"
+                        initial_balance.min() >= 0 and b.min() >= 0
+                    ), f"Contract Simulation Issue: Some agents went bankrupt after {when} at steps {np.nonzero(b.min(axis=0) < 0)[0]}!!\n{b}\nSupplies:\n{supplies}\nActive:\n{active_lines}\nSales:\n{sales}"
                     assert (
-                        inventory.min() >= 0
-                    ), f"Contract Simulation Issue: Some agents has negative inventory at step {s}!!\nInventory:{inventory}\nSupplies:\n{supplies}\nActive:\n{active_lines}\nSales:\n{sales}"
+                        i.min() >= 0
+                    ), f"Contract Simulation Issue: Some agents has negative inventory after {when} at steps {np.nonzero(i.min(axis=(0, 1)) < 0)[0]}!!\nInventory:{i}\nSupplies:\n{supplies}\nActive:\n{active_lines}\nSales:\n{sales}"
+                available = inventory_after_contracts[agents, process_of_agent, :]
+                assert np.all(
+                    active_lines <= available
+                ), f"Some agents should produce more than the items they have of their input product at steps {np.nonzero((active_lines > available).any(axis=0))[0]}"
 
-                for s in range(n_steps):
-                    _check(s)
-                    cs = contracts[s]
-                    if not cs:
-                        continue
-                    cs = sorted(cs, key=lambda c: c.product)
-                    for c in cs:
-                        if c.seller >= 0:
-                            inventory[c.seller, c.product] -= c.quantity
-                            balances[c.seller] += c.quantity * c.unit_price
-                        if c.buyer >= 0:
-                            inventory[c.buyer, c.product] += c.quantity
-                            balances[c.buyer] -= c.quantity * c.unit_price
-                    _check(s)
-                    for a in range(n_agents):
-                        p = process_of_agent[a]
-                        q = inventory[a, p]
-                        produced = active_lines[a, s]
-                        assert (
-                            produced <= q
-                        ), f"Agent {a} (level {p}) should produce {produced} at step {s} but only have {q} items of product {p}"
-                        if not produced:
-                            continue
-                        inventory[a, p + 1] += produced
-                        inventory[a, p] -= produced
-                        balances[a] -= produced * production_costs[a]
-
-                assets = catalog_valuation * (inventory * catalog_prices)
+                assets = catalog_valuation * (inventory[:, :, -1] * catalog_prices)
 
                 profit = (
-                    balances + assets.sum(axis=1) - initial_balance
+                    balances[:, -1] + assets.sum(axis=1) - initial_balance
                 ) / initial_balance
 
-                _check(n_steps)
                 assert (
                     profit.min() > 0
                 ), f"Contract Simulation Issue: Some agents lost!!\n{profit}"
@@ -1751,6 +1915,7 @@ class SCML2020World(TimeInAgreementMixin, World):
         inventory_valuation_trading: float = 0.5,
         inventory_valuation_catalog: float = 0.0,
         run_extra_checks: bool = True,
+        vectorized: bool = False,
     ) -> tuple[
         list[ExogenousContract],
         list[int],
@@ -1762,6 +1927,7 @@ class SCML2020World(TimeInAgreementMixin, World):
         Generates the prices, contracts and profiles ensuring there is some
         possibility of profit in the market
         """
+        cut = vectorized_integer_cut if vectorized else integer_cut
         n_processes = len(first_agent)
         n_agents = len(process_of_agent)
         n_products = n_processes + 1
@@ -1803,6 +1969,7 @@ class SCML2020World(TimeInAgreementMixin, World):
             quantities[-1],
             n_agents_per_process[-1],
             n_steps,
+            vectorized=vectorized,
         )
 
         # - now exogenous_supplies and exogenous_sales are both n_steps lists of n_agents_per_process[p] vectors (jagged)
@@ -1973,7 +2140,7 @@ class SCML2020World(TimeInAgreementMixin, World):
                     )
                 else:
                     n_contracts = int(1 + exogenous_control * (sale - 1))
-                    per_contract = integer_cut(sale, n_contracts, 0)
+                    per_contract = cut(sale, n_contracts, 0)
                     for q in per_contract:
                         if q == 0:
                             continue
@@ -2007,7 +2174,7 @@ class SCML2020World(TimeInAgreementMixin, World):
                     )
                 else:
                     n_contracts = int(1 + exogenous_control * (supply - 1))
-                    per_contract = integer_cut(supply, n_contracts, 0)
+                    per_contract = cut(supply, n_contracts, 0)
                     for q in per_contract:
                         if q == 0:
                             continue
@@ -2174,6 +2341,7 @@ class SCML2020World(TimeInAgreementMixin, World):
         # remove contracts saved in factories for this step
         for factory in self.factories:
             factory.contracts[self.current_step] = []
+            factory.close_contracts_at(self.current_step)
 
         # publish financial reports
         # -------------------------
@@ -2242,6 +2410,8 @@ class SCML2020World(TimeInAgreementMixin, World):
             )
 
     def post_step_stats(self):
+        if self._batch_execution_results:
+            self._record_unreported_batch_executions()
         self._stats["n_contracts_nullified_now"].append(self.__n_nullified)
         self._stats["n_bankrupt"].append(self.__n_bankrupt)
         market_size = 0
@@ -2343,7 +2513,227 @@ class SCML2020World(TimeInAgreementMixin, World):
     def order_contracts_for_execution(
         self, contracts: Collection[Contract]
     ) -> Collection[Contract]:
-        return sorted(contracts, key=lambda x: x.annotation["product"])
+        contracts = sorted(contracts, key=lambda x: x.annotation["product"])
+        self._batch_execution_results = dict()
+        signed = [_ for _ in contracts if _.signed_at >= 0]
+        if signed and self.current_step < self.n_steps:
+            np.add.at(
+                self._due_quantity[:, self.current_step],
+                np.fromiter(
+                    (_.annotation["product"] for _ in signed),
+                    dtype=int,
+                    count=len(signed),
+                ),
+                np.fromiter(
+                    (_.agreement["quantity"] for _ in signed),
+                    dtype=int,
+                    count=len(signed),
+                ),
+            )
+        if self.batch_contract_execution:
+            self._prepare_batch_execution(signed)
+        return contracts
+
+    def _prepare_batch_execution(self, contracts: list[Contract]) -> None:
+        """
+        Prepares the signed contracts of the current step (in execution order) for batch execution.
+
+        Remarks:
+            - Nothing is executed here. Contracts are executed by `start_contract_execution` when negmas asks for
+              them (See `_execute_run_in_batch`).
+        """
+        n = len(contracts)
+        self._batch_contracts = contracts
+        self._batch_index = {c.id: i for i, c in enumerate(contracts)}
+        self._batch_executed = dict()
+        self._batch_execution_results = dict()
+        if n == 0:
+            return
+        s = self.current_step
+        self._batch_products = np.fromiter(
+            (_.annotation["product"] for _ in contracts), dtype=int, count=n
+        )
+        self._batch_sellers = np.fromiter(
+            (self.f2i[_.annotation["seller"]] for _ in contracts), dtype=int, count=n
+        )
+        self._batch_buyers = np.fromiter(
+            (self.f2i[_.annotation["buyer"]] for _ in contracts), dtype=int, count=n
+        )
+        self._batch_quantities = np.fromiter(
+            (_.agreement["quantity"] for _ in contracts), dtype=np.int64, count=n
+        )
+        prices = np.fromiter(
+            (_.agreement["unit_price"] for _ in contracts), dtype=np.int64, count=n
+        )
+        times = np.fromiter(
+            (_.agreement["time"] for _ in contracts), dtype=int, count=n
+        )
+        self._batch_totals = self._batch_quantities * prices
+        self._batch_valid = (
+            (self._batch_quantities > 0)
+            & (prices > 0)
+            & (times == s)
+            & (self._batch_sellers != self._batch_buyers)
+        )
+
+    def _execute_run_in_batch(self, contract: Contract) -> bool:
+        """
+        Executes the contract together with the contracts following it that cannot be breached.
+
+        Args:
+            contract: The contract negmas is executing now.
+
+        Returns:
+            True if the contract was executed (its result and the results of the following contracts executed with
+            it are then in `_batch_execution_results`) and False if it may be breached and must be executed alone.
+
+        Remarks:
+            - A run of contracts for which every seller has enough of the product and every buyer has enough money
+              even ignoring what they receive within the run is executed together using array operations. These
+              contracts cannot be breached whatever their order.
+            - The state of all factories is read again at the beginning of every run. This guarantees that
+              breaches, balances and trading prices are the same as executing all contracts one by one.
+            - Contracts of a run other than the first are executed before negmas asks for them. Callbacks of
+              agents (e.g. `on_contract_executed`) of the first contract of a run see the state after the whole run.
+        """
+        first = self._batch_index.get(contract.id, None)
+        if first is None:
+            return False
+        contracts = self._batch_contracts
+        n = len(contracts)
+        bankrupt = np.fromiter(
+            (_.is_bankrupt for _ in self.factories),
+            dtype=bool,
+            count=len(self.factories),
+        )
+        inventory = np.stack([_._inventory for _ in self.factories])
+        balance = np.fromiter(
+            (_._balance for _ in self.factories),
+            dtype=float,
+            count=len(self.factories),
+        )
+        ps, ss = self._batch_products[first:], self._batch_sellers[first:]
+        bs = self._batch_buyers[first:]
+        qs, tots = self._batch_quantities[first:], self._batch_totals[first:]
+        skipped = np.fromiter(
+            (
+                _.nullified_at >= 0 or _.id in self._batch_executed
+                for _ in contracts[first:]
+            ),
+            dtype=bool,
+            count=n - first,
+        )
+        safe = self._batch_valid[first:] & ~skipped & ~bankrupt[ss] & ~bankrupt[bs]
+        safe &= inventory[ss, ps] - _grouped_cumsum(ss * self.n_products + ps, qs) >= 0
+        safe &= balance[bs] - _grouped_cumsum(bs, tots) >= max(0, self.bankruptcy_limit)
+        n_safe = len(safe) if safe.all() else int(np.argmin(safe))
+        if n_safe == 0:
+            return False
+        last = first + n_safe
+        self._execute_safe_contracts(
+            self._batch_products[first:last],
+            self._batch_sellers[first:last],
+            self._batch_buyers[first:last],
+            self._batch_quantities[first:last],
+            self._batch_totals[first:last],
+        )
+        for c in contracts[first:last]:
+            self._batch_execution_results[c.id] = set()
+            self._batch_executed[c.id] = c
+            self._close_contract(c)
+        return True
+
+    def _record_unreported_batch_executions(self) -> None:
+        """
+        Records contracts executed in a batch that negmas never asked for (e.g. when the step time limit is reached
+        while executing contracts) as executed.
+
+        Remarks:
+            - The records, counters, stats and graph edges of negmas are updated and agents are notified exactly as
+              negmas does for a contract executed without breaches.
+        """
+        results, self._batch_execution_results = self._batch_execution_results, dict()
+        for cid in results.keys():
+            contract = self._batch_executed[cid]
+            self.logwarning(
+                f"Contract {str(contract)} was executed in a batch but negmas stopped executing contracts before it"
+            )
+            for p in contract.partners:
+                self.contracts_executed[p] += 1
+            record = self._saved_contracts.get(cid, None)
+            if record is not None:
+                record.update(
+                    breaches="",
+                    executed_at=self.current_step,
+                    dropped_at=-1,
+                    nullified_at=-1,
+                    erred_at=-1,
+                )
+            self._add_edges(
+                contract.partners[0],
+                contract.partners,
+                self._edges_contracts_executed,
+                bi=True,
+            )
+            # counters of negmas that are added to the stats of this step once all of its stages are done
+            self._World__n_new_contract_executions += 1
+            self._World__activity_level += self.contract_size(contract)
+            for partner in contract.partners:
+                self.call(
+                    self.agents[partner],
+                    self.agents[partner].on_contract_executed,
+                    contract,
+                )
+            contract.executed_at = self.current_step
+
+    def _execute_safe_contracts(
+        self,
+        products: np.ndarray,
+        sellers: np.ndarray,
+        buyers: np.ndarray,
+        quantities: np.ndarray,
+        totals: np.ndarray,
+    ) -> None:
+        """Executes contracts that are known not to be breached.
+
+        Args:
+            products: The product of each contract
+            sellers: The index of the seller factory of each contract
+            buyers: The index of the buyer factory of each contract
+            quantities: The quantity of each contract
+            totals: The total price (quantity * unit price) of each contract
+
+        Remarks:
+            - The results are the same as calling `start_contract_execution`
+              on each contract in order.
+        """
+        s = self.current_step
+        n_factories = len(self.factories)
+        inventory_change = np.zeros((n_factories, self.n_products), dtype=int)
+        balance_change = np.zeros(n_factories, dtype=np.int64)
+        np.add.at(inventory_change, (sellers, products), -quantities)
+        np.add.at(inventory_change, (buyers, products), quantities)
+        np.add.at(balance_change, sellers, totals)
+        np.add.at(balance_change, buyers, -totals)
+        partners, n_contracts = np.unique(
+            np.concatenate((sellers, buyers)), return_counts=True
+        )
+        for i, k in zip(partners, n_contracts):
+            factory = self.factories[i]
+            factory._inventory += inventory_change[i]
+            factory.inventory_changes += inventory_change[i]
+            factory._balance += int(balance_change[i])
+            factory.balance_change += int(balance_change[i])
+            agent_id = factory.agent_id
+            for _ in range(k):
+                self.agent_n_contracts[agent_id] += 1
+                self.__register_contract(agent_id, 0)
+        np.add.at(self._sold_quantity[:, s + 1], products, quantities)
+        np.add.at(self._sold_value[:, s + 1], products, totals)
+        traded = np.unique(products)
+        self._real_price[traded, s + 1] = (
+            self._sold_value[traded, s + 1] / self._sold_quantity[traded, s + 1]
+        )
 
     def _execute(
         self,
@@ -2392,14 +2782,11 @@ class SCML2020World(TimeInAgreementMixin, World):
         sold, sell_cost = seller_factory.buy(product, -q, u, False, 0.0)
         if bought == 0:
             return
-        oldq = self._sold_quantity[product, self.current_step + 1]
-        oldp = self._real_price[product, self.current_step + 1]
-        totalp = 0.0
-        if oldq > 0:
-            totalp = oldp * oldq
         self._sold_quantity[product, self.current_step + 1] += bought
-        self._real_price[product, self.current_step + 1] = (totalp + buy_cost) / (
-            oldq + bought
+        self._sold_value[product, self.current_step + 1] += buy_cost
+        self._real_price[product, self.current_step + 1] = (
+            self._sold_value[product, self.current_step + 1]
+            / self._sold_quantity[product, self.current_step + 1]
         )
         assert (
             bought == sold
@@ -2470,10 +2857,10 @@ class SCML2020World(TimeInAgreementMixin, World):
         product = contract.annotation["product"]
         agent, partner = contract.partners
         is_seller = agent == contract.annotation["seller"]
-        self.a2f[agent].contracts[t].append(
+        self.a2f[agent].add_contract(
             ContractInfo(q, u, product, is_seller, partner, contract)
         )
-        self.a2f[partner].contracts[t].append(
+        self.a2f[partner].add_contract(
             ContractInfo(q, u, product, not is_seller, agent, contract)
         )
         return True
@@ -2482,6 +2869,12 @@ class SCML2020World(TimeInAgreementMixin, World):
         self.__n_nullified += 1
         contract.nullified_at = self.current_step
         contract.annotation["new_quantity"] = new_quantity
+        self._close_contract(contract)
+
+    def _close_contract(self, contract: Contract) -> None:
+        """Removes the contract from the open contracts of its partners"""
+        for partner in contract.partners:
+            self.a2f[partner].close_contract(contract)
 
     def __register_breach(
         self, agent_id: str, level: float, contract_total: float, factory: Factory
@@ -2526,6 +2919,16 @@ class SCML2020World(TimeInAgreementMixin, World):
         )
 
     def start_contract_execution(self, contract: Contract) -> set[Breach] | None:
+        if contract.id in self._batch_execution_results:
+            return self._batch_execution_results.pop(contract.id)
+        if self.batch_contract_execution and self._execute_run_in_batch(contract):
+            return self._batch_execution_results.pop(contract.id)
+        try:
+            return self._start_contract_execution(contract)
+        finally:
+            self._close_contract(contract)
+
+    def _start_contract_execution(self, contract: Contract) -> set[Breach] | None:
         self.logdebug(f"Executing {str(contract)}")
         s = self.current_step
         # get contract info
@@ -2687,11 +3090,7 @@ class SCML2020World(TimeInAgreementMixin, World):
             A mapping from agent ID to nullified contracts, the new quantity for them and compensation_money
         """
         # get all future contracts of the bankrupt agent that are not executed in their delivery time order
-        contracts = list(
-            itertools.chain(
-                *(factory.contracts[s] for s in range(self.current_step, self.n_steps))
-            )
-        )
+        contracts = list(factory.future_open_contracts(self.current_step))
 
         owed = 0
         total_owed = 0
@@ -2717,6 +3116,7 @@ class SCML2020World(TimeInAgreementMixin, World):
                     (contract.contract, 0, 0)
                 )
             self.record_bankrupt(factory)
+            factory.close_all_contracts()
             return nullified_contracts
 
         # calculate compensation fraction
@@ -2778,6 +3178,7 @@ class SCML2020World(TimeInAgreementMixin, World):
             self.nullify_contract(contract.contract, compensation_quantity)
             assert available >= 0
         self.record_bankrupt(factory)
+        factory.close_all_contracts()
         return nullified_contracts
 
     def scores(
@@ -2889,7 +3290,10 @@ class SCML2020World(TimeInAgreementMixin, World):
     @property
     def contracts_df(self) -> pd.DataFrame:
         """Returns a pandas data frame with the contracts"""
-        contracts = pd.DataFrame(self.saved_contracts)
+        if self.contract_sink is not None:
+            contracts = self.contract_sink.contracts_df()
+        else:
+            contracts = pd.DataFrame(self.saved_contracts)
         contracts["product_index"] = contracts.product_name.str.replace("p", "").astype(
             int
         )
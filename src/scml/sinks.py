@@ -0,0 +1,483 @@
+"""Sinks that stream the records of a running world to disk instead of keeping them in memory"""
+from __future__ import annotations
+
+import os
+from collections import defaultdict
+from pathlib import Path
+from typing import Any, Iterator, Literal, Sequence
+
+import numpy as np
+import pandas as pd
+from negmas.situated import World
+
+__all__ = ["ContractSink", "ContractSinkStatsMixin", "NEGOTIATION_DETAILS"]
+
+NEGOTIATION_DETAILS = (
+    "history",
+    "offers",
+    "threads",
+    "new_offers",
+    "new_offerer_agents",
+)
+"""Per-round details of negotiation records that are not saved by `ContractSink`"""
+
+_SCALARS = (str, int, float, bool, np.number, np.bool_)
+
+_KINDS = ("contracts", "breaches", "negotiations")
+
+_STANDARD_FILES = dict(
+    contracts=("contracts.csv", ("save_signed_contracts", "save_cancelled_contracts")),
+    breaches=("breaches.csv", ("save_resolved_breaches", "save_unresolved_breaches")),
+    negotiations=("negotiations.csv", ("save_negotiations",)),
+)
+"""File names used by negmas' `save_stats` for every kind of record and the world flags enabling them"""
+
+
+def _parquet_available() -> bool:
+    try:
+        import pyarrow  # noqa: F401
+    except ImportError:
+        return False
+    return True
+
+
+class ContractSink:
+    """
+    Streams contract, breach and negotiation records of a world to chunked files while it runs.
+
+    Args:
+        world: The world to collect records from.
+        path: The folder in which files are saved. It is created if needed.
+        chunk_size: The number of records of each kind collected before they are written as a single file.
+        format: The file format. "parquet" needs pyarrow. "auto" uses parquet if pyarrow is installed and csv otherwise.
+        evict: If True, records are removed from the world once they are collected by the sink.
+        stream: If False, the sink never collects records or writes files. It only gives the same summaries (e.g.
+                `contracts_df`, `product_summary`) computed from the records kept by the world.
+
+    Remarks:
+        - Call `flush` after every simulation step and `close` once the simulation ends (after `save_stats` of
+          negmas if it is used as `close` rewrites the standard contracts.csv, breaches.csv and negotiations.csv files
+          of the log folder from the chunks).
+        - A contract record is collected once its delivery time passes (i.e. its signing and execution are known), a
+          breach record after the step in which it happened and a negotiation record as soon as the world saves it.
+          Negotiation records are saved without their per-round details (See `NEGOTIATION_DETAILS`).
+        - Files are named `{kind}-{index}.{csv|parquet}` where kind is contracts, breaches or negotiations.
+        - SCML worlds are told about the sink so that their `contracts_df` includes the contracts it collected.
+        - When `evict` is True, contract based statistics of the world (e.g. `World.cancellation_rate`) only see the
+          contracts not yet collected. The sink provides the same statistics counting all contracts.
+    """
+
+    def __init__(
+        self,
+        world: World,
+        path: os.PathLike | str,
+        chunk_size: int = 10_000,
+        format: Literal["auto", "csv", "parquet"] = "auto",
+        evict: bool = True,
+        stream: bool = True,
+    ):
+        if format == "auto":
+            format = "parquet" if _parquet_available() else "csv"
+        self._world = world
+        self.path = Path(path)
+        self.chunk_size = chunk_size
+        self.format = format
+        self.evict = evict and stream
+        self.stream = stream
+        self._buffers: dict[str, list[dict[str, Any]]] = defaultdict(list)
+        self._files: dict[str, list[Path]] = defaultdict(list)
+        self._collected: dict[str, set[str]] = defaultdict(set)
+        self._counts: dict[str, int] = defaultdict(int)
+        self._signed_by_product: dict[str, list[int]] = defaultdict(lambda: [0, 0])
+        self._executed_by_product: dict[str, list[int]] = defaultdict(lambda: [0, 0])
+        if stream:
+            os.makedirs(self.path, exist_ok=True)
+        if hasattr(world, "contract_sink"):
+            world.contract_sink = self
+
+    def _records(self, kind: str) -> dict[str, dict[str, Any]]:
+        """Records of the given kind kept by the world"""
+        return getattr(self._world, f"_saved_{kind}")
+
+    def _live(self, kind: str) -> list[dict[str, Any]]:
+        """Records of the given kind still kept by the world and not yet collected"""
+        collected = self._collected[kind]
+        return [_ for k, _ in self._records(kind).items() if k not in collected]
+
+    def _live_contracts(self) -> list[dict[str, Any]]:
+        """Contract records still kept by the world and not yet collected"""
+        return self._live("contracts")
+
+    @staticmethod
+    def _tally(
+        counts: dict[str, int],
+        signed_by_product: dict[str, list[int]],
+        executed_by_product: dict[str, list[int]],
+        record: dict[str, Any],
+    ) -> None:
+        kind = "negotiated" if record.get("issues", None) else "exogenous"
+        counts["n_contracts"] += 1
+        counts[f"n_{kind}"] += 1
+        if record.get("signed_at", -1) < 0:
+            return
+        counts["n_signed"] += 1
+        counts[f"n_{kind}_signed"] += 1
+        product = record.get("product_name", None)
+        q, p = record.get("quantity", 0), record.get("unit_price", 0)
+        signed_by_product[product][0] += q
+        signed_by_product[product][1] += q * p
+        executed_at = record.get("executed_at", -1)
+        if executed_at is not None and executed_at >= 0:
+            executed_by_product[product][0] += q
+            executed_by_product[product][1] += q * p
+
+    def _collect(
+        self, kind: str, records: dict[str, dict[str, Any]], done
+    ) -> list[dict[str, Any]]:
+        collected = self._collected[kind]
+        ids = [k for k, v in records.items() if k not in collected and done(v)]
+        found = [records[_] for _ in ids]
+        if self.evict:
+            for k in ids:
+                del records[k]
+        else:
+            collected.update(ids)
+        return found
+
+    def _write(self, kind: str) -> None:
+        records = self._buffers[kind]
+        if not records:
+            return
+        data = pd.DataFrame.from_records(records)
+        if kind == "negotiations":
+            data = data.drop(
+                columns=[_ for _ in NEGOTIATION_DETAILS if _ in data.columns]
+            )
+        elif kind == "contracts" and "delivery_time" in data.columns:
+            data = data.sort_values(["delivery_time"], kind="stable")
+        for c in data.columns:
+            if data[c].dtype == object:
+                data[c] = data[c].map(
+                    lambda x: x if x is None or isinstance(x, _SCALARS) else str(x)
+                )
+        name = self.path / f"{kind}-{len(self._files[kind]):05}.{self.format}"
+        if self.format == "parquet":
+            data.to_parquet(name, index=False)
+        else:
+            data.to_csv(name, index=False)
+        self._files[kind].append(name)
+        self._buffers[kind] = []
+
+    def flush(self, final: bool = False) -> None:
+        """
+        Collects all records that will not change anymore and writes full chunks to disk.
+
+        Args:
+            final: If True, all records are collected and written (used at the end of the simulation).
+        """
+        if not self.stream:
+            return
+        world = self._world
+        step = world.current_step
+
+        contracts = self._collect(
+            "contracts",
+            world._saved_contracts,
+            lambda x: final or x.get("delivery_time", step) < step,
+        )
+        for record in contracts:
+            self._tally(
+                self._counts,
+                self._signed_by_product,
+                self._executed_by_product,
+                record,
+            )
+        breaches = self._collect(
+            "breaches", world._saved_breaches, lambda x: final or x["step"] < step
+        )
+        negotiations = self._collect(
+            "negotiations", world._saved_negotiations, lambda x: True
+        )
+        for kind, records in (
+            ("contracts", contracts),
+            ("breaches", breaches),
+            ("negotiations", negotiations),
+        ):
+            self._buffers[kind] += records
+            if final or len(self._buffers[kind]) >= self.chunk_size:
+                self._write(kind)
+
+    def close(self) -> None:
+        """
+        Collects and writes all remaining records. Call once after the simulation ends.
+
+        Remarks:
+            - The standard contracts.csv, breaches.csv and negotiations.csv files (as written by negmas' `save_stats`)
+              are then written to the folder of the sink from all chunks (one chunk at a time) for the kinds of
+              records the world saves.
+        """
+        if not self.stream:
+            return
+        self.flush(final=True)
+        for kind in _KINDS:
+            name, flags = _STANDARD_FILES[kind]
+            if any(getattr(self._world, _, False) for _ in flags):
+                self._write_standard_file(kind, self.path / name)
+
+    def _read_columns(self, name: Path) -> list[str]:
+        if self.format == "parquet":
+            import pyarrow.parquet as pq
+
+            return list(pq.read_schema(name).names)
+        return list(pd.read_csv(name, nrows=0).columns)
+
+    def _write_standard_file(self, kind: str, name: Path) -> None:
+        """Writes all records of the given kind to a single csv file with the layout used by negmas"""
+        columns: list[str] = []
+        for chunk in self._files[kind]:
+            columns += [_ for _ in self._read_columns(chunk) if _ not in columns]
+        if not columns:
+            with open(name, "w") as f:
+                f.write("")
+            return
+        n = 0
+        for data in self.iter_records(kind):
+            data = data.reindex(columns=columns)
+            data.index = range(n, n + len(data))
+            data.to_csv(
+                name, index_label="index", mode="w" if n == 0 else "a", header=n == 0
+            )
+            n += len(data)
+
+    def files(self, kind: str = "contracts") -> list[Path]:
+        """The files written so far for records of the given kind (contracts, breaches or negotiations)"""
+        return list(self._files[kind])
+
+    def iter_records(
+        self, kind: str = "contracts", columns: Sequence[str] | None = None
+    ) -> Iterator[pd.DataFrame]:
+        """
+        Iterates over the records of the given kind one chunk at a time.
+
+        Args:
+            kind: contracts, breaches or negotiations
+            columns: The columns to read. If None, all columns are read.
+
+        Remarks:
+            - Records collected but not yet written and records still kept by the world are returned as the last
+              chunk.
+        """
+        for name in self._files[kind]:
+            if self.format == "parquet":
+                yield pd.read_parquet(name, columns=columns)
+            else:
+                # empty strings (e.g. contracts with no breaches) are kept as they are
+                yield pd.read_csv(name, usecols=columns, keep_default_na=False)
+        remaining = list(self._buffers[kind]) + self._live(kind)
+        if remaining:
+            data = pd.DataFrame.from_records(remaining)
+            yield data.loc[:, list(columns)] if columns is not None else data
+
+    def contracts_df(
+        self, columns: Sequence[str] | None = None, signed_only: bool = False
+    ) -> pd.DataFrame:
+        """
+        Returns the contracts of the world as a data frame.
+
+        Args:
+            columns: The columns to read. Reading only the needed columns keeps memory usage low.
+            signed_only: Only return signed contracts
+        """
+        chunks = []
+        for data in self.iter_records(
+            "contracts",
+            columns
+            if columns is None or not signed_only or "signed_at" in columns
+            else list(columns) + ["signed_at"],
+        ):
+            if signed_only:
+                data = data.loc[data.signed_at >= 0, :]
+                if columns is not None:
+                    data = data.loc[:, list(columns)]
+            chunks.append(data)
+        if not chunks:
+            return pd.DataFrame(columns=columns)
+        return pd.concat(chunks, ignore_index=True)
+
+    def _all_counts(
+        self,
+    ) -> tuple[dict[str, int], dict[str, list[int]], dict[str, list[int]]]:
+        counts = defaultdict(int, self._counts)
+        signed = defaultdict(lambda: [0, 0])
+        executed = defaultdict(lambda: [0, 0])
+        for k, v in self._signed_by_product.items():
+            signed[k] = list(v)
+        for k, v in self._executed_by_product.items():
+            executed[k] = list(v)
+        for record in self._live_contracts():
+            self._tally(counts, signed, executed, record)
+        return counts, signed, executed
+
+    def product_summary(self, executed_only: bool = True) -> pd.DataFrame:
+        """
+        Returns the total quantity and average unit price traded of every product.
+
+        Args:
+            executed_only: If True only executed contracts are counted, otherwise all signed contracts are.
+
+        Returns:
+            A data frame with the columns product, quantity and uprice sorted by product.
+        """
+        _, signed, executed = self._all_counts()
+        totals = executed if executed_only else signed
+        return pd.DataFrame(
+            [
+                dict(product=k, quantity=q, uprice=v / q)
+                for k, (q, v) in sorted(totals.items(), key=lambda x: str(x[0]))
+                if q > 0
+            ],
+            columns=["product", "quantity", "uprice"],
+        )
+
+    def count(self, what: str) -> int:
+        """
+        Returns a contract count.
+
+        Args:
+            what: One of n_contracts, n_signed, n_exogenous, n_exogenous_signed, n_negotiated and
+                  n_negotiated_signed
+        """
+        return self._all_counts()[0][what]
+
+    @property
+    def n_contracts(self) -> int:
+        """Number of contracts concluded (exogenous or negotiated)"""
+        return self.count("n_contracts")
+
+    @property
+    def n_signed(self) -> int:
+        """Number of contracts signed (exogenous or negotiated)"""
+        return self.count("n_signed")
+
+    def _fraction_of_signed(self, stat: str) -> float:
+        stats = self._world.stats
+        if stat not in stats:
+            return np.nan
+        n_signed = self.n_signed
+        return sum(stats[stat]) / n_signed if n_signed > 0 else np.nan
+
+    @property
+    def agreement_fraction(self) -> float:
+        """Fraction of negotiations ending in agreement (same as `World.agreement_fraction`)"""
+        n_negs = sum(self._world.stats["n_negotiations"])
+        return self.count("n_negotiated") / n_negs if n_negs != 0 else np.nan
+
+    @property
+    def cancellation_rate(self) -> float:
+        """Fraction of contracts concluded that were not signed (same as `World.cancellation_rate`)"""
+        counts = self._all_counts()[0]
+        n_contracts = counts["n_contracts"]
+        return 1.0 - counts["n_signed"] / n_contracts if n_contracts else np.nan
+
+    @property
+    def breach_fraction(self) -> float:
+        """Fraction of signed contracts that led to breaches (same as `World.breach_fraction`)"""
+        n_signed = self.n_signed
+        n_breaches = sum(self._world.stats["n_breaches"])
+        return n_breaches / n_signed if n_signed != 0 else 0.0
+
+    @property
+    def contract_execution_fraction(self) -> float:
+        """Fraction of signed contracts executed (same as `World.contract_execution_fraction`)"""
+        return self._fraction_of_signed("n_contracts_executed")
+
+    @property
+    def contract_dropping_fraction(self) -> float:
+        """Fraction of signed contracts dropped (same as `World.contract_dropping_fraction`)"""
+        return self._fraction_of_signed("n_contracts_dropped")
+
+    @property
+    def contract_err_fraction(self) -> float:
+        """Fraction of signed contracts that erred (same as `World.contract_err_fraction`)"""
+        return self._fraction_of_signed("n_contracts_erred")
+
+    @property
+    def contract_nullification_fraction(self) -> float:
+        """Fraction of signed contracts nullified (same as `World.contract_nullification_fraction`)"""
+        return self._fraction_of_signed("n_contracts_nullified")
+
+    @property
+    def n_negotiation_rounds_failed(self) -> float:
+        """Average number of rounds in a failed negotiation (same as `World.n_negotiation_rounds_failed`)"""
+        stats = self._world.stats
+        if "n_negotiations" not in stats:
+            return np.nan
+        n_negs = sum(stats["n_negotiations"]) - self.count("n_negotiated")
+        if n_negs == 0 or "n_negotiation_rounds_failed" not in stats:
+            return np.nan
+        return sum(stats["n_negotiation_rounds_failed"]) / n_negs
+
+
+class ContractSinkStatsMixin:
+    """
+    Computes the contract based statistics of a world from its `ContractSink` when one streams its records.
+
+    Remarks:
+        - Worlds using this mixin must have a `contract_sink` attribute which `ContractSink` sets.
+        - Without it, these statistics of negmas are computed from the contracts kept by the world which are only the
+          ones not yet collected by a sink that evicts them.
+    """
+
+    def _streaming_sink(self) -> ContractSink | None:
+        sink = getattr(self, "contract_sink", None)
+        return sink if sink is not None and sink.evict else None
+
+    def n_saved_contracts(self, ignore_no_issue: bool = True) -> int:
+        sink = self._streaming_sink()
+        if sink is None:
+            return super().n_saved_contracts(ignore_no_issue)  # type: ignore
+        return sink.count("n_negotiated" if ignore_no_issue else "n_contracts")
+
+    @property
+    def agreement_fraction(self) -> float:
+        sink = self._streaming_sink()
+        return super().agreement_fraction if sink is None else sink.agreement_fraction  # type: ignore
+
+    @property
+    def cancellation_fraction(self) -> float:
+        sink = self._streaming_sink()
+        return super().cancellation_fraction if sink is None else sink.cancellation_rate  # type: ignore
+
+    @property
+    def cancellation_rate(self) -> float:
+        return self.cancellation_fraction
+
+    @property
+    def breach_fraction(self) -> float:
+        sink = self._streaming_sink()
+        return super().breach_fraction if sink is None else sink.breach_fraction  # type: ignore
+
+    @property
+    def n_negotiation_rounds_failed(self) -> float:
+        sink = self._streaming_sink()
+        return super().n_negotiation_rounds_failed if sink is None else sink.n_negotiation_rounds_failed  # type: ignore
+
+    @property
+    def contract_execution_fraction(self) -> float:
+        sink = self._streaming_sink()
+        return super().contract_execution_fraction if sink is None else sink.contract_execution_fraction  # type: ignore
+
+    @property
+    def contract_dropping_fraction(self) -> float:
+        sink = self._streaming_sink()
+        return super().contract_dropping_fraction if sink is None else sink.contract_dropping_fraction  # type: ignore
+
+    @property
+    def contract_err_fraction(self) -> float:
+        sink = self._streaming_sink()
+        return super().contract_err_fraction if sink is None else sink.contract_err_fraction  # type: ignore
+
+    @property
+    def contract_nullification_fraction(self) -> float:
+        sink = self._streaming_sink()
+        return super().contract_nullification_fraction if sink is None else sink.contract_nullification_fraction  # type: ignore
@@ -0,0 +1,410 @@
+"""Transports the results of tournament worlds run in worker processes back to the tournament process"""
+from __future__ import annotations
+
+import inspect
+import re
+import sys
+import time
+import traceback
+from concurrent import futures
+from multiprocessing import cpu_count
+from os import PathLike
+from pathlib import Path
+from typing import Any, Callable
+
+import numpy as np
+import pandas as pd
+import negmas
+from negmas.helpers.inout import load
+from negmas.situated import World
+from negmas.tournaments import WorldRunResults
+from negmas.tournaments.tournaments import (
+    ASSIGNED_CONFIGS_JSON_FILE,
+    ASSIGNED_CONFIGS_PICKLE_FILE,
+    MAX_TASKS_PER_CHILD,
+    PARAMS_FILE,
+    RESULTS_FILE,
+    TIMEOUT_EXTRA,
+    save_run_results,
+)
+
+try:
+    # private functions of negmas used to run a world set exactly as negmas does (See `memmap_transport_available`)
+    from negmas.tournaments.tournaments import _run_id, _run_worlds
+except ImportError:  # pragma: no cover
+    _run_id = _run_worlds = None
+
+__all__ = [
+    "RESULT_TRANSPORTS",
+    "MEMMAP_NEGMAS_VERSIONS",
+    "WORLD_RECORD_DTYPE",
+    "RECORDS_FILE_NAME",
+    "SCORES_FILE_NAME",
+    "memmap_transport_available",
+    "supports_memmap_transport",
+    "run_tournament_memmap",
+    "read_world_records",
+    "read_world_scores",
+]
+
+RESULT_TRANSPORTS = ("pickle", "memmap")
+"""Supported ways to send the results of worlds run in worker processes to the tournament process.
+
+- pickle: The default of negmas. Workers return scores and all stats of their worlds to the tournament process which
+  saves them.
+- memmap: Workers save the results of their worlds to the tournament folder themselves and only write a compact
+  typed record (See `WORLD_RECORD_DTYPE`) and the scores of every world set to memory-mapped arrays in the same folder.
+"""
+
+RECORDS_FILE_NAME = "world_records.npy"
+"""Name of the file keeping one `WORLD_RECORD_DTYPE` record for every world set of a tournament"""
+
+SCORES_FILE_NAME = "world_scores.npy"
+"""Name of the file keeping the scores of every world set of a tournament (NaN for missing scores)"""
+
+WORLD_RECORD_DTYPE = np.dtype(
+    [
+        ("run_id", "U256"),
+        ("done", np.bool_),
+        ("n_scores", np.int32),
+        ("planned_n_steps", np.int64),
+        ("executed_n_steps", np.int64),
+        ("execution_time", np.float64),
+        ("mean_agent_time", np.float64),
+        ("n_agent_exceptions", np.int64),
+        ("n_negotiator_exceptions", np.int64),
+        ("n_negs_registered", np.int64),
+        ("n_negs_succeeded", np.int64),
+        ("n_negs_failed", np.int64),
+        ("n_negs_timedout", np.int64),
+        ("n_contracts_concluded", np.int64),
+        ("n_contracts_signed", np.int64),
+        ("n_contracts_executed", np.int64),
+        ("n_contracts_breached", np.int64),
+        ("n_breaches_committed", np.int64),
+    ]
+)
+"""The record saved for every world set run by a tournament using the memmap result transport"""
+
+_STAT_FIELDS = tuple(
+    _ for _ in WORLD_RECORD_DTYPE.names if _ not in ("run_id", "done", "n_scores")
+)
+
+MEMMAP_NEGMAS_VERSIONS = ((0, 10), (0, 11))
+"""The versions of negmas supported by the memmap result transport (from the first inclusive to the second exclusive)"""
+
+_MULTIPROCESSING_OPTIONS = ("local", "parallel", "par", "p")
+
+_RUN_WORLDS_PARAMS = (
+    "worlds_params",
+    "world_generator",
+    "score_calculator",
+    "world_progress_callback",
+    "dry_run",
+    "save_world_stats",
+    "override_ran_worlds",
+    "save_progress_every",
+    "attempts_path",
+    "max_attempts",
+    "verbose",
+)
+
+
+def _version(version: str) -> tuple[int, ...]:
+    return tuple(int(_) for _ in re.findall(r"\d+", version)[:3])
+
+
+def memmap_transport_available() -> bool:
+    """
+    Checks whether the installed negmas can be used by the memmap result transport.
+
+    Remarks:
+        - Workers of the memmap transport run world sets using private functions of negmas (`_run_worlds` and
+          `_run_id`) because the public ones cannot take a world generator or a world progress callback. The transport
+          is only available for the versions of negmas in `MEMMAP_NEGMAS_VERSIONS` that provide these functions with
+          the expected parameters.
+    """
+    first, last = MEMMAP_NEGMAS_VERSIONS
+    if not first <= _version(negmas.__version__) < last:
+        return False
+    if _run_id is None or _run_worlds is None:
+        return False
+    return tuple(inspect.signature(_run_worlds).parameters) == _RUN_WORLDS_PARAMS
+
+
+def supports_memmap_transport(parallelism: str) -> bool:
+    """Checks whether the memmap result transport can be used with the given parallelism (local processes only) and
+    the installed negmas (See `memmap_transport_available`)"""
+    return memmap_transport_available() and any(
+        parallelism.startswith(_) for _ in _MULTIPROCESSING_OPTIONS
+    )
+
+
+def _max_workers(parallelism: str) -> int | None:
+    parts = parallelism.split(":")
+    if len(parts) == 1:
+        return None
+    return max(1, int(float(parts[-1]) * cpu_count()))
+
+
+def _load_assigned(tournament_path: Path) -> list[list[dict[str, Any]]]:
+    try:
+        assigned = load(tournament_path / ASSIGNED_CONFIGS_PICKLE_FILE)
+        if assigned:
+            return assigned
+    except Exception:
+        pass
+    return load(tournament_path / ASSIGNED_CONFIGS_JSON_FILE)
+
+
+def _is_done(worlds_params: list[dict[str, Any]]) -> bool:
+    return any(
+        (Path(_["__dir_name"]).parent / RESULTS_FILE).exists()
+        for _ in worlds_params
+        if _.get("__dir_name", None)
+    )
+
+
+def _open_arrays(
+    tournament_path: Path, assigned: list[list[dict[str, Any]]], n_scores: int
+) -> tuple[np.memmap, np.memmap]:
+    """Opens the arrays of a tournament being resumed or creates them for a new one"""
+    # the same ID negmas gives to a world set when running it (See `_run_world_set`)
+    run_ids = [_run_id(_) for _ in assigned]
+    try:
+        scores = np.load(tournament_path / SCORES_FILE_NAME, mmap_mode="r+")
+        records = np.load(tournament_path / RECORDS_FILE_NAME, mmap_mode="r+")
+        if (
+            scores.shape == (len(assigned), n_scores)
+            and list(records["run_id"]) == run_ids
+        ):
+            return scores, records
+    except (FileNotFoundError, ValueError):
+        pass
+    scores = np.lib.format.open_memmap(
+        tournament_path / SCORES_FILE_NAME,
+        mode="w+",
+        dtype=np.float64,
+        shape=(len(assigned), n_scores),
+    )
+    scores[:] = np.nan
+    scores.flush()
+    records = np.lib.format.open_memmap(
+        tournament_path / RECORDS_FILE_NAME,
+        mode="w+",
+        dtype=WORLD_RECORD_DTYPE,
+        shape=(len(assigned),),
+    )
+    records["run_id"] = run_ids
+    records.flush()
+    return scores, records
+
+
+def _run_world_set(
+    worlds_params: list[dict[str, Any]],
+    index: int,
+    tournament_path: Path,
+    name: str,
+    world_generator: Callable[..., World],
+    score_calculator: Callable[[list[World], dict[str, Any], bool], WorldRunResults],
+    world_progress_callback: Callable[[World | None], None] | None,
+    attempts_path: Path,
+    max_attempts: int,
+    verbose: bool,
+) -> int:
+    """Runs a world set in a worker, saves its results and returns the index of its record"""
+    run_id, world_paths, results, world_stats, type_stats, agent_stats = _run_worlds(
+        worlds_params,
+        world_generator,
+        score_calculator,
+        world_progress_callback=world_progress_callback,
+        dry_run=False,
+        save_world_stats=True,
+        override_ran_worlds=False,
+        save_progress_every=1,
+        attempts_path=attempts_path,
+        max_attempts=max_attempts,
+        verbose=verbose,
+    )
+    if results is None:
+        return index
+    save_run_results(
+        run_id=run_id,
+        score_=results,
+        world_stats_=world_stats,
+        type_stats_=type_stats,
+        agent_stats_=agent_stats,
+        tournament_progress_callback=None,
+        world_paths=world_paths,
+        name=name,
+        verbose=False,
+        _strt=time.perf_counter(),
+        attempts_path=attempts_path,
+        n_world_configs=1,
+        i=0,
+    )
+    scores = np.load(tournament_path / SCORES_FILE_NAME, mmap_mode="r+")
+    records = np.load(tournament_path / RECORDS_FILE_NAME, mmap_mode="r+")
+    values = np.asarray(
+        [np.nan if _ is None else _ for _ in results.scores], dtype=np.float64
+    )[: scores.shape[1]]
+    scores[index, : len(values)] = values
+    scores.flush()
+    records["n_scores"][index] = len(values)
+    for field in _STAT_FIELDS:
+        records[field][index] = getattr(world_stats, field)
+    records.flush()
+    # the record is marked as complete only after everything else is on disk
+    records["done"][index] = True
+    records.flush()
+    return index
+
+
+def run_tournament_memmap(
+    tournament_path: str | PathLike,
+    world_generator: Callable[..., World],
+    score_calculator: Callable[[list[World], dict[str, Any], bool], WorldRunResults],
+    parallelism: str = "parallel",
+    total_timeout: int | None = None,
+    tournament_progress_callback: Callable[[WorldRunResults | None, int, int], None]
+    | None = None,
+    world_progress_callback: Callable[[World | None], None] | None = None,
+    verbose: bool = False,
+    print_exceptions: bool = True,
+    max_attempts: int = sys.maxsize,
+) -> None:
+    """
+    Runs the worlds of a tournament created with `configs_only` in local worker processes using the memmap transport.
+
+    Args:
+        tournament_path: The folder of the tournament (the parent of its configs folder).
+        world_generator: Used to create worlds from their configs.
+        score_calculator: Used to score agents after every world set is run.
+        parallelism: "parallel" or "parallel:f" to use the fraction f of the CPUs.
+        total_timeout: Total timeout for running all worlds.
+        tournament_progress_callback: Called in the tournament process after every world set. See remarks.
+        world_progress_callback: Called in the worker after every step of every world.
+        verbose: Verbosity
+        print_exceptions: If true, exceptions of world sets are printed.
+        max_attempts: The maximum number of attempts to run each world set.
+
+    Remarks:
+        - Workers save the complete results of their world sets to the tournament folder (exactly as negmas does)
+          and return only the index of the world set. Scores and basic stats are passed through memory-mapped arrays
+          that can be read later using `read_world_records` and `read_world_scores`.
+        - World sets already run (i.e. that have a results file) are skipped and their records are kept.
+        - The `WorldRunResults` passed to `tournament_progress_callback` only has the names, log files and scores
+          of the worlds. Names, ids and types of agents are available in the results saved in the tournament folder.
+        - Use `evaluate_tournament` of negmas to compile the results after this function returns.
+
+    Raises:
+        RuntimeError: If the installed negmas cannot be used by the memmap transport (See `memmap_transport_available`)
+    """
+    if not memmap_transport_available():
+        raise RuntimeError(
+            f"The memmap result transport does not support negmas {negmas.__version__}"
+        )
+    tournament_path = Path(tournament_path).absolute()
+    params = load(tournament_path / PARAMS_FILE)
+    name = params.get("name", tournament_path.name)
+    assigned = _load_assigned(tournament_path)
+    attempts_path = tournament_path / "attempts"
+    attempts_path.mkdir(exist_ok=True, parents=True)
+    n_scores = max(
+        [len(w["world_params"]["agent_types"]) for s in assigned for w in s] + [1]
+    )
+    scores, records = _open_arrays(tournament_path, assigned, n_scores)
+    to_run = [i for i, _ in enumerate(assigned) if not _is_done(_)]
+    if verbose:
+        print(
+            f"Will run {len(to_run)} of {len(assigned)} world sets ({parallelism})",
+            flush=True,
+        )
+    if not to_run:
+        return
+
+    timeout = max(
+        w.get("world_params", dict()).get("time_limit", float("-inf"))
+        for s in assigned
+        for w in s
+    )
+    timeout = None if np.isinf(timeout) else timeout * TIMEOUT_EXTRA
+    kwargs: dict[str, Any] = dict(max_workers=_max_workers(parallelism))
+    if sys.version_info >= (3, 11):
+        kwargs["max_tasks_per_child"] = MAX_TASKS_PER_CHILD
+    strt = time.perf_counter()
+    with futures.ProcessPoolExecutor(**kwargs) as executor:
+        future_results = [
+            executor.submit(
+                _run_world_set,
+                assigned[i],
+                i,
+                tournament_path,
+                name,
+                world_generator,
+                score_calculator,
+                world_progress_callback,
+                attempts_path,
+                max_attempts,
+                verbose,
+            )
+            for i in to_run
+        ]
+        for i, future in enumerate(futures.as_completed(future_results)):
+            if total_timeout is not None and time.perf_counter() - strt > total_timeout:
+                for f in future_results:
+                    f.cancel()
+                break
+            results = None
+            try:
+                index = future.result(timeout=timeout)
+                # the parent receives nothing but the index. Everything else is read from the shared arrays
+                record = records[index]
+                if record["done"]:
+                    worlds_params = assigned[index]
+                    results = WorldRunResults(
+                        world_names=[_["world_params"]["name"] for _ in worlds_params],
+                        log_file_names=[
+                            _.get("log_file_name", None) for _ in worlds_params
+                        ],
+                    )
+                    results.scores = scores[index, : record["n_scores"]].tolist()
+            except Exception as e:
+                if print_exceptions:
+                    print(traceback.format_exc())
+                    print(e)
+            if tournament_progress_callback is not None:
+                tournament_progress_callback(results, i, len(to_run))
+            if verbose:
+                print(
+                    f"{i + 1:003} of {len(to_run):003} completed in "
+                    f"{time.perf_counter() - strt:0.2f}s",
+                    flush=True,
+                )
+
+
+def read_world_records(tournament_path: str | PathLike) -> pd.DataFrame:
+    """
+    Reads the records of the world sets of a tournament run using the memmap result transport.
+
+    Args:
+        tournament_path: The folder of the tournament
+
+    Returns:
+        A data frame with one row for every world set and one column for every field of `WORLD_RECORD_DTYPE`.
+    """
+    records = np.load(Path(tournament_path) / RECORDS_FILE_NAME, mmap_mode="r")
+    return pd.DataFrame.from_records(np.asarray(records))
+
+
+def read_world_scores(tournament_path: str | PathLike) -> np.ndarray:
+    """
+    Reads the scores of the world sets of a tournament run using the memmap result transport.
+
+    Args:
+        tournament_path: The folder of the tournament
+
+    Returns:
+        A read-only memory-mapped array with one row for every world set. Missing scores are NaN.
+    """
+    return np.load(Path(tournament_path) / SCORES_FILE_NAME, mmap_mode="r")
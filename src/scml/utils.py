@@ -1,19 +1,28 @@
 from __future__ import annotations
 
 import copy
+import sys
+import warnings
 from collections import defaultdict
 from functools import partial
 from itertools import chain
 from os import PathLike
+from pathlib import Path
 from random import randint, random, shuffle
 from typing import Any, Callable, Iterable, Sequence
 
+import negmas
 import numpy as np
 from negmas import Agent
 from negmas.helpers import get_class, get_full_type_name, unique_name
 from negmas.helpers.numeric import truncated_mean
 from negmas.serialization import deserialize, serialize
-from negmas.tournaments import TournamentResults, WorldRunResults, tournament
+from negmas.tournaments import (
+    TournamentResults,
+    WorldRunResults,
+    evaluate_tournament,
+    tournament,
+)
 
 from scml.oneshot.agents import (
     GreedyOneShotAgent,
@@ -30,6 +39,12 @@ from scml.scml2020.agents import (
     SatisficerAgent,
 )
 from scml.scml2020.world import SCML2020Agent, SCML2020World, is_system_agent
+from scml.transport import (
+    RESULT_TRANSPORTS,
+    memmap_transport_available,
+    run_tournament_memmap,
+    supports_memmap_transport,
+)
 
 __all__ = [
     "anac_config_generator_oneshot",
@@ -1132,6 +1147,62 @@ def balance_calculator_oneshot(
     return result
 
 
+def _run_tournament(
+    result_transport: str = "pickle", **kwargs
+) -> TournamentResults | PathLike:
+    """
+    Runs a tournament using negmas `tournament` passing results of worlds from workers using the given transport.
+
+    Args:
+        result_transport: How results of worlds run in worker processes reach the tournament process. "pickle"
+                          returns them from workers (default). "memmap" makes workers save them to the tournament
+                          folder and pass only compact score/stats records through memory-mapped arrays
+                          (See `scml.transport`).
+        kwargs: Arguments to pass to negmas `tournament`
+
+    Remarks:
+        - The memmap transport is used only for single-stage round-robin tournaments run in local processes with a
+          supported version of negmas (See `scml.transport.memmap_transport_available`). Other tournaments are run
+          by negmas as usual.
+    """
+    if result_transport not in RESULT_TRANSPORTS:
+        raise ValueError(
+            f"Unknown result transport {result_transport}. Supported transports are {RESULT_TRANSPORTS}"
+        )
+    if result_transport == "memmap" and not memmap_transport_available():
+        warnings.warn(
+            f"The memmap result transport does not support negmas {negmas.__version__}. Using pickle instead"
+        )
+    if (
+        result_transport == "pickle"
+        or kwargs.get("configs_only", False)
+        or not supports_memmap_transport(kwargs.get("parallelism", "parallel"))
+        or not kwargs.get("round_robin", False)
+        or kwargs.get("stage_winners_fraction", 0.0) > 0.0
+    ):
+        return tournament(**kwargs)
+    path = Path(tournament(**(kwargs | dict(configs_only=True)))).parent
+    run_tournament_memmap(
+        path,
+        world_generator=kwargs["world_generator"],
+        score_calculator=kwargs["score_calculator"],
+        parallelism=kwargs.get("parallelism", "parallel"),
+        total_timeout=kwargs.get("total_timeout", None),
+        tournament_progress_callback=kwargs.get("tournament_progress_callback", None),
+        world_progress_callback=kwargs.get("world_progress_callback", None),
+        verbose=kwargs.get("verbose", False),
+        print_exceptions=kwargs.get("print_exceptions", True),
+        max_attempts=kwargs.get("max_attempts", sys.maxsize),
+    )
+    return evaluate_tournament(
+        tournament_path=path,
+        verbose=kwargs.get("verbose", False),
+        recursive=True,
+        metric=kwargs.get("metric", "median"),
+        extra_scores_to_use=kwargs.get("extra_scores_to_use", None),
+    )
+
+
 def anac2020_tournament(
     competitors: Sequence[str | type[SCML2020Agent]],
     agent_names_reveal_type=False,
@@ -1245,6 +1316,7 @@ def anac2020_std(
     verbose: bool = False,
     configs_only=False,
     compact=False,
+    result_transport: str = "pickle",
     n_competitors_per_world=None,
     forced_logs_fraction: float = FORCED_LOGS_FRACTION,
     **kwargs,
@@ -1289,6 +1361,7 @@ def anac2020_std(
         n_competitors_per_world: Number of competitors in every simulation. If not given it will be a random number
                                  between 2 and min(2, n), where n is the number of competitors
         forced_logs_fraction: Fraction of simulations for which logs are always saved (including negotiations)
+        result_transport: How results of worker processes reach the tournament process (See `_run_tournament`)
         kwargs: Arguments to pass to the `world_generator` function
 
     Returns:
@@ -1310,7 +1383,8 @@ def anac2020_std(
         non_competitors = DefaultAgents
         non_competitor_params = [dict() for _ in non_competitors]
     kwargs["round_robin"] = kwargs.get("round_robin", ROUND_ROBIN)
-    return tournament(
+    return _run_tournament(
+        result_transport=result_transport,
         competitors=competitors,
         competitor_params=competitor_params,
         non_competitors=non_competitors,
@@ -1373,6 +1447,7 @@ def anac2020_collusion(
     verbose: bool = False,
     configs_only=False,
     compact=False,
+    result_transport: str = "pickle",
     n_competitors_per_world=None,
     forced_logs_fraction: float = FORCED_LOGS_FRACTION,
     **kwargs,
@@ -1418,6 +1493,7 @@ def anac2020_collusion(
         configs_only: If true, a config file for each
         compact: If true, compact logs will be created and effort will be made to reduce the memory footprint
         forced_logs_fraction: Fraction of simulations for which logs are always saved (including negotiations)
+        result_transport: How results of worker processes reach the tournament process (See `_run_tournament`)
         kwargs: Arguments to pass to the `world_generator` function
 
     Returns:
@@ -1439,7 +1515,8 @@ def anac2020_collusion(
         non_competitors = DefaultAgents
         non_competitor_params = [dict() for _ in non_competitors]
     kwargs["round_robin"] = kwargs.get("round_robin", ROUND_ROBIN)
-    return tournament(
+    return _run_tournament(
+        result_transport=result_transport,
         competitors=competitors,
         competitor_params=competitor_params,
         non_competitors=non_competitors,
@@ -1589,6 +1666,7 @@ def anac2021_std(
     verbose: bool = False,
     configs_only=False,
     compact=False,
+    result_transport: str = "pickle",
     n_competitors_per_world=None,
     forced_logs_fraction: float = FORCED_LOGS_FRACTION,
     **kwargs,
@@ -1633,6 +1711,7 @@ def anac2021_std(
         n_competitors_per_world: Number of competitors in every simulation. If not given it will be a random number
                                  between 2 and min(2, n), where n is the number of competitors
         forced_logs_fraction: Fraction of simulations for which logs are always saved (including negotiations)
+        result_transport: How results of worker processes reach the tournament process (See `_run_tournament`)
         kwargs: Arguments to pass to the `world_generator` function
 
     Returns:
@@ -1654,7 +1733,8 @@ def anac2021_std(
         non_competitors = DefaultAgents2021
         non_competitor_params = [dict() for _ in non_competitors]
     kwargs["round_robin"] = kwargs.get("round_robin", ROUND_ROBIN)
-    return tournament(
+    return _run_tournament(
+        result_transport=result_transport,
         competitors=competitors,
         competitor_params=competitor_params,
         non_competitors=non_competitors,
@@ -1719,6 +1799,7 @@ def anac2021_collusion(
     verbose: bool = False,
     configs_only=False,
     compact=False,
+    result_transport: str = "pickle",
     n_competitors_per_world=1,
     forced_logs_fraction: float = FORCED_LOGS_FRACTION,
     **kwargs,
@@ -1765,6 +1846,7 @@ def anac2021_collusion(
         configs_only: If true, a config file for each
         compact: If true, compact logs will be created and effort will be made to reduce the memory footprint
         forced_logs_fraction: Fraction of simulations for which logs are always saved (including negotiations)
+        result_transport: How results of worker processes reach the tournament process (See `_run_tournament`)
         kwargs: Arguments to pass to the `world_generator` function
 
     Returns:
@@ -1783,7 +1865,8 @@ def anac2021_collusion(
         non_competitors = DefaultAgents2021
         non_competitor_params = [dict() for _ in non_competitors]
     kwargs["round_robin"] = kwargs.get("round_robin", ROUND_ROBIN)
-    return tournament(
+    return _run_tournament(
+        result_transport=result_transport,
         competitors=competitors,
         competitor_params=competitor_params,
         non_competitors=non_competitors,
@@ -1847,6 +1930,7 @@ def anac2021_oneshot(
     verbose: bool = False,
     configs_only=False,
     compact=False,
+    result_transport: str = "pickle",
     n_competitors_per_world=None,
     forced_logs_fraction: float = FORCED_LOGS_FRACTION,
     **kwargs,
@@ -1891,6 +1975,7 @@ def anac2021_oneshot(
         n_competitors_per_world: Number of competitors in every simulation. If not given it will be a random number
                                  between 2 and min(2, n), where n is the number of competitors
         forced_logs_fraction: Fraction of simulations for which logs are always saved (including negotiations)
+        result_transport: How results of worker processes reach the tournament process (See `_run_tournament`)
         kwargs: Arguments to pass to the `world_generator` function
 
     Returns:
@@ -1919,7 +2004,8 @@ def anac2021_oneshot(
     kwargs["round_robin"] = kwargs.get("round_robin", ROUND_ROBIN)
     kwargs["oneshot_world"] = True
     kwargs["n_processes"] = 2
-    return tournament(
+    return _run_tournament(
+        result_transport=result_transport,
         competitors=competitors,
         competitor_params=competitor_params,
         non_competitors=non_competitors,
@@ -2071,6 +2157,7 @@ def anac2022_std(
     verbose: bool = False,
     configs_only=False,
     compact=False,
+    result_transport: str = "pickle",
     n_competitors_per_world=None,
     forced_logs_fraction: float = FORCED_LOGS_FRACTION,
     **kwargs,
@@ -2115,6 +2202,7 @@ def anac2022_std(
         n_competitors_per_world: Number of competitors in every simulation. If not given it will be a random number
                                  between 2 and min(2, n), where n is the number of competitors
         forced_logs_fraction: Fraction of simulations for which logs are always saved (including negotiations)
+        result_transport: How results of worker processes reach the tournament process (See `_run_tournament`)
         kwargs: Arguments to pass to the `world_generator` function
 
     Returns:
@@ -2136,7 +2224,8 @@ def anac2022_std(
         non_competitors = DefaultAgents2022
         non_competitor_params = [dict() for _ in non_competitors]
     kwargs["round_robin"] = kwargs.get("round_robin", ROUND_ROBIN)
-    return tournament(
+    return _run_tournament(
+        result_transport=result_transport,
         competitors=competitors,
         competitor_params=competitor_params,
         non_competitors=non_competitors,
@@ -2201,6 +2290,7 @@ def anac2022_collusion(
     verbose: bool = False,
     configs_only=False,
     compact=False,
+    result_transport: str = "pickle",
     n_competitors_per_world=1,
     forced_logs_fraction: float = FORCED_LOGS_FRACTION,
     **kwargs,
@@ -2247,6 +2337,7 @@ def anac2022_collusion(
         configs_only: If true, a config file for each
         compact: If true, compact logs will be created and effort will be made to reduce the memory footprint
         forced_logs_fraction: Fraction of simulations for which logs are always saved (including negotiations)
+        result_transport: How results of worker processes reach the tournament process (See `_run_tournament`)
         kwargs: Arguments to pass to the `world_generator` function
 
     Returns:
@@ -2265,7 +2356,8 @@ def anac2022_collusion(
         non_competitors = DefaultAgents2022
         non_competitor_params = [dict() for _ in non_competitors]
     kwargs["round_robin"] = kwargs.get("round_robin", ROUND_ROBIN)
-    return tournament(
+    return _run_tournament(
+        result_transport=result_transport,
         competitors=competitors,
         competitor_params=competitor_params,
         non_competitors=non_competitors,
@@ -2329,6 +2421,7 @@ def anac2022_oneshot(
     verbose: bool = False,
     configs_only=False,
     compact=False,
+    result_transport: str = "pickle",
     n_competitors_per_world=None,
     forced_logs_fraction: float = FORCED_LOGS_FRACTION,
     **kwargs,
@@ -2363,7 +2456,8 @@ def anac2022_oneshot(
     kwargs["round_robin"] = kwargs.get("round_robin", ROUND_ROBIN)
     kwargs["oneshot_world"] = True
     kwargs["n_processes"] = 2
-    return tournament(
+    return _run_tournament(
+        result_transport=result_transport,
         competitors=competitors,
         competitor_params=competitor_params,
         non_competitors=non_competitors,
@@ -2515,6 +2609,7 @@ def anac2023_std(
     verbose: bool = False,
     configs_only=False,
     compact=False,
+    result_transport: str = "pickle",
     n_competitors_per_world=None,
     forced_logs_fraction: float = FORCED_LOGS_FRACTION,
     **kwargs,
@@ -2559,6 +2654,7 @@ def anac2023_std(
         n_competitors_per_world: Number of competitors in every simulation. If not given it will be a random number
                                  between 2 and min(2, n), where n is the number of competitors
         forced_logs_fraction: Fraction of simulations for which logs are always saved (including negotiations)
+        result_transport: How results of worker processes reach the tournament process (See `_run_tournament`)
         kwargs: Arguments to pass to the `world_generator` function
 
     Returns:
@@ -2580,7 +2676,8 @@ def anac2023_std(
         non_competitors = DefaultAgents2023
         non_competitor_params = [dict() for _ in non_competitors]
     kwargs["round_robin"] = kwargs.get("round_robin", ROUND_ROBIN)
-    return tournament(
+    return _run_tournament(
+        result_transport=result_transport,
         competitors=competitors,
         competitor_params=competitor_params,
         non_competitors=non_competitors,
@@ -2645,6 +2742,7 @@ def anac2023_collusion(
     verbose: bool = False,
     configs_only=False,
     compact=False,
+    result_transport: str = "pickle",
     n_competitors_per_world=1,
     forced_logs_fraction: float = FORCED_LOGS_FRACTION,
     **kwargs,
@@ -2691,6 +2789,7 @@ def anac2023_collusion(
         configs_only: If true, a config file for each
         compact: If true, compact logs will be created and effort will be made to reduce the memory footprint
         forced_logs_fraction: Fraction of simulations for which logs are always saved (including negotiations)
+        result_transport: How results of worker processes reach the tournament process (See `_run_tournament`)
         kwargs: Arguments to pass to the `world_generator` function
 
     Returns:
@@ -2709,7 +2808,8 @@ def anac2023_collusion(
         non_competitors = DefaultAgents2023
         non_competitor_params = [dict() for _ in non_competitors]
     kwargs["round_robin"] = kwargs.get("round_robin", ROUND_ROBIN)
-    return tournament(
+    return _run_tournament(
+        result_transport=result_transport,
         competitors=competitors,
         competitor_params=competitor_params,
         non_competitors=non_competitors,
@@ -2773,6 +2873,7 @@ def anac2023_oneshot(
     verbose: bool = False,
     configs_only=False,
     compact=False,
+    result_transport: str = "pickle",
     n_competitors_per_world=None,
     forced_logs_fraction: float = FORCED_LOGS_FRACTION,
     **kwargs,
@@ -2817,6 +2918,7 @@ def anac2023_oneshot(
         n_competitors_per_world: Number of competitors in every simulation. If not given it will be a random number
                                  between 2 and min(2, n), where n is the number of competitors
         forced_logs_fraction: Fraction of simulations for which logs are always saved (including negotiations)
+        result_transport: How results of worker processes reach the tournament process (See `_run_tournament`)
         kwargs: Arguments to pass to the `world_generator` function
 
     Returns:
@@ -2845,7 +2947,8 @@ def anac2023_oneshot(
     kwargs["round_robin"] = kwargs.get("round_robin", ROUND_ROBIN)
     kwargs["oneshot_world"] = True
     kwargs["n_processes"] = 2
-    return tournament(
+    return _run_tournament(
+        result_transport=result_transport,
         competitors=competitors,
         competitor_params=competitor_params,
         non_competitors=non_competitors,
@@ -16,6 +16,7 @@ __all__ = [
     "SCML_RUN_COLLUSION_TOURNAMENTS",
     "SCML_RUN_SABOTAGE_TOURNAMENTS",
     "SCML_RUN_TEMP_FAILING",
+    "SCML_RUN_IMPORT_TIME",
 ]
 
 
@@ -45,3 +46,4 @@ SCML_RUN2020 = is_enabled("SCML_RUN2020")
 SCML_RUN_TUTORIAL2 = isnot_disabled("SCML_RUN_TUTORIAL2")
 SCML_RUN_NOTEBOOKS = isnot_disabled("SCML_RUN_NOTEBOOKS")
 SCML_RUN_SCHEDULER = is_enabled("SCML_RUN_SCHEDULER")
+SCML_RUN_IMPORT_TIME = is_enabled("SCML_RUN_IMPORT_TIME")
@@ -0,0 +1,74 @@
+import pytest
+
+from scml.experiment import (
+    RESULTS_FILE_NAME,
+    config_ids,
+    generate_configs_factorial,
+    oneshot_fixed_vars,
+    read_results,
+    run_configs,
+)
+from scml.oneshot import SCML2020OneShotWorld
+
+
+def oneshot_configs(n_worlds):
+    fixed = dict(oneshot_fixed_vars)
+    fixed["n_steps"] = 3
+    return generate_configs_factorial(
+        {"penalties_scale": ["trading", "catalog"]}, fixed, n_worlds
+    )
+
+
+def test_config_ids_are_stable_and_unique():
+    configs = oneshot_configs(2)
+    ids = config_ids(configs)
+    assert len(set(ids)) == len(configs)
+    assert ids == config_ids(oneshot_configs(2))
+    assert ids[:2] == config_ids(oneshot_configs(3))[:2]
+
+
+def test_config_ids_use_type_names_and_reject_unstable_values():
+    configs = [
+        dict(world_type=SCML2020OneShotWorld, agent_types=[SCML2020OneShotWorld])
+    ]
+    assert config_ids(configs) == config_ids(
+        [dict(agent_types=[SCML2020OneShotWorld], world_type=SCML2020OneShotWorld)]
+    )
+    with pytest.raises(ValueError):
+        config_ids([dict(value=object())])
+
+
+@pytest.mark.parametrize("n_jobs", [1, 2])
+def test_experiments_save_rows_and_resume(tmp_path, n_jobs):
+    results = run_configs(
+        oneshot_configs(1),
+        n_jobs,
+        path=tmp_path,
+        world_type=SCML2020OneShotWorld,
+        funcs=["welfare_all", "productivity"],
+    )
+    assert len(results) == 2
+    assert not results.failed_run.any()
+    assert results["productivity"].isnull().all()
+    assert (tmp_path / RESULTS_FILE_NAME).exists()
+    first = {_["config_id"]: _["time"] for _ in read_results(tmp_path)}
+
+    # a partially written row (e.g. after a crash) is ignored
+    with open(tmp_path / RESULTS_FILE_NAME, "a") as f:
+        f.write('{"config_id": "incomplete')
+
+    results = run_configs(
+        oneshot_configs(2),
+        n_jobs,
+        path=tmp_path,
+        world_type=SCML2020OneShotWorld,
+        funcs=["welfare_all", "productivity"],
+        batch_size=2,
+    )
+    assert len(results) == 4
+    assert len(set(results.config_id)) == 4
+    rows = read_results(tmp_path)
+    # configs completed before are not run again
+    assert all(
+        _["time"] == first[_["config_id"]] for _ in rows if _["config_id"] in first
+    )
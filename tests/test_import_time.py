@@ -0,0 +1,83 @@
+import subprocess
+import sys
+import time
+
+import pytest
+
+import scml
+from tests.switches import SCML_RUN_IMPORT_TIME
+
+# generous limits: the imports guarded here take a small fraction of these on a normal machine while importing
+# negmas alone takes seconds
+IMPORT_TIME_LIMIT = 1.0
+N_REPEATS = 3
+
+
+def _run(code: str, n_repeats: int = 1) -> tuple[float, str]:
+    """Runs the code in a fresh interpreter and returns the best time it took and its output"""
+    best, output = float("inf"), ""
+    for _ in range(n_repeats):
+        strt = time.perf_counter()
+        result = subprocess.run(
+            [sys.executable, "-c", code], capture_output=True, text=True, check=True
+        )
+        best = min(best, time.perf_counter() - strt)
+        output = result.stdout
+    return best, output
+
+
+def _loaded(code: str, modules: list[str]) -> list[str]:
+    _, output = _run(
+        code
+        + "\nimport sys\nprint(';'.join(_ for _ in "
+        + repr(modules)
+        + " if _ in sys.modules))"
+    )
+    return [_ for _ in output.strip().split(";") if _]
+
+
+@pytest.mark.skipif(
+    condition=not SCML_RUN_IMPORT_TIME,
+    reason="Wall-clock import times depend on the machine. Set SCML_RUN_IMPORT_TIME to run. See switches.py",
+)
+@pytest.mark.parametrize(
+    "code",
+    [
+        "import scml",
+        "from scml.cli import main",
+        "from scml.cli import main; main(['version'], standalone_mode=False)",
+    ],
+)
+def test_import_time(code):
+    duration, _ = _run(code, N_REPEATS)
+    assert duration < IMPORT_TIME_LIMIT, f"{code} took {duration:0.3}s"
+
+
+@pytest.mark.parametrize(
+    "code", ["import scml", "import scml.cli", "import scml.cliadv"]
+)
+def test_heavy_dependencies_are_not_imported(code):
+    assert not _loaded(code, ["negmas", "pandas", "tabulate", "gymnasium"])
+
+
+def test_rl_is_imported_only_when_used():
+    assert not _loaded("import scml.oneshot", ["gymnasium", "scml.oneshot.rl"])
+    assert _loaded("from scml.oneshot import OneShotRLAgent", ["scml.oneshot.rl"])
+
+
+def test_lazy_names_match_subpackages():
+    import scml.oneshot
+    import scml.oneshot.rl
+    import scml.scml2019
+    import scml.scml2020
+
+    expected = dict()
+    for pkg in (scml.scml2019, scml.scml2020, scml.oneshot):
+        for name in pkg.__all__:
+            if name not in ("utils", "helpers"):
+                expected[name] = getattr(pkg, name)
+    assert set(scml._LAZY_NAMES.keys()) == set(expected.keys())
+    for name, value in expected.items():
+        assert getattr(scml, name) is value, name
+    assert set(scml.__all__) == set(scml.scml2020.__all__ + scml.oneshot.__all__)
+    assert set(scml.oneshot._RL_EXPORTS) == set(scml.oneshot.rl.__all__)
@@ -1,3 +1,5 @@
+import itertools
+import random
 from pprint import pformat
 
 import pytest
@@ -8,7 +10,12 @@ from negmas.sao import SAOResponse
 
 from scml.oneshot import OneShotSyncAgent, SCML2020OneShotWorld
 from scml.oneshot.agents import RandomOneShotAgent
-from scml.oneshot.ufun import OneShotUFun
+from scml.oneshot.ufun import (
+    OneShotUFun,
+    clear_limit_cache,
+    enable_limit_cache,
+    limit_cache_info,
+)
 from scml.scml2020.common import QUANTITY, TIME, UNIT_PRICE
 
 
@@ -371,3 +378,232 @@ def test_find_limit():
     assert u.from_offers(
         tuple(), tuple(), ignore_signed_contracts=False
     ) < u.from_offers(((20, 5, 14),), (True,), ignore_signed_contracts=False)
+
+
+def test_outcome_spaces_are_shared_across_agents():
+    from negmas.outcomes.issue_ops import enumerate_issues
+
+    from scml.common import shared_outcome_array, shared_outcomes
+
+    world = SCML2020OneShotWorld(
+        **SCML2020OneShotWorld.generate(
+            RandomOneShotAgent, n_agents_per_process=3, n_processes=2, n_steps=3
+        ),
+    )
+    world.step()
+    agents = [_ for _ in world.agents.values() if _.awi.my_input_product == 1]
+    assert len(agents) > 1
+    spaces = {id(_.ufun.outcome_space) for _ in agents}
+    assert len(spaces) == 1
+    awi = agents[0].awi
+    assert awi.current_input_outcome_space is agents[1].awi.current_input_outcome_space
+    issues = awi.current_input_issues
+    outcomes = shared_outcomes(issues)
+    assert outcomes is shared_outcomes(issues)
+    assert list(outcomes) == list(enumerate_issues(issues))
+    assert shared_outcome_array(issues).tolist() == [list(_) for _ in outcomes]
+
+
+def test_ufuns_are_refreshed_in_place_every_day():
+    world = SCML2020OneShotWorld(
+        **SCML2020OneShotWorld.generate(
+            RandomOneShotAgent, n_agents_per_process=3, n_processes=2, n_steps=5
+        ),
+    )
+    world.step()
+    agents = {
+        aid: a for aid, a in world.agents.items() if isinstance(a.ufun, OneShotUFun)
+    }
+    assert agents
+    ufuns = {aid: a.ufun for aid, a in agents.items()}
+    for _ in range(3):
+        world.step()
+    for aid, a in agents.items():
+        ufun = a.ufun
+        assert ufun is ufuns[aid]
+        assert ufun.current_step == world.current_step - 1
+        fresh = OneShotUFun(
+            **{
+                k: getattr(ufun, k)
+                for k in (
+                    "ex_pin",
+                    "ex_qin",
+                    "ex_pout",
+                    "ex_qout",
+                    "input_product",
+                    "input_agent",
+                    "output_agent",
+                    "production_cost",
+                    "disposal_cost",
+                    "shortfall_penalty",
+                    "input_penalty_scale",
+                    "output_penalty_scale",
+                    "n_input_negs",
+                    "n_output_negs",
+                    "current_step",
+                    "input_qrange",
+                    "input_prange",
+                    "output_qrange",
+                    "output_prange",
+                    "force_exogenous",
+                    "n_lines",
+                    "current_balance",
+                    "suppliers",
+                    "consumers",
+                )
+            }
+        )
+        ufun.find_limit(True)
+        ufun.find_limit(False)
+        fresh.find_limit(True)
+        fresh.find_limit(False)
+        assert ufun.reserved_value == fresh.reserved_value
+        assert ufun.max_utility == fresh.max_utility
+        assert ufun.min_utility == fresh.min_utility
+
+
+def test_find_limit_is_shared_by_identical_ufuns():
+    class DoubledUFun(OneShotUFun):
+        def from_offers(self, *args, **kwargs):
+            u = super().from_offers(*args, **kwargs)
+            if isinstance(u, tuple):
+                return 2 * u[0], u[1]
+            return 2 * u
+
+    def make(balance, type_=OneShotUFun):
+        return type_(
+            ex_pin=10 * 10,
+            ex_qin=10,
+            ex_pout=0,
+            ex_qout=0,
+            input_product=0,
+            input_agent=True,
+            output_agent=False,
+            production_cost=2,
+            disposal_cost=0.1,
+            shortfall_penalty=0.3,
+            input_penalty_scale=None,
+            output_penalty_scale=None,
+            n_input_negs=0,
+            n_output_negs=5,
+            current_step=6,
+            input_qrange=(1, 10),
+            input_prange=(11, 12),
+            output_qrange=(1, 10),
+            output_prange=(14, 15),
+            current_balance=balance,
+        )
+
+    clear_limit_cache()
+    try:
+        first = make(float("inf"))
+        best, worst = first.find_limit(True), first.find_limit(False)
+        assert limit_cache_info().misses == 2
+        # a large enough balance is equivalent to an infinite one
+        second = make(10_000)
+        assert second.find_limit(True) == best
+        assert second.find_limit(False) == worst
+        info = limit_cache_info()
+        assert info.hits == 2 and info.misses == 2 and info.currsize == 2
+        # a small balance changes the limits
+        poor = make(50)
+        poor.find_limit(True)
+        assert limit_cache_info().misses == 3
+        # ufuns of a subclass that changes the utility do not share limits with the base class
+        doubled = make(float("inf"), DoubledUFun)
+        assert doubled.find_limit(True).utility == 2 * best.utility
+        assert limit_cache_info().misses == 4
+
+        enable_limit_cache(False)
+        third = make(float("inf"))
+        assert third.find_limit(True) == best
+        assert third.find_limit(False) == worst
+        info = limit_cache_info()
+        assert not info.enabled and info.hits == 0 and info.currsize == 0
+    finally:
+        enable_limit_cache(True)
+
+
+@pytest.mark.parametrize("level", ["first", "middle", "last"])
+def test_best_acceptance_set_matches_brute_force(level):
+    rng = random.Random(level)
+    for _ in range(100):
+        u = OneShotUFun(
+            ex_pin=rng.randint(0, 100) if level == "first" else 0,
+            ex_qin=rng.randint(0, 10) if level == "first" else 0,
+            ex_pout=rng.randint(0, 200) if level == "last" else 0,
+            ex_qout=rng.randint(0, 10) if level == "last" else 0,
+            input_product=0 if level == "first" else 1,
+            input_agent=level == "first",
+            output_agent=level == "last",
+            production_cost=rng.randint(0, 4),
+            disposal_cost=rng.random(),
+            shortfall_penalty=2 * rng.random(),
+            input_penalty_scale=10,
+            output_penalty_scale=12,
+            n_input_negs=3,
+            n_output_negs=3,
+            current_step=0,
+            n_lines=rng.randint(1, 12),
+        )
+        for _ in range(rng.randint(0, 3)):
+            if rng.random() < 0.5:
+                u.register_sale(rng.randint(1, 5), rng.randint(5, 20))
+            else:
+                u.register_supply(rng.randint(1, 5), rng.randint(5, 20))
+        n = rng.randint(0, 7)
+        offers = tuple(
+            None if rng.random() < 0.1 else (rng.randint(0, 10), 0, rng.randint(5, 20))
+            for _ in range(n)
+        )
+        if level == "middle":
+            outputs = tuple(rng.random() < 0.5 for _ in range(n))
+        else:
+            outputs = tuple([level == "first"] * n)
+
+        def utility(indices):
+            return u.from_offers(
+                tuple(offers[_] for _ in indices),
+                tuple(outputs[_] for _ in indices),
+                ignore_signed_contracts=False,
+            )
+
+        chosen, best = u.best_acceptance_set(offers, outputs)
+        assert best == pytest.approx(utility(chosen))
+        valid = [i for i, _ in enumerate(offers) if _]
+        assert best == pytest.approx(
+            max(
+                utility(_)
+                for k in range(len(valid) + 1)
+                for _ in itertools.combinations(valid, k)
+            )
+        )
+
+
+def test_best_acceptance_set_returns_partners():
+    u = OneShotUFun(
+        ex_pin=0,
+        ex_qin=0,
+        ex_pout=10 * 20,
+        ex_qout=10,
+        input_product=1,
+        input_agent=False,
+        output_agent=True,
+        production_cost=1,
+        disposal_cost=0.1,
+        shortfall_penalty=0.5,
+        input_penalty_scale=10,
+        output_penalty_scale=20,
+        n_input_negs=4,
+        n_output_negs=0,
+        current_step=0,
+        n_lines=10,
+        suppliers={"a", "b", "c", "d"},
+    )
+    offers = dict(a=(6, 0, 12), b=(4, 0, 10), c=(5, 0, 9), d=None)
+    chosen, best = u.best_acceptance_set(offers)
+    # b and c are cheaper but only a and b together cover the exogenous output of ten units
+    assert chosen == ("a", "b")
+    assert best == u.from_offers(
+        dict(a=offers["a"], b=offers["b"]), ignore_signed_contracts=False
+    )
@@ -1,6 +1,7 @@
 import logging
 import random
 from functools import partial
+from types import SimpleNamespace
 from typing import Any
 
 import numpy as np
@@ -136,6 +137,38 @@ def test_rl_agent_fallback():
     world.run()
 
 
+def test_rl_agent_batch_respond_uses_the_fallback_agent():
+    factory = FixedPartnerNumbersOneShotFactory()
+    world, agents = factory(types=(OneShotRLAgent,))
+    agent = agents[0]._obj  # type: ignore
+    assert agent._valid_index < 0
+
+    class Fallback:
+        def respond(self, negotiator_id, state):
+            return state.responses[negotiator_id]
+
+        def propose(self, negotiator_id, state):
+            return (1, state.step, 10)
+
+    offers = {"a": (1, 0, 5), "b": (2, 0, 6), "c": (3, 0, 7)}
+    responses = dict(
+        a=ResponseType.ACCEPT_OFFER,
+        b=ResponseType.REJECT_OFFER,
+        c=ResponseType.END_NEGOTIATION,
+    )
+    state = SimpleNamespace(step=3, responses=responses)
+    agent._fallback_agent = Fallback()
+    agent._awi = SimpleNamespace(current_states={_: state for _ in offers})
+    results = OneShotRLAgent.batch_respond([agent], [offers])
+    assert results == [
+        dict(
+            a=SAOResponse(ResponseType.ACCEPT_OFFER, (1, 0, 5)),
+            b=SAOResponse(ResponseType.REJECT_OFFER, (1, 3, 10)),
+            c=SAOResponse(ResponseType.END_NEGOTIATION, None),
+        )
+    ]
+
+
 def test_rl_agent_with_a_trained_model():
     from stable_baselines3 import A2C
 
@@ -158,6 +191,60 @@ def test_rl_agent_with_a_trained_model():
     world.run()
 
 
+class CheckedRLAgent(OneShotRLAgent):
+    """Checks that observations encoded from the AWI match the ones encoded from the state"""
+
+    def encode_state(self, mechanism_states):
+        encoded = super().encode_state(mechanism_states)
+        expected = self._obs_managers[self._valid_index].encode(self.awi.state)
+        assert np.all(encoded == expected), f"{encoded=}\n{expected=}"
+        return encoded
+
+
+def test_rl_agent_encodes_directly_from_awi():
+    factory = FixedPartnerNumbersOneShotFactory()
+    obs = FixedPartnerNumbersObservationManager(factory, extra_checks=True)
+    space = UnconstrainedActionManager(factory).make_space()
+    world, agents = factory(
+        types=(CheckedRLAgent,),
+        params=(dict(models=[lambda _: space.sample()], observation_managers=[obs]),),
+    )
+    world.step()
+    assert agents[0]._valid_index == 0  # type: ignore
+    assert agents[0]._obs is not None  # type: ignore
+    world.run()
+
+
+@mark.parametrize("batched_models", [True, False])
+def test_rl_agents_are_batched(batched_models):
+    n_agents = 3
+    factory = FixedPartnerNumbersOneShotFactory(world_params=dict(batch_policies=True))
+    obs = FixedPartnerNumbersObservationManager(factory)
+    action_space = UnconstrainedActionManager(factory).make_space()
+    batch_sizes = []
+
+    def model(observations):
+        if batched_models:
+            assert observations.ndim == 2
+            batch_sizes.append(len(observations))
+            return np.stack([action_space.sample() for _ in observations])
+        assert observations.ndim == 1
+        batch_sizes.append(1)
+        return action_space.sample()
+
+    params = dict(
+        models=[model], observation_managers=[obs], batched_models=batched_models
+    )
+    world, agents = factory(
+        types=(OneShotRLAgent,) * n_agents, params=(params,) * n_agents
+    )
+    world.run()
+    assert all(_._valid_index == 0 for _ in agents)  # type: ignore
+    assert batch_sizes
+    assert (max(batch_sizes) > 1) == batched_models
+    assert sum(world.stats["n_negotiations"]) > 0
+
+
 def test_env_runs_one_world():
     env = make_env(type="unlimited")
 
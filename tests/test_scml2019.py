@@ -1,5 +1,27 @@
+import copy
+import random
+from dataclasses import FrozenInstanceError
+from types import SimpleNamespace
+
 import pytest
+from negmas.situated import BulletinBoard, Contract
 
+from scml.scml2019.bank import DefaultBank
+from scml.scml2019.common import (
+    CFP,
+    CFPIndex,
+    Factory,
+    FrozenCFP,
+    Loan,
+    SCMLAgreement,
+)
+from scml.scml2019.consumers import JustInTimeConsumer
+from scml.scml2019.factory_managers.builtins import (
+    AveragingNegotiatorUtility,
+    GreedyFactoryManager,
+)
+from scml.scml2019.insurance import DefaultInsuranceCompany
+from scml.scml2019.simulators import temporary_transaction
 from scml.scml2019.utils import anac2019_world
 from tests.switches import SCML_RUN2019
 
@@ -14,6 +36,377 @@ from tests.switches import SCML_RUN2019
 def test_anac2019(n_steps, consumption_horizon):
     world = anac2019_world(n_steps=n_steps, consumption_horizon=consumption_horizon)
     world.run()
+    assert set(world._cfp_index._cfps.keys()) == set(
+        world.bulletin_board.data["cfps"].keys()
+    )
+
+
+@pytest.mark.skipif(
+    condition=not SCML_RUN2019,
+    reason="Environment set to ignore running 2019 tests. See switches.py",
+)
+def test_incremental_consumer_cfps_match_bulletin_board():
+    world = anac2019_world(n_steps=10, consumption_horizon=5)
+    consumers = [_ for _ in world.agents.values() if isinstance(_, JustInTimeConsumer)]
+    assert len(consumers) > 0 and not any(_.incremental_cfp_update for _ in consumers)
+    for consumer in consumers:
+        consumer.incremental_cfp_update = True
+    cfps = world.bulletin_board.data["cfps"]
+    while world.step():
+        for consumer in consumers:
+            published = {
+                (cfp.product, cfp.time): (key, cfp.max_quantity)
+                for key, cfp in cfps.items()
+                if cfp.publisher == consumer.id and cfp.time >= world.current_step
+            }
+            table = {
+                k: v
+                for k, v in consumer._published_cfps.items()
+                if k[1] >= world.current_step
+            }
+            assert published == table
+            for (p, t), (_, q) in table.items():
+                assert consumer.profiles[p].schedule_at(t) == q
+
+
+@pytest.mark.skipif(
+    condition=not SCML_RUN2019,
+    reason="Environment set to ignore running 2019 tests. See switches.py",
+)
+def test_memoized_negotiator_utilities_match_unmemoized():
+    world = anac2019_world(n_steps=10, consumption_horizon=5)
+    world.step()
+    manager = [_ for _ in world.agents.values() if type(_) is GreedyFactoryManager][0]
+    partner = [_ for _ in world.factory_managers if _.id != manager.id][0].id
+    sell_cfp = CFP(
+        is_buy=True,
+        publisher="buyer",
+        product=list(manager.producing.keys())[0],
+        time=(2, 8),
+        unit_price=(1.0, 50.0),
+        quantity=(1, 5),
+    )
+    buy_cfp = CFP(
+        is_buy=False,
+        publisher=partner,
+        product=list(manager.consuming.keys())[0],
+        time=(2, 8),
+        unit_price=(1.0, 500.0),
+        quantity=(1, 5),
+    )
+    ufuns = [
+        AveragingNegotiatorUtility(
+            agent=manager,
+            annotation=dict(
+                cfp=sell_cfp,
+                buyer="buyer",
+                seller=manager.id,
+                partners=["buyer", manager.id],
+            ),
+        ),
+        AveragingNegotiatorUtility(
+            agent=manager,
+            annotation=dict(
+                cfp=buy_cfp,
+                buyer=manager.id,
+                seller=partner,
+                partners=[manager.id, partner],
+            ),
+        ),
+    ]
+    agreements = [
+        SCMLAgreement(time=t, unit_price=float(u), quantity=q)
+        for t in range(2, 9)
+        for u in (1, 10, 50, 500)
+        for q in (1, 5)
+    ]
+
+    def evaluate(memoize):
+        manager.memoize_utilities = memoize
+        return [ufun(_) for ufun in ufuns for _ in agreements]
+
+    expected = evaluate(False)
+    assert evaluate(True) == pytest.approx(expected)
+    assert len(manager._utility_cache) == 2 * len(agreements)
+    # the price-free schedule of every product, quantity and time is shared by all unit prices
+    assert len(manager._marginal_cache) <= 2 * 7 * 2
+    assert evaluate(True) == pytest.approx(expected)
+    manager.invalidate_utility_cache()
+    assert ufuns[0](agreements[0]) == pytest.approx(expected[0])
+    assert len(manager._utility_cache) == 1
+
+    # stepping the world updates the simulator which drops all cached utilities
+    world.step()
+    expected = evaluate(False)
+    assert evaluate(True) == pytest.approx(expected)
+    n_updates = manager._n_schedule_updates
+    contract = ufuns[0]._contract(agreements[0])
+    with temporary_transaction(manager.scheduler):
+        schedule = manager.scheduler.schedule(contracts=[contract])
+    manager._execute_schedule(schedule=schedule, contract=contract)
+    assert manager._n_schedule_updates > n_updates
+    expected = evaluate(False)
+    assert evaluate(True) == pytest.approx(expected)
+
+
+@pytest.mark.skipif(
+    condition=not SCML_RUN2019,
+    reason="Environment set to ignore running 2019 tests. See switches.py",
+)
+def test_batched_cfp_feasibility_matches_individual_schedules():
+    world = anac2019_world(n_steps=20, consumption_horizon=5)
+    world.step()
+    manager = [_ for _ in world.agents.values() if type(_) is GreedyFactoryManager][0]
+    scheduler, simulator = manager.scheduler, manager.simulator
+    rng = random.Random(0)
+    cfps = []
+    for _ in range(30):
+        cfp = _random_cfp(rng)
+        cfps.append(
+            CFP(
+                is_buy=True,
+                publisher=cfp.publisher,
+                product=rng.choice(list(manager.producing.keys())),
+                time=cfp.time,
+                unit_price=cfp.unit_price,
+                quantity=cfp.quantity,
+            )
+        )
+    wallet, storage = simulator._wallet.copy(), simulator._storage.copy()
+    batched = scheduler.schedule_cfps(cfps, start_at=2)
+    assert (simulator._wallet == wallet).all()
+    assert (simulator._storage == storage).all()
+    for cfp, schedule in zip(cfps, batched):
+        with temporary_transaction(scheduler):
+            expected = scheduler.schedule(
+                contracts=[
+                    Contract(
+                        partners=[manager.id, cfp.publisher],
+                        agreement=SCMLAgreement(
+                            time=cfp.max_time,
+                            unit_price=cfp.max_unit_price,
+                            quantity=cfp.min_quantity,
+                        ),
+                        annotation=manager._create_annotation(cfp),
+                    )
+                ],
+                start_at=2,
+            )
+        assert schedule.valid == expected.valid
+        assert schedule.final_balance == expected.final_balance
+        assert [
+            (_.product, _.quantity_to_buy, _.quantity_in_storage, _.step)
+            for _ in schedule.needs
+        ] == [
+            (_.product, _.quantity_to_buy, _.quantity_in_storage, _.step)
+            for _ in expected.needs
+        ]
+    assert manager.can_produce_many(cfps) == [manager.can_produce(_) for _ in cfps]
+
+
+def _random_cfp(rng):
+    t = rng.randint(0, 10)
+    return CFP(
+        is_buy=rng.random() < 0.5,
+        publisher=f"a{rng.randint(0, 4)}",
+        product=rng.randint(0, 5),
+        time=(t, t + rng.randint(0, 3)) if rng.random() < 0.5 else t,
+        unit_price=(1.0, 10.0),
+        quantity=(1, rng.randint(1, 5)),
+    )
+
+
+def test_cfp_index_matches_bulletin_board():
+    rng = random.Random(0)
+    board, index = BulletinBoard(), CFPIndex()
+    board.add_section("cfps")
+    keys = []
+    for _ in range(200):
+        cfp = _random_cfp(rng)
+        board.record("cfps", key=cfp.id, value=cfp)
+        index.add(cfp.id, cfp)
+        keys.append(cfp.id)
+    for key in rng.sample(keys, 50):
+        board.remove("cfps", key=key)
+        index.remove(key)
+    queries = [
+        {"publisher": "a1"},
+        {"publisher": "a2", "time": 3, "product": 2},
+        {"products": [1, 3, 4], "is_buy": True},
+        {"publishers": ["a0", "a3"], "product_index": 1},
+        {"time": (2, 5), "quantity": 3},
+        {"product_ids": [7]},
+    ]
+    for query in queries:
+        assert list(index.query(query).items()) == list(
+            board.query("cfps", query).items()
+        )
+    for step in range(15):
+        expected = [k for k, v in board.data["cfps"].items() if v.max_time <= step]
+        assert index.expired(step) == expected
+        for key in expected:
+            board.remove("cfps", key=key)
+            index.remove(key)
+    assert len(index) == len(board.data["cfps"]) == 0
+
+
+def test_frozen_cfp_is_read_only_and_copies_are_mutable():
+    cfp = CFP(
+        is_buy=True,
+        publisher="a",
+        product=1,
+        time=[3, 4],
+        unit_price=(1.0, 2.0),
+        quantity=(1, 5),
+    )
+    frozen = FrozenCFP.of(cfp)
+    assert isinstance(frozen, CFP)
+    assert frozen == cfp and cfp == frozen
+    assert FrozenCFP.of(frozen) is frozen
+    assert frozen.time is not cfp.time
+    with pytest.raises(FrozenInstanceError):
+        frozen.quantity = 3
+    for thawed in (frozen.thaw(), copy.copy(frozen), copy.deepcopy(frozen)):
+        assert type(thawed) is CFP and thawed == cfp
+        thawed.quantity = 3
+    assert frozen.quantity == cfp.quantity == (1, 5)
+    assert frozen.satisfies({"product": 1, "time": 4})
+
+
+class _Borrower(SimpleNamespace):
+    def confirm_loan(self, loan, bankrupt_if_rejected):
+        return True
+
+    def __hash__(self):
+        return hash(self.id)
+
+
+@pytest.mark.parametrize("minimum_balance", [0.0, None], ids=["cr", "new-loan"])
+def test_bank_collects_installments_in_loan_order(minimum_balance):
+    a2f = {
+        _: Factory(
+            initial_storage={}, initial_wallet=0.0, profiles=[], max_storage=None
+        )
+        for _ in ("a", "b")
+    }
+    bank = DefaultBank(
+        minimum_balance=minimum_balance,
+        interest_rate=0.1,
+        interest_max=0.3,
+        balance_at_max_interest=100.0,
+        installment_interest=0.2,
+        time_increment=0.1,
+        a2f=a2f,
+    )
+    bank.awi = SimpleNamespace(current_step=0, logdebug=lambda *args, **kwargs: None)
+    a, b = _Borrower(id="a", name="a"), _Borrower(id="b", name="b")
+    loans = [
+        Loan(
+            amount=90,
+            starts_at=0,
+            total=90,
+            interest=0,
+            installment=30,
+            n_installments=3,
+        ),
+        Loan(
+            amount=60,
+            starts_at=0,
+            total=60,
+            interest=0,
+            installment=30,
+            n_installments=2,
+        ),
+        Loan(
+            amount=50,
+            starts_at=0,
+            total=50,
+            interest=0,
+            installment=50,
+            n_installments=1,
+        ),
+        Loan(
+            amount=10,
+            starts_at=5,
+            total=10,
+            interest=0,
+            installment=10,
+            n_installments=1,
+        ),
+    ]
+    for agent, loan in zip((a, a, a, b), loans):
+        bank._buy_loan(agent, loan, beneficiary=bank, contract=None)
+    a2f["a"].pay(a2f["a"].wallet - 70)
+    bank.step()
+    assert [(_.amount, _.n_installments) for _ in loans[:2]] == [(60, 2), (30, 1)]
+    assert a2f["a"].wallet == 0.0 and a2f["b"].wallet == 10.0
+    assert bank.wallet == -210 + 70
+    if minimum_balance is not None:
+        assert (loans[2].amount, loans[2].n_installments) == (40, 1)
+        assert bank.credit_rating("a") == -40
+        assert bank.loans[a] == loans[:3]
+    else:
+        # the unpaid installment was paid by a new loan starting next step
+        assert (loans[2].amount, loans[2].n_installments) == (-10, 0)
+        assert bank.wallet == -210 + 70 - 40 + 40
+        assert bank.loans[a][:2] == loans[:2] and len(bank.loans[a]) == 3
+        assert bank.loans[a][2].amount == 40 and bank.loans[a][2].starts_at == 1
+    assert bank.loans[b] == loans[3:]
+
+
+def test_insurance_premiums_batch_match_single_and_track_breaches():
+    a2f = {
+        _: Factory(
+            initial_storage={}, initial_wallet=100.0, profiles=[], max_storage=None
+        )
+        for _ in ("a", "b")
+    }
+    company = DefaultInsuranceCompany(
+        premium=0.1,
+        premium_breach_increment=0.5,
+        premium_time_increment=0.2,
+        a2f=a2f,
+        breach_sensitive_premiums=True,
+    )
+    default_company = DefaultInsuranceCompany(
+        premium=0.1, premium_breach_increment=0.5, premium_time_increment=0.2, a2f=a2f
+    )
+    board = BulletinBoard()
+    board.add_section("breaches")
+    for c in (company, default_company):
+        c._world = SimpleNamespace(bulletin_board=board)
+        c.awi = SimpleNamespace(current_step=2)
+    a, b = _Borrower(id="a", name="a"), _Borrower(id="b", name="b")
+    contracts = [
+        Contract(
+            partners=["a", "b"],
+            agreement={"time": time, "quantity": 1, "unit_price": 10},
+            signed_at=signed_at,
+        )
+        for time, signed_at in ((5, None), (5, 0), (2, 1), (8, 1))
+    ]
+    board.record("breaches", {"perpetrator": "b", "level": 0.4}, key="b1")
+    board.record("breaches", {"perpetrator": "a", "level": 1.0}, key="a1")
+    expected = [0.3, 0.3 * 1.4, None, 0.3 * 1.2]
+    premiums = company.evaluate_insurance_many(contracts, insured=a, against=b)
+    assert premiums == pytest.approx(expected)
+    assert premiums == [
+        company.evaluate_insurance(_, insured=a, against=b) for _ in contracts
+    ]
+    assert default_company.evaluate_insurance_many(
+        contracts, insured=a, against=b
+    ) == pytest.approx([0.1, 0.1 * 1.4, None, 0.1 * 1.2])
+    board.record("breaches", {"perpetrator": "b", "level": 0.6}, key="b2")
+    assert company.breach_level(b) == pytest.approx(1.0)
+    assert company.evaluate_insurance_many(
+        contracts[:2], insured=b, against=[b, a], t=3
+    ) == pytest.approx([0.6, 0.6 * 1.6])
+
+    policy = company.buy_insurance(contracts[0], insured=a, against=b)
+    assert policy is not None and (contracts[0].id, "b") in company.insured_contracts
+    assert not company.is_insured(contracts[0], perpetrator=a)
+    assert company.is_insured(contracts[0], perpetrator=b)
+    assert not company.is_insured(contracts[0], perpetrator=b)
 
 
 if __name__ == "__main__":
@@ -16,6 +16,9 @@ from scml.scml2019.common import NO_PRODUCTION
 from scml.scml2019.simulators import (
     FastFactorySimulator,
     SlowFactorySimulator,
+    SparseFactorySimulator,
+    compare_simulators,
+    select_simulator_type,
     storage_as_array,
 )
 from scml.scml2019.world import Factory
@@ -174,7 +177,7 @@ def do_simulator_run(simulator, profiles, t, at, profile_ind, override):
     t=st.integers(min_value=0, max_value=n_steps - 1),
     at=st.integers(min_value=0, max_value=n_steps - 1),
     override=st.booleans(),
-    simulator_type=st.sampled_from(("fast",)),
+    simulator_type=st.sampled_from(("fast", "sparse")),
 )  # @todo add slow back
 def test_slow_factory_simulator_with_jobs_hypothesis(
     profile_ind, t, at, override, simulator_type
@@ -223,9 +226,11 @@ def test_slow_factory_simulator_with_jobs_hypothesis(
         for i, (p, l) in enumerate(zip(processes, itertools.cycle(range(n_lines))))
     ]
 
-    simulator_type = (
-        SlowFactorySimulator if simulator_type == "slow" else FastFactorySimulator
-    )
+    simulator_type = dict(
+        slow=SlowFactorySimulator,
+        fast=FastFactorySimulator,
+        sparse=SparseFactorySimulator,
+    )[simulator_type]
     simulator = simulator_type(
         initial_wallet=initial_wallet,
         initial_storage=initial_storage,
@@ -406,5 +411,40 @@ class SimulatorsActAsFactory(RuleBasedStateMachine):
 
 TestSimulators = SimulatorsActAsFactory.TestCase
 
+
+def test_slow_factory_simulator_rewinds_to_the_returned_bookmark(slow_simulator):
+    outer = slow_simulator.bookmark()
+    slow_simulator.pay(10, 5)
+    inner = slow_simulator.bookmark()
+    for payment in (20, 30):
+        slow_simulator.pay(payment, 5)
+        inner = slow_simulator.rewind(inner)
+        assert slow_simulator.wallet_at(5) == initial_wallet - 10
+    assert slow_simulator.rollback(inner) and slow_simulator.delete_bookmark(inner)
+    assert slow_simulator.wallet_at(5) == initial_wallet - 10
+    assert slow_simulator.rollback(outer) and slow_simulator.delete_bookmark(outer)
+    assert slow_simulator.wallet_at(5) == initial_wallet
+
+
+@pytest.mark.parametrize("max_storage", [None, 150])
+@pytest.mark.parametrize("seed", list(range(5)))
+def test_sparse_simulator_matches_fast_simulator(seed, max_storage):
+    times = compare_simulators(
+        sample_profiles,
+        n_steps=40,
+        n_products=len(sample_products),
+        n_operations=500,
+        initial_wallet=300.0,
+        max_storage=max_storage,
+        seed=seed,
+    )
+    assert set(times.keys()) == {"FastFactorySimulator", "SparseFactorySimulator"}
+
+
+def test_simulator_selection_depends_on_problem_size():
+    assert select_simulator_type(n_steps=50, n_products=20) is FastFactorySimulator
+    assert select_simulator_type(n_steps=1000, n_products=20) is SparseFactorySimulator
+
+
 if __name__ == "__main__":
     pytest.main(args=[__file__])
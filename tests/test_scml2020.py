@@ -1,6 +1,7 @@
 import random
 
 import hypothesis.strategies as st
+import pandas as pd
 import pytest
 from hypothesis import given, settings
 from negmas import save_stats
@@ -354,3 +355,75 @@ def test_graphs_lead_to_no_unknown_nodes():
         construct_graphs=True,
     )
     world.graph((0, world.n_steps))
+
+
+@pytest.mark.skipif(
+    condition=not SCML_RUN2020,
+    reason="Environment set to ignore running 2020 tests. See switches.py",
+)
+@pytest.mark.parametrize("evict", [True, False])
+def test_contract_sink_streams_contracts(tmp_path, evict):
+    from scml.sinks import ContractSink
+
+    world = generate_world(
+        [DecentralizingAgent, BuyCheapSellExpensiveAgent],
+        n_processes=2,
+        n_steps=10,
+    )
+    sink = ContractSink(world, tmp_path, chunk_size=10, format="csv", evict=evict)
+    for _ in range(world.n_steps):
+        world.step()
+        sink.flush()
+        assert all(
+            c["delivery_time"] >= world.current_step
+            for c in world.saved_contracts
+            if evict
+        )
+    sink.close()
+    assert len(sink.files()) > 1
+    assert sink.n_contracts == len(world.contracts_df)
+    signed = sink.contracts_df(["quantity", "product_name"], signed_only=True)
+    assert len(signed) == sink.n_signed
+    assert (
+        sink.product_summary(executed_only=False).quantity.sum()
+        == signed["quantity"].sum()
+    )
+    if evict:
+        assert len(world.saved_contracts) == 0
+    # the world computes its statistics from the sink when its records are evicted
+    for name in (
+        "cancellation_rate",
+        "agreement_fraction",
+        "contract_execution_fraction",
+        "breach_fraction",
+        "n_negotiation_rounds_failed",
+    ):
+        a, b = getattr(sink, name), getattr(world, name)
+        assert a == b or (a != a and b != b), name
+    # the standard files of negmas are written from the chunks
+    contracts = pd.read_csv(tmp_path / "contracts.csv")
+    assert len(contracts) == sink.n_contracts
+    assert contracts["index"].tolist() == list(range(len(contracts)))
+
+
+@pytest.mark.skipif(
+    condition=not SCML_RUN2020,
+    reason="Environment set to ignore running 2020 tests. See switches.py",
+)
+def test_contract_sink_without_streaming(tmp_path):
+    from scml.sinks import ContractSink
+
+    world = generate_world(
+        [DecentralizingAgent, BuyCheapSellExpensiveAgent],
+        n_processes=2,
+        n_steps=10,
+    )
+    sink = ContractSink(world, tmp_path / "sink", stream=False)
+    for _ in range(world.n_steps):
+        world.step()
+        sink.flush()
+    sink.close()
+    assert not (tmp_path / "sink").exists()
+    assert len(world.saved_contracts) == sink.n_contracts > 0
+    assert len(sink.contracts_df()) == sink.n_contracts
+    assert sink.agreement_fraction == world.agreement_fraction
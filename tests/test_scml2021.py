@@ -1,3 +1,4 @@
+import copy
 import warnings
 
 import pytest
@@ -5,11 +6,12 @@ import pytest
 warnings.filterwarnings("ignore")
 
 import random
+from types import SimpleNamespace
 
 import hypothesis.strategies as st
 import numpy as np
 from hypothesis import example, given, settings
-from negmas import save_stats
+from negmas import Contract, save_stats
 from negmas.helpers import unique_name
 from numpy.testing import assert_allclose
 from pytest import mark, raises
@@ -21,6 +23,7 @@ from scml.scml2020 import (
     BuyCheapSellExpensiveAgent,
     DoNothingAgent,
     IndependentNegotiationsAgent,
+    PredictionBasedTradingStrategy,
     RandomAgent,
     SatisficerAgent,
     SCML2021World,
@@ -298,6 +301,157 @@ def test_agents_go_bankrupt(n_processes):
         #     )
 
 
+@mark.parametrize("batch_contract_execution", [False, True])
+def test_open_contracts_index_matches_contract_lists(batch_contract_execution):
+    world = generate_world(
+        [RandomAgent],
+        n_processes=3,
+        n_steps=15,
+        initial_balance=200,
+        bankruptcy_limit=0,
+        batch_contract_execution=batch_contract_execution,
+        compact=COMPACT,
+        no_logs=NOLOGS,
+    )
+    while world.step():
+        s = world.current_step
+        for factory in world.factories:
+            if factory.is_bankrupt:
+                assert len(factory.open_contracts) == 0
+                continue
+            expected = [
+                c.contract.id
+                for t in range(s, world.n_steps)
+                for c in factory.contracts[t]
+                if c.contract.executed_at < 0
+                and c.contract.nullified_at < 0
+                and not world.a2f[c.partner].is_bankrupt
+            ]
+            assert [_.contract.id for _ in factory.future_open_contracts(s)] == expected
+            assert sorted(
+                cid for _ in factory.open_contracts_with.values() for cid in _.keys()
+            ) == sorted(expected)
+
+
+@mark.parametrize("batch_contract_execution", [False, True])
+def test_market_statistics_are_shared_by_all_agents(batch_contract_execution):
+    world = generate_world(
+        [DecentralizingAgent, RandomAgent],
+        n_processes=2,
+        n_steps=10,
+        batch_contract_execution=batch_contract_execution,
+        compact=COMPACT,
+        no_logs=NOLOGS,
+    )
+    agents = [_ for aid, _ in world.agents.items() if not is_system_agent(aid)]
+    market = agents[0].awi.market_statistics
+    assert all(_.awi.market_statistics is market for _ in agents)
+    summary = world.exogenous_contracts_summary
+    for agent in agents:
+        inp, out = agent.awi.my_input_product, agent.awi.my_output_product
+        n_competitors = len(agent.awi.all_consumers[inp])
+        assert_allclose(
+            market.exogenous_supply[inp], summary[inp, :, 0] / n_competitors
+        )
+        assert_allclose(
+            market.exogenous_demand[out], summary[out, :, 0] / n_competitors
+        )
+    while world.step():
+        rates = market.execution_rates
+        assert np.all(rates >= 0) and np.all(rates <= 1)
+        s = min(world.current_step, world.n_steps - 1)
+        forecast = market.price_forecast
+        assert forecast.shape == (world.n_products, world.n_steps)
+        assert_allclose(forecast[:, s], world.trading_prices)
+        assert_allclose(forecast[:, :s], world._trading_price[:, 1 : s + 1])
+        assert np.all(forecast >= 0)
+        due, executed = (
+            world._due_quantity[:, : s + 1].sum(),
+            world._sold_quantity.sum(),
+        )
+        assert executed <= due
+        # execution rates follow due quantities recorded for the current step
+        before = rates.copy()
+        world._due_quantity[:, s] += 1000
+        assert np.all(market.execution_rates <= before)
+        world._due_quantity[:, s] -= 1000
+        assert_allclose(market.execution_rates, before)
+
+
+def test_prediction_based_trading_signs_within_needs():
+    n_steps = 5
+    agent = SimpleNamespace(
+        id="me",
+        awi=SimpleNamespace(
+            current_step=1,
+            n_steps=n_steps,
+            available_for_production=lambda *args, **kwargs: (np.arange(100), None),
+        ),
+        output_price=np.zeros(n_steps),
+        input_cost=np.zeros(n_steps),
+        outputs_secured=np.array([0, 1, 0, 0, 0]),
+        outputs_needed=np.array([0, 2, 3, 0, 0]),
+        inputs_secured=np.array([0, 0, 0, 1, 0]),
+        inputs_needed=np.array([0, 0, 0, 2, 2]),
+    )
+
+    def contract(is_seller, q, t):
+        seller, buyer = ("me", "partner") if is_seller else ("partner", "me")
+        return Contract(
+            partners=[seller, buyer],
+            agreement=dict(quantity=q, time=t, unit_price=10),
+            annotation=dict(seller=seller, buyer=buyer),
+        )
+
+    contracts = [
+        # secured and needed between steps 1 and 2
+        contract(True, 2, 3),
+        contract(True, 3, 3),
+        # nothing can be sold before step 0
+        contract(True, 1, 0),
+        # secured and needed between steps 3 and 4
+        contract(False, 1, 2),
+        # nothing can be sold after the last step
+        contract(False, 3, 4),
+    ]
+    assert PredictionBasedTradingStrategy.sign_all_contracts(agent, contracts) == [
+        "me",
+        None,
+        None,
+        "me",
+        None,
+    ]
+
+
+def test_factory_state_contracts_are_snapshots():
+    world = generate_world(
+        [RandomAgent], n_processes=2, n_steps=10, compact=COMPACT, no_logs=NOLOGS
+    )
+    for _ in range(4):
+        world.step()
+    for factory in world.factories:
+        state = factory.state
+        infos = [_ for step in factory.contracts for _ in step]
+        assert len(state.contracts) == len(infos)
+        assert [_.id for _ in state.contracts] == [_.contract.id for _ in infos]
+        for copied, info in zip(state.contracts, infos):
+            assert copied is not info.contract
+            assert copied.agreement == info.contract.agreement
+        assert isinstance(state.contracts, list)
+    for factory in world.factories:
+        state = factory.state
+        infos = [_ for step in factory.contracts for _ in step]
+        if not infos:
+            continue
+        before = [(_.contract.executed_at, _.contract.nullified_at) for _ in infos]
+        for info in infos:
+            info.contract.executed_at, info.contract.nullified_at = 1000, 1000
+        assert [(_.executed_at, _.nullified_at) for _ in state.contracts] == before
+        for info, (executed_at, nullified_at) in zip(infos, before):
+            info.contract.executed_at = executed_at
+            info.contract.nullified_at = nullified_at
+
+
 @mark.parametrize("n_processes", [2, 3, 4, 5, 6])
 def test_generate(n_processes):
     world = SCML2021World(
@@ -311,6 +465,88 @@ def test_generate(n_processes):
     world.run()
 
 
+@mark.parametrize(
+    "n_processes,method",
+    [
+        (2, "profitable"),
+        (4, "profitable"),
+        (2, "guaranteed_profit"),
+        (4, "guaranteed_profit"),
+    ],
+)
+def test_generate_vectorized(n_processes, method):
+    world = SCML2021World(
+        **SCML2021World.generate(
+            agent_types=DoNothingAgent,
+            n_steps=50,
+            n_processes=n_processes,
+            initial_balance=None,
+            method=method,
+            vectorized=True,
+        )
+    )
+    world.run()
+
+
+@given(
+    n=st.integers(0, 500),
+    l=st.integers(1, 10),
+    l_m=st.integers(0, 3),
+    l_x=st.one_of(st.none(), st.integers(50, 100)),
+)
+def test_vectorized_integer_cut(n, l, l_m, l_x):
+    from scml.common import vectorized_integer_cut
+
+    if n < l * l_m or (l_x is not None and n > l * l_x):
+        with raises(ValueError):
+            vectorized_integer_cut(n, l, l_m, l_x)
+        return
+    x = vectorized_integer_cut(n, l, l_m, l_x)
+    assert len(x) == l and sum(x) == n and min(x) >= l_m
+    assert l_x is None or max(x) <= l_x
+
+
+@given(n=st.integers(0, 500), p=st.lists(st.floats(0.0, 1.0), min_size=1, max_size=8))
+def test_vectorized_fraction_cut(n, p):
+    from scml.common import vectorized_fraction_cut
+
+    p = np.asarray(p)
+    if p.sum() < 1e-3:
+        return
+    x = vectorized_fraction_cut(n, p / p.sum())
+    assert x.sum() == n and x.min() >= 0
+
+
+@given(
+    predictability=st.floats(0.0, 1.0),
+    a=st.integers(1, 8),
+    limit=st.one_of(st.none(), st.integers(10, 20)),
+)
+@settings(deadline=None, max_examples=30)
+def test_vectorized_distribute_quantities(predictability, a, limit):
+    from scml.common import distribute_quantities
+
+    n_steps = 20
+    q = np.random.randint(0, 10 * a, size=n_steps)
+    values = np.asarray(
+        distribute_quantities(False, predictability, q, a, n_steps, limit, True)
+    )
+    assert values.shape == (n_steps, a)
+    assert values.min() >= 0
+    assert limit is None or values.max() <= limit
+    assert np.all(np.abs(values.sum(axis=1) - q) < 2 * a)
+
+
+def test_generate_many():
+    kwargs = dict(agent_types=DoNothingAgent, n_steps=20, n_processes=3, seed=5)
+    configs = SCML2021World.generate_many(3, **kwargs)
+    assert len(configs) == 3
+    for a, b in zip(configs, SCML2021World.generate_many(3, **kwargs)):
+        assert a["exogenous_contracts"] == b["exogenous_contracts"]
+        assert np.all(a["catalog_prices"] == b["catalog_prices"])
+    SCML2021World(**configs[0]).run()
+
+
 def test_a_tiny_world():
     world = generate_world(
         [DecentralizingAgent],
@@ -632,3 +868,167 @@ def test_trading_prices_updated(n_agents, n_processes, n_steps):
 
     assert diffs.max() > eps
     force_single_thread(False)
+
+
+@mark.parametrize("seed", range(6))
+def test_batch_contract_execution_matches_sequential_execution(seed):
+    config = SCML2021World.generate(
+        DoNothingAgent, n_processes=3, n_steps=5, n_agents_per_process=3
+    )
+    worlds = [
+        SCML2021World(
+            **copy.deepcopy(config),
+            batch_contract_execution=batch,
+            compact=True,
+            no_logs=True,
+        )
+        for batch in (False, True)
+    ]
+    rng = np.random.default_rng(seed)
+    n_products = worlds[0].n_products
+    states = [
+        (rng.integers(0, 20, n_products), int(rng.integers(0, 500)))
+        for _ in worlds[0].factories
+    ]
+    specs = []
+    for i in range(80):
+        product = int(rng.integers(0, n_products))
+        specs.append(
+            (
+                f"c{seed}-{i}",
+                product,
+                worlds[0].suppliers[product][
+                    rng.integers(0, len(worlds[0].suppliers[product]))
+                ],
+                worlds[0].consumers[product][
+                    rng.integers(0, len(worlds[0].consumers[product]))
+                ],
+                int(rng.integers(1, 10)),
+                int(rng.integers(1, 30)),
+            )
+        )
+
+    results = []
+    for world in worlds:
+        for factory, (inventory, balance) in zip(world.factories, states):
+            if is_system_agent(factory.agent_id):
+                continue
+            factory._inventory[:] = inventory
+            factory._balance = balance
+        contracts = []
+        for cid, product, seller, buyer, q, u in specs:
+            contract = Contract(
+                agreement=dict(time=0, quantity=q, unit_price=u),
+                partners=[buyer, seller],
+                annotation=dict(
+                    seller=seller,
+                    buyer=buyer,
+                    caller=buyer,
+                    is_buy=True,
+                    product=product,
+                ),
+                signatures={buyer: buyer, seller: seller},
+                signed_at=0,
+                id=cid,
+            )
+            world.on_contract_signed(contract)
+            contracts.append(contract)
+        breaches = []
+        for contract in world.order_contracts_for_execution(contracts):
+            b = world.start_contract_execution(contract)
+            breaches.append(
+                (
+                    contract.id,
+                    None
+                    if b is None
+                    else sorted((_.perpetrator, _.type, _.level) for _ in b),
+                )
+            )
+        results.append(
+            (
+                breaches,
+                [_.current_balance for _ in world.factories],
+                [_.current_inventory.tolist() for _ in world.factories],
+                [_.is_bankrupt for _ in world.factories],
+                world._sold_quantity[:, 1].tolist(),
+                world._real_price[:, 1].tolist(),
+                world.breach_prob,
+                world.agent_n_contracts,
+            )
+        )
+    sequential, batched = results
+    assert any(_[1] for _ in sequential[0]), "No breaches happened"
+    assert sequential[0] == batched[0]
+    assert sequential[1:4] == batched[1:4]
+    assert sequential[4] == batched[4]
+    assert_allclose(sequential[5], batched[5], rtol=0, atol=0)
+    assert sequential[6:] == batched[6:]
+
+
+def test_batch_contract_execution_records_unreported_contracts():
+    world = SCML2021World(
+        **SCML2021World.generate(
+            DoNothingAgent, n_processes=2, n_steps=5, n_agents_per_process=2
+        ),
+        batch_contract_execution=True,
+        construct_graphs=True,
+        compact=True,
+        no_logs=True,
+    )
+    product = 1
+    seller, buyer = world.suppliers[product][0], world.consumers[product][0]
+    world.a2f[seller]._inventory[product] = 100
+    world.a2f[buyer]._balance = 10_000
+    contracts = []
+    for i in range(5):
+        contract = Contract(
+            agreement=dict(time=0, quantity=2, unit_price=10),
+            partners=[buyer, seller],
+            annotation=dict(
+                seller=seller, buyer=buyer, caller=buyer, is_buy=True, product=product
+            ),
+            signatures={buyer: buyer, seller: seller},
+            signed_at=0,
+            id=f"c{i}",
+        )
+        world.on_contract_signed(contract)
+        contracts.append(contract)
+    ordered = world.order_contracts_for_execution(contracts)
+    # negmas executes the first contract (and with it the whole run) then stops
+    assert world.start_contract_execution(ordered[0]) == set()
+    executed_before = world._World__n_new_contract_executions
+    world._record_unreported_batch_executions()
+    assert world._World__n_new_contract_executions == executed_before + 4
+    assert world.contracts_executed[seller] == world.contracts_executed[buyer] == 4
+    assert all(_.executed_at == 0 for _ in ordered[1:])
+    assert all(world._saved_contracts[_.id]["executed_at"] == 0 for _ in ordered[1:])
+    assert len(world._edges_contracts_executed[0][(buyer, seller)]) == 4
+    assert not world._batch_execution_results
+
+
+def test_batch_contract_execution_executes_erring_contracts_once():
+    world = SCML2021World(
+        **SCML2021World.generate(
+            [DecentralizingAgent, RandomAgent], n_steps=10, n_processes=2
+        ),
+        batch_contract_execution=True,
+        ignore_contract_execution_exceptions=True,
+        compact=True,
+        no_logs=True,
+    )
+    calls = []
+    original = world._start_contract_execution
+
+    def failing(contract):
+        calls.append(contract.id)
+        # every other contract executed alone fails partway through its execution
+        if len(calls) % 2:
+            raise RuntimeError("failed")
+        return original(contract)
+
+    world._start_contract_execution = failing
+    world.run()
+    assert calls, "No contract was executed alone"
+    assert len(calls) == len(set(calls)), "A contract was executed twice"
+    # erred contracts are counted once for each partner
+    assert sum(world.contracts_erred.values()) == 2 * ((len(calls) + 1) // 2)
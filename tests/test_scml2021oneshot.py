@@ -1,3 +1,5 @@
+import copy
+import itertools
 import random
 from collections import defaultdict
 
@@ -18,6 +20,7 @@ from pytest import mark, raises
 
 import scml
 from scml.oneshot import (
+    OneShotBatchPolicy,
     OneShotSingleAgreementAgent,
     SCML2020OneShotWorld,
     builtin_agent_types,
@@ -29,7 +32,13 @@ from scml.oneshot.agent import (
 )
 from scml.oneshot.agents import GreedySyncAgent, RandomOneShotAgent
 from scml.oneshot.awi import OneShotAWI
-from scml.oneshot.common import QUANTITY, TIME, UNIT_PRICE, is_system_agent
+from scml.oneshot.common import (
+    QUANTITY,
+    TIME,
+    UNIT_PRICE,
+    best_subset,
+    is_system_agent,
+)
 from scml.oneshot.ufun import OneShotUFun
 
 from .switches import SCML_ON_GITHUB
@@ -151,6 +160,81 @@ def test_quantity_distribution(n_processes):
                     ), f"Contract: {str(c)} has negative or more quantity than n. lines {lines}\n{pformat(world.info)}"
 
 
+@mark.parametrize(
+    "force_signing,exogenous_control", [(True, -1), (False, 0.3), (False, 1.0)]
+)
+def test_generate_vectorized(force_signing, exogenous_control):
+    world = generate_world(
+        [MyOneShotAgent],
+        n_processes=3,
+        force_signing=force_signing,
+        exogenous_control=exogenous_control,
+        vectorized=True,
+    )
+    n_exogenous = 0
+    for contracts in world.exogenous_contracts.values():
+        for c in contracts:
+            n_exogenous += 1
+            for p in c.partners:
+                if is_system_agent(p):
+                    continue
+                assert world.agent_profiles[p].n_lines >= c.agreement["quantity"] > 0
+    assert n_exogenous > 0
+    world.run()
+
+
+def test_exogenous_contracts_array_matches_objects():
+    from scml.oneshot.common import OneShotExogenousContracts
+
+    config = SCML2020OneShotWorld.generate(
+        [MyOneShotAgent],
+        n_processes=2,
+        n_steps=10,
+        force_signing=False,
+        exogenous_control=0.5,
+        vectorized=True,
+    )
+    exogenous = config["exogenous_contracts"]
+    assert isinstance(exogenous, OneShotExogenousContracts)
+    as_objects = list(exogenous)
+    assert exogenous == as_objects
+    assert OneShotExogenousContracts.from_contracts(as_objects) == exogenous
+    assert np.all(exogenous["quantity"] == [_.quantity for _ in as_objects])
+
+    def agreements(contracts):
+        return {
+            s: sorted(
+                (c.annotation["seller"], c.annotation["buyer"], c.annotation["product"])
+                + tuple(sorted(c.agreement.items()))
+                for c in cs
+            )
+            for s, cs in contracts.items()
+        }
+
+    worlds = [
+        SCML2020OneShotWorld(
+            **(copy.deepcopy(config) | dict(exogenous_contracts=_)),
+            compact=True,
+            no_logs=True,
+        )
+        for _ in (exogenous, as_objects)
+    ]
+    assert agreements(worlds[0].exogenous_contracts) == agreements(
+        worlds[1].exogenous_contracts
+    )
+
+
+def test_generate_many():
+    kwargs = dict(agent_types=[MyOneShotAgent], n_steps=10, n_processes=2, seed=3)
+    configs = SCML2020OneShotWorld.generate_many(3, **kwargs)
+    assert len(configs) == 3
+    for a, b in zip(configs, SCML2020OneShotWorld.generate_many(3, **kwargs)):
+        assert a["exogenous_contracts"] == b["exogenous_contracts"]
+        assert np.all(a["catalog_prices"] == b["catalog_prices"])
+    world = SCML2020OneShotWorld(**configs[0], compact=True, no_logs=True)
+    world.run()
+
+
 @mark.parametrize("agent_type", types)
 @given(n_processes=st.integers(2, 4))
 @settings(deadline=300_000, max_examples=20)
@@ -942,6 +1026,91 @@ def test_sync_agent_receives_first_proposals_before_counter_all(
     assert world.current_step >= n_steps - 1
 
 
+class MyBatchAgent(OneShotBatchPolicy):
+    """Accepts offers covering no more than its needs and asks for its needs at its best price otherwise"""
+
+    batch_sizes: list[int] = []
+
+    def encode_batch_state(self):
+        iq, ip = (
+            self.awi.current_input_issues[QUANTITY],
+            self.awi.current_input_issues[UNIT_PRICE],
+        )
+        oq, op = (
+            self.awi.current_output_issues[QUANTITY],
+            self.awi.current_output_issues[UNIT_PRICE],
+        )
+        return np.asarray(
+            [
+                self.awi.needed_supplies,
+                self.awi.needed_sales,
+                iq.max_value,
+                ip.min_value,
+                oq.max_value,
+                op.max_value,
+            ],
+            dtype=float,
+        )
+
+    @classmethod
+    def act_batch(cls, offers, states):
+        cls.batch_sizes.append(len(offers))
+        selling = offers[..., 2] == 1
+        needs = np.where(selling, states[:, 1:2], states[:, 0:1])
+        max_quantity = np.where(selling, states[:, 4:5], states[:, 2:3])
+        price = np.where(selling, states[:, 5:6], states[:, 3:4])
+        responses = np.empty_like(offers)
+        responses[..., 0] = np.where(
+            offers[..., 0] <= needs,
+            ResponseType.ACCEPT_OFFER.value,
+            np.where(
+                needs > 0,
+                ResponseType.REJECT_OFFER.value,
+                ResponseType.END_NEGOTIATION.value,
+            ),
+        )
+        responses[..., 1] = np.clip(needs, 1, max_quantity)
+        responses[..., 2] = price
+        return responses
+
+
+@pytest.mark.parametrize("batch_policies", [True, False])
+def test_batch_policies(batch_policies):
+    MyBatchAgent.batch_sizes = []
+    world = generate_world(
+        [MyBatchAgent],
+        n_processes=2,
+        n_agents_per_process=4,
+        n_steps=5,
+        batch_policies=batch_policies,
+        ignore_agent_exceptions=False,
+        ignore_negotiation_exceptions=False,
+    )
+    world.run()
+    assert world.current_step == 5
+    assert world.stats["n_contracts_concluded"]
+    assert sum(world.stats["n_contracts_concluded"]) > 0
+    if batch_policies:
+        # every call handles all agents with offers to respond to
+        assert max(MyBatchAgent.batch_sizes) > 1
+    else:
+        assert set(MyBatchAgent.batch_sizes) == {1}
+
+
+def test_batch_policies_can_run_with_other_agents():
+    world = generate_world(
+        [MyBatchAgent, RandomOneShotAgent, GreedySyncAgent],
+        n_processes=2,
+        n_agents_per_process=3,
+        n_steps=5,
+        batch_policies=True,
+        ignore_agent_exceptions=False,
+        ignore_negotiation_exceptions=False,
+    )
+    world.run()
+    assert world.current_step == 5
+
+
 class MyRandomAgent(RandomOneShotAgent):
     def has_trade(self, s=None):
         if s is None:
@@ -1190,3 +1359,19 @@ def test_price_pumping_bankrupts_random_agents():
 #     world = generate_world(types, 2, 300, 4)
 #     world.run()
 #     check_trading_explosion(world, types)
+
+
+@given(
+    quantities=st.lists(st.integers(0, 10), max_size=8),
+    target=st.integers(-2, 40),
+    allow_excess=st.booleans(),
+)
+def test_best_subset_matches_powerset_search(quantities, target, allow_excess):
+    best, diff = None, float("inf")
+    for size in range(len(quantities) + 1):
+        for indices in itertools.combinations(range(len(quantities)), size):
+            total = sum(quantities[_] for _ in indices)
+            d = abs(target - total) if allow_excess else target - total
+            if 0 <= d < diff:
+                best, diff = (indices, total), d
+    assert best_subset(quantities, target, allow_excess) == best
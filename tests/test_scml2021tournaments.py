@@ -6,7 +6,20 @@ import pytest
 from hypothesis import given
 
 from scml.oneshot.agents import RandomOneShotAgent
-from scml.utils import anac2021_oneshot, truncated_mean
+from scml.transport import (
+    RECORDS_FILE_NAME,
+    SCORES_FILE_NAME,
+    memmap_transport_available,
+    read_world_records,
+    read_world_scores,
+    run_tournament_memmap,
+)
+from scml.utils import (
+    anac2021_oneshot,
+    anac2021_oneshot_world_generator,
+    balance_calculator_oneshot,
+    truncated_mean,
+)
 
 from .switches import SCML_RUN2021_ONESHOT, SCML_RUN_STD_TOURNAMENTS
 
@@ -78,6 +91,107 @@ def test_oneshot(n):
     ), f"Agents do not appear the same number of times:\n{df}"
 
 
+def test_memmap_transport_is_guarded_by_negmas_version(tmp_path, monkeypatch):
+    import negmas
+
+    assert memmap_transport_available()
+    monkeypatch.setattr(negmas, "__version__", "99.0.0")
+    assert not memmap_transport_available()
+    with pytest.raises(RuntimeError):
+        run_tournament_memmap(
+            tmp_path,
+            world_generator=anac2021_oneshot_world_generator,
+            score_calculator=balance_calculator_oneshot,
+        )
+
+
+@pytest.mark.skipif(
+    condition=not SCML_RUN2021_ONESHOT or not SCML_RUN_STD_TOURNAMENTS,
+    reason="Environment set to ignore running 2020 or tournament tests. See switches.py",
+)
+def test_oneshot_memmap_transport(tmp_path):
+    competitors = [MyAgent0, MyAgent1]
+    progress = []
+    results = anac2021_oneshot(
+        competitors=competitors,
+        n_steps=5,
+        n_configs=1,
+        n_runs_per_world=1,
+        parallelism="parallel",
+        result_transport="memmap",
+        tournament_path=str(tmp_path),
+        tournament_progress_callback=lambda r, i, n: progress.append(r),
+    )
+    assert len(results.total_scores) == 2
+    records = read_world_records(results.path)
+    scores = read_world_scores(results.path)
+    assert records["done"].all()
+    assert (records["executed_n_steps"] == 5).all()
+    assert len(progress) == len(records)
+    assert all(_ is not None and _.scores for _ in progress)
+    n_scores = sorted(
+        np.count_nonzero(~np.isnan(scores[i])) for i in range(len(records))
+    )
+    assert n_scores == sorted(records["n_scores"])
+    assert sum(n_scores) == len(results.scores)
+    assert np.isclose(np.nansum(scores), results.scores["score"].sum())
+
+
+@pytest.mark.skipif(
+    condition=not SCML_RUN2021_ONESHOT or not SCML_RUN_STD_TOURNAMENTS,
+    reason="Environment set to ignore running 2020 or tournament tests. See switches.py",
+)
+def test_oneshot_memmap_transport_resumes(tmp_path):
+    from negmas.tournaments.tournaments import RESULTS_FILE
+
+    from scml.transport import _load_assigned
+
+    path = Path(
+        anac2021_oneshot(
+            competitors=[MyAgent0, MyAgent1],
+            n_steps=5,
+            n_configs=2,
+            n_runs_per_world=1,
+            tournament_path=str(tmp_path),
+            configs_only=True,
+        )
+    ).parent
+
+    def run():
+        progress = []
+        run_tournament_memmap(
+            path,
+            world_generator=anac2021_oneshot_world_generator,
+            score_calculator=balance_calculator_oneshot,
+            tournament_progress_callback=lambda r, i, n: progress.append(r),
+        )
+        return progress
+
+    assert len(run()) > 1
+    before = read_world_scores(path).copy()
+    assert read_world_records(path)["done"].all()
+
+    # interrupt the run of the first world set after its results are saved
+    for world_params in _load_assigned(path)[0]:
+        (Path(world_params["__dir_name"]).parent / RESULTS_FILE).unlink(missing_ok=True)
+    records = np.load(path / RECORDS_FILE_NAME, mmap_mode="r+")
+    scores = np.load(path / SCORES_FILE_NAME, mmap_mode="r+")
+    records["done"][0] = False
+    scores[0] = np.nan
+    records.flush()
+    scores.flush()
+    del records, scores
+
+    progress = run()
+    assert len(progress) == 1
+    records = read_world_records(path)
+    after = read_world_scores(path)
+    assert records["done"].all()
+    # world sets run before the interruption keep their records
+    assert np.array_equal(after[1:], before[1:], equal_nan=True)
+    assert np.count_nonzero(~np.isnan(after[0])) == records["n_scores"][0]
+
+
 @pytest.mark.skipif(
     condition=not SCML_RUN2021_ONESHOT or not SCML_RUN_STD_TOURNAMENTS,
     reason="Environment set to ignore running 2020 or tournament tests. See switches.py",